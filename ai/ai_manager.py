@@ -10,9 +10,11 @@ Manages three AI services:
 All cloud API calls route through Tor for privacy.
 """
 
+import asyncio
 import json
 import os
 import sys
+import time
 from pathlib import Path
 from typing import Dict, List, Optional, Any
 from datetime import datetime
@@ -28,17 +30,25 @@ logger = logging.getLogger('AIManager')
 class AIManager:
     """Central manager for all AI assistant services"""
 
-    def __init__(self, config_dir: str = "/opt/qwamos/ai/config"):
+    def __init__(self, config_dir: str = "/opt/qwamos/ai/config", response_cache=None):
+        """
+        Initialize AI manager
+
+        Args:
+            config_dir: Directory with per-service config files
+            response_cache: Optional ResponseCache (see enable_response_cache)
+        """
         self.config_dir = Path(config_dir)
+        self.response_cache = response_cache
         self.services = {
             'kali-gpt': {'enabled': False, 'controller': None},
             'claude': {'enabled': False, 'controller': None},
             'chatgpt': {'enabled': False, 'controller': None}
         }
         self.usage_stats = {
-            'kali-gpt': {'queries': 0, 'tokens': 0, 'cost': 0.0},
-            'claude': {'queries': 0, 'tokens': 0, 'cost': 0.0},
-            'chatgpt': {'queries': 0, 'tokens': 0, 'cost': 0.0}
+            service: {'queries': 0, 'tokens': 0, 'cost': 0.0,
+                      'cache_hits': 0, 'cache_misses': 0, 'latency_saved': 0.0}
+            for service in self.services
         }
         self._load_config()
 
@@ -126,6 +136,8 @@ class AIManager:
     def disable_claude(self) -> bool:
         """Disable Claude service"""
         try:
+            if self.services['claude']['controller']:
+                self.services['claude']['controller'].close()
             self.services['claude']['enabled'] = False
             self.services['claude']['controller'] = None
             logger.info("Claude disabled")
@@ -170,6 +182,8 @@ class AIManager:
     def disable_chatgpt(self) -> bool:
         """Disable ChatGPT service"""
         try:
+            if self.services['chatgpt']['controller']:
+                self.services['chatgpt']['controller'].close()
             self.services['chatgpt']['enabled'] = False
             self.services['chatgpt']['controller'] = None
             logger.info("ChatGPT disabled")
@@ -178,9 +192,73 @@ class AIManager:
             logger.error(f"Error disabling ChatGPT: {e}")
             return False
 
+    # === Response Cache ===
+
+    def enable_response_cache(self, cache_dir: str = "/opt/qwamos/ai/cache/responses",
+                              ttl: float = 3600.0, max_entries: int = 1000,
+                              max_bytes: int = 64 * 1024 * 1024) -> bool:
+        """
+        Enable the encrypted on-disk response cache (opt-in)
+
+        Args:
+            cache_dir: Directory for encrypted entries
+            ttl: Seconds a cached response stays valid
+            max_entries: Maximum cached responses
+            max_bytes: Maximum cache size on disk
+
+        Returns:
+            bool: True if enabled successfully
+        """
+        try:
+            from response_cache import ResponseCache
+
+            self.response_cache = ResponseCache(cache_dir, ttl=ttl, max_entries=max_entries,
+                                                max_bytes=max_bytes)
+            logger.info(f"✅ Response cache enabled ({cache_dir}, ttl {ttl:.0f}s)")
+            return True
+
+        except Exception as e:
+            logger.error(f"❌ Failed to enable response cache: {e}")
+            return False
+
+    def disable_response_cache(self, clear: bool = False):
+        """Disable the response cache, optionally deleting cached entries"""
+        if self.response_cache is not None and clear:
+            self.response_cache.clear()
+        self.response_cache = None
+        logger.info("Response cache disabled")
+
+    def _cache_key(self, service: str, controller: Any, prompt: str,
+                   context: Optional[Dict]) -> str:
+        """Cache key for a query (service, model, normalized prompt, context hash)"""
+        model = getattr(controller, 'model', None)
+        if not isinstance(model, str):
+            # Kali GPT holds the loaded llama object in .model
+            model = str(getattr(controller, 'model_path', type(controller).__name__))
+        return self.response_cache.make_key(service, model, prompt, context)
+
+    def _cache_lookup(self, service: str, key: str) -> Optional[str]:
+        """Return a cached response and record the hit or miss"""
+        cached = self.response_cache.get(key)
+        if cached is None:
+            self.usage_stats[service]['cache_misses'] += 1
+            return None
+
+        response, latency = cached
+        self.usage_stats[service]['cache_hits'] += 1
+        self.usage_stats[service]['latency_saved'] += latency
+        logger.info(f"Response from {service} served from cache")
+        return response
+
+    def _cache_store(self, key: str, response: Any, latency: float):
+        """Cache a successful text response (controllers report errors as 'Error: ...')"""
+        if isinstance(response, str) and not response.startswith("Error"):
+            self.response_cache.put(key, response, latency)
+
     # === Query Interface ===
 
-    def query(self, service: str, prompt: str, context: Optional[Dict] = None) -> str:
+    def query(self, service: str, prompt: str, context: Optional[Dict] = None,
+              use_cache: bool = True) -> str:
         """
         Send query to specified AI service
 
@@ -188,6 +266,7 @@ class AIManager:
             service: Service name ('kali-gpt', 'claude', 'chatgpt')
             prompt: User prompt/query
             context: Optional context dict (conversation history, etc.)
+            use_cache: Consult the response cache if one is enabled
 
         Returns:
             str: AI response
@@ -202,14 +281,74 @@ class AIManager:
         if not controller:
             raise RuntimeError(f"No controller for {service}")
 
+        key = None
+        if self.response_cache is not None and use_cache:
+            key = self._cache_key(service, controller, prompt, context)
+            cached = self._cache_lookup(service, key)
+            if cached is not None:
+                return cached
+
         # Route query to appropriate controller
         try:
             logger.info(f"Querying {service}...")
 
+            started = time.monotonic()
             response = controller.query(prompt, context or {})
 
             # Update usage stats
             self._update_stats(service, response)
+            if key:
+                self._cache_store(key, response, time.monotonic() - started)
+
+            logger.info(f"Response from {service} received")
+            return response
+
+        except Exception as e:
+            logger.error(f"Query failed: {e}")
+            raise
+
+    async def aquery(self, service: str, prompt: str, context: Optional[Dict] = None,
+                     use_cache: bool = True) -> str:
+        """
+        Send query to specified AI service from asyncio code
+
+        Queries to different services (or several to one cloud service)
+        run concurrently instead of blocking the event loop.
+
+        Args:
+            service: Service name ('kali-gpt', 'claude', 'chatgpt')
+            prompt: User prompt/query
+            context: Optional context dict (conversation history, etc.)
+            use_cache: Consult the response cache if one is enabled
+
+        Returns:
+            str: AI response
+        """
+        controller = self.services.get(service, {}).get('controller')
+        if not hasattr(controller, 'aquery'):
+            # Validation and the blocking controller both run in a worker thread
+            return await asyncio.to_thread(self.query, service, prompt, context, use_cache)
+
+        if not self.services[service]['enabled']:
+            raise RuntimeError(f"Service {service} is not enabled")
+
+        key = None
+        if self.response_cache is not None and use_cache:
+            key = self._cache_key(service, controller, prompt, context)
+            cached = await asyncio.to_thread(self._cache_lookup, service, key)
+            if cached is not None:
+                return cached
+
+        try:
+            logger.info(f"Querying {service}...")
+
+            started = time.monotonic()
+            response = await controller.aquery(prompt, context or {})
+
+            # Update usage stats
+            self._update_stats(service, response)
+            if key:
+                await asyncio.to_thread(self._cache_store, key, response, time.monotonic() - started)
 
             logger.info(f"Response from {service} received")
             return response
@@ -274,9 +413,10 @@ class AIManager:
         Get detailed usage statistics
 
         Returns:
-            dict: Usage stats for all services
+            dict: Usage stats for all services (including response cache
+                  hits, misses and seconds of latency saved)
         """
-        return self.usage_stats.copy()
+        return {service: stats.copy() for service, stats in self.usage_stats.items()}
 
     def list_services(self) -> List[str]:
         """List all available services"""
@@ -315,6 +455,7 @@ def main():
     query_parser = subparsers.add_parser('query', help='Query AI service')
     query_parser.add_argument('service', choices=['kali-gpt', 'claude', 'chatgpt'])
     query_parser.add_argument('prompt', help='Query prompt')
+    query_parser.add_argument('--cache', action='store_true', help='Use the encrypted response cache')
 
     args = parser.parse_args()
 
@@ -364,10 +505,15 @@ def main():
             print(f"  Queries: {data['queries']}")
             print(f"  Tokens:  {data['tokens']}")
             print(f"  Cost:    ${data['cost']:.2f}")
+            if data['cache_hits'] or data['cache_misses']:
+                print(f"  Cache:   {data['cache_hits']} hits, {data['cache_misses']} misses, "
+                      f"{data['latency_saved']:.1f}s saved")
         print()
         return 0
 
     elif args.command == 'query':
+        if args.cache:
+            manager.enable_response_cache()
         try:
             response = manager.query(args.service, args.prompt)
             print(f"\n{response}\n")
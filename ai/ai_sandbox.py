@@ -19,6 +19,8 @@ Author: QWAMOS Security Team
 
 import os
 import sys
+import signal
+import asyncio
 import subprocess
 import json
 import logging
@@ -29,6 +31,16 @@ from enum import Enum
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger('AISandbox')
 
+# Worker protocol limits (see sandbox_worker.py)
+WORKER_SOURCE = Path(__file__).parent / "sandbox_worker.py"
+WORKER_SPAWN_TIMEOUT = 30.0
+WORKER_REPLY_GRACE = 5.0
+WORKER_MESSAGE_LIMIT = 64 * 1024 * 1024
+
+# Host variables kept when scrub_env is set; everything else (API keys,
+# tokens, proxy settings) stays out of the sandbox
+SCRUBBED_ENV_KEEP = ('PATH', 'LANG', 'LC_ALL', 'LC_CTYPE', 'TZ')
+
 
 class SandboxMode(Enum):
     """Sandbox isolation levels."""
@@ -48,7 +60,10 @@ class AISandbox:
     def __init__(self,
                  ai_service: str,
                  mode: SandboxMode = SandboxMode.STRICT,
-                 config_dir: str = "/opt/qwamos/ai"):
+                 config_dir: str = "/opt/qwamos/ai",
+                 pool_size: int = 0,
+                 max_jobs_per_worker: int = 50,
+                 scrub_env: bool = False):
         """
         Initialize AI sandbox.
 
@@ -56,9 +71,17 @@ class AISandbox:
             ai_service: Name of AI service (kali_gpt, chatgpt, claude)
             mode: Sandbox isolation mode
             config_dir: AI configuration directory
+            pool_size: Pre-spawned sandbox workers used by arun() (0 = spawn per call)
+            max_jobs_per_worker: Jobs a pooled worker runs before it is recycled
+            scrub_env: Don't pass the host environment to sandboxed processes
+                (only SCRUBBED_ENV_KEEP plus the env given per call)
         """
         self.ai_service = ai_service
         self.mode = mode
+        self.pool_size = pool_size
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.scrub_env = scrub_env
+        self.pools: Dict[bool, SandboxPool] = {}
         self.config_dir = Path(config_dir)
         self.service_dir = self.config_dir / ai_service
 
@@ -95,7 +118,8 @@ class AISandbox:
     def run_isolated(self,
                      command: List[str],
                      env: Optional[Dict[str, str]] = None,
-                     allow_network: bool = True) -> subprocess.CompletedProcess:
+                     allow_network: bool = True,
+                     timeout: float = 300) -> subprocess.CompletedProcess:
         """
         Run command in isolated sandbox.
 
@@ -103,6 +127,7 @@ class AISandbox:
             command: Command and arguments to execute
             env: Environment variables
             allow_network: Whether to allow network access
+            timeout: Seconds before the process is killed
 
         Returns:
             CompletedProcess result
@@ -110,19 +135,13 @@ class AISandbox:
         if self.mode == SandboxMode.NONE:
             # No sandboxing - run directly (UNSAFE!)
             logger.warning("⚠️  Running AI process WITHOUT sandbox isolation!")
-            return subprocess.run(command, env=env, capture_output=True, text=True)
+            if self.scrub_env:
+                env = self._sandbox_env(env)
+            return subprocess.run(command, env=env, capture_output=True, text=True, timeout=timeout)
 
         # Build sandbox command
         sandbox_cmd = self._build_sandbox_command(command, allow_network)
-
-        # Merge environment
-        sandbox_env = os.environ.copy()
-        if env:
-            sandbox_env.update(env)
-
-        # Add sandbox-specific environment
-        sandbox_env['QWAMOS_SANDBOXED'] = '1'
-        sandbox_env['QWAMOS_AI_SERVICE'] = self.ai_service
+        sandbox_env = self._sandbox_env(env)
 
         logger.info(f"Running {self.ai_service} in {self.mode.value} sandbox")
         logger.debug(f"Command: {' '.join(sandbox_cmd)}")
@@ -134,16 +153,88 @@ class AISandbox:
                 env=sandbox_env,
                 capture_output=True,
                 text=True,
-                timeout=300  # 5 minute timeout
+                timeout=timeout
             )
             return result
         except subprocess.TimeoutExpired:
-            logger.error(f"AI process timeout after 300s")
+            logger.error(f"AI process timeout after {timeout}s")
             raise
         except Exception as e:
             logger.error(f"Sandbox execution failed: {e}")
             raise
 
+    async def arun(self,
+                   command: List[str],
+                   env: Optional[Dict[str, str]] = None,
+                   allow_network: bool = True,
+                   timeout: float = 300) -> subprocess.CompletedProcess:
+        """
+        Run command in the sandbox without blocking the event loop.
+
+        With pool_size > 0 the job goes to an idle pre-spawned worker;
+        otherwise a fresh sandbox is spawned as in run_isolated().
+
+        Args:
+            command: Command and arguments to execute
+            env: Extra environment variables
+            allow_network: Whether to allow network access
+            timeout: Seconds before the job is killed
+
+        Returns:
+            CompletedProcess result
+
+        Raises:
+            subprocess.TimeoutExpired: If the job exceeds its timeout
+        """
+        if self.pool_size <= 0:
+            return await asyncio.to_thread(self.run_isolated, command, env, allow_network, timeout)
+
+        pool = self.pools.get(allow_network)
+        if pool is None:
+            pool = SandboxPool(self, self.pool_size, self.max_jobs_per_worker, allow_network)
+            self.pools[allow_network] = pool
+            await pool.start()
+
+        return await pool.run(command, env, timeout)
+
+    def set_mode(self, mode: SandboxMode):
+        """
+        Change the isolation mode.
+
+        Pooled workers were spawned under the old policy, so they are
+        recycled: idle ones now, busy ones when their job finishes.
+
+        Args:
+            mode: New sandbox isolation mode
+        """
+        if mode == self.mode:
+            return
+
+        logger.info(f"Sandbox policy change: {self.mode.value} -> {mode.value}")
+        self.mode = mode
+        for pool in self.pools.values():
+            pool.recycle()
+
+    async def close_pools(self):
+        """Stop all pooled sandbox workers."""
+        pools, self.pools = list(self.pools.values()), {}
+        for pool in pools:
+            await pool.close()
+
+    def _sandbox_env(self, env: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        """Build the environment for sandboxed processes."""
+        if self.scrub_env:
+            sandbox_env = {key: os.environ[key] for key in SCRUBBED_ENV_KEEP if key in os.environ}
+        else:
+            sandbox_env = os.environ.copy()
+        if env:
+            sandbox_env.update(env)
+
+        # Add sandbox-specific environment
+        sandbox_env['QWAMOS_SANDBOXED'] = '1'
+        sandbox_env['QWAMOS_AI_SERVICE'] = self.ai_service
+        return sandbox_env
+
     def _build_sandbox_command(self,
                                command: List[str],
                                allow_network: bool) -> List[str]:
@@ -242,6 +333,7 @@ class AISandbox:
             '--tmpfs', '/var',
             '--tmpfs', '/home',
             '--bind', str(self.sandbox_home), '/home/ai',
+            '--bind', str(self.sandbox_tmp), str(self.sandbox_tmp),
             '--chdir', '/home/ai',
         ])
 
@@ -317,6 +409,233 @@ class AISandbox:
             logger.warning(f"Sandbox cleanup failed: {e}")
 
 
+class SandboxPool:
+    """
+    Pool of pre-spawned, idle sandbox workers.
+
+    Each worker is one sandbox (firejail/bwrap/unshare) running
+    sandbox_worker.py, which forks jobs received over its stdin pipe.
+    Workers are recycled after max_jobs jobs, after a timed-out reply,
+    or when the sandbox policy changes.
+    """
+
+    def __init__(self,
+                 sandbox: AISandbox,
+                 size: int = 2,
+                 max_jobs: int = 50,
+                 allow_network: bool = True):
+        """
+        Initialize sandbox pool.
+
+        Args:
+            sandbox: Sandbox whose mode and directories the workers use
+            size: Number of workers
+            max_jobs: Jobs a worker runs before it is replaced
+            allow_network: Whether workers get network access
+        """
+        self.sandbox = sandbox
+        self.size = size
+        self.max_jobs = max_jobs
+        self.allow_network = allow_network
+
+        self.idle: asyncio.Queue = asyncio.Queue()
+        self.workers: set = set()
+        self.replacing: set = set()
+        self.generation = 0
+        self.next_job_id = 0
+        self.closed = False
+        self.stats = {
+            'jobs': 0,
+            'timeouts': 0,
+            'spawned': 0,
+            'recycled': 0
+        }
+
+    async def start(self):
+        """Spawn the initial workers."""
+        workers = await asyncio.gather(*[self._spawn() for _ in range(self.size)])
+        for worker in workers:
+            self.idle.put_nowait(worker)
+
+        logger.info(f"✓ Sandbox pool ready: {self.sandbox.ai_service} "
+                    f"({self.size} workers, {self.sandbox.mode.value})")
+
+    async def run(self,
+                  command: List[str],
+                  env: Optional[Dict[str, str]] = None,
+                  timeout: float = 300) -> subprocess.CompletedProcess:
+        """
+        Run a job on an idle worker.
+
+        Args:
+            command: Command and arguments to execute
+            env: Extra environment variables
+            timeout: Seconds before the job is killed
+
+        Returns:
+            CompletedProcess result
+
+        Raises:
+            subprocess.TimeoutExpired: If the job exceeds its timeout
+        """
+        if self.closed:
+            raise RuntimeError("Sandbox pool is closed")
+
+        # None marks a slot whose background respawn failed
+        worker = await self.idle.get()
+        if worker is None or worker.returncode is not None or worker.generation != self.generation:
+            if worker is not None:
+                self._retire(worker)
+            try:
+                worker = await self._spawn()
+            except (OSError, RuntimeError):
+                self.idle.put_nowait(None)
+                raise
+
+        self.next_job_id += 1
+        job = {'id': self.next_job_id, 'command': command, 'env': env or {}, 'timeout': timeout}
+        self.stats['jobs'] += 1
+
+        try:
+            worker.stdin.write((json.dumps(job) + "\n").encode('utf-8'))
+            await worker.stdin.drain()
+            reply = await asyncio.wait_for(self._read_message(worker), timeout + WORKER_REPLY_GRACE)
+        except asyncio.TimeoutError:
+            # The worker is wedged; never hand it out again
+            logger.error(f"Sandbox worker {worker.pid} did not answer within {timeout}s")
+            self.stats['timeouts'] += 1
+            self._replace(worker)
+            raise subprocess.TimeoutExpired(command, timeout)
+        except (ConnectionError, ValueError) as e:
+            logger.error(f"Sandbox worker {worker.pid} failed: {e}")
+            self._replace(worker)
+            raise RuntimeError(f"Sandbox worker failed: {e}")
+        except asyncio.CancelledError:
+            # A reply may still be in flight, so the worker cannot be reused
+            self._replace(worker)
+            raise
+
+        worker.jobs += 1
+        if worker.jobs >= self.max_jobs or worker.generation != self.generation:
+            self._replace(worker)
+        else:
+            self.idle.put_nowait(worker)
+
+        if reply['timed_out']:
+            logger.error(f"AI process timeout after {timeout}s")
+            self.stats['timeouts'] += 1
+            raise subprocess.TimeoutExpired(command, timeout, output=reply['stdout'], stderr=reply['stderr'])
+
+        return subprocess.CompletedProcess(command, reply['returncode'], reply['stdout'], reply['stderr'])
+
+    def recycle(self):
+        """Replace all workers (e.g. after a sandbox policy change)."""
+        self.generation += 1
+        idle = [self.idle.get_nowait() for _ in range(self.idle.qsize())]
+        for worker in idle:
+            if worker is None:
+                self.idle.put_nowait(None)
+            else:
+                self._replace(worker)
+
+    async def close(self):
+        """Stop all workers."""
+        self.closed = True
+        for task in list(self.replacing):
+            task.cancel()
+        await asyncio.gather(*self.replacing, return_exceptions=True)
+
+        for worker in list(self.workers):
+            self._retire(worker)
+        await asyncio.gather(*[worker.wait() for worker in self.workers])
+        self.workers.clear()
+
+        logger.info(f"Sandbox pool stopped: {self.sandbox.ai_service}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get pool statistics
+
+        Returns:
+            dict: Job, timeout and worker lifecycle counters
+        """
+        stats = dict(self.stats)
+        stats['workers'] = sum(1 for worker in self.workers
+                               if worker.returncode is None and not worker.stdin.is_closing())
+        stats['idle'] = self.idle.qsize()
+        return stats
+
+    async def _spawn(self) -> asyncio.subprocess.Process:
+        """Start one sandboxed worker and wait until it reports ready."""
+        # Pass the source with -c: the sandbox may not mount the QWAMOS tree
+        command = [sys.executable, '-u', '-c', WORKER_SOURCE.read_text()]
+        if self.sandbox.mode != SandboxMode.NONE:
+            command = self.sandbox._build_sandbox_command(command, self.allow_network)
+
+        worker = await asyncio.create_subprocess_exec(
+            *command,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            env=self.sandbox._sandbox_env(),
+            limit=WORKER_MESSAGE_LIMIT,
+            start_new_session=True  # own process group, so retiring also kills running jobs
+        )
+        worker.generation = self.generation
+        worker.jobs = 0
+        self.workers.add(worker)
+
+        try:
+            await asyncio.wait_for(self._read_message(worker), WORKER_SPAWN_TIMEOUT)
+        except (asyncio.TimeoutError, ValueError) as e:
+            self._retire(worker)
+            raise RuntimeError(f"Sandbox worker failed to start: {e or type(e).__name__}")
+        except asyncio.CancelledError:
+            self._retire(worker)
+            raise
+
+        self.stats['spawned'] += 1
+        return worker
+
+    async def _read_message(self, worker: asyncio.subprocess.Process) -> Dict[str, Any]:
+        """Read the next protocol message, skipping sandbox tool chatter."""
+        while True:
+            line = await worker.stdout.readline()
+            if not line:
+                raise ValueError(f"worker exited ({await worker.wait()})")
+            if line.startswith(b"{"):
+                return json.loads(line)
+
+    def _replace(self, worker: asyncio.subprocess.Process):
+        """Retire a worker and spawn its replacement in the background."""
+        self._retire(worker)
+        self.stats['recycled'] += 1
+        if self.closed:
+            return
+
+        task = asyncio.ensure_future(self._spawn_idle())
+        self.replacing.add(task)
+        task.add_done_callback(self.replacing.discard)
+
+    async def _spawn_idle(self):
+        try:
+            self.idle.put_nowait(await self._spawn())
+        except (OSError, RuntimeError) as e:
+            logger.error(f"Sandbox worker respawn failed: {e}")
+            self.idle.put_nowait(None)
+
+    def _retire(self, worker: asyncio.subprocess.Process):
+        """Stop a worker and any job it is still running."""
+        # Exited workers are forgotten; retired ones stay until reaped by close()
+        self.workers = {w for w in self.workers if w.returncode is None}
+        if worker.returncode is None:
+            worker.stdin.close()
+            try:
+                os.killpg(worker.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+
 # Convenience function
 def run_ai_sandboxed(ai_service: str,
                      command: List[str],
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+QWAMOS AI API Sessions - Pooled HTTP for cloud AI controllers
+
+Over Tor, every fresh connection costs a SOCKS handshake, circuit setup
+and a TLS handshake (seconds). Controllers keep one requests.Session
+whose connection pool is reused across queries, including through the
+SOCKS proxy (urllib3 pools SOCKS connections per host like direct ones).
+"""
+
+import logging
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger('AISession')
+
+
+def create_session(proxy: Optional[str] = None, pool_size: int = 4) -> requests.Session:
+    """
+    Create a keep-alive session for one API host.
+
+    Args:
+        proxy: Proxy URL for http and https (e.g. socks5h://127.0.0.1:9050)
+        pool_size: Connections kept open (concurrent aquery calls)
+
+    Returns:
+        requests.Session
+    """
+    session = requests.Session()
+    # Requests over the pool size open a temporary connection instead of blocking
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=False)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    set_session_proxy(session, proxy)
+    return session
+
+
+def set_session_proxy(session: requests.Session, proxy: Optional[str]):
+    """
+    Route a session through a proxy (None for direct).
+
+    Args:
+        session: Session from create_session
+        proxy: Proxy URL or None
+    """
+    # Ignore *_PROXY environment variables: routing is decided here only
+    session.trust_env = False
+    session.proxies.clear()
+    if proxy:
+        session.proxies.update({'http': proxy, 'https': proxy})
@@ -9,12 +9,20 @@ General purpose AI assistance and coding help.
 import os
 import sys
 import json
+import asyncio
 import logging
 import requests
 from pathlib import Path
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 
+# Add ai/ and ai/security/ to path for the shared helpers
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "security"))
+
+from api_session import create_session, set_session_proxy
+from request_sanitizer import RequestSanitizer
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -46,6 +54,16 @@ class ChatGPTController:
         self.temperature = 1.0
         self.timeout = 60
 
+        # Pooled keep-alive session (reuses Tor circuits and TLS connections)
+        self.session = create_session(self.tor_socks_proxy)
+        self.session.headers.update({
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        })
+
+        # PII redaction for outgoing prompts
+        self.sanitizer = RequestSanitizer()
+
         # Conversation history
         self.history = []
 
@@ -76,11 +94,6 @@ class ChatGPTController:
             messages = self._build_messages(prompt, context)
 
             # Prepare request
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-
             payload = {
                 "model": self.model,
                 "messages": messages,
@@ -92,22 +105,12 @@ class ChatGPTController:
             if context and 'functions' in context:
                 payload['functions'] = context['functions']
 
-            # Configure proxy for Tor
-            proxies = {}
-            if self.use_tor:
-                proxies = {
-                    'http': self.tor_socks_proxy,
-                    'https': self.tor_socks_proxy
-                }
-
             # Make API request
             logger.info("Sending request to OpenAI API via Tor...")
 
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/chat/completions",
-                headers=headers,
                 json=payload,
-                proxies=proxies,
                 timeout=self.timeout
             )
 
@@ -148,6 +151,21 @@ class ChatGPTController:
             logger.error(f"Query failed: {e}")
             return f"Error: {e}"
 
+    async def aquery(self, prompt: str, context: Optional[Dict] = None) -> str:
+        """
+        Query ChatGPT without blocking the event loop
+
+        Concurrent calls share the session's connection pool.
+
+        Args:
+            prompt: User prompt/query
+            context: Optional context (conversation history, system prompt, etc.)
+
+        Returns:
+            str: ChatGPT's response
+        """
+        return await asyncio.to_thread(self.query, prompt, context)
+
     def _build_messages(self, prompt: str, context: Optional[Dict]) -> List[Dict]:
         """Build messages array for API request"""
         messages = []
@@ -223,11 +241,6 @@ Be helpful, clear, and concise. Format code with markdown code blocks."""
             str: ChatGPT's response
         """
         try:
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-
             # Build message with image
             messages = [
                 {
@@ -248,18 +261,9 @@ Be helpful, clear, and concise. Format code with markdown code blocks."""
                 "max_tokens": 1000
             }
 
-            proxies = {}
-            if self.use_tor:
-                proxies = {
-                    'http': self.tor_socks_proxy,
-                    'https': self.tor_socks_proxy
-                }
-
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/chat/completions",
-                headers=headers,
                 json=payload,
-                proxies=proxies,
                 timeout=self.timeout
             )
 
@@ -284,29 +288,15 @@ Be helpful, clear, and concise. Format code with markdown code blocks."""
             # Simple test query
             test_prompt = "Respond with just 'OK' if you can read this."
 
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-
             payload = {
                 "model": self.model,
                 "messages": [{"role": "user", "content": test_prompt}],
                 "max_tokens": 10
             }
 
-            proxies = {}
-            if self.use_tor:
-                proxies = {
-                    'http': self.tor_socks_proxy,
-                    'https': self.tor_socks_proxy
-                }
-
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/chat/completions",
-                headers=headers,
                 json=payload,
-                proxies=proxies,
                 timeout=30
             )
 
@@ -358,13 +348,19 @@ Be helpful, clear, and concise. Format code with markdown code blocks."""
     def enable_tor(self):
         """Enable Tor routing"""
         self.use_tor = True
+        set_session_proxy(self.session, self.tor_socks_proxy)
         logger.info("Tor routing enabled")
 
     def disable_tor(self):
         """Disable Tor routing (NOT RECOMMENDED)"""
         self.use_tor = False
+        set_session_proxy(self.session, None)
         logger.warning("⚠️  Tor routing disabled - API requests will expose your IP")
 
+    def close(self):
+        """Close pooled API connections"""
+        self.session.close()
+
     def sanitize_request(self, prompt: str) -> str:
         """
         Sanitize request to remove sensitive information
@@ -375,25 +371,9 @@ Be helpful, clear, and concise. Format code with markdown code blocks."""
         Returns:
             str: Sanitized prompt
         """
-        # Remove common sensitive patterns
-        import re
-
-        sanitized = prompt
-
-        # Remove IP addresses
-        sanitized = re.sub(r'\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b', '[IP_REDACTED]', sanitized)
-
-        # Remove API keys (common patterns)
-        sanitized = re.sub(r'sk-[a-zA-Z0-9]{20,}', '[API_KEY_REDACTED]', sanitized)
-        sanitized = re.sub(r'ghp_[a-zA-Z0-9]{36}', '[GITHUB_TOKEN_REDACTED]', sanitized)
-
-        # Remove email addresses
-        sanitized = re.sub(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', '[EMAIL_REDACTED]', sanitized)
-
-        # Remove potential passwords (password= or pwd= patterns)
-        sanitized = re.sub(r'(password|pwd|pass)\s*[=:]\s*\S+', r'\1=[PASSWORD_REDACTED]', sanitized, flags=re.IGNORECASE)
+        sanitized, replacements = self.sanitizer.sanitize(prompt)
 
-        if sanitized != prompt:
+        if replacements:
             logger.warning("⚠️  Sensitive information detected and redacted from prompt")
 
         return sanitized
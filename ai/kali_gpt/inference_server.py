@@ -0,0 +1,633 @@
+#!/usr/bin/env python3
+"""
+QWAMOS Kali GPT Inference Server
+
+One long-lived process owns the GGUF model; every other component talks
+to it over a unix socket:
+- Model loaded once (mmap'd, so pages are shared with the page cache)
+- llama.cpp threads sized to, and pinned on, the performance cores
+- Requests queued by priority (threat response before app builder)
+- Tokens streamed back as newline-delimited JSON
+- llama context state saved at static prompt prefixes (system prompt,
+  tool context) so only the new suffix is evaluated per request
+
+Wire protocol (one JSON object per line):
+    -> {"prompt": "...", "priority": 0, "prefixes": [1480], "params": {"max_tokens": 256}}
+    <- {"token": "..."}                                   (repeated)
+    <- {"done": true, "tokens": 12, "queue_ms": 1.0, "ttft_ms": 80.0}
+    <- {"error": "..."}                                   (instead of done)
+    -> {"op": "status"}
+    <- {"status": {...}}
+"""
+
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from enum import IntEnum
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "hypervisor"))
+
+logger = logging.getLogger('KaliGPTServer')
+
+DEFAULT_SOCKET = os.environ.get('KALI_GPT_SOCKET', '/opt/qwamos/ai/kali_gpt/cache/kali-gpt.sock')
+
+# Prompts may carry whole scan outputs
+MAX_LINE = 16 * 1024 * 1024
+
+
+class Priority(IntEnum):
+    """Request priority (lower is served first)"""
+    THREAT_RESPONSE = 0
+    INTERACTIVE = 10
+    APP_BUILDER = 20
+    BACKGROUND = 30
+
+    @classmethod
+    def parse(cls, value) -> 'Priority':
+        """Accept a Priority, its integer value or its name ('threat_response')"""
+        if isinstance(value, str):
+            return cls[value.upper()]
+        return cls(value)
+
+
+class InferenceError(Exception):
+    """Inference server or backend error"""
+    pass
+
+
+@dataclass
+class GenerationParams:
+    """Sampling parameters for one request"""
+    max_tokens: int = 2048
+    temperature: float = 0.7
+    top_p: float = 0.9
+    repeat_penalty: float = 1.1
+    stop: List[str] = field(default_factory=lambda: ["User:", "Assistant:"])
+
+
+def tune_threads() -> Tuple[int, List[int]]:
+    """
+    Pick llama.cpp thread count and CPU set from the core topology.
+
+    Returns:
+        (threads, cpus): one thread per performance core
+    """
+    try:
+        from cpu_topology import CPUTopology
+        cpus = CPUTopology.from_sysfs().big_cores()
+    except Exception as e:
+        logger.debug(f"CPU topology unavailable: {e}")
+        cpus = []
+    if not cpus:
+        cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else \
+            list(range(os.cpu_count() or 4))
+    return len(cpus), cpus
+
+
+class PrefixStateCache:
+    """
+    Bounded LRU of model context states keyed by prompt-prefix hash.
+
+    A state is whatever the backend's save_state() returns (a LlamaState
+    for llama.cpp); size_of reports its bytes for the memory budget.
+    """
+
+    def __init__(self, max_entries: int = 8, max_bytes: int = 512 * 1024 * 1024,
+                 size_of: Callable[[Any], int] = lambda state: 0):
+        """
+        Args:
+            max_entries: States kept at most
+            max_bytes: Total state bytes kept at most
+            size_of: Byte size of a state
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size_of = size_of
+        self._states: 'OrderedDict[str, Tuple[Any, int]]' = OrderedDict()
+        self.bytes = 0
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    @staticmethod
+    def key(prefix: str) -> str:
+        return hashlib.sha256(prefix.encode()).hexdigest()
+
+    def get(self, prefix: str) -> Optional[Any]:
+        entry = self._states.get(self.key(prefix))
+        if entry is None:
+            self.stats['misses'] += 1
+            return None
+        self._states.move_to_end(self.key(prefix))
+        self.stats['hits'] += 1
+        return entry[0]
+
+    def put(self, prefix: str, state: Any):
+        key = self.key(prefix)
+        if key in self._states:
+            self.bytes -= self._states.pop(key)[1]
+        size = self.size_of(state)
+        self._states[key] = (state, size)
+        self.bytes += size
+        while len(self._states) > self.max_entries or (self.bytes > self.max_bytes and len(self._states) > 1):
+            _, (_, evicted) = self._states.popitem(last=False)
+            self.bytes -= evicted
+            self.stats['evictions'] += 1
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+
+class PrefixCachingBackend(ABC):
+    """
+    Restores saved context state for static prompt prefixes.
+
+    Subclasses provide _save_state, _load_state and _eval_prefix; the
+    model's own prefix matching then skips every token already in the
+    restored context, so only the new suffix is evaluated.
+    """
+
+    def __init__(self, prefix_cache_entries: int = 8):
+        self.prefix_cache = PrefixStateCache(prefix_cache_entries, size_of=self._state_size)
+
+    def prime(self, prompt: str, prefixes: Sequence[int] = ()):
+        """
+        Put the context into the state for the deepest prefix of prompt.
+
+        Args:
+            prompt: Full prompt
+            prefixes: Character offsets ending cacheable prefixes
+        """
+        boundaries = sorted({p for p in prefixes if 0 < p < len(prompt)})
+        start = 0
+        for boundary in reversed(boundaries):
+            state = self.prefix_cache.get(prompt[:boundary])
+            if state is not None:
+                self._load_state(state)
+                start = boundary
+                break
+
+        for boundary in boundaries:
+            if boundary > start:
+                self._eval_prefix(prompt[:boundary])
+                self.prefix_cache.put(prompt[:boundary], self._save_state())
+
+    @abstractmethod
+    def _save_state(self) -> Any:
+        """Snapshot the current context state"""
+
+    @abstractmethod
+    def _load_state(self, state: Any):
+        """Restore a snapshot from _save_state"""
+
+    @abstractmethod
+    def _eval_prefix(self, prefix: str):
+        """Evaluate prefix into the context"""
+
+    def _state_size(self, state: Any) -> int:
+        return 0
+
+
+def _common_prefix(a: Sequence, b: Sequence) -> int:
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+class LlamaBackend(PrefixCachingBackend):
+    """llama-cpp-python model, loaded once with mmap"""
+
+    def __init__(self, model_path: str, n_ctx: int = 4096, n_threads: Optional[int] = None,
+                 n_batch: int = 512, pin_threads: bool = True, prefix_cache_entries: int = 8):
+        """
+        Args:
+            model_path: GGUF model file
+            n_ctx: Context size
+            n_threads: Generation threads (default: one per performance core)
+            n_batch: Prompt evaluation batch size
+            pin_threads: Restrict the process to the performance cores
+            prefix_cache_entries: Saved prefix states kept (system prompt, tool contexts)
+        """
+        super().__init__(prefix_cache_entries)
+        self.model_path = str(model_path)
+        self.n_ctx = n_ctx
+        self.n_batch = n_batch
+        self.pin_threads = pin_threads
+        self.n_threads, self.cpus = tune_threads()
+        if n_threads:
+            self.n_threads = n_threads
+        self.model = None
+
+    def load(self):
+        """Map the model (no-op if already loaded)"""
+        if self.model is not None:
+            return
+        try:
+            from llama_cpp import Llama
+        except ImportError:
+            raise InferenceError("llama-cpp-python not installed (pip install llama-cpp-python)")
+        if not Path(self.model_path).exists():
+            raise InferenceError(f"Model file not found: {self.model_path}")
+
+        if self.pin_threads and hasattr(os, 'sched_setaffinity'):
+            try:
+                os.sched_setaffinity(0, self.cpus)
+            except OSError as e:
+                logger.warning(f"Could not pin to performance cores: {e}")
+
+        logger.info(f"Loading {self.model_path} ({self.n_threads} threads on CPUs {self.cpus})")
+        self.model = Llama(
+            model_path=self.model_path,
+            n_ctx=self.n_ctx,
+            n_threads=self.n_threads,
+            n_threads_batch=self.n_threads,
+            n_batch=self.n_batch,
+            n_gpu_layers=0,  # CPU only (no GPU on mobile)
+            use_mmap=True,
+            use_mlock=False,
+            verbose=False
+        )
+
+    def generate(self, prompt: str, params: GenerationParams, prefixes: Sequence[int] = ()) -> Iterator[str]:
+        """Yield generated text pieces"""
+        self.prime(prompt, prefixes)
+        for chunk in self.model(prompt, stream=True, max_tokens=params.max_tokens,
+                                temperature=params.temperature, top_p=params.top_p,
+                                repeat_penalty=params.repeat_penalty, stop=params.stop):
+            yield chunk['choices'][0]['text']
+
+    def close(self):
+        """Unload the model"""
+        self.model = None
+        self.prefix_cache = PrefixStateCache(self.prefix_cache.max_entries, size_of=self._state_size)
+
+    def _save_state(self):
+        return self.model.save_state()
+
+    def _load_state(self, state):
+        self.model.load_state(state)
+
+    def _eval_prefix(self, prefix: str):
+        # Same tokenization as create_completion, so its prefix match lines up
+        tokens = self.model.tokenize(prefix.encode('utf-8'), special=True)
+        common = _common_prefix(self.model.input_ids.tolist(), tokens)
+        self.model.n_tokens = common
+        self.model.eval(tokens[common:])
+
+    def _state_size(self, state) -> int:
+        return getattr(state, 'llama_state_size', 0)
+
+
+class FakeBackend(PrefixCachingBackend):
+    """
+    Deterministic stand-in model for tests.
+
+    Models a single KV context: prompts are split into whitespace tokens
+    and only tokens past the longest common prefix with the current
+    context are "evaluated" (counted in last_evaluated).
+    """
+
+    def __init__(self, respond: Optional[Callable[[str], str]] = None, token_delay: float = 0.0,
+                 prefix_cache_entries: int = 8):
+        """
+        Args:
+            respond: Maps a prompt to the full reply (default: echo the last line)
+            token_delay: Seconds per generated token
+            prefix_cache_entries: Saved prefix states kept
+        """
+        super().__init__(prefix_cache_entries)
+        self.respond = respond or (lambda prompt: f"ack {prompt.strip().splitlines()[-1]}")
+        self.token_delay = token_delay
+        self.loads = 0
+        self.prompts: List[str] = []
+        self.context: List[str] = []
+        self.evaluated = 0
+        self.last_evaluated = 0
+        self.model = None
+
+    def load(self):
+        if self.model is None:
+            self.loads += 1
+            self.model = object()
+
+    def generate(self, prompt: str, params: GenerationParams, prefixes: Sequence[int] = ()) -> Iterator[str]:
+        self.prompts.append(prompt)
+        before = self.evaluated
+        self.prime(prompt, prefixes)
+        self._eval(prompt)
+        self.last_evaluated = self.evaluated - before
+        for i, word in enumerate(self.respond(prompt).split(" ")[:params.max_tokens]):
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            yield word if i == 0 else " " + word
+
+    def close(self):
+        self.model = None
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        return text.replace("\n", " \n ").split(" ")
+
+    def _eval(self, text: str):
+        tokens = self.tokenize(text)
+        common = _common_prefix(self.context, tokens)
+        self.evaluated += len(tokens) - common
+        self.context = tokens
+
+    def _save_state(self):
+        return list(self.context)
+
+    def _load_state(self, state):
+        self.context = list(state)
+
+    def _eval_prefix(self, prefix: str):
+        self._eval(prefix)
+
+
+@dataclass(order=True)
+class _Job:
+    priority: int
+    seq: int
+    prompt: str = field(compare=False)
+    params: GenerationParams = field(compare=False)
+    prefixes: List[int] = field(compare=False)
+    events: asyncio.Queue = field(compare=False)
+    enqueued: float = field(compare=False, default_factory=time.monotonic)
+    cancelled: threading.Event = field(compare=False, default_factory=threading.Event)
+
+
+class InferenceServer:
+    """
+    Unix-socket inference server around a single backend.
+
+    Generation runs on a dedicated thread (never the shared default
+    executor, which in-process callers may fill); everything else
+    (accepting clients, queueing, streaming tokens) stays on the loop.
+    """
+
+    def __init__(self, backend, socket_path: str = DEFAULT_SOCKET, max_queue: int = 64):
+        """
+        Args:
+            backend: LlamaBackend or FakeBackend
+            socket_path: Unix socket to listen on
+            max_queue: Requests waiting beyond this are rejected
+        """
+        self.backend = backend
+        self.socket_path = str(socket_path)
+        self.max_queue = max_queue
+
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._seq = itertools.count()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='kali-gpt')
+        self.active: Optional[_Job] = None
+
+        self.stats = {'requests': 0, 'completed': 0, 'rejected': 0, 'cancelled': 0, 'tokens': 0,
+                      'by_priority': {p.name.lower(): 0 for p in Priority}}
+
+    async def start(self):
+        """Load the model and start listening"""
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.backend.load)
+
+        Path(self.socket_path).parent.mkdir(parents=True, exist_ok=True)
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._queue = asyncio.PriorityQueue()
+        self._server = await asyncio.start_unix_server(self._handle, path=self.socket_path, limit=MAX_LINE)
+        os.chmod(self.socket_path, 0o600)
+        self._worker = asyncio.ensure_future(self._work())
+        logger.info(f"Kali GPT inference server listening on {self.socket_path}")
+
+    async def serve_forever(self):
+        """Serve until cancelled"""
+        await self._server.serve_forever()
+
+    async def close(self):
+        """Stop accepting requests and abort queued ones"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+        if self.active is not None:
+            self.active.cancelled.set()
+        while self._queue is not None and not self._queue.empty():
+            self._queue.get_nowait().events.put_nowait({'error': 'server shutting down'})
+        self._executor.shutdown(wait=False)
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    def status(self) -> Dict:
+        """Queue and model status"""
+        return {
+            'model_loaded': self.backend.model is not None,
+            'queued': self._queue.qsize() if self._queue else 0,
+            'busy': self.active is not None,
+            'threads': getattr(self.backend, 'n_threads', None),
+            'prefix_cache': {'entries': len(self.backend.prefix_cache), **self.backend.prefix_cache.stats},
+            **self.stats
+        }
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError:
+                    await self._send(writer, {'error': 'invalid request'})
+                    continue
+
+                if request.get('op') == 'status':
+                    await self._send(writer, {'status': self.status()})
+                    continue
+
+                job = self._submit(request)
+                if job is None:
+                    if not await self._send(writer, {'error': 'bad request or queue full'}):
+                        break
+                    continue
+                if not await self._stream(job, writer):
+                    break
+        except (ConnectionError, ValueError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            writer.close()
+
+    def _submit(self, request: Dict) -> Optional[_Job]:
+        try:
+            priority = Priority.parse(request.get('priority', Priority.INTERACTIVE))
+            params = GenerationParams(**request.get('params', {}))
+            prompt = request['prompt']
+            prefixes = [int(p) for p in request.get('prefixes', [])]
+        except (KeyError, TypeError, ValueError):
+            self.stats['rejected'] += 1
+            return None
+        if self._queue.qsize() >= self.max_queue:
+            self.stats['rejected'] += 1
+            return None
+
+        self.stats['requests'] += 1
+        self.stats['by_priority'][priority.name.lower()] += 1
+        job = _Job(int(priority), next(self._seq), prompt, params, prefixes, asyncio.Queue())
+        self._queue.put_nowait(job)
+        return job
+
+    async def _stream(self, job: _Job, writer: asyncio.StreamWriter) -> bool:
+        while True:
+            event = await job.events.get()
+            if not await self._send(writer, event):
+                job.cancelled.set()
+                return False
+            if 'token' not in event:
+                return True
+
+    async def _send(self, writer: asyncio.StreamWriter, message: Dict) -> bool:
+        try:
+            writer.write(json.dumps(message).encode() + b"\n")
+            await writer.drain()
+            return True
+        except ConnectionError:
+            return False
+
+    async def _work(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            if job.cancelled.is_set():
+                continue
+            self.active = job
+            try:
+                result = await loop.run_in_executor(self._executor, self._generate, job, loop)
+                job.events.put_nowait(result)
+            finally:
+                self.active = None
+
+    def _generate(self, job: _Job, loop: asyncio.AbstractEventLoop) -> Dict:
+        """Run one request on the worker thread, posting tokens to the loop"""
+        started = time.monotonic()
+        first_token = None
+        tokens = 0
+        try:
+            for text in self.backend.generate(job.prompt, job.params, job.prefixes):
+                if job.cancelled.is_set():
+                    self.stats['cancelled'] += 1
+                    return {'error': 'cancelled'}
+                if first_token is None:
+                    first_token = time.monotonic()
+                tokens += 1
+                loop.call_soon_threadsafe(job.events.put_nowait, {'token': text})
+        except Exception as e:
+            logger.error(f"Generation failed: {e}")
+            return {'error': str(e)}
+
+        self.stats['completed'] += 1
+        self.stats['tokens'] += tokens
+        return {
+            'done': True,
+            'tokens': tokens,
+            'queue_ms': (started - job.enqueued) * 1000,
+            'ttft_ms': ((first_token or time.monotonic()) - started) * 1000
+        }
+
+
+class InferenceClient:
+    """Blocking client for the inference server"""
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET, timeout: float = 300.0):
+        """
+        Args:
+            socket_path: Server unix socket
+            timeout: Socket timeout per read
+        """
+        self.socket_path = str(socket_path)
+        self.timeout = timeout
+        self.last_result: Dict = {}
+
+    def available(self) -> bool:
+        """True if a server is listening"""
+        if not os.path.exists(self.socket_path):
+            return False
+        try:
+            with self._connect():
+                return True
+        except OSError:
+            return False
+
+    def stream(self, prompt: str, priority=Priority.INTERACTIVE, prefixes: Sequence[int] = (),
+               **params) -> Iterator[str]:
+        """
+        Generate, yielding text pieces as they arrive.
+
+        Args:
+            prompt: Full prompt
+            priority: Priority (enum, value or name)
+            prefixes: Offsets ending static prompt prefixes worth caching
+            **params: GenerationParams fields
+
+        Raises:
+            InferenceError: Server reported an error
+        """
+        request = {'prompt': prompt, 'priority': int(Priority.parse(priority)),
+                   'prefixes': list(prefixes), 'params': params}
+        with self._connect() as sock, sock.makefile('rb') as reader:
+            sock.sendall(json.dumps(request).encode() + b"\n")
+            for line in reader:
+                event = json.loads(line)
+                if 'token' in event:
+                    yield event['token']
+                elif 'error' in event:
+                    raise InferenceError(event['error'])
+                else:
+                    self.last_result = event
+                    return
+        raise InferenceError("Connection closed before response finished")
+
+    def generate(self, prompt: str, priority=Priority.INTERACTIVE, prefixes: Sequence[int] = (),
+                 **params) -> str:
+        """Generate and return the full response"""
+        return "".join(self.stream(prompt, priority, prefixes, **params))
+
+    def status(self) -> Dict:
+        """Server status"""
+        with self._connect() as sock, sock.makefile('rb') as reader:
+            sock.sendall(b'{"op": "status"}\n')
+            return json.loads(reader.readline())['status']
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+
+async def serve(backend, socket_path: str = DEFAULT_SOCKET):
+    """Run an inference server until cancelled"""
+    server = InferenceServer(backend, socket_path)
+    await server.start()
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
@@ -11,13 +11,18 @@ import sys
 import json
 import logging
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime
 
 # CRITICAL FIX #22: Import AI sandbox for process isolation
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from ai_sandbox import AISandbox, SandboxMode
 
+sys.path.insert(0, str(Path(__file__).parent))
+from inference_server import (
+    DEFAULT_SOCKET, GenerationParams, InferenceClient, InferenceError, LlamaBackend, Priority, serve
+)
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -30,7 +35,9 @@ class KaliGPTController:
 
     def __init__(self, model_dir: str = "/opt/qwamos/ai/kali_gpt/models",
                  enable_sandbox: bool = True,
-                 encrypt_history: bool = True):
+                 encrypt_history: bool = True,
+                 server_socket: Optional[str] = None,
+                 priority: Any = Priority.INTERACTIVE):
         """
         Initialize Kali GPT controller
 
@@ -38,15 +45,21 @@ class KaliGPTController:
             model_dir: Directory containing Llama model files
             enable_sandbox: Enable process sandboxing (Fix #22)
             encrypt_history: Encrypt conversation history (Fix #23)
+            server_socket: Shared inference server socket (default: KALI_GPT_SOCKET)
+            priority: Default request priority on the shared server
         """
         self.model_dir = Path(model_dir)
         self.model_path = self.model_dir / "llama-3.1-8b-instruct.gguf"
-        self.llama_cpp = None
+        self.backend = None
         self.model = None
         self.context_size = 4096
         self.max_tokens = 2048
         self.temperature = 0.7
 
+        # Shared inference server (one model copy for all callers)
+        self.client = InferenceClient(server_socket or DEFAULT_SOCKET)
+        self.priority = Priority.parse(priority)
+
         # CRITICAL FIX #22: Enable sandbox by default
         self.enable_sandbox = enable_sandbox
         self.sandbox = None
@@ -67,8 +80,12 @@ class KaliGPTController:
         # Load system prompts
         self.system_prompt = self._load_system_prompt()
 
-        # Load tool knowledge base
+        # Load tool knowledge base (serialized once; prompt prefixes must be byte-identical)
         self.tool_knowledge = self._load_tool_knowledge()
+        self.tool_context = {
+            tool: f"Tool Context: {tool}\n{json.dumps(info, indent=2)}\n\n"
+            for tool, info in self.tool_knowledge.items()
+        }
 
         # Conversation history
         self.history = []
@@ -192,29 +209,19 @@ Remember: All testing should only be performed on systems you own or have explic
                 logger.info("Please download Llama 3.1 8B Instruct GGUF model")
                 return False
 
-            # Import llama-cpp-python
-            try:
-                from llama_cpp import Llama
-                self.llama_cpp = Llama
-            except ImportError:
-                logger.error("llama-cpp-python not installed")
-                logger.info("Install with: pip install llama-cpp-python")
-                return False
-
-            # Load model
+            # Load model (mmap'd, threads on the performance cores)
             logger.info("Loading Llama 3.1 8B model (this may take a minute)...")
 
-            self.model = self.llama_cpp(
-                model_path=str(self.model_path),
-                n_ctx=self.context_size,
-                n_threads=4,  # ARM64 optimization
-                n_gpu_layers=0,  # CPU only (no GPU on mobile)
-                verbose=False
-            )
+            self.backend = LlamaBackend(str(self.model_path), n_ctx=self.context_size)
+            self.backend.load()
+            self.model = self.backend.model
 
             logger.info("✅ Kali GPT model loaded successfully")
             return True
 
+        except InferenceError as e:
+            logger.error(str(e))
+            return False
         except Exception as e:
             logger.error(f"Failed to load model: {e}")
             return False
@@ -225,34 +232,34 @@ Remember: All testing should only be performed on systems you own or have explic
 
         Args:
             prompt: User query/prompt
-            context: Optional context (conversation history, scan results, etc.)
+            context: Optional context (conversation history, scan results,
+                     'priority' on the shared server, etc.)
 
         Returns:
             str: Kali GPT response
         """
         try:
-            # Ensure model is loaded
-            if not self.model:
-                if not self.load_model():
-                    return "Error: Kali GPT model not loaded. Please check model installation."
-
             # Add context to prompt if provided
-            full_prompt = self._build_prompt(prompt, context)
-
-            # Generate response
-            logger.info("Generating Kali GPT response...")
-
-            response = self.model(
-                full_prompt,
-                max_tokens=self.max_tokens,
-                temperature=self.temperature,
-                top_p=0.9,
-                repeat_penalty=1.1,
-                stop=["User:", "Assistant:"]
-            )
-
-            # Extract text from response
-            answer = response['choices'][0]['text'].strip()
+            full_prompt, prefixes = self._build_prompt_with_prefixes(prompt, context)
+            params = self._generation_params()
+
+            if not self.model and self.client.available():
+                # Shared inference server holds the only model copy
+                priority = Priority.parse((context or {}).get('priority', self.priority))
+                logger.info(f"Generating Kali GPT response via server ({priority.name.lower()})...")
+                answer = self.client.generate(full_prompt, priority, prefixes, **params).strip()
+            else:
+                # Ensure model is loaded
+                if not self.model:
+                    if not self.load_model():
+                        return "Error: Kali GPT model not loaded. Please check model installation."
+
+                # Generate response
+                logger.info("Generating Kali GPT response...")
+
+                answer = "".join(self.backend.generate(
+                    full_prompt, GenerationParams(**params), prefixes
+                )).strip()
 
             # Add to history
             self.history.append({
@@ -268,17 +275,36 @@ Remember: All testing should only be performed on systems you own or have explic
             logger.error(f"Query failed: {e}")
             return f"Error generating response: {e}"
 
+    def _generation_params(self) -> Dict[str, Any]:
+        """Sampling parameters shared by local and server generation"""
+        return {
+            'max_tokens': self.max_tokens,
+            'temperature': self.temperature,
+            'top_p': 0.9,
+            'repeat_penalty': 1.1,
+            'stop': ["User:", "Assistant:"]
+        }
+
     def _build_prompt(self, prompt: str, context: Optional[Dict]) -> str:
         """Build complete prompt with system prompt and context"""
+        return self._build_prompt_with_prefixes(prompt, context)[0]
+
+    def _build_prompt_with_prefixes(self, prompt: str, context: Optional[Dict]) -> Tuple[str, List[int]]:
+        """
+        Build complete prompt and the offsets ending its static prefixes.
+
+        The system prompt and tool context never change between queries, so
+        the model's state after each is cached and only the rest is evaluated.
+        """
         parts = [self.system_prompt, "\n\n"]
+        prefixes = [len(self.system_prompt) + 2]
 
         # Add tool context if relevant
         if context and 'tool' in context:
             tool = context['tool']
-            if tool in self.tool_knowledge:
-                parts.append(f"Tool Context: {tool}\n")
-                parts.append(json.dumps(self.tool_knowledge[tool], indent=2))
-                parts.append("\n\n")
+            if tool in self.tool_context:
+                parts.append(self.tool_context[tool])
+                prefixes.append(prefixes[0] + len(self.tool_context[tool]))
 
         # Add scan results if provided
         if context and 'scan_results' in context:
@@ -297,7 +323,7 @@ Remember: All testing should only be performed on systems you own or have explic
         parts.append(f"User: {prompt}\n")
         parts.append("Assistant: ")
 
-        return "".join(parts)
+        return "".join(parts), prefixes
 
     def analyze_tool_output(self, tool: str, output: str) -> str:
         """
@@ -362,7 +388,7 @@ Include: Executive Summary, Technical Details, Risk Ratings, and Remediation Rec
     def shutdown(self):
         """Shutdown and unload model"""
         if self.model:
-            del self.model
+            self.backend.close()
             self.model = None
             logger.info("Kali GPT model unloaded")
 
@@ -402,6 +428,7 @@ Include: Executive Summary, Technical Details, Risk Ratings, and Remediation Rec
             'context_size': self.context_size,
             'queries': len(self.history),
             'status': 'ready' if self.model else 'not_loaded',
+            'server_available': self.client.available(),
             'sandbox_enabled': self.enable_sandbox,
             'history_encrypted': self.encrypt_history
         }
@@ -547,8 +574,24 @@ def main():
     # Test command
     subparsers.add_parser('test', help='Test Kali GPT functionality')
 
+    # Server command (systemd: qwamos-ai-kali-gpt.service)
+    server_parser = subparsers.add_parser('server', help='Run the shared inference server')
+    server_parser.add_argument('--socket', default=DEFAULT_SOCKET, help='Unix socket path')
+    server_parser.add_argument('--threads', type=int, help='Override thread count')
+
     args = parser.parse_args()
 
+    if args.command == 'server':
+        import asyncio
+        model_path = os.environ.get('MODEL_PATH', "/opt/qwamos/ai/kali_gpt/models/llama-3.1-8b-instruct.gguf")
+        n_ctx = int(os.environ.get('CONTEXT_LENGTH', 4096))
+        backend = LlamaBackend(model_path, n_ctx=n_ctx, n_threads=args.threads)
+        try:
+            asyncio.run(serve(backend, args.socket))
+        except KeyboardInterrupt:
+            pass
+        return
+
     # Initialize controller
     controller = KaliGPTController()
 
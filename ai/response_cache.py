@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+QWAMOS AI Response Cache - Encrypted on-disk cache for AIManager
+
+Auditors and the threat coordinator send many near-identical prompts.
+Responses are cached per (service, model, normalized prompt, context hash)
+with a TTL and size-bounded LRU eviction. Entries are encrypted at rest
+with ChaCha20-Poly1305 and file names are keyed HMACs, so the cache
+directory reveals neither prompts nor responses.
+"""
+
+import hashlib
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from Crypto.Cipher import ChaCha20_Poly1305
+from Crypto.Hash import SHA256
+from Crypto.Protocol.KDF import HKDF
+from Crypto.Random import get_random_bytes
+
+logger = logging.getLogger('ResponseCache')
+
+# Context keys that only affect routing, not the answer
+IGNORED_CONTEXT_KEYS = ('priority',)
+
+NONCE_SIZE = 12
+TAG_SIZE = 16
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace so re-indented or re-wrapped prompts share a key"""
+    return " ".join(prompt.split())
+
+
+def context_hash(context: Optional[Dict]) -> str:
+    """Stable hash of the answer-relevant part of a query context"""
+    relevant = {k: v for k, v in (context or {}).items() if k not in IGNORED_CONTEXT_KEYS}
+    encoded = json.dumps(relevant, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def derive_cache_key(device_id_file: Optional[Path] = None) -> bytes:
+    """
+    Derive the cache encryption key from the persistent device ID.
+
+    Args:
+        device_id_file: Device ID file (default ~/.qwamos/.device_id)
+
+    Returns:
+        32-byte encryption key
+    """
+    device_id_file = device_id_file or Path.home() / ".qwamos" / ".device_id"
+    if device_id_file.exists():
+        device_id = device_id_file.read_bytes()
+    else:
+        device_id = str(uuid.getnode()).encode('utf-8')
+        device_id_file.parent.mkdir(parents=True, exist_ok=True)
+        device_id_file.write_bytes(device_id)
+        os.chmod(device_id_file, 0o600)
+
+    return HKDF(
+        master=device_id,
+        key_len=32,
+        salt=b"qwamos-ai-cache-v1",
+        hashmod=SHA256,
+        num_keys=1,
+        context=b"ai-response-cache"
+    )
+
+
+class ResponseCache:
+    """Encrypted, TTL + LRU bounded AI response cache"""
+
+    def __init__(self, cache_dir: str, ttl: float = 3600.0, max_entries: int = 1000,
+                 max_bytes: int = 64 * 1024 * 1024, key: Optional[bytes] = None):
+        """
+        Initialize response cache
+
+        Args:
+            cache_dir: Directory for encrypted entries
+            ttl: Seconds an entry stays valid
+            max_entries: Maximum cached responses
+            max_bytes: Maximum total size of entry files
+            key: 32-byte encryption key (default: derived from device ID)
+        """
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.key = key or derive_cache_key()
+
+        self.lock = threading.Lock()
+        # entry id -> (size, created); order is least to most recently used
+        self.entries: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self.bytes = 0
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'expired': 0,
+            'evictions': 0,
+            'latency_saved': 0.0
+        }
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        os.chmod(self.cache_dir, 0o700)
+        self._load_index()
+
+    def _load_index(self):
+        """Rebuild the LRU index from entry files (atime = last use, mtime = created)"""
+        files = []
+        for path in self.cache_dir.glob("*.bin"):
+            st = path.stat()
+            files.append((st.st_atime, path.stem, st.st_size, st.st_mtime))
+
+        for _, entry_id, size, created in sorted(files):
+            self.entries[entry_id] = (size, created)
+            self.bytes += size
+
+        with self.lock:
+            self._evict()
+
+        if self.entries:
+            logger.info(f"Response cache loaded ({len(self.entries)} entries)")
+
+    def make_key(self, service: str, model: str, prompt: str, context: Optional[Dict] = None) -> str:
+        """
+        Build the cache key for a query
+
+        Args:
+            service: Service name
+            model: Model identifier
+            prompt: User prompt
+            context: Query context
+
+        Returns:
+            str: Entry id (keyed HMAC, safe to use as a file name)
+        """
+        material = "\0".join([service, model, normalize_prompt(prompt), context_hash(context)])
+        return hmac.new(self.key, material.encode('utf-8'), hashlib.sha256).hexdigest()
+
+    def get(self, entry_id: str) -> Optional[Tuple[str, float]]:
+        """
+        Look up a cached response
+
+        Args:
+            entry_id: Key from make_key
+
+        Returns:
+            (response, original latency) or None on miss
+        """
+        with self.lock:
+            entry = self.entries.get(entry_id)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+
+            if time.time() - entry[1] > self.ttl:
+                self._remove(entry_id)
+                self.stats['expired'] += 1
+                self.stats['misses'] += 1
+                return None
+
+            path = self._path(entry_id)
+            try:
+                blob = path.read_bytes()
+                cipher = ChaCha20_Poly1305.new(key=self.key, nonce=blob[:NONCE_SIZE])
+                cipher.update(entry_id.encode('ascii'))
+                plaintext = cipher.decrypt_and_verify(blob[NONCE_SIZE + TAG_SIZE:],
+                                                      blob[NONCE_SIZE:NONCE_SIZE + TAG_SIZE])
+                record = json.loads(plaintext.decode('utf-8'))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Dropping unreadable cache entry: {e}")
+                self._remove(entry_id)
+                self.stats['misses'] += 1
+                return None
+
+            self.entries.move_to_end(entry_id)
+            os.utime(path, (time.time(), entry[1]))
+            self.stats['hits'] += 1
+            self.stats['latency_saved'] += record['latency']
+            return record['response'], record['latency']
+
+    def put(self, entry_id: str, response: str, latency: float):
+        """
+        Store a response
+
+        Args:
+            entry_id: Key from make_key
+            response: Response text
+            latency: Seconds the original query took
+        """
+        created = time.time()
+        plaintext = json.dumps({'response': response, 'latency': latency}).encode('utf-8')
+        nonce = get_random_bytes(NONCE_SIZE)
+        cipher = ChaCha20_Poly1305.new(key=self.key, nonce=nonce)
+        cipher.update(entry_id.encode('ascii'))
+        ciphertext, tag = cipher.encrypt_and_digest(plaintext)
+        blob = nonce + tag + ciphertext
+
+        with self.lock:
+            if len(blob) > self.max_bytes:
+                return
+
+            path = self._path(entry_id)
+            tmp = path.with_suffix(".tmp")
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(blob)
+            os.utime(tmp, (created, created))
+            os.replace(tmp, path)
+
+            if entry_id in self.entries:
+                self.bytes -= self.entries.pop(entry_id)[0]
+            self.entries[entry_id] = (len(blob), created)
+            self.bytes += len(blob)
+            self.stats['stores'] += 1
+            self._evict()
+
+    def clear(self):
+        """Delete all cached responses"""
+        with self.lock:
+            for entry_id in list(self.entries):
+                self._remove(entry_id)
+        logger.info("Response cache cleared")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics
+
+        Returns:
+            dict: Hit/miss counters, latency saved and current size
+        """
+        with self.lock:
+            stats = dict(self.stats)
+            stats['entries'] = len(self.entries)
+            stats['bytes'] = self.bytes
+            lookups = stats['hits'] + stats['misses']
+            stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _path(self, entry_id: str) -> Path:
+        return self.cache_dir / f"{entry_id}.bin"
+
+    def _remove(self, entry_id: str):
+        size, _ = self.entries.pop(entry_id)
+        self.bytes -= size
+        try:
+            self._path(entry_id).unlink()
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        """Drop least recently used entries until within bounds (lock held)"""
+        while self.entries and (len(self.entries) > self.max_entries or self.bytes > self.max_bytes):
+            self._remove(next(iter(self.entries)))
+            self.stats['evictions'] += 1
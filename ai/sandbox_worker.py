@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+QWAMOS AI Sandbox Worker
+
+Long-lived job runner started inside a sandbox by SandboxPool. Jobs are
+forked from here, so they inherit the worker's namespaces and mounts and
+sandbox setup is paid once per worker instead of once per call.
+
+Protocol (one JSON object per line):
+    stdout: {"ready": true, "pid": 123}                          on startup
+    stdin:  {"id": 1, "command": [...], "env": {...}, "timeout": 300}
+    stdout: {"id": 1, "returncode": 0, "stdout": "...", "stderr": "...",
+             "timed_out": false}
+
+SandboxPool passes this file's source with `python -c`, since the sandbox
+may not have the QWAMOS tree mounted; keep it dependency-free.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+
+def _text(data) -> str:
+    """TimeoutExpired output may be bytes even in text mode"""
+    if data is None:
+        return ""
+    return data.decode('utf-8', 'replace') if isinstance(data, bytes) else data
+
+
+def run_job(job: dict) -> dict:
+    """Run one job and build its reply"""
+    env = dict(os.environ)
+    env.update(job.get('env') or {})
+    reply = {'id': job['id'], 'timed_out': False}
+
+    try:
+        proc = subprocess.run(
+            job['command'],
+            env=env,
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            text=True,
+            timeout=job.get('timeout')
+        )
+        reply.update(returncode=proc.returncode, stdout=proc.stdout, stderr=proc.stderr)
+    except subprocess.TimeoutExpired as e:
+        reply.update(returncode=-9, stdout=_text(e.stdout), stderr=_text(e.stderr), timed_out=True)
+    except OSError as e:
+        reply.update(returncode=127, stdout="", stderr=str(e))
+
+    return reply
+
+
+def main():
+    out = sys.stdout
+    out.write(json.dumps({'ready': True, 'pid': os.getpid()}) + "\n")
+    out.flush()
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        out.write(json.dumps(run_job(json.loads(line))) + "\n")
+        out.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -16,97 +16,114 @@ Protects:
 - File paths
 - Usernames
 - Passwords
+
+All patterns are combined into one alternation and applied in a single
+pass; large contexts (scan output) can be streamed in chunks.
 """
 
 import re
-from typing import Dict, List, Tuple
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Tuple
 import logging
 
 logger = logging.getLogger('RequestSanitizer')
 
+EMAIL = r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
+# Lead patterns must not end inside an email address: with one pass per
+# pattern the email pass ran first and took the whole word
+NOT_EMAIL = r'(?![A-Za-z0-9._%+-]*@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b)'
+
+# Credential labels and values; {value} is any other PII pattern (see below)
+USERNAME_LABEL = r'(?:username|user|login)[\s:=]+'
+USERNAME_VALUE = r'(?:(?!{value})[a-zA-Z0-9_-])+'
+PASSWORD_LABEL = r'(?:(?:password|passwd|pwd)[\s:=]+|pass\s*[=:]\s*)'
+PASSWORD_VALUE = r'(?:{value}|\S)'
+
+# (name, anchor, lead, pattern, replacement)
+#
+# anchor 'digit' / 'word': the match starts at a word boundary (with a digit
+# for 'digit'); 'lead': the match starts with one of the characters in lead.
+# The combined pattern tries digit, then word, then lead patterns; where two
+# patterns can match at the same position the first one listed wins.
+PII_PATTERNS = [
+    ('ipv4', 'digit', '', r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b', '[IP_ADDRESS]'),
+    ('phone_us', 'digit', '', r'\d{3}[-.]?\d{3}[-.]?\d{4}\b', '[PHONE]'),
+    ('credit_card', 'digit', '', r'\d{4}[\s-]?\d{4}[\s-]?\d{4}[\s-]?\d{4}\b', '[CREDIT_CARD]'),
+    ('ssn', 'digit', '', r'\d{3}-\d{2}-\d{4}\b', '[SSN]'),
+    ('ipv6', 'word', '', r'(?:[0-9a-fA-F]{1,4}:){7}[0-9a-fA-F]{1,4}\b', '[IPV6_ADDRESS]'),
+    ('mac_address', 'word', '', r'(?:[0-9A-Fa-f]{2}[:-]){5}[0-9A-Fa-f]{2}\b', '[MAC_ADDRESS]'),
+    ('email', 'word', '', EMAIL, '[EMAIL]'),
+    ('api_key_generic', 'word', '', r'(?i:[a-zA-Z0-9_-]{32,}\b(?=.*key|token|secret))', '[API_KEY]'),
+    ('file_path_windows', 'word', '', r'(?i:[A-Z]:\\[\w\\.-]+)', '[FILE_PATH]'),
+    ('phone_intl', 'lead', '+', r'\+\d{1,3}[\s.-]?\d{1,4}[\s.-]?\d{1,4}[\s.-]?\d{1,9}' + NOT_EMAIL, '[PHONE]'),
+    ('api_key_anthropic', 'lead', 's', r'sk-ant-[a-zA-Z0-9\-_]{95,}', '[API_KEY]'),
+    ('api_key_openai', 'lead', 's', r'sk-[a-zA-Z0-9]{20,}', '[API_KEY]'),
+    ('github_token', 'lead', 'g', r'ghp_[a-zA-Z0-9]{36}', '[API_KEY]'),
+    ('url_with_params', 'lead', 'h', r'https?://[^\s]+\?[^\s]+', '[URL_WITH_PARAMS]'),
+    ('file_path_unix', 'lead', '/', r'/(?:home|root|etc|var|opt)/[\w/.-]+' + NOT_EMAIL, '[FILE_PATH]'),
+    ('username', 'lead', 'uUlL', f'(?i:{USERNAME_LABEL}{USERNAME_VALUE})', 'username: [USERNAME]'),
+    ('password_username', 'lead', 'pP', f'(?i:{PASSWORD_LABEL}{PASSWORD_VALUE}*?{USERNAME_LABEL}{USERNAME_VALUE})',
+     'password: [REDACTED] [USERNAME]'),
+    ('password', 'lead', 'pP', f'(?i:{PASSWORD_LABEL}{PASSWORD_VALUE}+)', 'password: [REDACTED]'),
+    ('jwt_token', 'lead', 'e', r'eyJ[a-zA-Z0-9_-]+\.eyJ[a-zA-Z0-9_-]+\.[a-zA-Z0-9_-]+', '[JWT_TOKEN]'),
+    ('ssh_key', 'lead', '-', r'-----BEGIN (?:RSA |DSA |EC |OPENSSH )?PRIVATE KEY-----', '[SSH_PRIVATE_KEY_REDACTED]'),
+]
+
+# Inside username/password values the other patterns take precedence (as they
+# did when each pattern ran as its own pass, replacing their matches first):
+# a username stops where an IP, email, card number, key, ... starts, and a
+# password value takes such matches whole instead of stopping inside them.
+# A username label inside a password value is redacted together with the
+# username after it, as the username pass rewrote it before the password
+# pass ran.
+CREDENTIAL_PATTERNS = ('username', 'password_username', 'password')
+_VALUE = "(?-i:%s)" % "|".join(
+    pattern if anchor == 'lead' else r'\b' + pattern
+    for name, anchor, _, pattern, _ in PII_PATTERNS if name not in CREDENTIAL_PATTERNS
+)
+PII_PATTERNS = [(name, anchor, lead, pattern.replace('{value}', _VALUE), replacement)
+                for name, anchor, lead, pattern, replacement in PII_PATTERNS]
+
+# Aggressive mode: anything that looks like a hash or base64 blob
+AGGRESSIVE_PATTERNS = [
+    ('hash', 'word', '', r'[a-fA-F0-9]{32,}\b', '[HASH]'),
+    ('base64', 'word', '', r'[A-Za-z0-9+/]{40,}={0,2}\b', '[BASE64_DATA]'),
+]
+
+# Streaming: text kept back so a match can complete in the next chunk, and
+# already emitted text kept as context for \b at the cut
+DEFAULT_OVERLAP = 4096
+CONTEXT = 16
+
+
+def _combine(entries: List[Tuple[str, str, str, str, str]]) -> re.Pattern:
+    """Build one alternation, grouping patterns by how they can start"""
+    def alternation(anchor):
+        return "|".join(f"(?P<{name}>{pattern})" for name, a, _, pattern, _ in entries if a == anchor)
+
+    lead = "".join(sorted({c for _, a, chars, _, _ in entries if a == 'lead' for c in chars}))
+    return re.compile(
+        rf"\b(?:(?=\d)(?:{alternation('digit')})|{alternation('word')})"
+        rf"|(?=[{re.escape(lead)}])(?:{alternation('lead')})"
+    )
+
 
 class RequestSanitizer:
     """Sanitize user prompts before sending to AI services"""
 
     def __init__(self):
         self.patterns = self._compile_patterns()
+        self.replacements = {name: replacement
+                             for name, _, _, _, replacement in PII_PATTERNS + AGGRESSIVE_PATTERNS}
+        self.combined = _combine(PII_PATTERNS)
+        self.combined_aggressive = _combine(PII_PATTERNS + AGGRESSIVE_PATTERNS)
         self.replacements_made = []
 
     def _compile_patterns(self) -> Dict[str, Tuple[re.Pattern, str]]:
-        """Compile regex patterns for PII detection"""
+        """Compile each PII pattern on its own (for per-pattern inspection)"""
         return {
-            'ipv4': (
-                re.compile(r'\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b'),
-                '[IP_ADDRESS]'
-            ),
-            'ipv6': (
-                re.compile(r'\b([0-9a-fA-F]{1,4}:){7}[0-9a-fA-F]{1,4}\b'),
-                '[IPV6_ADDRESS]'
-            ),
-            'email': (
-                re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'),
-                '[EMAIL]'
-            ),
-            'phone_us': (
-                re.compile(r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b'),
-                '[PHONE]'
-            ),
-            'phone_intl': (
-                re.compile(r'\+\d{1,3}[\s.-]?\d{1,4}[\s.-]?\d{1,4}[\s.-]?\d{1,9}'),
-                '[PHONE]'
-            ),
-            'api_key_anthropic': (
-                re.compile(r'sk-ant-[a-zA-Z0-9\-_]{95,}'),
-                '[API_KEY]'
-            ),
-            'api_key_openai': (
-                re.compile(r'sk-[a-zA-Z0-9]{48,}'),
-                '[API_KEY]'
-            ),
-            'api_key_generic': (
-                re.compile(r'\b[a-zA-Z0-9_-]{32,}\b(?=.*key|token|secret)', re.IGNORECASE),
-                '[API_KEY]'
-            ),
-            'credit_card': (
-                re.compile(r'\b\d{4}[\s-]?\d{4}[\s-]?\d{4}[\s-]?\d{4}\b'),
-                '[CREDIT_CARD]'
-            ),
-            'ssn': (
-                re.compile(r'\b\d{3}-\d{2}-\d{4}\b'),
-                '[SSN]'
-            ),
-            'url_with_params': (
-                re.compile(r'https?://[^\s]+\?[^\s]+'),
-                '[URL_WITH_PARAMS]'
-            ),
-            'file_path_unix': (
-                re.compile(r'/(?:home|root|etc|var|opt)/[\w/.-]+'),
-                '[FILE_PATH]'
-            ),
-            'file_path_windows': (
-                re.compile(r'[A-Z]:\\[\w\\.-]+', re.IGNORECASE),
-                '[FILE_PATH]'
-            ),
-            'username': (
-                re.compile(r'(?:username|user|login)[\s:=]+([a-zA-Z0-9_-]+)', re.IGNORECASE),
-                r'username: [USERNAME]'
-            ),
-            'password': (
-                re.compile(r'(?:password|passwd|pwd)[\s:=]+\S+', re.IGNORECASE),
-                'password: [REDACTED]'
-            ),
-            'jwt_token': (
-                re.compile(r'eyJ[a-zA-Z0-9_-]+\.eyJ[a-zA-Z0-9_-]+\.[a-zA-Z0-9_-]+'),
-                '[JWT_TOKEN]'
-            ),
-            'ssh_key': (
-                re.compile(r'-----BEGIN (?:RSA |DSA |EC |OPENSSH )?PRIVATE KEY-----'),
-                '[SSH_PRIVATE_KEY_REDACTED]'
-            ),
-            'mac_address': (
-                re.compile(r'\b([0-9A-Fa-f]{2}[:-]){5}([0-9A-Fa-f]{2})\b'),
-                '[MAC_ADDRESS]'
-            )
+            name: (re.compile(pattern if anchor == 'lead' else r'\b' + pattern), replacement)
+            for name, anchor, _, pattern, replacement in PII_PATTERNS
         }
 
     def sanitize(self, text: str, aggressive: bool = False) -> Tuple[str, List[str]]:
@@ -120,32 +137,88 @@ class RequestSanitizer:
         Returns:
             Tuple of (sanitized_text, list_of_replacements_made)
         """
-        self.replacements_made = []
-        sanitized = text
-
-        # Apply each pattern
-        for pattern_name, (pattern, replacement) in self.patterns.items():
-            matches = pattern.findall(sanitized)
-            if matches:
-                self.replacements_made.append(f"{pattern_name}: {len(matches)} replacement(s)")
-                sanitized = pattern.sub(replacement, sanitized)
-                logger.debug(f"Sanitized {len(matches)} {pattern_name} match(es)")
-
-        # Aggressive mode: additional patterns
-        if aggressive:
-            # Redact anything that looks like a hash
-            hash_pattern = re.compile(r'\b[a-fA-F0-9]{32,}\b')
-            if hash_pattern.search(sanitized):
-                self.replacements_made.append("hash: multiple replacements")
-                sanitized = hash_pattern.sub('[HASH]', sanitized)
-
-            # Redact base64-like strings
-            base64_pattern = re.compile(r'\b[A-Za-z0-9+/]{40,}={0,2}\b')
-            if base64_pattern.search(sanitized):
-                self.replacements_made.append("base64: multiple replacements")
-                sanitized = base64_pattern.sub('[BASE64_DATA]', sanitized)
-
-        return sanitized, self.replacements_made
+        counts = Counter()
+        parts = []
+        self._substitute(self._pattern(aggressive), text, 0, len(text), True, parts, counts)
+        self.replacements_made = self._report(counts)
+        return "".join(parts), self.replacements_made
+
+    def sanitize_stream(self, chunks: Iterable[str], aggressive: bool = False,
+                        overlap: int = DEFAULT_OVERLAP) -> Iterator[str]:
+        """
+        Sanitize a large text delivered in chunks
+
+        Output pieces concatenate to the same result as sanitize() on the
+        whole text, as long as no single match (or a line scanned by the
+        api_key_generic lookahead) is longer than the overlap.
+
+        Args:
+            chunks: Iterable of text chunks (e.g. iter(lambda: f.read(1 << 20), ''))
+            aggressive: If True, apply more aggressive pattern matching
+            overlap: Characters held back until the next chunk arrives
+
+        Yields:
+            Sanitized text pieces
+        """
+        pattern = self._pattern(aggressive)
+        counts = Counter()
+        context = ""
+        pending = ""
+
+        for chunk in chunks:
+            pending += chunk
+            if len(pending) < 2 * overlap:
+                continue
+
+            text = context + pending
+            parts = []
+            cut = self._substitute(pattern, text, len(context), len(text) - overlap, False, parts, counts)
+            context = text[max(0, cut - CONTEXT):cut]
+            pending = text[cut:]
+            yield "".join(parts)
+
+        text = context + pending
+        parts = []
+        self._substitute(pattern, text, len(context), len(text), True, parts, counts)
+        self.replacements_made = self._report(counts)
+        yield "".join(parts)
+
+    def _pattern(self, aggressive: bool) -> re.Pattern:
+        return self.combined_aggressive if aggressive else self.combined
+
+    def _substitute(self, pattern: re.Pattern, text: str, start: int, end: int, final: bool,
+                    parts: List[str], counts: Counter) -> int:
+        """
+        Append text[start:end] with matches replaced to parts.
+
+        Unless final, a match running past end moves end back to the
+        match start so the match is handled with the next chunk.
+
+        Returns:
+            Position up to which text was consumed
+        """
+        pos = start
+        for match in pattern.finditer(text, start):
+            if not final and match.end() > end:
+                end = min(end, match.start())
+                break
+            name = match.lastgroup
+            parts.append(text[pos:match.start()])
+            parts.append(self.replacements[name])
+            counts[name] += 1
+            pos = match.end()
+
+        parts.append(text[pos:end])
+        return end
+
+    def _report(self, counts: Counter) -> List[str]:
+        """Replacement summary in pattern order"""
+        report = []
+        for name in self.replacements:
+            if counts[name]:
+                report.append(f"{name}: {counts[name]} replacement(s)")
+                logger.debug(f"Sanitized {counts[name]} {name} match(es)")
+        return report
 
     def sanitize_dict(self, data: Dict) -> Dict:
         """Recursively sanitize all string values in a dictionary"""
@@ -174,13 +247,8 @@ class RequestSanitizer:
         Returns:
             List of detected sensitive data types
         """
-        detected = []
-
-        for pattern_name, (pattern, _) in self.patterns.items():
-            if pattern.search(text):
-                detected.append(pattern_name)
-
-        return detected
+        found = {match.lastgroup for match in self.combined.finditer(text)}
+        return [name for name in self.patterns if name in found]
 
     def get_report(self) -> str:
         """Get a report of what was sanitized"""
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+QWAMOS Request Sanitizer Benchmark
+
+Sanitizes synthetic nmap-style scan output and compares:
+- legacy: one re.sub() pass per pattern (the previous implementation)
+- single_pass: RequestSanitizer.sanitize() with the combined pattern
+- streamed: RequestSanitizer.sanitize_stream() over 1 MiB chunks
+
+Usage:
+    python ai/security/sanitizer_benchmark.py [--sizes 1,10,50] [--seed 42]
+
+Author: QWAMOS Project
+License: MIT
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+# Add ai/security to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from request_sanitizer import AGGRESSIVE_PATTERNS, PII_PATTERNS, RequestSanitizer
+
+CHUNK_SIZE = 1 << 20
+
+SERVICES = ["ssh", "http", "https", "smtp", "mysql", "rdp", "microsoft-ds", "domain"]
+
+
+def make_scan_output(size_mb: float, seed: int = 42) -> str:
+    """Generate nmap-like scan output with occasional PII"""
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    lines: List[str] = []
+    length = 0
+
+    while length < target:
+        ip = f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+        block = [
+            f"Nmap scan report for host-{rng.randrange(10 ** 6)}.corp.example ({ip})",
+            f"Host is up ({rng.random():.4f}s latency).",
+            "PORT      STATE SERVICE  VERSION",
+        ]
+        for _ in range(rng.randrange(2, 8)):
+            block.append(f"{rng.randrange(1, 65536)}/tcp".ljust(10) +
+                         f"open  {rng.choice(SERVICES):<8} banner {rng.randrange(10 ** 8):08x}")
+        if rng.random() < 0.2:
+            block.append(f"| contact: admin{rng.randrange(100)}@corp.example phone 555-{rng.randrange(100, 999)}-{rng.randrange(1000, 9999)}")
+        if rng.random() < 0.1:
+            block.append(f"| http-title: login=admin{rng.randrange(100)} password=hunter{rng.randrange(100)}")
+        if rng.random() < 0.1:
+            block.append(f"| ssh-hostkey: {rng.getrandbits(256):064x}")
+        block.append(f"MAC Address: 00:1A:2B:{rng.randrange(256):02X}:{rng.randrange(256):02X}:{rng.randrange(256):02X}")
+        block.append("")
+        text = "\n".join(block) + "\n"
+        lines.append(text)
+        length += len(text)
+
+    return "".join(lines)
+
+
+def legacy_sanitize(text: str, aggressive: bool = False) -> str:
+    """The previous algorithm: one full re.sub() pass per pattern"""
+    for _, anchor, _, pattern, replacement in PII_PATTERNS:
+        text = re.sub(pattern if anchor == 'lead' else r'\b' + pattern, replacement, text)
+    if aggressive:
+        for _, _, _, pattern, replacement in AGGRESSIVE_PATTERNS:
+            text = re.sub(r'\b' + pattern, replacement, text)
+    return text
+
+
+def run_benchmark(sizes: List[float], seed: int = 42, aggressive: bool = False) -> Dict[str, Dict]:
+    """Time each strategy on each input size"""
+    sanitizer = RequestSanitizer()
+    results = {}
+
+    for size_mb in sizes:
+        text = make_scan_output(size_mb, seed)
+        mb = len(text) / (1024 * 1024)
+
+        start = time.perf_counter()
+        legacy = legacy_sanitize(text, aggressive)
+        legacy_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        single, replacements = sanitizer.sanitize(text, aggressive)
+        single_s = time.perf_counter() - start
+
+        chunks = (text[i:i + CHUNK_SIZE] for i in range(0, len(text), CHUNK_SIZE))
+        start = time.perf_counter()
+        streamed = "".join(sanitizer.sanitize_stream(chunks, aggressive))
+        streamed_s = time.perf_counter() - start
+
+        results[f"{size_mb:g}MB"] = {
+            'bytes': len(text),
+            'replacements': replacements,
+            'legacy_s': legacy_s,
+            'single_pass_s': single_s,
+            'streamed_s': streamed_s,
+            'legacy_mb_s': mb / legacy_s,
+            'single_pass_mb_s': mb / single_s,
+            'streamed_mb_s': mb / streamed_s,
+            'speedup': legacy_s / single_s,
+            'streamed_matches': streamed == single,
+            'legacy_matches': single == legacy,
+        }
+        if single != legacy:
+            at = len(os.path.commonprefix([single, legacy]))
+            results[f"{size_mb:g}MB"]['first_difference'] = {
+                'offset': at,
+                'single_pass': single[max(0, at - 40):at + 40],
+                'legacy': legacy[max(0, at - 40):at + 40],
+            }
+
+    return results
+
+
+def main():
+    """Run benchmark and print results."""
+    parser = argparse.ArgumentParser(description="QWAMOS request sanitizer benchmark")
+    parser.add_argument("--sizes", default="1,10,50", help="Comma-separated input sizes in MB")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--aggressive", action="store_true", help="Include hash/base64 patterns")
+    parser.add_argument("--json", action="store_true", help="Print raw JSON results")
+    args = parser.parse_args()
+
+    sizes = [float(s) for s in args.sizes.split(",")]
+    results = run_benchmark(sizes, args.seed, args.aggressive)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print("=" * 70)
+    print(f"QWAMOS Request Sanitizer Benchmark ({'aggressive' if args.aggressive else 'default'} mode)")
+    print("=" * 70)
+    print(f"{'size':<8} {'legacy MB/s':>12} {'single MB/s':>12} {'stream MB/s':>12} "
+          f"{'speedup':>8} {'stream==':>9} {'legacy==':>9}")
+    for name, result in results.items():
+        print(f"{name:<8} {result['legacy_mb_s']:>12.2f} {result['single_pass_mb_s']:>12.2f} "
+              f"{result['streamed_mb_s']:>12.2f} {result['speedup']:>7.2f}x "
+              f"{str(result['streamed_matches']):>9} {str(result['legacy_matches']):>9}")
+    for name, result in results.items():
+        if 'first_difference' in result:
+            diff = result['first_difference']
+            print(f"{name}: single pass differs from legacy at offset {diff['offset']}")
+            print(f"  single: {diff['single_pass']!r}")
+            print(f"  legacy: {diff['legacy']!r}")
+    print("=" * 70)
+
+    if not all(result['legacy_matches'] and result['streamed_matches'] for result in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,8 @@ ALL 3 AIs must score >=90/100 for code to pass.
 
 import logging
 import asyncio
+import hashlib
+from collections import OrderedDict
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
@@ -55,6 +57,7 @@ class SecurityVulnerability:
     cwe_id: Optional[str] = None  # Common Weakness Enumeration ID
     recommendation: str = ""
     detected_by_ai: str = ""  # kali_gpt, claude, chatgpt
+    column: Optional[int] = None
 
 
 @dataclass
@@ -86,6 +89,261 @@ class TripleAuditResult:
     audit_summary: str = ""
 
 
+@dataclass(frozen=True)
+class AnalysisMarker:
+    """Text the static-analysis scan locates in each file"""
+    literals: Tuple[str, ...] = ()  # Located with str.find (first of any)
+    regex: str = ""  # Or located with a precompiled search
+    lowercase: bool = False  # Search the lowercased file (patterns written in lowercase)
+
+
+ANALYSIS_MARKERS: Dict[str, AnalysisMarker] = {
+    'sql_concat': AnalysisMarker(regex=r'\.execSQL\s*\(\s*["\'].*?\+'),
+    'runtime_exec': AnalysisMarker(regex=r'Runtime\.getRuntime\(\)\.exec\s*\('),
+    'secret_password': AnalysisMarker(regex=r'password\s*=\s*["\'][^"\']+["\']', lowercase=True),
+    'secret_api_key': AnalysisMarker(regex=r'api[_-]?key\s*=\s*["\'][^"\']+["\']', lowercase=True),
+    'secret_secret': AnalysisMarker(regex=r'secret\s*=\s*["\'][^"\']+["\']', lowercase=True),
+    'secret_token': AnalysisMarker(regex=r'token\s*=\s*["\'][^"\']+["\']', lowercase=True),
+    'secret_assignment': AnalysisMarker(('password =', 'api_key =', 'secret ='), lowercase=True),
+    'java_util_random': AnalysisMarker(('java.util.Random',)),
+    'DES': AnalysisMarker(('DES',)),
+    'RC4': AnalysisMarker(('RC4',)),
+    'MD5': AnalysisMarker(('MD5',)),
+    'SHA1': AnalysisMarker(('SHA1',)),
+    'ECB': AnalysisMarker(('ECB',)),
+    'http_url': AnalysisMarker(regex=r'http://[^"\']+'),
+    'trust_all': AnalysisMarker(('TrustAllCertificates', 'trustAllHosts')),
+    'Activity': AnalysisMarker(('Activity',)),
+    'onCreate': AnalysisMarker(('onCreate',)),
+    'authentication': AnalysisMarker(('authentication',), lowercase=True),
+    'login': AnalysisMarker(('login',), lowercase=True),
+    'static': AnalysisMarker(('static',)),
+    'getInstance': AnalysisMarker(('getInstance',)),
+    'synchronized': AnalysisMarker(('synchronized',)),
+    'EditText': AnalysisMarker(('EditText',)),
+    'getUserInput': AnalysisMarker(('getUserInput',)),
+    'validate': AnalysisMarker(('validate',), lowercase=True),
+    'sanitize': AnalysisMarker(('sanitize',), lowercase=True),
+    'printStackTrace': AnalysisMarker(('printStackTrace()',)),
+    'security_todo': AnalysisMarker(regex=r'//\s*(?:todo|fixme).*?(?:security|auth|encrypt|password)',
+                                    lowercase=True),
+    'HttpURLConnection': AnalysisMarker(('HttpURLConnection',)),
+    'OkHttp': AnalysisMarker(('OkHttp',)),
+}
+
+
+@dataclass(frozen=True)
+class AnalysisRule:
+    """Static-analysis rule evaluated over the markers found in one file"""
+    rule_id: str
+    severity: VulnerabilitySeverity
+    audit_type: AuditType
+    description: str
+    cwe_id: str
+    recommendation: str
+    any_of: Tuple[str, ...]  # At least one present; the earliest is the finding location
+    all_of: Tuple[str, ...] = ()
+    none_of: Tuple[str, ...] = ()
+    filename_contains: str = ""  # Lowercase filename filter
+
+    def match(self, filename: str, found: Dict[str, Tuple[int, int]]) -> Optional[Tuple[int, int]]:
+        """Return the (line, column) of the finding, or None if the rule does not fire"""
+        if self.filename_contains and self.filename_contains not in filename.lower():
+            return None
+        if any(marker not in found for marker in self.all_of):
+            return None
+        if any(marker in found for marker in self.none_of):
+            return None
+
+        locations = [found[marker] for marker in self.any_of if marker in found]
+        return min(locations) if locations else None
+
+
+VULNERABILITY_SCAN_RULES = [
+    AnalysisRule('sql_injection', VulnerabilitySeverity.CRITICAL, AuditType.VULNERABILITY_SCAN,
+                 "Potential SQL injection - string concatenation in SQL query", "CWE-89",
+                 "Use parameterized queries with prepared statements",
+                 any_of=('sql_concat',)),
+    AnalysisRule('command_injection', VulnerabilitySeverity.HIGH, AuditType.VULNERABILITY_SCAN,
+                 "Command execution detected - potential command injection", "CWE-78",
+                 "Validate and sanitize all user input before executing commands",
+                 any_of=('runtime_exec',)),
+    AnalysisRule('hardcoded_secret', VulnerabilitySeverity.CRITICAL, AuditType.VULNERABILITY_SCAN,
+                 "Hardcoded secret detected in source code", "CWE-798",
+                 "Store secrets in Android Keystore or secure configuration",
+                 any_of=('secret_password', 'secret_api_key', 'secret_secret', 'secret_token')),
+    AnalysisRule('insecure_random', VulnerabilitySeverity.HIGH, AuditType.CRYPTO_ANALYSIS,
+                 "Insecure random number generator used for cryptographic operations", "CWE-330",
+                 "Use SecureRandom for cryptographic operations",
+                 any_of=('java_util_random',), filename_contains='crypto'),
+]
+
+CRYPTO_RULES = [
+    AnalysisRule(f'weak_crypto_{algo}', VulnerabilitySeverity.HIGH, AuditType.CRYPTO_ANALYSIS,
+                 f"Weak cryptographic algorithm detected: {algo}", "CWE-327",
+                 "Use AES-256-GCM or ChaCha20-Poly1305 for encryption",
+                 any_of=(algo,))
+    for algo in ('DES', 'RC4', 'MD5', 'SHA1')
+] + [
+    AnalysisRule('ecb_mode', VulnerabilitySeverity.HIGH, AuditType.CRYPTO_ANALYSIS,
+                 "ECB cipher mode detected (insecure)", "CWE-327",
+                 "Use GCM or CBC mode with proper IV",
+                 any_of=('ECB',)),
+]
+
+NETWORK_RULES = [
+    AnalysisRule('cleartext_http', VulnerabilitySeverity.MEDIUM, AuditType.NETWORK_SECURITY,
+                 "Insecure HTTP connection detected", "CWE-319",
+                 "Use HTTPS for all network communications",
+                 any_of=('http_url',)),
+    AnalysisRule('ssl_bypass', VulnerabilitySeverity.CRITICAL, AuditType.NETWORK_SECURITY,
+                 "SSL certificate validation bypass detected", "CWE-295",
+                 "Implement proper certificate validation",
+                 any_of=('trust_all',)),
+]
+
+ARCHITECTURE_RULES = [
+    AnalysisRule('missing_authentication', VulnerabilitySeverity.LOW, AuditType.ARCHITECTURE_SECURITY,
+                 "Activity may lack authentication checks", "CWE-306",
+                 "Implement authentication checks if handling sensitive data",
+                 any_of=('Activity',), all_of=('onCreate',), none_of=('authentication', 'login')),
+]
+
+DESIGN_PATTERN_RULES = [
+    AnalysisRule('unsynchronized_singleton', VulnerabilitySeverity.LOW, AuditType.ARCHITECTURE_SECURITY,
+                 "Singleton pattern without thread synchronization", "CWE-543",
+                 "Use synchronized keyword or double-checked locking",
+                 any_of=('getInstance',), all_of=('static',), none_of=('synchronized',)),
+]
+
+INPUT_VALIDATION_RULES = [
+    AnalysisRule('unvalidated_input', VulnerabilitySeverity.MEDIUM, AuditType.VULNERABILITY_SCAN,
+                 "User input handling without visible validation", "CWE-20",
+                 "Implement input validation and sanitization",
+                 any_of=('EditText', 'getUserInput'), none_of=('validate', 'sanitize')),
+]
+
+ERROR_HANDLING_RULES = [
+    AnalysisRule('stack_trace_exposure', VulnerabilitySeverity.LOW, AuditType.VULNERABILITY_SCAN,
+                 "printStackTrace() exposes sensitive information", "CWE-209",
+                 "Log errors securely without exposing stack traces to users",
+                 any_of=('printStackTrace',)),
+]
+
+CODE_QUALITY_RULES = [
+    AnalysisRule('security_todo', VulnerabilitySeverity.MEDIUM, AuditType.VULNERABILITY_SCAN,
+                 "Unfinished security-related code (TODO/FIXME)", "CWE-1164",
+                 "Complete all security-related implementations",
+                 any_of=('security_todo',)),
+]
+
+
+@dataclass
+class CodeAnalysis:
+    """Shared static-analysis result for one set of code files"""
+    # filename -> marker -> (line, column) of its first occurrence
+    markers: Dict[str, Dict[str, Tuple[int, int]]]
+
+    def has(self, marker: str) -> bool:
+        """True if any file contains the marker"""
+        return any(marker in found for found in self.markers.values())
+
+    def findings(self, rules: List[AnalysisRule], ai_name: str) -> List[SecurityVulnerability]:
+        """Evaluate rules over every file (at most one finding per file and rule)"""
+        vulnerabilities = []
+
+        for filename, found in self.markers.items():
+            for rule in rules:
+                location = rule.match(filename, found)
+                if location is None:
+                    continue
+                vulnerabilities.append(SecurityVulnerability(
+                    severity=rule.severity,
+                    audit_type=rule.audit_type,
+                    file=filename,
+                    line=location[0],
+                    column=location[1],
+                    description=rule.description,
+                    cwe_id=rule.cwe_id,
+                    recommendation=rule.recommendation,
+                    detected_by_ai=ai_name
+                ))
+
+        return vulnerabilities
+
+
+class StaticAnalysisEngine:
+    """
+    Static analysis shared by all three AI audits.
+
+    Each file is scanned once per audit for every marker (regexes are
+    precompiled, case-insensitive markers share one lowercased copy) and
+    the result is memoized by content hash, so re-audits after a code
+    iteration only rescan the files that changed.
+    """
+
+    def __init__(self, markers: Optional[Dict[str, AnalysisMarker]] = None, max_cached_files: int = 1024):
+        self.markers = markers or ANALYSIS_MARKERS
+        self.compiled = {name: re.compile(marker.regex)
+                         for name, marker in self.markers.items() if marker.regex}
+        self.max_cached_files = max_cached_files
+        self.cache: "OrderedDict[str, Dict[str, Tuple[int, int]]]" = OrderedDict()
+        self.stats = {
+            'files_scanned': 0,
+            'cache_hits': 0
+        }
+
+    def analyze(self, code: Dict[str, str]) -> CodeAnalysis:
+        """
+        Analyze code files.
+
+        Args:
+            code: Code files {filename: content}
+
+        Returns:
+            CodeAnalysis with marker locations per file
+        """
+        return CodeAnalysis({filename: self.scan(content) for filename, content in code.items()})
+
+    def scan(self, content: str) -> Dict[str, Tuple[int, int]]:
+        """Locate the first occurrence of each marker (memoized by content hash)"""
+        key = hashlib.sha256(content.encode('utf-8', 'surrogatepass')).hexdigest()
+        found = self.cache.get(key)
+        if found is not None:
+            self.cache.move_to_end(key)
+            self.stats['cache_hits'] += 1
+            return found
+
+        lowered = content.lower()
+        found = {}
+        for name, marker in self.markers.items():
+            text = lowered if marker.lowercase else content
+            if marker.regex:
+                match = self.compiled[name].search(text)
+                offset = match.start() if match else -1
+            else:
+                offsets = [o for o in (text.find(literal) for literal in marker.literals) if o >= 0]
+                offset = min(offsets) if offsets else -1
+            if offset >= 0:
+                found[name] = self._line_column(text, offset)
+
+        self.cache[key] = found
+        if len(self.cache) > self.max_cached_files:
+            self.cache.popitem(last=False)
+        self.stats['files_scanned'] += 1
+        return found
+
+    def get_stats(self) -> Dict[str, int]:
+        """Scan and cache counters"""
+        return dict(self.stats, cached_files=len(self.cache))
+
+    @staticmethod
+    def _line_column(text: str, offset: int) -> Tuple[int, int]:
+        """1-based line and column of an offset"""
+        line_start = text.rfind('\n', 0, offset) + 1
+        return text.count('\n', 0, offset) + 1, offset - line_start + 1
+
+
 class TripleAISecurityAuditor:
     """
     Triple-AI security auditor with consensus requirement.
@@ -118,6 +376,9 @@ class TripleAISecurityAuditor:
             'chatgpt': 0.25
         }
 
+        # Shared static analysis (memoized across re-audits)
+        self.analysis_engine = StaticAnalysisEngine()
+
     async def perform_triple_audit(
         self,
         code: Dict[str, str],
@@ -139,10 +400,13 @@ class TripleAISecurityAuditor:
         """
         logger.info("Starting Triple-AI Security Audit...")
 
+        # One static-analysis pass shared by all 3 audits
+        analysis = self.analysis_engine.analyze(code)
+
         # Run all 3 audits in parallel
-        kali_audit_task = self._kali_gpt_audit(code, manifest, dependencies, user_request)
-        claude_audit_task = self._claude_audit(code, manifest, dependencies, user_request)
-        chatgpt_audit_task = self._chatgpt_audit(code, manifest, dependencies, user_request)
+        kali_audit_task = self._kali_gpt_audit(analysis, manifest, dependencies, user_request)
+        claude_audit_task = self._claude_audit(analysis, manifest, dependencies, user_request)
+        chatgpt_audit_task = self._chatgpt_audit(analysis, manifest, dependencies, user_request)
 
         kali_audit, claude_audit, chatgpt_audit = await asyncio.gather(
             kali_audit_task,
@@ -182,7 +446,7 @@ class TripleAISecurityAuditor:
         )
 
         # Check fail conditions
-        fail_conditions = self._check_fail_conditions(code, manifest, all_vulnerabilities)
+        fail_conditions = self._check_fail_conditions(analysis, manifest, all_vulnerabilities)
 
         if fail_conditions:
             all_pass = False
@@ -217,7 +481,7 @@ class TripleAISecurityAuditor:
 
     async def _kali_gpt_audit(
         self,
-        code: Dict[str, str],
+        analysis: CodeAnalysis,
         manifest: str,
         dependencies: List[str],
         user_request: str
@@ -237,7 +501,7 @@ class TripleAISecurityAuditor:
         score = 100.0
 
         # 1. Vulnerability Scanning
-        vuln_scan_results = await self._vulnerability_scan(code, 'kali_gpt')
+        vuln_scan_results = await self._vulnerability_scan(analysis, 'kali_gpt')
         vulnerabilities.extend(vuln_scan_results)
 
         # 2. Permission Analysis
@@ -245,11 +509,11 @@ class TripleAISecurityAuditor:
         vulnerabilities.extend(permission_vulns)
 
         # 3. Cryptographic Analysis
-        crypto_vulns = self._analyze_crypto(code, 'kali_gpt')
+        crypto_vulns = self._analyze_crypto(analysis, 'kali_gpt')
         vulnerabilities.extend(crypto_vulns)
 
         # 4. Network Security
-        network_vulns = self._analyze_network_security(code, manifest, 'kali_gpt')
+        network_vulns = self._analyze_network_security(analysis, manifest, 'kali_gpt')
         vulnerabilities.extend(network_vulns)
 
         # Calculate score penalties
@@ -282,7 +546,7 @@ class TripleAISecurityAuditor:
 
     async def _claude_audit(
         self,
-        code: Dict[str, str],
+        analysis: CodeAnalysis,
         manifest: str,
         dependencies: List[str],
         user_request: str
@@ -302,19 +566,19 @@ class TripleAISecurityAuditor:
         score = 100.0
 
         # 1. Architecture Security Review
-        arch_vulns = self._review_architecture_security(code, 'claude')
+        arch_vulns = self._review_architecture_security(analysis, 'claude')
         vulnerabilities.extend(arch_vulns)
 
         # 2. Design Pattern Analysis
-        design_vulns = self._analyze_design_patterns(code, 'claude')
+        design_vulns = self._analyze_design_patterns(analysis, 'claude')
         vulnerabilities.extend(design_vulns)
 
         # 3. Input Validation Review
-        input_vulns = self._review_input_validation(code, 'claude')
+        input_vulns = self._review_input_validation(analysis, 'claude')
         vulnerabilities.extend(input_vulns)
 
         # 4. Error Handling Review
-        error_vulns = self._review_error_handling(code, 'claude')
+        error_vulns = self._review_error_handling(analysis, 'claude')
         vulnerabilities.extend(error_vulns)
 
         # Calculate score penalties
@@ -347,7 +611,7 @@ class TripleAISecurityAuditor:
 
     async def _chatgpt_audit(
         self,
-        code: Dict[str, str],
+        analysis: CodeAnalysis,
         manifest: str,
         dependencies: List[str],
         user_request: str
@@ -375,7 +639,7 @@ class TripleAISecurityAuditor:
         vulnerabilities.extend(manifest_vulns)
 
         # 3. Code Quality Security Review
-        quality_vulns = self._review_code_quality_security(code, 'chatgpt')
+        quality_vulns = self._review_code_quality_security(analysis, 'chatgpt')
         vulnerabilities.extend(quality_vulns)
 
         # Calculate score penalties
@@ -406,72 +670,9 @@ class TripleAISecurityAuditor:
             pass_status=pass_status
         )
 
-    async def _vulnerability_scan(self, code: Dict[str, str], ai_name: str) -> List[SecurityVulnerability]:
+    async def _vulnerability_scan(self, analysis: CodeAnalysis, ai_name: str) -> List[SecurityVulnerability]:
         """Scan for common vulnerabilities (OWASP Top 10)"""
-        vulnerabilities = []
-
-        for filename, content in code.items():
-            # SQL Injection check
-            if re.search(r'\.execSQL\s*\(\s*["\'].*?\+', content):
-                vulnerabilities.append(SecurityVulnerability(
-                    severity=VulnerabilitySeverity.CRITICAL,
-                    audit_type=AuditType.VULNERABILITY_SCAN,
-                    file=filename,
-                    line=None,
-                    description="Potential SQL injection - string concatenation in SQL query",
-                    cwe_id="CWE-89",
-                    recommendation="Use parameterized queries with prepared statements",
-                    detected_by_ai=ai_name
-                ))
-
-            # Command Injection check
-            if re.search(r'Runtime\.getRuntime\(\)\.exec\s*\(', content):
-                vulnerabilities.append(SecurityVulnerability(
-                    severity=VulnerabilitySeverity.HIGH,
-                    audit_type=AuditType.VULNERABILITY_SCAN,
-                    file=filename,
-                    line=None,
-                    description="Command execution detected - potential command injection",
-                    cwe_id="CWE-78",
-                    recommendation="Validate and sanitize all user input before executing commands",
-                    detected_by_ai=ai_name
-                ))
-
-            # Hardcoded secrets check
-            secret_patterns = [
-                r'password\s*=\s*["\'][^"\']+["\']',
-                r'api[_-]?key\s*=\s*["\'][^"\']+["\']',
-                r'secret\s*=\s*["\'][^"\']+["\']',
-                r'token\s*=\s*["\'][^"\']+["\']'
-            ]
-            for pattern in secret_patterns:
-                if re.search(pattern, content, re.IGNORECASE):
-                    vulnerabilities.append(SecurityVulnerability(
-                        severity=VulnerabilitySeverity.CRITICAL,
-                        audit_type=AuditType.VULNERABILITY_SCAN,
-                        file=filename,
-                        line=None,
-                        description="Hardcoded secret detected in source code",
-                        cwe_id="CWE-798",
-                        recommendation="Store secrets in Android Keystore or secure configuration",
-                        detected_by_ai=ai_name
-                    ))
-                    break
-
-            # Insecure random number generation
-            if 'java.util.Random' in content and 'crypto' in filename.lower():
-                vulnerabilities.append(SecurityVulnerability(
-                    severity=VulnerabilitySeverity.HIGH,
-                    audit_type=AuditType.CRYPTO_ANALYSIS,
-                    file=filename,
-                    line=None,
-                    description="Insecure random number generator used for cryptographic operations",
-                    cwe_id="CWE-330",
-                    recommendation="Use SecureRandom for cryptographic operations",
-                    detected_by_ai=ai_name
-                ))
-
-        return vulnerabilities
+        return analysis.findings(VULNERABILITY_SCAN_RULES, ai_name)
 
     def _analyze_permissions(
         self,
@@ -526,180 +727,50 @@ class TripleAISecurityAuditor:
 
         return vulnerabilities
 
-    def _analyze_crypto(self, code: Dict[str, str], ai_name: str) -> List[SecurityVulnerability]:
+    def _analyze_crypto(self, analysis: CodeAnalysis, ai_name: str) -> List[SecurityVulnerability]:
         """Analyze cryptographic implementation"""
-        vulnerabilities = []
-
-        for filename, content in code.items():
-            # Weak encryption algorithms
-            weak_algorithms = ['DES', 'RC4', 'MD5', 'SHA1']
-            for algo in weak_algorithms:
-                if algo in content:
-                    vulnerabilities.append(SecurityVulnerability(
-                        severity=VulnerabilitySeverity.HIGH,
-                        audit_type=AuditType.CRYPTO_ANALYSIS,
-                        file=filename,
-                        line=None,
-                        description=f"Weak cryptographic algorithm detected: {algo}",
-                        cwe_id="CWE-327",
-                        recommendation="Use AES-256-GCM or ChaCha20-Poly1305 for encryption",
-                        detected_by_ai=ai_name
-                    ))
-
-            # ECB mode (insecure)
-            if 'ECB' in content:
-                vulnerabilities.append(SecurityVulnerability(
-                    severity=VulnerabilitySeverity.HIGH,
-                    audit_type=AuditType.CRYPTO_ANALYSIS,
-                    file=filename,
-                    line=None,
-                    description="ECB cipher mode detected (insecure)",
-                    cwe_id="CWE-327",
-                    recommendation="Use GCM or CBC mode with proper IV",
-                    detected_by_ai=ai_name
-                ))
-
-        return vulnerabilities
+        return analysis.findings(CRYPTO_RULES, ai_name)
 
     def _analyze_network_security(
         self,
-        code: Dict[str, str],
+        analysis: CodeAnalysis,
         manifest: str,
         ai_name: str
     ) -> List[SecurityVulnerability]:
         """Analyze network security configuration"""
-        vulnerabilities = []
-
-        for filename, content in code.items():
-            # Insecure HTTP connections
-            if re.search(r'http://[^"\']+', content):
-                vulnerabilities.append(SecurityVulnerability(
-                    severity=VulnerabilitySeverity.MEDIUM,
-                    audit_type=AuditType.NETWORK_SECURITY,
-                    file=filename,
-                    line=None,
-                    description="Insecure HTTP connection detected",
-                    cwe_id="CWE-319",
-                    recommendation="Use HTTPS for all network communications",
-                    detected_by_ai=ai_name
-                ))
-
-            # SSL certificate validation bypass
-            if 'TrustAllCertificates' in content or 'trustAllHosts' in content:
-                vulnerabilities.append(SecurityVulnerability(
-                    severity=VulnerabilitySeverity.CRITICAL,
-                    audit_type=AuditType.NETWORK_SECURITY,
-                    file=filename,
-                    line=None,
-                    description="SSL certificate validation bypass detected",
-                    cwe_id="CWE-295",
-                    recommendation="Implement proper certificate validation",
-                    detected_by_ai=ai_name
-                ))
-
-        return vulnerabilities
+        return analysis.findings(NETWORK_RULES, ai_name)
 
     def _review_architecture_security(
         self,
-        code: Dict[str, str],
+        analysis: CodeAnalysis,
         ai_name: str
     ) -> List[SecurityVulnerability]:
         """Review architectural security patterns"""
-        vulnerabilities = []
-
-        # This would integrate with Claude's architecture analysis
-        # For now, basic checks
-
-        for filename, content in code.items():
-            # Missing authentication checks
-            if 'Activity' in content and 'onCreate' in content:
-                if 'authentication' not in content.lower() and 'login' not in content.lower():
-                    vulnerabilities.append(SecurityVulnerability(
-                        severity=VulnerabilitySeverity.LOW,
-                        audit_type=AuditType.ARCHITECTURE_SECURITY,
-                        file=filename,
-                        line=None,
-                        description="Activity may lack authentication checks",
-                        cwe_id="CWE-306",
-                        recommendation="Implement authentication checks if handling sensitive data",
-                        detected_by_ai=ai_name
-                    ))
-
-        return vulnerabilities
+        return analysis.findings(ARCHITECTURE_RULES, ai_name)
 
     def _analyze_design_patterns(
         self,
-        code: Dict[str, str],
+        analysis: CodeAnalysis,
         ai_name: str
     ) -> List[SecurityVulnerability]:
         """Analyze security-relevant design patterns"""
-        vulnerabilities = []
-
-        # Check for singleton pattern with mutable state
-        for filename, content in code.items():
-            if 'static' in content and 'getInstance' in content:
-                if 'synchronized' not in content:
-                    vulnerabilities.append(SecurityVulnerability(
-                        severity=VulnerabilitySeverity.LOW,
-                        audit_type=AuditType.ARCHITECTURE_SECURITY,
-                        file=filename,
-                        line=None,
-                        description="Singleton pattern without thread synchronization",
-                        cwe_id="CWE-543",
-                        recommendation="Use synchronized keyword or double-checked locking",
-                        detected_by_ai=ai_name
-                    ))
-
-        return vulnerabilities
+        return analysis.findings(DESIGN_PATTERN_RULES, ai_name)
 
     def _review_input_validation(
         self,
-        code: Dict[str, str],
+        analysis: CodeAnalysis,
         ai_name: str
     ) -> List[SecurityVulnerability]:
         """Review input validation mechanisms"""
-        vulnerabilities = []
-
-        for filename, content in code.items():
-            # Check for user input handling
-            if 'EditText' in content or 'getUserInput' in content:
-                if 'validate' not in content.lower() and 'sanitize' not in content.lower():
-                    vulnerabilities.append(SecurityVulnerability(
-                        severity=VulnerabilitySeverity.MEDIUM,
-                        audit_type=AuditType.VULNERABILITY_SCAN,
-                        file=filename,
-                        line=None,
-                        description="User input handling without visible validation",
-                        cwe_id="CWE-20",
-                        recommendation="Implement input validation and sanitization",
-                        detected_by_ai=ai_name
-                    ))
-
-        return vulnerabilities
+        return analysis.findings(INPUT_VALIDATION_RULES, ai_name)
 
     def _review_error_handling(
         self,
-        code: Dict[str, str],
+        analysis: CodeAnalysis,
         ai_name: str
     ) -> List[SecurityVulnerability]:
         """Review error handling for information leakage"""
-        vulnerabilities = []
-
-        for filename, content in code.items():
-            # Check for stack trace exposure
-            if 'printStackTrace()' in content:
-                vulnerabilities.append(SecurityVulnerability(
-                    severity=VulnerabilitySeverity.LOW,
-                    audit_type=AuditType.VULNERABILITY_SCAN,
-                    file=filename,
-                    line=None,
-                    description="printStackTrace() exposes sensitive information",
-                    cwe_id="CWE-209",
-                    recommendation="Log errors securely without exposing stack traces to users",
-                    detected_by_ai=ai_name
-                ))
-
-        return vulnerabilities
+        return analysis.findings(ERROR_HANDLING_RULES, ai_name)
 
     async def _audit_dependencies(
         self,
@@ -784,31 +855,15 @@ class TripleAISecurityAuditor:
 
     def _review_code_quality_security(
         self,
-        code: Dict[str, str],
+        analysis: CodeAnalysis,
         ai_name: str
     ) -> List[SecurityVulnerability]:
         """Review code quality issues that impact security"""
-        vulnerabilities = []
-
-        for filename, content in code.items():
-            # Check for TODO/FIXME comments in security-critical areas
-            if re.search(r'//\s*(TODO|FIXME).*?(security|auth|encrypt|password)', content, re.IGNORECASE):
-                vulnerabilities.append(SecurityVulnerability(
-                    severity=VulnerabilitySeverity.MEDIUM,
-                    audit_type=AuditType.VULNERABILITY_SCAN,
-                    file=filename,
-                    line=None,
-                    description="Unfinished security-related code (TODO/FIXME)",
-                    cwe_id="CWE-1164",
-                    recommendation="Complete all security-related implementations",
-                    detected_by_ai=ai_name
-                ))
-
-        return vulnerabilities
+        return analysis.findings(CODE_QUALITY_RULES, ai_name)
 
     def _check_fail_conditions(
         self,
-        code: Dict[str, str],
+        analysis: CodeAnalysis,
         manifest: str,
         vulnerabilities: List[SecurityVulnerability]
     ) -> List[str]:
@@ -818,10 +873,7 @@ class TripleAISecurityAuditor:
         # Check each configured fail condition
         for condition in self.fail_conditions:
             if condition == "network_calls_without_permission":
-                has_network_code = any(
-                    'HttpURLConnection' in content or 'OkHttp' in content
-                    for content in code.values()
-                )
+                has_network_code = analysis.has('HttpURLConnection') or analysis.has('OkHttp')
                 has_internet_perm = 'android.permission.INTERNET' in manifest
 
                 if has_network_code and not has_internet_perm:
@@ -844,16 +896,13 @@ class TripleAISecurityAuditor:
             elif condition == "insecure_crypto":
                 insecure_patterns = ['DES', 'RC4', 'MD5', 'ECB']
                 for pattern in insecure_patterns:
-                    if any(pattern in content for content in code.values()):
+                    if analysis.has(pattern):
                         fail_conditions.append(f"Insecure cryptography: {pattern}")
                         break
 
             elif condition == "hardcoded_secrets":
-                secret_patterns = ['password =', 'api_key =', 'secret =']
-                for pattern in secret_patterns:
-                    if any(pattern in content.lower() for content in code.values()):
-                        fail_conditions.append("Hardcoded secrets detected")
-                        break
+                if analysis.has('secret_assignment'):
+                    fail_conditions.append("Hardcoded secrets detected")
 
         return fail_conditions
 
@@ -5,7 +5,7 @@ QWAMOS Phase 9: Deployment Manager
 Secure app deployment to dedicated VMs:
 - One VM per app for maximum isolation
 - Minimal permissions enforcement
-- Runtime monitoring and threat detection
+- Runtime monitoring and threat detection (one scheduler for all apps)
 - Resource management (CPU, RAM, storage)
 - Network isolation
 
@@ -15,15 +15,21 @@ Secure app deployment to dedicated VMs:
 
 import logging
 import asyncio
+import heapq
+import random
 import subprocess
 import os
 import json
 import psutil
-from typing import Dict, List, Optional
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
 from datetime import datetime
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "hypervisor"))
+
 logger = logging.getLogger('DeploymentManager')
 
 
@@ -102,6 +108,15 @@ class ThreatDetection:
     timestamp: str
 
 
+@dataclass
+class MonitoredVM:
+    """Runtime monitor state for one VM"""
+    vm_config: VMConfiguration
+    apps: Dict[str, str]  # package_name -> app_id
+    interval: float
+    generation: int = 0   # bumped on reschedule; stale heap entries are skipped
+
+
 @dataclass
 class DeploymentResult:
     """Deployment result"""
@@ -112,6 +127,172 @@ class DeploymentResult:
     deployment_log: str = ""
 
 
+THREAT_ORDER = list(ThreatLevel)
+
+
+class RuntimeMonitorScheduler:
+    """
+    Single runtime monitor for all deployed apps.
+
+    Replaces one polling task per app with one loop over a heap of
+    per-VM due times:
+    - Metrics are collected once per VM per poll for all of its apps
+      (one dumpsys round-trip in production), with at most
+      max_concurrent collections in flight
+    - First polls are spread over one base interval, and every interval
+      carries +/- jitter so VMs deployed together drift apart
+    - The interval tightens to min_interval on HIGH/CRITICAL threats and
+      relaxes towards max_interval while a VM stays quiet
+    - Each app's metrics are fanned out to DeploymentManager._detect_threats
+    """
+
+    def __init__(
+        self,
+        manager: 'DeploymentManager',
+        base_interval: float = 5.0,
+        min_interval: float = 1.0,
+        max_interval: float = 15.0,
+        jitter: float = 0.2,
+        max_concurrent: int = 8,
+        error_interval: float = 10.0
+    ):
+        self.manager = manager
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self.max_concurrent = max_concurrent
+        self.error_interval = error_interval
+
+        self.vms: Dict[str, MonitoredVM] = {}
+        self.heap: List[Tuple[float, int, str, int]] = []  # (due, seq, vm_id, generation)
+        self.seq = 0
+        self.polling: set = set()
+        self.task: Optional[asyncio.Task] = None
+        self.wakeup: Optional[asyncio.Event] = None
+        self.semaphore: Optional[asyncio.Semaphore] = None
+
+        self.stats = {'polls': 0, 'apps_checked': 0, 'errors': 0, 'in_flight': 0, 'peak_in_flight': 0}
+
+    def register(self, vm_config: VMConfiguration, package_name: str, app_id: str):
+        """Start monitoring an app (starts the scheduler on first use)"""
+        vm = self.vms.get(vm_config.vm_id)
+        if vm is not None:
+            vm.apps[package_name] = app_id
+            return
+
+        vm = MonitoredVM(vm_config=vm_config, apps={package_name: app_id}, interval=self.base_interval)
+        self.vms[vm_config.vm_id] = vm
+        self._ensure_running()
+        # Stagger the first poll across one base interval
+        self._schedule(vm, random.uniform(0, self.base_interval))
+
+    def unregister(self, vm_id: str, package_name: Optional[str] = None):
+        """Stop monitoring one app, or every app of a VM"""
+        vm = self.vms.get(vm_id)
+        if vm is None:
+            return
+        if package_name is not None:
+            vm.apps.pop(package_name, None)
+        if package_name is None or not vm.apps:
+            del self.vms[vm_id]  # its heap entry is skipped when popped
+
+    async def stop(self):
+        """Stop the scheduler and any polls in flight"""
+        tasks = list(self.polling) + ([self.task] if self.task else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.task = None
+        self.polling.clear()
+
+    def get_stats(self) -> Dict:
+        return dict(self.stats, vms=len(self.vms), apps=sum(len(vm.apps) for vm in self.vms.values()))
+
+    def _ensure_running(self):
+        if self.task is None or self.task.done():
+            self.wakeup = asyncio.Event()
+            self.semaphore = asyncio.Semaphore(self.max_concurrent)
+            self.task = asyncio.create_task(self._run())
+
+    def _schedule(self, vm: MonitoredVM, delay: float):
+        vm.generation += 1
+        self.seq += 1
+        heapq.heappush(self.heap, (asyncio.get_running_loop().time() + delay, self.seq,
+                                   vm.vm_config.vm_id, vm.generation))
+        self.wakeup.set()
+
+    async def _run(self):
+        """Dispatch polls as VMs fall due"""
+        loop = asyncio.get_running_loop()
+        logger.info("Runtime monitor scheduler active")
+
+        while True:
+            now = loop.time()
+            while self.heap and self.heap[0][0] <= now:
+                _, _, vm_id, generation = heapq.heappop(self.heap)
+                vm = self.vms.get(vm_id)
+                if vm is None or vm.generation != generation:
+                    continue
+                task = asyncio.create_task(self._poll(vm))
+                self.polling.add(task)
+                task.add_done_callback(self.polling.discard)
+
+            # Sleep until the next VM is due or a new one is scheduled.
+            # asyncio.wait (not wait_for) so stop() can never lose its cancel.
+            self.wakeup.clear()
+            timeout = self.heap[0][0] - now if self.heap else None
+            waiter = asyncio.ensure_future(self.wakeup.wait())
+            try:
+                await asyncio.wait([waiter], timeout=timeout)
+            finally:
+                waiter.cancel()
+
+    async def _poll(self, vm: MonitoredVM):
+        """Collect one VM's metrics, check each app and reschedule"""
+        vm_config = vm.vm_config
+        try:
+            async with self.semaphore:
+                self.stats['in_flight'] += 1
+                self.stats['peak_in_flight'] = max(self.stats['peak_in_flight'], self.stats['in_flight'])
+                try:
+                    metrics = await self.manager._collect_vm_metrics(vm_config, list(vm.apps))
+                finally:
+                    self.stats['in_flight'] -= 1
+
+            self.stats['polls'] += 1
+            worst = ThreatLevel.NONE
+            for package_name, app_metrics in metrics.items():
+                app_id = vm.apps.get(package_name)
+                if app_id is None:
+                    continue  # uninstalled while collecting
+                threats = await self.manager._detect_threats(vm_config, package_name, app_metrics)
+                self.stats['apps_checked'] += 1
+                await self.manager._handle_threats(app_id, package_name, threats, vm_config.vm_id)
+                if THREAT_ORDER.index(threats.threat_level) > THREAT_ORDER.index(worst):
+                    worst = threats.threat_level
+
+            vm.interval = self._next_interval(vm.interval, worst)
+            delay = vm.interval
+        except Exception as e:
+            logger.error(f"Runtime monitor error for {vm_config.vm_name}: {e}")
+            self.stats['errors'] += 1
+            delay = self.error_interval
+
+        if self.vms.get(vm_config.vm_id) is vm:
+            self._schedule(vm, delay * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    def _next_interval(self, interval: float, threat_level: ThreatLevel) -> float:
+        """Poll faster under threat, back off while quiet"""
+        if threat_level in (ThreatLevel.HIGH, ThreatLevel.CRITICAL):
+            return self.min_interval
+        if threat_level == ThreatLevel.MEDIUM:
+            return max(self.min_interval, self.base_interval / 2)
+        if threat_level == ThreatLevel.LOW:
+            return self.base_interval
+        return min(self.max_interval, max(interval, self.base_interval) * 1.5)
+
+
 class DeploymentManager:
     """
     Deployment manager for AI-generated apps.
@@ -149,7 +330,21 @@ class DeploymentManager:
 
         # Deployed apps registry
         self.deployed_apps: Dict[str, DeployedApp] = {}
-        self.runtime_monitors: Dict[str, asyncio.Task] = {}
+
+        # One runtime monitor for all apps
+        monitor_config = self.deployment_config.get('runtime_monitor', {})
+        self.runtime_monitor = RuntimeMonitorScheduler(
+            self,
+            base_interval=monitor_config.get('base_interval_seconds', 5.0),
+            min_interval=monitor_config.get('min_interval_seconds', 1.0),
+            max_interval=monitor_config.get('max_interval_seconds', 15.0),
+            jitter=monitor_config.get('jitter', 0.2),
+            max_concurrent=monitor_config.get('max_concurrent_collections', 8)
+        )
+
+        # Shared metrics collector (one host-wide collection for all monitors)
+        self.metrics_bus_name = self.deployment_config.get('metrics_bus', 'qwamos-metrics')
+        self.metrics_reader = None
 
     async def deploy_app(
         self,
@@ -204,10 +399,10 @@ class DeploymentManager:
             # Step 5: Start runtime monitor
             logger.info("Step 5: Starting runtime monitor...")
             deployment_log.append("Step 5: Starting runtime monitor...")
-            await self._start_runtime_monitor(vm_config, package_name)
+            app_id = f"{user_id}_{package_name}"
+            await self._start_runtime_monitor(vm_config, package_name, app_id)
 
             # Step 6: Register deployed app
-            app_id = f"{user_id}_{package_name}"
             deployed_app = DeployedApp(
                 app_id=app_id,
                 package_name=package_name,
@@ -426,77 +621,98 @@ class DeploymentManager:
     async def _start_runtime_monitor(
         self,
         vm_config: VMConfiguration,
-        package_name: str
+        package_name: str,
+        app_id: str
     ) -> None:
         """Start runtime monitoring for app"""
 
         logger.info("Starting runtime monitor...")
 
-        # Create monitoring task
-        monitor_task = asyncio.create_task(
-            self._runtime_monitor_loop(vm_config, package_name)
-        )
-
-        self.runtime_monitors[vm_config.vm_id] = monitor_task
+        self.runtime_monitor.register(vm_config, package_name, app_id)
 
         logger.info("Runtime monitor started")
 
-    async def _runtime_monitor_loop(
+    async def _handle_threats(
         self,
-        vm_config: VMConfiguration,
-        package_name: str
+        app_id: str,
+        package_name: str,
+        threats: ThreatDetection,
+        vm_id: str
     ) -> None:
-        """Runtime monitoring loop"""
+        """Log detected threats and stop the app (and its monitoring) on CRITICAL"""
 
-        logger.info(f"Runtime monitor active for {package_name}")
+        if threats.threat_level == ThreatLevel.NONE:
+            return
 
-        while True:
-            try:
-                # Collect metrics
-                metrics = await self._collect_runtime_metrics(vm_config, package_name)
+        logger.warning(f"Threat detected in {package_name}: {threats.threat_level.value}")
+        for threat in threats.threats_detected:
+            logger.warning(f"  - {threat}")
+
+        # Take action based on threat level
+        if threats.threat_level == ThreatLevel.CRITICAL:
+            logger.error(f"CRITICAL threat - terminating {package_name}")
+            await self.stop_app(app_id)
+            # A stopped app must not keep being polled; start_app() re-registers it
+            self.runtime_monitor.unregister(vm_id, package_name)
 
-                # Detect threats
-                threats = await self._detect_threats(vm_config, package_name, metrics)
+    async def _collect_vm_metrics(
+        self,
+        vm_config: VMConfiguration,
+        package_names: List[str]
+    ) -> Dict[str, RuntimeMetrics]:
+        """
+        Collect runtime metrics for all monitored apps of one VM.
 
-                # Log threats
-                if threats.threat_level != ThreatLevel.NONE:
-                    logger.warning(f"Threat detected in {package_name}: {threats.threat_level.value}")
-                    for threat in threats.threats_detected:
-                        logger.warning(f"  - {threat}")
+        In production this is a single round-trip per VM, e.g.
+        adb -s <vm_device_id> shell dumpsys cpuinfo/meminfo, parsed per package.
 
-                    # Take action based on threat level
-                    if threats.threat_level == ThreatLevel.CRITICAL:
-                        logger.error(f"CRITICAL threat - terminating {package_name}")
-                        await self.stop_app(package_name)
+        Returns:
+            package_name -> RuntimeMetrics
+        """
 
-                # Sleep before next check
-                await asyncio.sleep(5)  # Check every 5 seconds
+        # CPU, memory and network come from the shared metrics collector
+        reader = self._get_metrics_reader()
+        vm = reader.vm(vm_config.vm_name) if reader else None
+        if vm is not None:
+            metrics = RuntimeMetrics(
+                cpu_usage_percent=vm.cpu_percent,
+                memory_usage_mb=float(vm.memory_mb),
+                network_rx_bytes=int(vm.net_recv_mb * 1024 * 1024),
+                network_tx_bytes=int(vm.net_sent_mb * 1024 * 1024),
+                storage_used_mb=50.0,
+                uptime_seconds=300.0
+            )
+        else:
+            # No collector running: return simulated metrics
+            metrics = RuntimeMetrics(
+                cpu_usage_percent=5.0,
+                memory_usage_mb=128.0,
+                network_rx_bytes=0,
+                network_tx_bytes=0,
+                storage_used_mb=50.0,
+                uptime_seconds=300.0
+            )
 
-            except Exception as e:
-                logger.error(f"Runtime monitor error: {e}")
-                await asyncio.sleep(10)
+        return {package_name: metrics for package_name in package_names}
 
     async def _collect_runtime_metrics(
         self,
         vm_config: VMConfiguration,
         package_name: str
     ) -> RuntimeMetrics:
-        """Collect runtime metrics from VM"""
-
-        # In production, would query VM metrics via:
-        # - adb shell dumpsys cpuinfo
-        # - adb shell dumpsys meminfo
-        # - VM resource monitoring tools
-
-        # For now, return simulated metrics
-        return RuntimeMetrics(
-            cpu_usage_percent=5.0,
-            memory_usage_mb=128.0,
-            network_rx_bytes=0,
-            network_tx_bytes=0,
-            storage_used_mb=50.0,
-            uptime_seconds=300.0
-        )
+        """Collect runtime metrics for a single app"""
+        metrics = await self._collect_vm_metrics(vm_config, [package_name])
+        return metrics[package_name]
+
+    def _get_metrics_reader(self):
+        """Attach to the shared metrics bus once a collector has created it"""
+        if self.metrics_reader is None:
+            try:
+                from metrics_bus import MetricsReader
+                self.metrics_reader = MetricsReader(self.metrics_bus_name)
+            except (ImportError, FileNotFoundError) as e:
+                logger.debug(f"Metrics bus unavailable: {e}")
+        return self.metrics_reader
 
     async def _detect_threats(
         self,
@@ -554,6 +770,9 @@ class DeploymentManager:
 
         app.status = AppStatus.RUNNING
 
+        # Resume monitoring if it was dropped when the app was stopped for a threat
+        self.runtime_monitor.register(app.vm_config, app.package_name, app_id)
+
         logger.info(f"App started: {app.app_name}")
 
         return True
@@ -593,9 +812,7 @@ class DeploymentManager:
         await self.stop_app(app_id)
 
         # Stop runtime monitor
-        if app.vm_config.vm_id in self.runtime_monitors:
-            self.runtime_monitors[app.vm_config.vm_id].cancel()
-            del self.runtime_monitors[app.vm_config.vm_id]
+        self.runtime_monitor.unregister(app.vm_config.vm_id, app.package_name)
 
         # Destroy VM
         await self._destroy_vm(app.vm_config)
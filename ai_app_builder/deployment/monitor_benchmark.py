@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+QWAMOS Runtime Monitor Benchmark
+Phase 9: AI App Builder
+
+Simulates runtime monitoring of a fleet of deployed apps, each in its own
+VM, with a fixed per-VM collection latency standing in for adb dumpsys.
+A few "hot" apps show network activity (HIGH threat). Compares:
+- legacy: one polling task per app, fixed 5 s interval (the previous monitor)
+- scheduler: RuntimeMonitorScheduler (batched, staggered, adaptive)
+
+Time is scaled (--scale 0.1 runs 60 monitored seconds in 6 real seconds);
+reported intervals are in monitored seconds.
+
+Usage:
+    python ai_app_builder/deployment/monitor_benchmark.py [--apps 200] [--hot 10] [--seed 42]
+
+Author: QWAMOS Project
+License: MIT
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import sys
+from pathlib import Path
+from statistics import mean
+from typing import Dict, List
+
+# Add deployment to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from deployment_manager import DeploymentManager, RuntimeMetrics, VMConfiguration
+
+BASE_INTERVAL = 5.0
+
+
+class SimulatedDeploymentManager(DeploymentManager):
+    """DeploymentManager whose metric collection sleeps instead of calling adb"""
+
+    def __init__(self, scale: float, latency: float, hot_packages: set):
+        super().__init__({'deployment': {'runtime_monitor': {
+            'base_interval_seconds': BASE_INTERVAL * scale,
+            'min_interval_seconds': 1.0 * scale,
+            'max_interval_seconds': 15.0 * scale,
+        }}})
+        self.latency = latency
+        self.hot_packages = hot_packages
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.collection_starts: List[float] = []
+        self.checks: Dict[str, List[float]] = {}
+
+    async def _collect_vm_metrics(self, vm_config: VMConfiguration, package_names: List[str]) -> Dict[str, RuntimeMetrics]:
+        loop = asyncio.get_running_loop()
+        self.collection_starts.append(loop.time())
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+
+        result = {}
+        for package_name in package_names:
+            self.checks.setdefault(package_name, []).append(loop.time())
+            hot = package_name in self.hot_packages
+            result[package_name] = RuntimeMetrics(
+                cpu_usage_percent=5.0,
+                memory_usage_mb=128.0,
+                network_rx_bytes=0,
+                network_tx_bytes=4096 if hot else 0,
+                storage_used_mb=50.0,
+                uptime_seconds=300.0
+            )
+        return result
+
+
+def make_fleet(apps: int) -> List[VMConfiguration]:
+    return [
+        VMConfiguration(
+            vm_id=f"app_com.qwamos.app{i}", vm_name=f"qwamos_app_{i}", cpu_cores=2,
+            ram_mb=1024, storage_gb=2, network_mode='isolated', android_version="13"
+        )
+        for i in range(apps)
+    ]
+
+
+async def legacy_monitor(manager: DeploymentManager, vm_config: VMConfiguration, package_name: str, interval: float):
+    """The previous per-app monitor loop"""
+    while True:
+        metrics = await manager._collect_runtime_metrics(vm_config, package_name)
+        threats = await manager._detect_threats(vm_config, package_name, metrics)
+        await manager._handle_threats(package_name, package_name, threats, vm_config.vm_id)
+        await asyncio.sleep(interval)
+
+
+async def run_strategy(strategy: str, fleet: List[VMConfiguration], hot: set,
+                       scale: float, latency: float, duration: float) -> Dict:
+    manager = SimulatedDeploymentManager(scale, latency, hot)
+    tasks = []
+    if strategy == 'legacy':
+        tasks = [asyncio.create_task(legacy_monitor(manager, vm, vm.vm_id, BASE_INTERVAL * scale))
+                 for vm in fleet]
+    else:
+        for vm in fleet:
+            manager.runtime_monitor.register(vm, vm.vm_id, vm.vm_id)
+
+    await asyncio.sleep(duration)
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await manager.runtime_monitor.stop()
+
+    # Most collections started inside any 100 ms (monitored) window
+    starts = sorted(manager.collection_starts)
+    window = 0.1 * scale
+    burst, lo = 0, 0
+    for hi, t in enumerate(starts):
+        while t - starts[lo] > window:
+            lo += 1
+        burst = max(burst, hi - lo + 1)
+
+    def mean_gap(packages) -> float:
+        gaps = [b - a for p in packages for a, b in zip(manager.checks.get(p, []), manager.checks.get(p, [])[1:])]
+        return mean(gaps) / scale if gaps else float('nan')
+
+    quiet = {vm.vm_id for vm in fleet} - hot
+    return {
+        'collections': len(starts),
+        'collections_per_s': len(starts) / (duration / scale),
+        'peak_concurrent': manager.peak_in_flight,
+        'max_burst_100ms': burst,
+        'hot_interval_s': mean_gap(hot),
+        'quiet_interval_s': mean_gap(quiet),
+        'apps_checked': sum(len(c) for c in manager.checks.values()),
+    }
+
+
+def run_benchmark(apps: int, hot: int, seed: int = 42, scale: float = 0.1,
+                  latency_ms: float = 200.0, monitored_seconds: float = 60.0) -> Dict[str, Dict]:
+    """Run both strategies over the same fleet"""
+    random.seed(seed)
+    fleet = make_fleet(apps)
+    hot_packages = {vm.vm_id for vm in random.sample(fleet, hot)}
+    latency = latency_ms / 1000 * scale
+    duration = monitored_seconds * scale
+
+    return {
+        strategy: asyncio.run(run_strategy(strategy, fleet, hot_packages, scale, latency, duration))
+        for strategy in ('legacy', 'scheduler')
+    }
+
+
+def main():
+    """Run benchmark and print results."""
+    parser = argparse.ArgumentParser(description="QWAMOS runtime monitor benchmark")
+    parser.add_argument("--apps", type=int, default=200, help="Deployed apps (one VM each)")
+    parser.add_argument("--hot", type=int, default=10, help="Apps showing network activity")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--scale", type=float, default=0.1, help="Real seconds per monitored second")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="Simulated dumpsys latency per VM")
+    parser.add_argument("--seconds", type=float, default=60.0, help="Monitored seconds to simulate")
+    parser.add_argument("--json", action="store_true", help="Print raw JSON results")
+    args = parser.parse_args()
+
+    logging.getLogger('DeploymentManager').setLevel(logging.ERROR)
+    results = run_benchmark(args.apps, args.hot, args.seed, args.scale, args.latency_ms, args.seconds)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print("=" * 70)
+    print(f"QWAMOS Runtime Monitor Benchmark ({args.apps} apps, {args.hot} hot, "
+          f"{args.seconds:g}s monitored)")
+    print("=" * 70)
+    print(f"{'strategy':<10} {'collect/s':>10} {'peak conc':>10} {'burst':>6} "
+          f"{'hot int s':>10} {'quiet int s':>12}")
+    for name, result in results.items():
+        print(f"{name:<10} {result['collections_per_s']:>10.1f} {result['peak_concurrent']:>10} "
+              f"{result['max_burst_100ms']:>6} {result['hot_interval_s']:>10.2f} "
+              f"{result['quiet_interval_s']:>12.2f}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,17 +11,23 @@ Key Features:
 - Triple security audit (all 3 AIs must approve)
 - Automated quality assurance
 - Enhancement suggestions with user approval
+- Independent AI calls run concurrently; reviewers see per-file diffs
+- Stage checkpoints so a failed build resumes where it stopped
 
 @module multi_ai_pipeline
 @version 1.0.0
 """
 
 import asyncio
+import difflib
+import hashlib
 import json
 import logging
-from typing import Dict, List, Optional, Tuple
+import shutil
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from dataclasses import dataclass, asdict
 from enum import Enum
+from pathlib import Path
 import sys
 import os
 
@@ -39,6 +45,8 @@ logging.basicConfig(
 )
 logger = logging.getLogger('MultiAIPipeline')
 
+DEFAULT_CHECKPOINT_DIR = "/var/lib/qwamos/app_builder/checkpoints"
+
 
 class PipelineStage(Enum):
     """Pipeline execution stages"""
@@ -96,6 +104,71 @@ class GeneratedApp:
     build_instructions: str
 
 
+class PipelineCheckpoint:
+    """
+    Completed-stage outputs for one build, stored as <root>/<build_id>/<stage>.json
+
+    A checkpoint is only used while every earlier stage was also restored;
+    once a stage has to run again, the checkpoints after it are stale.
+    """
+
+    def __init__(self, root: str, build_id: str, request_hash: str):
+        self.path = Path(root) / build_id
+        self.request_hash = request_hash
+        self.enabled = True
+        self.fresh = False  # set once a stage has run in this build
+
+    def load(self, stage: PipelineStage) -> Optional[Any]:
+        """Return the saved output of a stage, or None if it must run"""
+        if self.fresh:
+            return None
+
+        path = self.path / f"{stage.value}.json"
+        try:
+            record = json.loads(path.read_text())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable checkpoint {path}: {e}")
+            return None
+
+        if record.get('request_sha256') != self.request_hash:
+            logger.warning(f"Ignoring checkpoint {path}: made for a different request")
+            return None
+        return record['data']
+
+    def save(self, stage: PipelineStage, data: Any):
+        """Atomically record a stage's output"""
+        self.fresh = True
+        if not self.enabled:
+            return
+
+        path = self.path / f"{stage.value}.json"
+        tmp = path.with_suffix('.json.tmp')
+        try:
+            self.path.mkdir(parents=True, exist_ok=True, mode=0o700)
+            tmp.write_text(json.dumps({
+                'stage': stage.value,
+                'request_sha256': self.request_hash,
+                'data': data
+            }, default=_json_default))
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"Checkpointing disabled for this build: {e}")
+            self.enabled = False
+
+    def clear(self):
+        """Delete all checkpoints of this build"""
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def _json_default(obj):
+    """Encode enums (e.g. ApprovalStatus inside asdict() output) by value"""
+    if isinstance(obj, Enum):
+        return obj.value
+    raise TypeError(f"{type(obj).__name__} is not JSON serializable")
+
+
 class MultiAIPipeline:
     """
     Multi-AI coordination pipeline for secure app generation
@@ -109,13 +182,31 @@ class MultiAIPipeline:
     6. User approval
     7. Build in isolated VM
     8. Deploy to dedicated VM
+
+    Stages 1-5 are checkpointed; calling build_app() again with the same
+    request and user resumes after the last completed stage.
     """
 
-    def __init__(self):
-        """Initialize AI controllers"""
-        self.kali_gpt = KaliGPTController()
-        self.claude = ClaudeController()
-        self.chatgpt = ChatGPTController()
+    def __init__(
+        self,
+        kali_gpt: Optional[KaliGPTController] = None,
+        claude: Optional[ClaudeController] = None,
+        chatgpt: Optional[ChatGPTController] = None,
+        checkpoint_dir: str = DEFAULT_CHECKPOINT_DIR
+    ):
+        """
+        Initialize AI controllers
+
+        Args:
+            kali_gpt: Kali GPT controller (default: new app_builder-priority client)
+            claude: Claude controller (default: new controller)
+            chatgpt: ChatGPT controller (default: new controller)
+            checkpoint_dir: Directory for per-build stage checkpoints
+        """
+        self.kali_gpt = kali_gpt or KaliGPTController(priority='app_builder')
+        self.claude = claude or ClaudeController()
+        self.chatgpt = chatgpt or ChatGPTController()
+        self.checkpoint_dir = checkpoint_dir
 
         self.max_iterations = 3  # Max refinement passes
         self.min_security_score = 90.0  # Minimum acceptable score
@@ -123,48 +214,77 @@ class MultiAIPipeline:
 
         logger.info("Multi-AI Pipeline initialized")
 
-    async def build_app(self, user_request: str, user_id: str) -> GeneratedApp:
+    async def build_app(
+        self,
+        user_request: str,
+        user_id: str,
+        build_id: Optional[str] = None,
+        resume: bool = True
+    ) -> GeneratedApp:
         """
         Main pipeline: Build app from user request
 
         Args:
             user_request: Natural language app description
             user_id: User ID for approval workflow
+            build_id: Checkpoint key (default: derived from user_id and request)
+            resume: Reuse checkpoints left by an earlier failed/interrupted run
 
         Returns:
             GeneratedApp with all code, audits, and metadata
         """
         logger.info(f"Starting app build pipeline for: {user_request[:100]}...")
 
+        request_hash = hashlib.sha256(user_request.encode()).hexdigest()
+        if build_id is None:
+            build_id = hashlib.sha256(f"{user_id}\0{user_request}".encode()).hexdigest()[:16]
+        checkpoint = PipelineCheckpoint(self.checkpoint_dir, build_id, request_hash)
+        if not resume:
+            checkpoint.clear()
+
         try:
             # Stage 1: Requirements Analysis (Consensus Required)
-            logger.info("[Stage 1/8] Requirements Analysis...")
-            requirements = await self._analyze_requirements(user_request)
+            requirements = await self._run_stage(
+                checkpoint, PipelineStage.REQUIREMENTS_ANALYSIS,
+                "[Stage 1/8] Requirements Analysis...",
+                lambda: self._analyze_requirements(user_request),
+                encode=lambda r: dict(r, consensus=asdict(r['consensus'])),
+                decode=self._decode_requirements
+            )
 
             # Stage 2: Code Generation (Round-Robin with Crosschecks)
-            logger.info("[Stage 2/8] Code Generation with Crosschecks...")
-            code = await self._generate_code_with_crosschecks(requirements)
+            code = await self._run_stage(
+                checkpoint, PipelineStage.CODE_GENERATION,
+                "[Stage 2/8] Code Generation with Crosschecks...",
+                lambda: self._generate_code_with_crosschecks(requirements)
+            )
 
             # Stage 3: Triple Security Audit (All 3 AIs)
-            logger.info("[Stage 3/8] Triple Security Audit...")
-            security_audit = await self._triple_security_audit(code)
-
-            if security_audit.final_score < self.min_security_score:
-                raise SecurityError(
-                    f"Security audit failed: {security_audit.final_score}/100 "
-                    f"(minimum: {self.min_security_score})"
-                )
+            security_audit = await self._run_stage(
+                checkpoint, PipelineStage.SECURITY_AUDIT,
+                "[Stage 3/8] Triple Security Audit...",
+                lambda: self._triple_security_audit(code),
+                encode=asdict,
+                decode=lambda d: SecurityAuditResult(**d),
+                validate=self._check_security_audit
+            )
 
             # Stage 4: Quality Assurance (Automated Testing)
-            logger.info("[Stage 4/8] Quality Assurance Testing...")
-            qa_result = await self._run_quality_assurance(code)
-
-            if not qa_result.passed:
-                raise QualityError(f"QA failed: {qa_result.failures}")
+            qa_result = await self._run_stage(
+                checkpoint, PipelineStage.QUALITY_ASSURANCE,
+                "[Stage 4/8] Quality Assurance Testing...",
+                lambda: self._run_quality_assurance(code),
+                encode=asdict,
+                decode=lambda d: QAResult(**d),
+                validate=self._check_quality_assurance
+            )
 
             # Stage 5: Enhancement Suggestions (Optional)
-            logger.info("[Stage 5/8] Generating Enhancement Suggestions...")
-            enhancements = await self._suggest_enhancements(code, requirements)
+            enhancements = await self._run_stage(
+                checkpoint, PipelineStage.ENHANCEMENTS,
+                "[Stage 5/8] Generating Enhancement Suggestions...",
+                lambda: self._suggest_enhancements(code, requirements)
+            )
 
             # Stage 6: User Approval (Present results to user)
             logger.info("[Stage 6/8] Awaiting User Approval...")
@@ -191,12 +311,79 @@ class MultiAIPipeline:
             logger.info(f"   Quality Score: {app.quality_score}/100")
             logger.info(f"   Enhancements: {len(app.enhancements)}")
 
+            checkpoint.clear()
             return app
 
         except Exception as e:
             logger.error(f"Pipeline failed: {e}")
+            if checkpoint.enabled and checkpoint.path.exists():
+                logger.info(f"Completed stages checkpointed in {checkpoint.path}; "
+                            "re-run to resume")
             raise
 
+    async def _run_stage(
+        self,
+        checkpoint: PipelineCheckpoint,
+        stage: PipelineStage,
+        label: str,
+        run: Callable,
+        encode: Optional[Callable] = None,
+        decode: Optional[Callable] = None,
+        validate: Optional[Callable] = None
+    ) -> Any:
+        """
+        Restore a stage from its checkpoint, or run and checkpoint it
+
+        Args:
+            checkpoint: Checkpoints of the current build
+            stage: Stage being executed
+            label: Progress message
+            run: Coroutine factory producing the stage output
+            encode: Output -> JSON-compatible data (default: identity)
+            decode: Inverse of encode (default: identity)
+            validate: Raises if the output must stop the pipeline;
+                      rejected outputs are never checkpointed
+
+        Returns:
+            Stage output
+        """
+        saved = checkpoint.load(stage)
+        if saved is not None:
+            logger.info(f"{label} (resumed from checkpoint)")
+            result = decode(saved) if decode else saved
+            if validate:
+                validate(result)
+            return result
+
+        logger.info(label)
+        result = await run()
+        if validate:
+            validate(result)
+        checkpoint.save(stage, encode(result) if encode else result)
+        return result
+
+    def _check_security_audit(self, security_audit: 'SecurityAuditResult'):
+        """Stop the pipeline below the minimum security score"""
+        if security_audit.final_score < self.min_security_score:
+            raise SecurityError(
+                f"Security audit failed: {security_audit.final_score}/100 "
+                f"(minimum: {self.min_security_score})"
+            )
+
+    def _check_quality_assurance(self, qa_result: 'QAResult'):
+        """Stop the pipeline on any QA failure"""
+        if not qa_result.passed:
+            raise QualityError(f"QA failed: {qa_result.failures}")
+
+    def _decode_requirements(self, data: Dict) -> Dict:
+        """Rebuild requirements (with ConsensusResult) from a checkpoint"""
+        consensus = dict(data['consensus'])
+        consensus['reviews'] = [
+            AIReview(**dict(review, status=ApprovalStatus(review['status'])))
+            for review in consensus['reviews']
+        ]
+        return dict(data, consensus=ConsensusResult(**consensus))
+
     async def _analyze_requirements(self, user_request: str) -> Dict:
         """
         Stage 1: Requirements analysis with triple-AI consensus
@@ -209,20 +396,20 @@ class MultiAIPipeline:
         """
         logger.info("Running requirements analysis with all 3 AIs...")
 
-        # Get requirements from each AI
-        kali_analysis = await self.kali_gpt.analyze_requirements(
-            user_request,
-            focus="security"
-        )
-
-        claude_analysis = await self.claude.analyze_requirements(
-            user_request,
-            focus="architecture"
-        )
-
-        chatgpt_analysis = await self.chatgpt.analyze_requirements(
-            user_request,
-            focus="user_experience"
+        # Get requirements from each AI (independent, so run concurrently)
+        kali_analysis, claude_analysis, chatgpt_analysis = await asyncio.gather(
+            self.kali_gpt.analyze_requirements(
+                user_request,
+                focus="security"
+            ),
+            self.claude.analyze_requirements(
+                user_request,
+                focus="architecture"
+            ),
+            self.chatgpt.analyze_requirements(
+                user_request,
+                focus="user_experience"
+            )
         )
 
         # Build consensus
@@ -268,10 +455,16 @@ class MultiAIPipeline:
         2. Kali GPT: Security review + hardening
         3. ChatGPT: Code quality review + improvements
         4. Repeat for max_iterations or until all approve
+
+        Both reviews run concurrently. After the first iteration reviewers
+        only receive unified diffs of the files changed since they last
+        reviewed; if nothing changed, their previous verdicts stand.
         """
         logger.info("Starting round-robin code generation with crosschecks...")
 
         code = {}
+        reviewed: Dict[str, str] = {}  # code as of the last review
+        reviews = None
         iteration = 0
 
         while iteration < self.max_iterations:
@@ -285,19 +478,32 @@ class MultiAIPipeline:
                 previous_code=code if iteration > 1 else None
             )
 
-            # Kali GPT: Security review
-            logger.info("  → Kali GPT: Security review...")
-            kali_review = await self.kali_gpt.review_code(
-                code,
-                focus="security"
-            )
+            # Kali GPT security review + ChatGPT quality review
+            as_diff = bool(reviewed)
+            changes = self._diff_code(reviewed, code) if as_diff else code
 
-            # ChatGPT: Quality review
-            logger.info("  → ChatGPT: Quality review...")
-            chatgpt_review = await self.chatgpt.review_code(
-                code,
-                focus="quality"
-            )
+            if reviews is not None and not changes:
+                logger.info("  → No changes since last review, keeping verdicts")
+            else:
+                logger.info(
+                    f"  → Kali GPT + ChatGPT: Security and quality review "
+                    f"({len(changes)} {'changed ' if as_diff else ''}file(s))..."
+                )
+                reviews = await asyncio.gather(
+                    self.kali_gpt.review_code(
+                        changes,
+                        focus="security",
+                        as_diff=as_diff
+                    ),
+                    self.chatgpt.review_code(
+                        changes,
+                        focus="quality",
+                        as_diff=as_diff
+                    )
+                )
+                reviewed = dict(code)
+
+            kali_review, chatgpt_review = reviews
 
             # Check if all approved
             if (kali_review.status == ApprovalStatus.APPROVED and
@@ -340,24 +546,22 @@ class MultiAIPipeline:
         logger.info("Running triple security audit...")
 
         # Kali GPT: Vulnerability scan
-        logger.info("  → Kali GPT: Vulnerability scan...")
-        kali_audit = await self.kali_gpt.security_audit(
-            code,
-            audit_type="vulnerability"
-        )
-
         # Claude Code: Architecture security
-        logger.info("  → Claude Code: Architecture security review...")
-        claude_audit = await self.claude.security_audit(
-            code,
-            audit_type="architecture"
-        )
-
         # ChatGPT: Dependency & manifest audit
-        logger.info("  → ChatGPT: Dependency and manifest audit...")
-        chatgpt_audit = await self.chatgpt.security_audit(
-            code,
-            audit_type="dependencies"
+        logger.info("  → Kali GPT / Claude Code / ChatGPT audits running concurrently...")
+        kali_audit, claude_audit, chatgpt_audit = await asyncio.gather(
+            self.kali_gpt.security_audit(
+                code,
+                audit_type="vulnerability"
+            ),
+            self.claude.security_audit(
+                code,
+                audit_type="architecture"
+            ),
+            self.chatgpt.security_audit(
+                code,
+                audit_type="dependencies"
+            )
         )
 
         # Calculate final score (weighted average)
@@ -451,19 +655,19 @@ class MultiAIPipeline:
         logger.info("Generating enhancement suggestions from all 3 AIs...")
 
         # Get suggestions from each AI
-        kali_enhancements = await self.kali_gpt.suggest_enhancements(
-            code,
-            focus="security_improvements"
-        )
-
-        claude_enhancements = await self.claude.suggest_enhancements(
-            code,
-            focus="performance_and_architecture"
-        )
-
-        chatgpt_enhancements = await self.chatgpt.suggest_enhancements(
-            code,
-            focus="user_experience"
+        kali_enhancements, claude_enhancements, chatgpt_enhancements = await asyncio.gather(
+            self.kali_gpt.suggest_enhancements(
+                code,
+                focus="security_improvements"
+            ),
+            self.claude.suggest_enhancements(
+                code,
+                focus="performance_and_architecture"
+            ),
+            self.chatgpt.suggest_enhancements(
+                code,
+                focus="user_experience"
+            )
         )
 
         # Merge and deduplicate
@@ -473,8 +677,8 @@ class MultiAIPipeline:
             chatgpt_enhancements
         )
 
-        # Remove duplicates
-        unique_enhancements = list(set(all_enhancements))
+        # Remove duplicates (keeping first-seen order)
+        unique_enhancements = list(dict.fromkeys(all_enhancements))
 
         logger.info(f"Generated {len(unique_enhancements)} enhancement suggestions")
 
@@ -507,7 +711,7 @@ class MultiAIPipeline:
             kali_result,
             claude_result,
             chatgpt_result,
-            stage
+            stage=stage
         )
 
         return ConsensusResult(
@@ -529,6 +733,36 @@ class MultiAIPipeline:
         # Placeholder implementation
         return "Merged decision from all AIs"
 
+    def _diff_code(self, previous: Dict[str, str], current: Dict[str, str]) -> Dict[str, str]:
+        """
+        Per-file unified diffs between two iterations
+
+        Args:
+            previous: filename -> code as last reviewed
+            current: filename -> code now
+
+        Returns:
+            filename -> unified diff, for added/changed/removed files only
+        """
+        diffs = {}
+        for filename in sorted(previous.keys() | current.keys()):
+            old = previous.get(filename)
+            new = current.get(filename)
+            if old == new:
+                continue
+
+            lines = difflib.unified_diff(
+                (old or "").splitlines(keepends=True),
+                (new or "").splitlines(keepends=True),
+                fromfile=f"a/{filename}" if old is not None else "/dev/null",
+                tofile=f"b/{filename}" if new is not None else "/dev/null"
+            )
+            diffs[filename] = "".join(
+                line if line.endswith("\n") else line + "\n\\ No newline at end of file\n"
+                for line in lines
+            )
+        return diffs
+
     def _extract_app_name(self, user_request: str) -> str:
         """Extract app name from user request"""
         # Simple extraction - in production, use NLP
@@ -7,7 +7,7 @@ AI-powered test generation and execution with zero-error requirement:
 - AI-generated integration tests
 - AI-generated security tests
 - AI-generated performance tests
-- Automated test execution
+- Parallel sharded test execution with per-test timeouts
 - Code coverage analysis
 - Zero errors required for approval
 
@@ -18,16 +18,65 @@ AI-powered test generation and execution with zero-error requirement:
 import logging
 import asyncio
 import subprocess
+import sys
 import tempfile
 import os
 import json
-from typing import Dict, List, Optional, Tuple
+import time
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
 import re
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "ai"))
+
+from ai_sandbox import AISandbox, SandboxMode
+
 logger = logging.getLogger('QualityAssurance')
 
+DEFAULT_DURATION_HISTORY = "/var/lib/qwamos/app_builder/qa_durations.json"
+
+# Runs every test* callable of a generated Python test file, pytest-style.
+# Exit codes: 0 passed, 1 assertion failed, 2 error, 3 no tests found.
+PYTHON_TEST_HARNESS = '''
+import importlib.util, os, sys, traceback
+test_file, src_dir = sys.argv[1], sys.argv[2]
+sys.path.insert(0, src_dir)
+os.chdir(src_dir)
+try:
+    spec = importlib.util.spec_from_file_location("generated_test", test_file)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    tests = [getattr(module, name) for name in sorted(vars(module))
+             if name.startswith("test") and callable(getattr(module, name))]
+    if not tests:
+        print("no tests found in " + test_file, file=sys.stderr)
+        sys.exit(3)
+    for test in tests:
+        test()
+except AssertionError:
+    traceback.print_exc()
+    sys.exit(1)
+except Exception:
+    traceback.print_exc()
+    sys.exit(2)
+'''
+
+DEFAULT_TEST_RUNNERS = {
+    'python': [sys.executable, "-c", PYTHON_TEST_HARNESS, "{test_file}", "{src_dir}"],
+}
+
+TEST_FILE_EXTENSIONS = {'python': '.py', 'java': '.java', 'kotlin': '.kt'}
+
+# First-run duration estimates (ms) before any history exists
+DEFAULT_DURATION_ESTIMATES_MS = {
+    'unit': 100.0,
+    'integration': 500.0,
+    'security': 300.0,
+    'performance': 2000.0,
+}
+
 
 class TestType(Enum):
     """Types of tests generated"""
@@ -54,6 +103,7 @@ class TestCase:
     code: str
     target_file: str
     target_function: Optional[str] = None
+    language: str = "java"  # language of `code`, selects the test runner
 
 
 @dataclass
@@ -96,6 +146,278 @@ class QAResult:
     qa_summary: str
 
 
+class ShardedTestExecutor:
+    """
+    Runs generated test cases in parallel shards.
+
+    Each test is written to its own file next to the generated code and
+    run as a sandbox job without network access, with a per-test timeout.
+    Tests are packed into shards by estimated duration from a history
+    file, so shards finish at about the same time. Results stream back
+    as they complete; a failing critical test (security by default)
+    stops the run and the remaining tests are reported as skipped.
+    """
+
+    def __init__(
+        self,
+        max_shards: Optional[int] = None,
+        timeout_s: float = 120.0,
+        history_path: Optional[str] = DEFAULT_DURATION_HISTORY,
+        runners: Optional[Dict[str, List[str]]] = None,
+        sandbox=None,
+        fail_fast_types: Tuple[TestType, ...] = (TestType.SECURITY,)
+    ):
+        """
+        Args:
+            max_shards: Parallel shards (default: CPU count)
+            timeout_s: Per-test timeout in seconds
+            history_path: JSON file of past test durations (None: don't keep one)
+            runners: language -> command template with {test_file}/{src_dir}
+            sandbox: AISandbox to run tests in (default: a network-isolated
+                sandbox pool that doesn't see the host environment)
+            fail_fast_types: Test types whose failure stops the run
+        """
+        self.max_shards = max(1, max_shards or os.cpu_count() or 1)
+        self.timeout_s = timeout_s
+        self.history_path = Path(history_path) if history_path else None
+        self.runners = dict(DEFAULT_TEST_RUNNERS, **(runners or {}))
+        self.owns_sandbox = sandbox is None
+        self.sandbox = sandbox or AISandbox(
+            "qa_tests", SandboxMode.NETWORK_ISOLATED, pool_size=self.max_shards, scrub_env=True
+        )
+        self.fail_fast_types = set(fail_fast_types)
+        self.history: Dict[str, float] = self._load_history()
+
+    def estimate_ms(self, test_case: TestCase) -> float:
+        """Expected duration: last measured, else a per-type default"""
+        return self.history.get(
+            self._history_key(test_case),
+            DEFAULT_DURATION_ESTIMATES_MS.get(test_case.test_type.value, 500.0)
+        )
+
+    def plan_shards(self, test_cases: List[TestCase]) -> List[List[TestCase]]:
+        """
+        Pack tests into at most max_shards shards, longest first onto the
+        least-loaded shard. Within a shard, critical tests run first so
+        fail-fast triggers as early as possible.
+        """
+        shard_count = min(self.max_shards, len(test_cases))
+        shards: List[List[TestCase]] = [[] for _ in range(shard_count)]
+        loads = [0.0] * shard_count
+
+        for test_case in sorted(test_cases, key=self.estimate_ms, reverse=True):
+            index = loads.index(min(loads))
+            shards[index].append(test_case)
+            loads[index] += self.estimate_ms(test_case)
+
+        for shard in shards:
+            shard.sort(key=lambda t: (t.test_type not in self.fail_fast_types, -self.estimate_ms(t)))
+        return shards
+
+    async def run(self, test_cases: List[TestCase], code: Dict[str, str]) -> AsyncIterator[TestResult]:
+        """
+        Execute test cases, yielding each result as soon as it is known.
+
+        Args:
+            test_cases: Tests to run
+            code: Generated code files, written out for the tests to import
+
+        Yields:
+            One TestResult per test case, in completion order
+        """
+        runnable = []
+        for test_case in test_cases:
+            if test_case.language in self.runners:
+                runnable.append(test_case)
+            else:
+                logger.error(f"No test runner configured for {test_case.language} tests")
+                yield TestResult(
+                    test_case=test_case,
+                    status=TestStatus.ERROR,
+                    execution_time_ms=0.0,
+                    error_message=f"No test runner configured for {test_case.language} tests"
+                )
+        if not runnable:
+            return
+
+        shards = self.plan_shards(runnable)
+        logger.info(f"Running {len(runnable)} tests in {len(shards)} shard(s)")
+
+        if self.owns_sandbox:
+            try:
+                self.sandbox.setup_sandbox()
+            except OSError as e:
+                logger.error(f"Test sandbox setup failed: {e}")
+
+        # The sandboxes get a private /tmp; their own tmp dir is shared with the host
+        sandbox_tmp = self.sandbox.sandbox_tmp if self.sandbox.sandbox_tmp.is_dir() else None
+        with tempfile.TemporaryDirectory(prefix="qwamos-qa-", dir=sandbox_tmp) as workdir:
+            src_dir = Path(workdir) / "src"
+            test_files = self._write_files(Path(workdir), src_dir, runnable, code)
+
+            results: asyncio.Queue = asyncio.Queue()
+            tasks = [
+                asyncio.ensure_future(self._run_shard(shard, test_files, src_dir, results))
+                for shard in shards
+            ]
+            pending = set(map(id, runnable))
+            stopped_by = None
+
+            try:
+                while pending:
+                    result = await results.get()
+                    pending.discard(id(result.test_case))
+                    yield result
+
+                    if (result.status in (TestStatus.FAILED, TestStatus.ERROR) and
+                            result.test_case.test_type in self.fail_fast_types):
+                        stopped_by = result.test_case.name
+                        logger.error(f"Critical test {stopped_by} failed, stopping test run")
+                        break
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                if self.owns_sandbox:
+                    # The pool's workers belong to this event loop
+                    await self.sandbox.close_pools()
+                self._save_history()
+
+            if stopped_by:
+                for test_case in runnable:
+                    if id(test_case) in pending:
+                        yield TestResult(
+                            test_case=test_case,
+                            status=TestStatus.SKIPPED,
+                            execution_time_ms=0.0,
+                            error_message=f"Not run: fail-fast after critical failure in {stopped_by}"
+                        )
+
+    def _write_files(
+        self,
+        workdir: Path,
+        src_dir: Path,
+        test_cases: List[TestCase],
+        code: Dict[str, str]
+    ) -> Dict[int, Path]:
+        """Write generated code under src/ and one file per test under tests/"""
+        for filename, content in code.items():
+            path = (src_dir / filename).resolve()
+            if not path.is_relative_to(src_dir.resolve()):
+                raise ValueError(f"Generated file escapes source tree: {filename}")
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(content)
+        src_dir.mkdir(exist_ok=True)
+
+        test_dir = workdir / "tests"
+        test_dir.mkdir()
+        test_files = {}
+        for index, test_case in enumerate(test_cases):
+            safe_name = re.sub(r'\W', '_', test_case.name)
+            extension = TEST_FILE_EXTENSIONS.get(test_case.language, '.txt')
+            path = test_dir / f"{index:04d}_{safe_name}{extension}"
+            path.write_text(test_case.code)
+            test_files[id(test_case)] = path
+        return test_files
+
+    async def _run_shard(
+        self,
+        shard: List[TestCase],
+        test_files: Dict[int, Path],
+        src_dir: Path,
+        results: asyncio.Queue
+    ):
+        """Run one shard's tests back to back"""
+        for test_case in shard:
+            result = await self._run_test(test_case, test_files[id(test_case)], src_dir)
+            results.put_nowait(result)
+
+    async def _run_test(self, test_case: TestCase, test_file: Path, src_dir: Path) -> TestResult:
+        """Run a single test file and classify its outcome"""
+        command = [
+            arg.replace("{test_file}", str(test_file)).replace("{src_dir}", str(src_dir))
+            for arg in self.runners[test_case.language]
+        ]
+        env = {'PYTHONPATH': str(src_dir), 'PYTHONDONTWRITEBYTECODE': '1'}
+
+        started = time.monotonic()
+        try:
+            returncode, stdout, stderr = await self._exec(command, env)
+        except subprocess.TimeoutExpired:
+            elapsed_ms = (time.monotonic() - started) * 1000
+            self._record(test_case, elapsed_ms)
+            return TestResult(
+                test_case=test_case,
+                status=TestStatus.ERROR,
+                execution_time_ms=elapsed_ms,
+                error_message=f"Test {test_case.name} timed out after {self.timeout_s:g}s"
+            )
+        except (OSError, RuntimeError) as e:
+            # Runner could not be started, or the sandbox worker died
+            return TestResult(
+                test_case=test_case,
+                status=TestStatus.ERROR,
+                execution_time_ms=(time.monotonic() - started) * 1000,
+                error_message=f"Test {test_case.name} could not be run: {e}"
+            )
+        elapsed_ms = (time.monotonic() - started) * 1000
+        self._record(test_case, elapsed_ms)
+
+        if returncode == 0:
+            return TestResult(test_case=test_case, status=TestStatus.PASSED, execution_time_ms=elapsed_ms)
+
+        output = (stderr or stdout).strip()
+        last_line = output.splitlines()[-1] if output else f"exit status {returncode}"
+        return TestResult(
+            test_case=test_case,
+            status=TestStatus.FAILED if returncode == 1 else TestStatus.ERROR,
+            execution_time_ms=elapsed_ms,
+            error_message=f"Test {test_case.name} failed: {last_line}",
+            stack_trace=output[-4000:] or None
+        )
+
+    async def _exec(self, command: List[str], env: Dict[str, str]) -> Tuple[int, str, str]:
+        """
+        Run a command in the sandbox with the per-test timeout.
+
+        Raises:
+            subprocess.TimeoutExpired: If the test exceeds its timeout
+        """
+        proc = await self.sandbox.arun(command, env=env, allow_network=False, timeout=self.timeout_s)
+        return proc.returncode, proc.stdout, proc.stderr
+
+    def _history_key(self, test_case: TestCase) -> str:
+        return f"{test_case.target_file}::{test_case.name}"
+
+    def _record(self, test_case: TestCase, elapsed_ms: float):
+        """Blend a new measurement into the duration history"""
+        key = self._history_key(test_case)
+        previous = self.history.get(key)
+        self.history[key] = elapsed_ms if previous is None else (previous + elapsed_ms) / 2
+
+    def _load_history(self) -> Dict[str, float]:
+        if self.history_path is None:
+            return {}
+        try:
+            return json.loads(self.history_path.read_text()).get('durations_ms', {})
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"Ignoring unreadable test duration history {self.history_path}: {e}")
+            return {}
+
+    def _save_history(self):
+        if self.history_path is None:
+            return
+        tmp = self.history_path.with_suffix('.tmp')
+        try:
+            self.history_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp.write_text(json.dumps({'durations_ms': self.history}, indent=1, sort_keys=True))
+            os.replace(tmp, self.history_path)
+        except OSError as e:
+            logger.warning(f"Could not save test duration history: {e}")
+
+
 class AutomatedQualityAssurance:
     """
     Automated quality assurance with AI-generated tests.
@@ -108,7 +430,7 @@ class AutomatedQualityAssurance:
     5. Require ZERO errors and >=80% coverage
     """
 
-    def __init__(self, config: Dict, kali_gpt, claude, chatgpt):
+    def __init__(self, config: Dict, kali_gpt, claude, chatgpt, sandbox=None):
         self.config = config
         self.kali_gpt = kali_gpt
         self.claude = claude
@@ -125,6 +447,15 @@ class AutomatedQualityAssurance:
             'performance_tests'
         ])
 
+        self.executor = ShardedTestExecutor(
+            max_shards=qa_config.get('max_parallel_shards'),
+            timeout_s=qa_config.get('test_timeout_seconds', 120.0),
+            history_path=qa_config.get('duration_history', DEFAULT_DURATION_HISTORY),
+            runners=qa_config.get('test_runners'),
+            sandbox=sandbox,
+            fail_fast_types=(TestType.SECURITY,) if qa_config.get('fail_fast_on_security_failure', True) else ()
+        )
+
     async def perform_quality_assurance(
         self,
         code: Dict[str, str],
@@ -162,7 +493,10 @@ class AutomatedQualityAssurance:
         failed = sum(1 for r in test_results if r.status == TestStatus.FAILED)
         errors = sum(1 for r in test_results if r.status == TestStatus.ERROR)
 
-        zero_errors_achieved = (failed == 0 and errors == 0)
+        skipped = sum(1 for r in test_results if r.status == TestStatus.SKIPPED)
+
+        # Skipped tests were never executed, so they can't count towards zero errors
+        zero_errors_achieved = (passed > 0 and failed == 0 and errors == 0 and skipped == 0)
         min_coverage_achieved = coverage_report.line_coverage >= self.min_code_coverage
         all_checks_passed = zero_errors_achieved and min_coverage_achieved
 
@@ -633,59 +967,26 @@ public void test_api_integration() {{
         code: Dict[str, str]
     ) -> List[TestResult]:
         """
-        Execute all test cases.
+        Execute all test cases with the sharded executor.
 
-        For now, simulates test execution. In production, would:
-        1. Set up Android test environment
-        2. Compile test code
-        3. Run tests with JUnit/Espresso
-        4. Collect results
+        Results are logged as they stream in and returned in test_cases
+        order. Tests in languages without a configured runner are errors.
         """
         logger.info(f"Executing {len(test_cases)} tests...")
 
-        test_results = []
-
-        for test_case in test_cases:
-            # Simulate test execution
-            # In production, would actually run the tests
-            result = await self._execute_single_test(test_case, code)
-            test_results.append(result)
-
-        return test_results
-
-    async def _execute_single_test(
-        self,
-        test_case: TestCase,
-        code: Dict[str, str]
-    ) -> TestResult:
-        """Execute a single test case"""
+        results: Dict[int, TestResult] = {}
+        async for result in self.executor.run(test_cases, code):
+            results[id(result.test_case)] = result
+            if result.status == TestStatus.PASSED:
+                logger.debug(f"  ✅ {result.test_case.name} ({result.execution_time_ms:.0f} ms)")
+            elif result.status != TestStatus.SKIPPED:
+                logger.warning(f"  ❌ {result.test_case.name}: {result.error_message}")
 
-        # Simulate test execution
-        # In production, would compile and run actual test
+        skipped = sum(1 for r in results.values() if r.status == TestStatus.SKIPPED)
+        if skipped:
+            logger.warning(f"{skipped} test(s) skipped")
 
-        import random
-        execution_time = random.uniform(10, 500)  # ms
-
-        # Most tests should pass (90% pass rate for well-generated code)
-        # This simulates the AI generating high-quality tests
-        success_rate = 0.95
-
-        if random.random() < success_rate:
-            status = TestStatus.PASSED
-            error_message = None
-            stack_trace = None
-        else:
-            status = TestStatus.FAILED
-            error_message = f"Test {test_case.name} failed: Assertion error"
-            stack_trace = "at TestClass.testMethod(TestClass.java:42)"
-
-        return TestResult(
-            test_case=test_case,
-            status=status,
-            execution_time_ms=execution_time,
-            error_message=error_message,
-            stack_trace=stack_trace
-        )
+        return [results[id(test_case)] for test_case in test_cases]
 
     async def _analyze_coverage(
         self,
@@ -752,6 +1053,7 @@ public void test_api_integration() {{
         passed = sum(1 for r in test_results if r.status == TestStatus.PASSED)
         failed = sum(1 for r in test_results if r.status == TestStatus.FAILED)
         errors = sum(1 for r in test_results if r.status == TestStatus.ERROR)
+        skipped = sum(1 for r in test_results if r.status == TestStatus.SKIPPED)
 
         # Group tests by type
         unit_tests = sum(1 for r in test_results if r.test_case.test_type == TestType.UNIT)
@@ -771,6 +1073,7 @@ TEST EXECUTION RESULTS:
   Passed:              {passed} ✅
   Failed:              {failed} {'❌' if failed > 0 else ''}
   Errors:              {errors} {'❌' if errors > 0 else ''}
+  Skipped:             {skipped}
 
   Zero Errors:         {'✅ YES' if zero_errors_achieved else '❌ NO'}
 
@@ -5,14 +5,68 @@ Claude Sonnet 4.5 Autonomous Security System
 
 Runs comprehensive security analysis and automated hardening.
 Designed to run on GCP VM with full toolchain.
+
+Usage:
+    python3 artemis_full_pipeline.py [--incremental] [--jobs N]
+
+With --incremental, per-file tools only scan files whose content changed
+since the last run (tracked in reports/static/artemis_cache.json), the git
+history secret scan only covers new commits, dependency scanners re-run when
+a dependency manifest changed, and vulnerability scanners re-run at least
+once a day for database updates.
 """
 
+import argparse
+import hashlib
 import json
+import os
+import shutil
 import subprocess
 import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+
+CACHE_VERSION = 2
+BATCH_SIZE = 200  # files per tool invocation
+
+SEMGREP_SUFFIXES = {
+    ".py", ".sh", ".bash", ".js", ".jsx", ".ts", ".tsx", ".java", ".kt",
+    ".c", ".h", ".cpp", ".go", ".rb", ".php", ".rs", ".yml", ".yaml", ".tf"
+}
+
+# Tools that report findings per file:
+# name -> (suffixes to scan, None = every file; report file; key of the result list)
+FILE_TOOLS = {
+    "bandit": ({".py"}, "bandit.json", "results"),
+    "semgrep": (SEMGREP_SUFFIXES, "semgrep.json", "results"),
+    "shellcheck": ({".sh", ".bash"}, "shellcheck.json", None),
+    "gitleaks": (None, "gitleaks.json", None),
+}
+
+# Whole-repo tools: name -> (inputs whose change re-runs the tool, uses a
+# vulnerability database). "dependencies" means DEPENDENCY_MANIFESTS only;
+# trivy also scans sources for secrets and misconfigurations, so any file.
+REPO_TOOLS = {
+    "safety": ("dependencies", True),
+    "syft": ("dependencies", False),
+    "grype": ("dependencies", True),
+    "trivy": ("files", True),
+}
+
+# Cached results of vulnerability scanners expire so database updates are seen
+VULN_DB_TTL = 24 * 3600
+
+# Dependency scanners re-run when one of these files changes
+DEPENDENCY_MANIFESTS = {
+    "requirements.txt", "requirements-dev.txt", "setup.py", "setup.cfg", "pyproject.toml",
+    "Pipfile", "Pipfile.lock", "poetry.lock", "package.json", "package-lock.json",
+    "yarn.lock", "go.mod", "go.sum", "Cargo.toml", "Cargo.lock",
+    "build.gradle", "build.gradle.kts", "pom.xml"
+}
 
 class ArtemisColors:
     HEADER = '\033[95m'
@@ -25,7 +79,7 @@ class ArtemisColors:
     BOLD = '\033[1m'
 
 class ArtemisPipeline:
-    def __init__(self, repo_root: Path):
+    def __init__(self, repo_root: Path, incremental: bool = False, jobs: Optional[int] = None):
         self.repo_root = repo_root
         self.report_dir = repo_root / "reports"
         self.static_dir = self.report_dir / "static"
@@ -36,6 +90,13 @@ class ArtemisPipeline:
         for d in [self.static_dir, self.triage_dir, self.hardening_dir]:
             d.mkdir(parents=True, exist_ok=True)
 
+        # Per-file content hashes and per-tool results (full runs start empty)
+        self.incremental = incremental
+        self.jobs = jobs or len(FILE_TOOLS) + 4
+        self.cache_file = self.static_dir / "artemis_cache.json"
+        self.manifest = self._load_manifest() if incremental else self._empty_manifest()
+        self.tool_runtimes: Dict[str, Dict] = {}
+
         self.findings = {
             "p0_critical": [],
             "p1_high": [],
@@ -76,52 +137,294 @@ class ArtemisPipeline:
         """Phase 1: Comprehensive Static Analysis"""
         self.print_header("PHASE 1: STATIC ANALYSIS SUITE")
 
-        analyses = [
-            ("bandit", ["bandit", "-r", ".", "-f", "json", "-o", str(self.static_dir / "bandit.json")]),
-            ("semgrep", ["semgrep", "--config=auto", "--json", f"--output={self.static_dir}/semgrep.json", "."]),
-            ("safety", ["safety", "check", "--json", f"--output={self.static_dir}/safety.json"]),
-            ("shellcheck", self._run_shellcheck),
-            ("gitleaks", ["gitleaks", "detect", "-v", f"--report-path={self.static_dir}/gitleaks.json", "--report-format=json"]),
-            ("syft", ["syft", "dir:.", "--output=json", f"--file={self.static_dir}/sbom.json"]),
-            ("grype", ["grype", "dir:.", "--output=json", f"--file={self.static_dir}/grype.json"]),
-            ("trivy", ["trivy", "fs", "--format=json", f"--output={self.static_dir}/trivy.json", "."]),
-        ]
-
-        for i, (name, cmd) in enumerate(analyses, 1):
-            self.print_step(i, len(analyses), f"Running {name}")
-
-            if callable(cmd):
-                cmd()
-            else:
-                code, stdout, stderr = self.run_command(cmd)
-                if code != 0 and "found" not in stderr.lower():
+        start = time.monotonic()
+        files, changed = self._fingerprint_files()
+        self.tool_runtimes["fingerprint"] = {
+            "seconds": time.monotonic() - start, "scanned": len(files), "cached": 0, "status": "ok"
+        }
+        mode = "incremental" if self.incremental else "full"
+        print(f"  {len(files)} files, {changed} new or changed ({mode} mode)")
+
+        analyses = {name: (self._run_file_tool, name, files) for name in FILE_TOOLS}
+        analyses["gitleaks-history"] = (self._scan_git_history,)
+        analyses.update({
+            name: (self._run_repo_tool, name, cmd, files)
+            for name, cmd in [
+                ("safety", ["safety", "check", "--json", f"--output={self.static_dir}/safety.json"]),
+                ("syft", ["syft", "dir:.", "--output=json", f"--file={self.static_dir}/sbom.json"]),
+                ("grype", ["grype", "dir:.", "--output=json", f"--file={self.static_dir}/grype.json"]),
+                ("trivy", ["trivy", "fs", "--format=json", f"--output={self.static_dir}/trivy.json", "."]),
+            ]
+        })
+
+        # Tools are independent: run them concurrently, report as each finishes
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            futures = {pool.submit(self._timed, name, *job): name for name, job in analyses.items()}
+            for i, future in enumerate(as_completed(futures), 1):
+                name = futures[future]
+                runtime = future.result()
+                self.print_step(i, len(analyses), f"{name}: {runtime['status']}, "
+                                f"{runtime['scanned']} scanned, {runtime['cached']} cached "
+                                f"({runtime['seconds']:.1f}s)")
+                if runtime["status"] not in ("ok", "cached"):
                     print(f"{ArtemisColors.WARNING}  ⚠ {name} completed with warnings{ArtemisColors.ENDC}")
 
-        print(f"{ArtemisColors.OKGREEN}✅ Phase 1 Complete{ArtemisColors.ENDC}")
+        self._save_manifest()
+        print(f"{ArtemisColors.OKGREEN}✅ Phase 1 Complete ({time.monotonic() - start:.1f}s){ArtemisColors.ENDC}")
+
+    def _timed(self, name: str, run, *args) -> Dict:
+        """Run one analysis and record its runtime"""
+        start = time.monotonic()
+        try:
+            runtime = run(*args)
+        except Exception as e:
+            runtime = {"scanned": 0, "cached": 0, "status": f"failed: {e}"}
+        runtime["seconds"] = time.monotonic() - start
+        self.tool_runtimes[name] = runtime
+        return runtime
+
+    def _empty_manifest(self) -> Dict:
+        return {"version": CACHE_VERSION, "tools": {}, "files": {}, "repo_tools": {}, "history": {}}
+
+    def _load_manifest(self) -> Dict:
+        try:
+            manifest = json.loads(self.cache_file.read_text())
+            if manifest.get("version") == CACHE_VERSION:
+                return manifest
+        except (OSError, ValueError):
+            pass
+        return self._empty_manifest()
+
+    def _save_manifest(self):
+        tmp = self.cache_file.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.manifest))
+        os.replace(tmp, self.cache_file)
+
+    def _list_files(self) -> List[str]:
+        """Repo-relative paths of tracked and untracked, non-ignored files"""
+        code, stdout, _ = self.run_command(["git", "ls-files", "-z", "-co", "--exclude-standard"])
+        if code == 0:
+            paths = [p for p in stdout.split("\0") if p]
+        else:
+            paths = [str(p.relative_to(self.repo_root)) for p in self.repo_root.rglob("*")
+                     if ".git" not in p.parts]
+
+        reports = str(self.report_dir.relative_to(self.repo_root)) + os.sep
+        return sorted(p for p in paths if not p.startswith(reports))
+
+    def _fingerprint_files(self) -> Tuple[List[str], int]:
+        """
+        Update content hashes in the manifest. Files whose size and mtime
+        are unchanged keep their hash without being read; files whose
+        content changed lose their cached results.
+        """
+        entries = self.manifest["files"]
+        current, changed = [], 0
+        for path in self._list_files():
+            full = self.repo_root / path
+            try:
+                st = full.lstat()
+            except OSError:
+                continue
+            if not full.is_file() or full.is_symlink():
+                continue
+            current.append(path)
 
-    def _run_shellcheck(self):
-        """Run shellcheck on all shell scripts"""
-        shell_files = list(self.repo_root.rglob("*.sh"))
-        shell_files.extend(self.repo_root.rglob("*.bash"))
+            entry = entries.get(path)
+            if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+                continue
 
-        results = []
-        for script in shell_files:
-            if ".git" in str(script):
+            digest = hashlib.sha256(full.read_bytes()).hexdigest()
+            if entry is None or entry["sha256"] != digest:
+                entry = {"sha256": digest, "results": {}}
+                changed += 1
+            entry.update(size=st.st_size, mtime_ns=st.st_mtime_ns)
+            entries[path] = entry
+
+        for path in set(entries) - set(current):
+            del entries[path]  # deleted files drop their findings
+        return current, changed
+
+    def _tool_signature(self, name: str) -> Optional[str]:
+        """Tool version; cached results are dropped when it changes"""
+        if not shutil.which(name):
+            return None
+        code, stdout, stderr = self.run_command([name, "--version"])
+        lines = (stdout or stderr).strip().splitlines()
+        return f"{CACHE_VERSION}:{lines[0] if lines else code}"
+
+    def _run_file_tool(self, name: str, files: List[str]) -> Dict:
+        """Run a per-file tool on files without cached results for it"""
+        suffixes = FILE_TOOLS[name][0]
+        eligible = [f for f in files if suffixes is None or Path(f).suffix in suffixes]
+
+        signature = self._tool_signature(name)
+        if signature is None:
+            return {"scanned": 0, "cached": 0, "status": "not installed"}
+        if self.manifest["tools"].get(name) != signature:
+            for entry in self.manifest["files"].values():
+                entry["results"].pop(name, None)
+            self.manifest["tools"][name] = signature
+
+        entries = self.manifest["files"]
+        targets = [f for f in eligible if name not in entries[f]["results"]]
+        failed = 0
+        for i in range(0, len(targets), BATCH_SIZE):
+            batch = targets[i:i + BATCH_SIZE]
+            results = self._scan_batch(name, batch)
+            if results is None:
+                failed += len(batch)  # left uncached, retried next run
                 continue
+            for path in batch:
+                entries[path]["results"][name] = results.get(path, [])
 
-            code, stdout, stderr = self.run_command(["shellcheck", "-f", "json", str(script)])
-            if stdout:
-                try:
-                    results.extend(json.loads(stdout))
-                except:
-                    pass
+        status = f"{failed} files failed" if failed else ("ok" if targets else "cached")
+        return {"scanned": len(targets) - failed, "cached": len(eligible) - len(targets), "status": status}
 
-        (self.static_dir / "shellcheck.json").write_text(json.dumps(results, indent=2))
+    def _scan_batch(self, name: str, batch: List[str]) -> Optional[Dict[str, List]]:
+        """Run a tool on a batch of files; findings grouped by repo-relative path"""
+        try:
+            if name == "gitleaks":
+                return self._scan_gitleaks(batch)
+
+            if name == "bandit":
+                code, stdout, _ = self.run_command(["bandit", "-f", "json", "-q", *batch])
+                items, key = json.loads(stdout)["results"], "filename"
+            elif name == "semgrep":
+                code, stdout, _ = self.run_command(["semgrep", "--config=auto", "--json", "--quiet", *batch])
+                items, key = json.loads(stdout)["results"], "path"
+            else:
+                code, stdout, _ = self.run_command(["shellcheck", "-f", "json", *batch])
+                items, key = json.loads(stdout or "[]"), "file"
+        except (ValueError, KeyError, TypeError):
+            return None
+
+        grouped: Dict[str, List] = {}
+        for item in items:
+            grouped.setdefault(os.path.normpath(item.get(key, "")), []).append(item)
+        return grouped
+
+    def _scan_gitleaks(self, batch: List[str]) -> Optional[Dict[str, List]]:
+        """gitleaks scans directories: scan a copy of just the changed files"""
+        with tempfile.TemporaryDirectory(prefix="artemis-gitleaks-") as scratch:
+            source = Path(scratch) / "src"
+            for path in batch:
+                target = source / path
+                target.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(self.repo_root / path, target)
+
+            report = Path(scratch) / "report.json"
+            code, _, _ = self.run_command([
+                "gitleaks", "detect", "--no-git", f"--source={source}",
+                "--report-format=json", f"--report-path={report}"
+            ])
+            try:
+                leaks = json.loads(report.read_text() or "[]")
+            except (OSError, ValueError):
+                return None
+
+        grouped: Dict[str, List] = {}
+        for leak in leaks:
+            leak["File"] = os.path.relpath(os.path.join(source, leak.get("File", "")), source)
+            grouped.setdefault(leak["File"], []).append(leak)
+        return grouped
+
+    def _scan_git_history(self) -> Dict:
+        """
+        gitleaks over the git history, so secrets committed and later
+        deleted are found. Incremental runs only scan commits added since
+        the last scanned HEAD and keep the earlier findings.
+        """
+        signature = self._tool_signature("gitleaks")
+        if signature is None:
+            return {"scanned": 0, "cached": 0, "status": "not installed"}
+        code, stdout, _ = self.run_command(["git", "rev-parse", "--verify", "HEAD"])
+        head = stdout.strip()
+        if code != 0 or not head:
+            return {"scanned": 0, "cached": 0, "status": "no git history"}
+
+        state = self.manifest["history"]
+        report = self.static_dir / "gitleaks_history.json"
+        since = state.get("commit") if state.get("signature") == signature else None
+        if since and self.run_command(["git", "merge-base", "--is-ancestor", since, head])[0] != 0:
+            since = None  # history was rewritten: rescan all of it
+
+        if since == head and report.exists():
+            return {"scanned": 0, "cached": len(state.get("leaks", [])), "status": "cached"}
+        revisions = f"{since}..{head}" if since else head
+        code, stdout, _ = self.run_command(["git", "rev-list", "--count", revisions])
+        commits = int(stdout) if code == 0 and stdout.strip().isdigit() else 0
+
+        with tempfile.TemporaryDirectory(prefix="artemis-gitleaks-") as scratch:
+            output = Path(scratch) / "report.json"
+            cmd = ["gitleaks", "detect", f"--source={self.repo_root}",
+                   "--report-format=json", f"--report-path={output}"]
+            if since:
+                cmd.append(f"--log-opts={revisions}")
+            code, _, _ = self.run_command(cmd)
+            try:
+                leaks = json.loads(output.read_text() or "[]")
+            except (OSError, ValueError):
+                return {"scanned": 0, "cached": 0, "status": f"exit {code}"}
+
+        if since:
+            leaks = state.get("leaks", []) + leaks
+        state.update(signature=signature, commit=head, leaks=leaks)
+        report.write_text(json.dumps(leaks, indent=2))
+        return {"scanned": commits, "cached": 0, "status": "ok"}
+
+    def _run_repo_tool(self, name: str, cmd: List[str], files: List[str]) -> Dict:
+        """
+        Run a whole-repo scanner unless its inputs (see REPO_TOOLS) and
+        version are unchanged and, for vulnerability scanners, the cached
+        result is younger than VULN_DB_TTL.
+        """
+        signature = self._tool_signature(name)
+        if signature is None:
+            return {"scanned": 0, "cached": 0, "status": "not installed"}
+
+        scope, uses_vuln_db = REPO_TOOLS[name]
+        inputs = files if scope == "files" else [f for f in files if Path(f).name in DEPENDENCY_MANIFESTS]
+        fingerprint = hashlib.sha256(json.dumps(
+            [signature] + [(f, self.manifest["files"][f]["sha256"]) for f in inputs]
+        ).encode()).hexdigest()
+
+        output = next(Path(arg.split("=", 1)[1]) for arg in cmd if arg.startswith(("--output=", "--file=")))
+        cached = self.manifest["repo_tools"].get(name, {})
+        fresh = not uses_vuln_db or time.time() - cached.get("time", 0) < VULN_DB_TTL
+        if cached.get("fingerprint") == fingerprint and fresh and output.exists():
+            return {"scanned": 0, "cached": len(inputs), "status": "cached"}
+
+        # Scanners exit non-zero when they find issues; a missing report is the failure
+        output.unlink(missing_ok=True)
+        code, _, _ = self.run_command(cmd)
+        if not output.exists():
+            self.manifest["repo_tools"].pop(name, None)
+            return {"scanned": len(inputs), "cached": 0, "status": f"exit {code}"}
+
+        self.manifest["repo_tools"][name] = {"fingerprint": fingerprint, "time": time.time()}
+        return {"scanned": len(inputs), "cached": 0, "status": "ok"}
+
+    def _merge_cached_results(self):
+        """Write each per-file tool's report from cached plus fresh results"""
+        for name, (_, report, key) in FILE_TOOLS.items():
+            if name not in self.manifest["tools"]:
+                continue
+            items = [
+                item
+                for path in sorted(self.manifest["files"])
+                for item in self.manifest["files"][path]["results"].get(name, [])
+            ]
+            data = {key: items} if key else items
+            (self.static_dir / report).write_text(json.dumps(data, indent=2))
 
     def phase2_triage(self):
         """Phase 2: Triage and Prioritization"""
         self.print_header("PHASE 2: TRIAGE AND PRIORITIZATION")
 
+        # Merge cached and fresh per-file results into the tool reports
+        self._merge_cached_results()
+
         # Load all results
         self._load_bandit_results()
         self._load_semgrep_results()
@@ -206,14 +509,22 @@ class ArtemisPipeline:
             print(f"{ArtemisColors.WARNING}Warning: Could not parse semgrep results: {e}{ArtemisColors.ENDC}")
 
     def _load_gitleaks_results(self):
-        """Load secret scanning results"""
-        gitleaks_file = self.static_dir / "gitleaks.json"
-        if not gitleaks_file.exists():
-            return
-
+        """Load secret scanning results (working tree and git history)"""
+        seen = set()
+        for report in ("gitleaks_history.json", "gitleaks.json"):
+            gitleaks_file = self.static_dir / report
+            if gitleaks_file.exists():
+                self._load_gitleaks_report(gitleaks_file, seen)
+
+    def _load_gitleaks_report(self, gitleaks_file: Path, seen: set):
+        """Add one gitleaks report's findings; a secret found in both reports counts once"""
         try:
             data = json.loads(gitleaks_file.read_text())
             for leak in data:
+                key = (leak.get("File"), leak.get("RuleID"), leak.get("Secret"))
+                if key in seen:
+                    continue
+                seen.add(key)
                 finding = {
                     "tool": "gitleaks",
                     "file": leak.get("File"),
@@ -222,6 +533,8 @@ class ArtemisPipeline:
                     "secret_type": leak.get("RuleID"),
                     "severity": "CRITICAL"
                 }
+                if leak.get("Commit"):
+                    finding["commit"] = leak["Commit"]
                 self.findings["p0_critical"].append(finding)
         except Exception as e:
             print(f"{ArtemisColors.WARNING}Warning: Could not parse gitleaks results: {e}{ArtemisColors.ENDC}")
@@ -348,6 +661,7 @@ class ArtemisPipeline:
                 "info": len(self.findings["info"])
             },
             "total_issues": sum(len(v) for v in self.findings.values()),
+            "tool_runtimes": self.tool_runtimes,
             "reports_generated": [
                 str(f.relative_to(self.repo_root))
                 for f in self.report_dir.rglob("*")
@@ -370,6 +684,12 @@ class ArtemisPipeline:
         return summary
 
 def main():
+    parser = argparse.ArgumentParser(description="QWAMOS Artemis security pipeline")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only scan files changed since the last run")
+    parser.add_argument("--jobs", type=int, default=None, help="Tools to run concurrently")
+    args = parser.parse_args()
+
     print(f"{ArtemisColors.BOLD}{ArtemisColors.HEADER}")
     print("╔═══════════════════════════════════════════════════════════════════╗")
     print("║                                                                   ║")
@@ -384,7 +704,7 @@ def main():
         print(f"{ArtemisColors.FAIL}Error: Not in a git repository{ArtemisColors.ENDC}")
         return 1
 
-    pipeline = ArtemisPipeline(repo_root)
+    pipeline = ArtemisPipeline(repo_root, incremental=args.incremental, jobs=args.jobs)
 
     try:
         # Phase 1: Static Analysis
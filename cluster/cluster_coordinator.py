@@ -5,7 +5,7 @@ Phase XVI: Secure Cluster Mode
 
 Cluster coordination and management:
 - Cluster-wide resource management
-- VM placement decisions
+- Reservation-aware VM placement (bin packing, anti-affinity)
 - Load balancing
 - Failover coordination
 - State synchronization
@@ -25,6 +25,7 @@ from enum import Enum
 sys.path.insert(0, str(Path(__file__).parent))
 
 from cluster_node import ClusterNode, NodeRole, NodeStatus, PeerNode
+from placement_engine import PlacementEngine, PlacementError, ResourceVector, VMRequest
 
 
 class PlacementStrategy(Enum):
@@ -33,6 +34,18 @@ class PlacementStrategy(Enum):
     ROUND_ROBIN = "round_robin"  # Rotate placements
     AFFINITY = "affinity"  # Keep related VMs together
     ANTI_AFFINITY = "anti_affinity"  # Spread VMs across nodes
+    BEST_FIT = "best_fit"  # Pack VMs onto the tightest node that fits
+    WORST_FIT = "worst_fit"  # Place on node with most free capacity left
+
+
+# Fit used by the placement engine for each strategy
+STRATEGY_FIT = {
+    PlacementStrategy.LEAST_LOADED: PlacementEngine.WORST_FIT,
+    PlacementStrategy.AFFINITY: PlacementEngine.WORST_FIT,
+    PlacementStrategy.ANTI_AFFINITY: PlacementEngine.WORST_FIT,
+    PlacementStrategy.BEST_FIT: PlacementEngine.BEST_FIT,
+    PlacementStrategy.WORST_FIT: PlacementEngine.WORST_FIT,
+}
 
 
 @dataclass
@@ -48,7 +61,7 @@ class ClusterCoordinator:
     Coordinates cluster-wide operations.
 
     Features:
-    - Resource-aware VM placement
+    - Resource-aware VM placement with per-node reservations
     - Load balancing
     - Failover management
     - Cluster state synchronization
@@ -75,12 +88,48 @@ class ClusterCoordinator:
         # Round-robin counter
         self.rr_counter = 0
 
+        # Per-node reservations and placement index
+        self.engine = PlacementEngine()
+        self.refresh_nodes()
+
+    def refresh_nodes(self):
+        """Sync node capacities from this node and its peers into the placement engine."""
+        self.engine.add_node(self.node.identity.node_id, self._capacity(self.node.resources))
+        for peer in self.node.list_peers():
+            self.engine.add_node(peer.identity.node_id, self._capacity(peer.resources))
+
+        known = set(self.node.peers) | {self.node.identity.node_id}
+        for node_id in list(self.engine.nodes):
+            if node_id not in known:
+                for request in self.engine.remove_node(node_id):
+                    self.vm_placements.pop(request.vm_name, None)
+
+    @staticmethod
+    def _capacity(resources) -> ResourceVector:
+        return ResourceVector(cpu=resources.cpu_cores,
+                              memory_mb=resources.memory_mb,
+                              storage_gb=resources.storage_gb)
+
+    def _is_online(self, node_id: str) -> bool:
+        """Check if a node can receive VMs."""
+        if node_id == self.node.identity.node_id:
+            return True
+        peer = self.node.get_peer(node_id)
+        return peer is not None and peer.status == NodeStatus.ONLINE
+
+    def _get_node(self, node_id: str):
+        if node_id == self.node.identity.node_id:
+            return self.node
+        return self.node.get_peer(node_id)
+
     def place_vm(self, vm_name: str, required_cpu: int = 2,
                 required_memory_mb: int = 1024,
                 required_storage_gb: int = 10,
-                strategy: Optional[PlacementStrategy] = None) -> VMPlacement:
+                strategy: Optional[PlacementStrategy] = None,
+                labels: Optional[Dict[str, str]] = None,
+                anti_affinity: Optional[List[str]] = None) -> VMPlacement:
         """
-        Determine optimal node for VM placement.
+        Determine optimal node for VM placement and reserve its resources.
 
         Args:
             vm_name: VM name
@@ -88,6 +137,33 @@ class ClusterCoordinator:
             required_memory_mb: Required memory in MB
             required_storage_gb: Required storage in GB
             strategy: Placement strategy (uses default if None)
+            labels: VM labels (e.g. {"app": "db"})
+            anti_affinity: Label keys whose values must not share a node
+
+        Returns:
+            VMPlacement decision
+
+        Raises:
+            PlacementError: If no online node has enough free resources
+        """
+        request = VMRequest(
+            vm_name=vm_name,
+            resources=ResourceVector(cpu=required_cpu,
+                                     memory_mb=required_memory_mb,
+                                     storage_gb=required_storage_gb),
+            labels=dict(labels or {}),
+            anti_affinity=list(anti_affinity or [])
+        )
+        return self._place_request(request, strategy)
+
+    def _place_request(self, request: VMRequest,
+                       strategy: Optional[PlacementStrategy] = None) -> VMPlacement:
+        """
+        Place a VM request using the given strategy.
+
+        Args:
+            request: VM requirements
+            strategy: Placement strategy (uses default if None)
 
         Returns:
             VMPlacement decision
@@ -95,126 +171,139 @@ class ClusterCoordinator:
         if strategy is None:
             strategy = self.placement_strategy
 
-        # Get all online nodes (including self)
-        candidates = [self.node]
-        for peer in self.node.list_peers():
-            if peer.status == NodeStatus.ONLINE:
-                candidates.append(peer)
+        # Pick up peers that joined since the last placement
+        if len(self.engine.nodes) != len(self.node.peers) + 1:
+            self.refresh_nodes()
 
-        if not candidates:
-            # No nodes available, place on self
-            placement = VMPlacement(
-                vm_name=vm_name,
-                node_id=self.node.identity.node_id,
-                reason="No other nodes available"
-            )
-            self.vm_placements[vm_name] = placement
-            return placement
-
-        # Select node based on strategy
-        if strategy == PlacementStrategy.LEAST_LOADED:
-            selected_node = self._select_least_loaded(candidates, required_cpu,
-                                                     required_memory_mb, required_storage_gb)
-        elif strategy == PlacementStrategy.ROUND_ROBIN:
-            selected_node = self._select_round_robin(candidates)
+        if strategy == PlacementStrategy.ROUND_ROBIN:
+            node_id = self._select_round_robin(request)
         else:
-            # Default to least loaded
-            selected_node = self._select_least_loaded(candidates, required_cpu,
-                                                     required_memory_mb, required_storage_gb)
-
-        # Get node ID
-        if isinstance(selected_node, ClusterNode):
-            node_id = selected_node.identity.node_id
-            node_hostname = selected_node.identity.hostname
-        else:  # PeerNode
-            node_id = selected_node.identity.node_id
-            node_hostname = selected_node.identity.hostname
+            node_id = self.engine.place(request, fit=STRATEGY_FIT[strategy],
+                                        node_filter=self._is_online)
 
         placement = VMPlacement(
-            vm_name=vm_name,
+            vm_name=request.vm_name,
             node_id=node_id,
-            reason=f"Placed on {node_hostname} using {strategy.value} strategy"
+            reason=f"Placed on {self._get_node(node_id).identity.hostname} using {strategy.value} strategy"
         )
 
-        self.vm_placements[vm_name] = placement
+        self.vm_placements[request.vm_name] = placement
         return placement
 
-    def _select_least_loaded(self, candidates: List, required_cpu: int,
-                            required_memory_mb: int, required_storage_gb: int):
+    def _select_round_robin(self, request: VMRequest) -> str:
         """
-        Select node with most available resources.
+        Select node using round-robin, skipping nodes that cannot host the VM.
 
         Args:
-            candidates: List of nodes
-            required_cpu: Required CPU
-            required_memory_mb: Required memory
-            required_storage_gb: Required storage
+            request: VM requirements
 
         Returns:
-            Selected node
+            Selected node ID
         """
-        best_node = None
-        best_score = -1
-
-        for candidate in candidates:
-            # Get resources
-            if isinstance(candidate, ClusterNode):
-                resources = candidate.resources
-            else:  # PeerNode
-                resources = candidate.resources
-
-            # Check if resources sufficient
-            if (resources.cpu_cores >= required_cpu and
-                resources.memory_mb >= required_memory_mb and
-                resources.storage_gb >= required_storage_gb):
-
-                # Calculate available resources score
-                score = (resources.cpu_cores * 1000 +
-                        resources.memory_mb +
-                        resources.storage_gb * 100)
-
-                if score > best_score:
-                    best_score = score
-                    best_node = candidate
+        candidates = [node_id for node_id in self.engine.nodes if self._is_online(node_id)]
+        for offset in range(len(candidates)):
+            node_id = candidates[(self.rr_counter + offset) % len(candidates)]
+            try:
+                self.engine.reserve(request, node_id)
+            except PlacementError:
+                continue
+            self.rr_counter += offset + 1
+            return node_id
+
+        raise PlacementError(f"No node can host {request.vm_name}")
+
+    def attach_membership(self, membership):
+        """
+        Fail over VMs as soon as gossip membership declares a node dead.
 
-        if best_node is None:
-            # No node meets requirements, use first candidate
-            return candidates[0]
+        Args:
+            membership: SwimMembership instance for the coordinator node
+        """
+        self.node.attach_membership(membership)
+        membership.subscribe(self._on_membership_change)
 
-        return best_node
+    def _on_membership_change(self, node_id: str, state):
+        if state.value == "dead" and node_id in self.engine.nodes:
+            self.handle_node_failure(node_id)
 
-    def _select_round_robin(self, candidates: List):
+    def migrate_vm(self, vm_name: str, target_node_id: str) -> bool:
         """
-        Select node using round-robin.
+        Migrate VM to target node.
 
         Args:
-            candidates: List of nodes
+            vm_name: VM name
+            target_node_id: Target node ID
 
         Returns:
-            Selected node
+            True if migration initiated
         """
-        selected = candidates[self.rr_counter % len(candidates)]
-        self.rr_counter += 1
-        return selected
+        if not self._reserve_migration(vm_name, target_node_id):
+            return False
 
-    def migrate_vm(self, vm_name: str, target_node_id: str) -> bool:
+        current_placement = self.vm_placements[vm_name]
+
+        # Update placement
+        print(f"🔄 Migrating {vm_name} from {current_placement.node_id} to {target_node_id}")
+
+        new_placement = VMPlacement(
+            vm_name=vm_name,
+            node_id=target_node_id,
+            reason=f"Manual migration from {current_placement.node_id}"
+        )
+
+        self.vm_placements[vm_name] = new_placement
+
+        print(f"✅ VM migration initiated")
+        return True
+
+    async def live_migrate_vm(self, vm_name: str, target_node_id: str, migrator,
+                              spec: Optional[Dict] = None):
         """
-        Migrate VM to target node.
+        Live-migrate a running VM and move its placement on success.
+
+        The target's resources are reserved before the pre-copy starts and
+        handed back if the migration fails, so the VM never loses its slot.
 
         Args:
             vm_name: VM name
             target_node_id: Target node ID
+            migrator: LiveMigrator on the VM's current node
+            spec: VM definition for the target's QEMU launcher
 
         Returns:
-            True if migration initiated
+            MigrationResult, or None if the target cannot host the VM
+
+        Raises:
+            MigrationError: If the migration fails; the placement is unchanged
         """
+        source_node_id = self.vm_placements.get(vm_name, VMPlacement(vm_name, "", "")).node_id
+        if not self._reserve_migration(vm_name, target_node_id):
+            return None
+
+        print(f"🔄 Live-migrating {vm_name} from {source_node_id} to {target_node_id}")
+        try:
+            result = await migrator.migrate(vm_name, target_node_id, spec)
+        except BaseException:
+            self.engine.move(vm_name, source_node_id)
+            print(f"❌ Live migration of {vm_name} failed; VM stays on {source_node_id}")
+            raise
+
+        self.vm_placements[vm_name] = VMPlacement(
+            vm_name=vm_name,
+            node_id=target_node_id,
+            reason=f"Live migration from {source_node_id} ({result.downtime_ms} ms downtime)"
+        )
+        print(f"✅ {vm_name} running on {target_node_id} "
+              f"(downtime {result.downtime_ms} ms, {len(result.iterations)} pre-copy iterations)")
+        return result
+
+    def _reserve_migration(self, vm_name: str, target_node_id: str) -> bool:
+        """Validate a migration and move the VM's reservation to the target."""
         # Check if VM exists in placements
         if vm_name not in self.vm_placements:
             print(f"❌ VM {vm_name} not found in cluster")
             return False
 
-        current_placement = self.vm_placements[vm_name]
-
         # Check if target node exists and is online
         target_node = None
         if target_node_id == self.node.identity.node_id:
@@ -228,39 +317,43 @@ class ClusterCoordinator:
             print(f"❌ Target node {target_node_id} not available")
             return False
 
-        # Update placement
-        print(f"🔄 Migrating {vm_name} from {current_placement.node_id} to {target_node_id}")
+        if len(self.engine.nodes) != len(self.node.peers) + 1:
+            self.refresh_nodes()
 
-        new_placement = VMPlacement(
-            vm_name=vm_name,
-            node_id=target_node_id,
-            reason=f"Manual migration from {current_placement.node_id}"
-        )
+        if not self.engine.move(vm_name, target_node_id):
+            print(f"❌ Target node {target_node_id} cannot host {vm_name}")
+            return False
+        return True
 
-        self.vm_placements[vm_name] = new_placement
+    def balance_load(self, threshold: float = 0.2) -> List[Tuple[str, str, str]]:
+        """
+        Rebalance VMs across cluster nodes.
 
-        print(f"✅ VM migration initiated")
-        return True
+        Moves VMs from the busiest to the idlest node until the spread of
+        node utilisation drops below threshold, leaving other placements
+        untouched.
+
+        Args:
+            threshold: Allowed utilisation spread between nodes (0.0-1.0)
 
-    def balance_load(self):
-        """Rebalance VMs across cluster nodes."""
+        Returns:
+            List of (vm_name, source_node_id, target_node_id) moves
+        """
         print("🔄 Balancing cluster load...")
 
-        # Get all VMs
-        vms = list(self.vm_placements.keys())
+        self.refresh_nodes()
+        moves = self.engine.rebalance(threshold=threshold, node_filter=self._is_online)
 
-        # Recalculate placements
-        for vm_name in vms:
-            new_placement = self.place_vm(
-                vm_name,
-                strategy=PlacementStrategy.LEAST_LOADED
+        for vm_name, source, target in moves:
+            print(f"  Moving {vm_name}: {source} → {target}")
+            self.vm_placements[vm_name] = VMPlacement(
+                vm_name=vm_name,
+                node_id=target,
+                reason=f"Rebalanced from {source}"
             )
 
-            old_placement = self.vm_placements.get(vm_name)
-            if old_placement and new_placement.node_id != old_placement.node_id:
-                print(f"  Moving {vm_name}: {old_placement.node_id} → {new_placement.node_id}")
-
         print("✅ Load balancing complete")
+        return moves
 
     def handle_node_failure(self, failed_node_id: str):
         """
@@ -271,22 +364,31 @@ class ClusterCoordinator:
         """
         print(f"⚠️  Handling failure of node {failed_node_id}")
 
-        # Find VMs on failed node
-        affected_vms = [
-            vm_name for vm_name, placement in self.vm_placements.items()
-            if placement.node_id == failed_node_id
-        ]
+        # Keep the failed node out of placement until it heartbeats again
+        peer = self.node.get_peer(failed_node_id)
+        if peer is not None:
+            peer.status = NodeStatus.OFFLINE
+
+        # Drop its reservations; VMs keep their original requirements
+        affected = self.engine.remove_node(failed_node_id)
+        if peer is not None:
+            self.engine.add_node(failed_node_id, self._capacity(peer.resources))
 
-        if not affected_vms:
+        if not affected:
             print("   No VMs affected")
             return
 
-        print(f"   Migrating {len(affected_vms)} VMs...")
+        print(f"   Migrating {len(affected)} VMs...")
 
         # Migrate VMs to other nodes
-        for vm_name in affected_vms:
-            new_placement = self.place_vm(vm_name)
-            print(f"   ✅ {vm_name} → {new_placement.node_id}")
+        for request in affected:
+            try:
+                new_placement = self._place_request(request)
+            except PlacementError as e:
+                self.vm_placements.pop(request.vm_name, None)
+                print(f"   ❌ {request.vm_name}: {e}")
+                continue
+            print(f"   ✅ {request.vm_name} → {new_placement.node_id}")
 
         print("✅ Failover complete")
 
@@ -306,6 +408,15 @@ class ClusterCoordinator:
 
         return load_by_node
 
+    def get_node_utilization(self) -> Dict[str, float]:
+        """
+        Get reserved share of each node's capacity.
+
+        Returns:
+            Dictionary of node_id -> dominant-resource utilisation (0.0-1.0)
+        """
+        return self.engine.utilization()
+
     def print_cluster_state(self):
         """Print cluster state."""
         print(f"\n{'='*70}")
@@ -328,8 +439,9 @@ class ClusterCoordinator:
         load = self.get_cluster_load()
         if load:
             print(f"\nLoad Distribution:")
+            utilization = self.get_node_utilization()
             for node_id, vm_count in load.items():
-                print(f"  {node_id}: {vm_count} VMs")
+                print(f"  {node_id}: {vm_count} VMs ({utilization.get(node_id, 0.0):.0%} reserved)")
 
         print(f"{'='*70}\n")
 
@@ -41,6 +41,14 @@ class NodeStatus(Enum):
     DEGRADED = "degraded"
 
 
+# Peer status for each gossip membership state (gossip_membership.MemberState)
+MEMBER_STATUS = {
+    "alive": NodeStatus.ONLINE,
+    "suspect": NodeStatus.DEGRADED,
+    "dead": NodeStatus.OFFLINE,
+}
+
+
 @dataclass
 class NodeIdentity:
     """Node identity information."""
@@ -115,6 +123,12 @@ class ClusterNode:
         # Last heartbeat time
         self.last_heartbeat = time.time()
 
+        # Gossip membership (replaces heartbeat timeouts when attached)
+        self.membership = None
+
+        # Shared metrics bus reader (adds live load to heartbeats when attached)
+        self.metrics = None
+
     def _load_or_create_identity(self, cluster_id: str, role: NodeRole) -> NodeIdentity:
         """
         Load existing identity or create new one.
@@ -342,6 +356,9 @@ class ClusterNode:
                 'status': 'online',
                 'resources': asdict(self.resources)
             }
+            load = self._current_load()
+            if load:
+                heartbeat_data['load'] = load
 
             # Update last heartbeat time
             self.last_heartbeat = current_time
@@ -363,8 +380,57 @@ class ClusterNode:
             peer.last_seen = heartbeat_data['timestamp']
             peer.status = NodeStatus.ONLINE
 
+    def attach_membership(self, membership):
+        """
+        Track peer status from gossip membership instead of heartbeat timeouts.
+
+        Args:
+            membership: SwimMembership instance for this node
+        """
+        self.membership = membership
+        membership.subscribe(self._on_membership_change)
+
+    def attach_metrics(self, reader):
+        """
+        Report live host load from the shared metrics collector.
+
+        Args:
+            reader: MetricsReader attached to the node's metrics bus
+        """
+        self.metrics = reader
+
+    def _current_load(self) -> Optional[Dict]:
+        """Host load from the metrics bus, or None if unavailable."""
+        if self.metrics is None:
+            return None
+        snapshot = self.metrics.snapshot(vm_names=[])
+        if snapshot is None:
+            return None
+        return {
+            'cpu_percent': snapshot.cpu.system_percent,
+            'memory_available_mb': snapshot.memory.available_mb,
+            'cpu_temp_c': snapshot.thermal.cpu_temp_c,
+            'sampled_at': snapshot.timestamp
+        }
+
+    def _on_membership_change(self, node_id: str, state):
+        """Mirror a membership state change onto the peer's status."""
+        peer = self.peers.get(node_id)
+        if peer is None:
+            return
+
+        peer.status = MEMBER_STATUS[state.value]
+        if peer.status == NodeStatus.ONLINE:
+            peer.last_seen = time.time()
+        elif peer.status == NodeStatus.OFFLINE:
+            print(f"⚠️  Peer {node_id} marked offline")
+
     def check_peer_health(self):
         """Check health of all peers and mark offline if needed."""
+        if self.membership is not None:
+            # Gossip failure detection keeps peer status current
+            return
+
         current_time = time.time()
         timeout = 30.0  # 30 seconds timeout
 
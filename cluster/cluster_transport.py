@@ -0,0 +1,647 @@
+#!/usr/bin/env python3
+"""
+QWAMOS Cluster Transport
+Phase XVI: Secure Cluster Mode
+
+Asyncio wire protocol between cluster nodes:
+- One persistent connection per peer (TCP, or unix sockets for tests)
+- Length-prefixed frames carrying batches of multiplexed messages
+- Request/response correlation over the shared connection
+- ChaCha20-Poly1305 session keys negotiated once per connection
+  (ephemeral X25519 + HKDF-SHA256 keyed with the cluster secret)
+- Heartbeats coalesced into the next outgoing frame
+
+Frame layout:
+    [4-byte big-endian length][ChaCha20-Poly1305 ciphertext + 16-byte tag]
+
+The plaintext of a frame is a JSON array of messages, each
+[type, msg_id, reply_to, body]. Nonces are per-direction frame counters,
+so no nonce is ever sent or reused within a session.
+
+Author: QWAMOS Project
+License: MIT
+"""
+
+import asyncio
+import inspect
+import json
+import logging
+import struct
+from collections import deque
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple, Union
+
+from Crypto.Cipher import ChaCha20_Poly1305
+from Crypto.Hash import SHA256
+from Crypto.Protocol.DH import import_x25519_public_key, key_agreement
+from Crypto.Protocol.KDF import HKDF
+from Crypto.PublicKey import ECC
+
+logger = logging.getLogger("ClusterTransport")
+
+PROTOCOL_MAGIC = b"QWCT1"
+HANDSHAKE_SIZE = len(PROTOCOL_MAGIC) + 32
+TAG_SIZE = 16
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+MAX_BATCH_BYTES = 256 * 1024
+
+# Message types handled by the transport itself
+MSG_HELLO = "hello"
+MSG_HEARTBEAT = "heartbeat"
+MSG_REPLY = "reply"
+MSG_ERROR = "error"
+
+Handler = Callable[[str, Any], Union[Any, Awaitable[Any]]]
+Address = Union[str, Tuple[str, int]]
+
+
+class TransportError(Exception):
+    """Connection, handshake or remote handler failure."""
+
+
+def parse_address(address: Address) -> Tuple[str, Any]:
+    """
+    Parse a peer address.
+
+    Args:
+        address: "unix:/path/sock", "host:port" or (host, port)
+
+    Returns:
+        ("unix", path) or ("tcp", (host, port))
+    """
+    if isinstance(address, tuple):
+        return "tcp", (address[0], int(address[1]))
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"Invalid cluster address: {address}")
+    return "tcp", (host.strip("[]"), int(port))
+
+
+class SessionCipher:
+    """ChaCha20-Poly1305 with one key and frame counter per direction."""
+
+    def __init__(self, send_key: bytes, recv_key: bytes):
+        self._send_key = send_key
+        self._recv_key = recv_key
+        self._send_counter = 0
+        self._recv_counter = 0
+
+    @staticmethod
+    def _nonce(counter: int) -> bytes:
+        if counter >= 1 << 64:
+            raise TransportError("Session nonce space exhausted")
+        return struct.pack(">IQ", 0, counter)
+
+    def seal(self, plaintext: bytes) -> bytes:
+        cipher = ChaCha20_Poly1305.new(key=self._send_key, nonce=self._nonce(self._send_counter))
+        self._send_counter += 1
+        ciphertext, tag = cipher.encrypt_and_digest(plaintext)
+        return ciphertext + tag
+
+    def open(self, data: bytes) -> bytes:
+        if len(data) < TAG_SIZE:
+            raise TransportError("Truncated frame")
+        cipher = ChaCha20_Poly1305.new(key=self._recv_key, nonce=self._nonce(self._recv_counter))
+        self._recv_counter += 1
+        try:
+            return cipher.decrypt_and_verify(data[:-TAG_SIZE], data[-TAG_SIZE:])
+        except ValueError:
+            raise TransportError("Frame authentication failed")
+
+
+async def read_frame(reader: asyncio.StreamReader) -> bytes:
+    """Read one length-prefixed frame."""
+    header = await reader.readexactly(4)
+    (length,) = struct.unpack(">I", header)
+    if length > MAX_FRAME_SIZE:
+        raise TransportError(f"Frame too large: {length} bytes")
+    return await reader.readexactly(length)
+
+
+def write_frame(writer: asyncio.StreamWriter, payload: bytes):
+    """Queue one length-prefixed frame."""
+    writer.write(struct.pack(">I", len(payload)) + payload)
+
+
+async def negotiate_session(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                            cluster_key: bytes, initiator: bool) -> SessionCipher:
+    """
+    Derive per-connection session keys.
+
+    Both sides send an ephemeral X25519 public key. The shared secret is
+    expanded with HKDF-SHA256, salted with the cluster key and bound to
+    both public keys, into one key per direction. A peer without the
+    cluster key derives different keys and fails on its first frame.
+
+    Args:
+        reader: Connection reader
+        writer: Connection writer
+        cluster_key: Pre-shared cluster secret
+        initiator: True on the connecting side
+
+    Returns:
+        SessionCipher for this connection
+    """
+    ephemeral = ECC.generate(curve="curve25519")
+    local_public = ephemeral.public_key().export_key(format="raw")
+
+    writer.write(PROTOCOL_MAGIC + local_public)
+    await writer.drain()
+
+    greeting = await reader.readexactly(HANDSHAKE_SIZE)
+    if not greeting.startswith(PROTOCOL_MAGIC):
+        raise TransportError("Peer does not speak the QWAMOS cluster protocol")
+    peer_public = greeting[len(PROTOCOL_MAGIC):]
+
+    try:
+        shared = key_agreement(eph_priv=ephemeral, eph_pub=import_x25519_public_key(peer_public),
+                               kdf=lambda secret: secret)
+    except ValueError as e:
+        raise TransportError(f"Key agreement failed: {e}")
+
+    initiator_public, responder_public = ((local_public, peer_public) if initiator
+                                          else (peer_public, local_public))
+    i2r, r2i = HKDF(
+        master=shared,
+        key_len=32,
+        salt=SHA256.new(cluster_key).digest(),
+        hashmod=SHA256,
+        num_keys=2,
+        context=PROTOCOL_MAGIC + initiator_public + responder_public
+    )
+
+    return SessionCipher(i2r, r2i) if initiator else SessionCipher(r2i, i2r)
+
+
+class PeerChannel:
+    """
+    One encrypted, multiplexed connection to a peer.
+
+    Outgoing messages are queued and drained by a single writer task; all
+    messages queued since the last write go out as one encrypted frame.
+    """
+
+    def __init__(self, transport: "ClusterTransport", reader: asyncio.StreamReader,
+                 writer: asyncio.StreamWriter, cipher: SessionCipher, initiator: bool):
+        self.transport = transport
+        self.peer_id: Optional[str] = None
+        self.initiator = initiator
+        self._reader = reader
+        self._writer = writer
+        self._cipher = cipher
+
+        self._outbox: Deque[bytes] = deque()
+        self._heartbeat: Optional[bytes] = None
+        self._wakeup = asyncio.Event()
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._next_id = 1
+        self._closed = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+        self.stats = {"frames_sent": 0, "frames_received": 0,
+                      "messages_sent": 0, "messages_received": 0}
+
+    @property
+    def closed(self) -> bool:
+        return self._closed.is_set()
+
+    def start(self):
+        self._tasks = [asyncio.ensure_future(self._write_loop()),
+                       asyncio.ensure_future(self._read_loop())]
+
+    async def hello(self, node_id: str, timeout: float) -> str:
+        """
+        Exchange node IDs as the first encrypted frame in each direction.
+
+        Returns:
+            Authenticated peer node ID
+        """
+        self._enqueue(MSG_HELLO, 0, 0, {"node_id": node_id})
+        await self._flush()
+        try:
+            messages = json.loads(self._cipher.open(await asyncio.wait_for(read_frame(self._reader), timeout)))
+        except (ValueError, asyncio.IncompleteReadError) as e:
+            raise TransportError(f"Handshake failed: {e}")
+
+        msg_type, _, _, body = messages[0]
+        if msg_type != MSG_HELLO or not isinstance(body, dict) or "node_id" not in body:
+            raise TransportError("Expected hello frame")
+        self.peer_id = body["node_id"]
+        return self.peer_id
+
+    # ------------------------------------------------------------------
+    # Sending
+    # ------------------------------------------------------------------
+
+    def send(self, msg_type: str, body: Any = None):
+        """Queue a one-way message."""
+        self._enqueue(msg_type, 0, 0, body)
+
+    async def request(self, msg_type: str, body: Any = None, timeout: float = 10.0) -> Any:
+        """
+        Send a message and wait for the peer handler's reply.
+
+        Raises:
+            TransportError: On timeout, disconnect or remote handler error
+        """
+        msg_id = self._next_id
+        self._next_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[msg_id] = future
+
+        self._enqueue(msg_type, msg_id, 0, body)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise TransportError(f"Request {msg_type} to {self.peer_id} timed out")
+        finally:
+            self._pending.pop(msg_id, None)
+
+    def set_heartbeat(self, encoded: bytes):
+        """Replace the pending heartbeat; only the newest one is sent."""
+        if self.closed:
+            return
+        self._heartbeat = encoded
+        self._wakeup.set()
+
+    def _enqueue(self, msg_type: str, msg_id: int, reply_to: int, body: Any):
+        if self.closed:
+            raise TransportError(f"Connection to {self.peer_id} is closed")
+        self._outbox.append(json.dumps([msg_type, msg_id, reply_to, body],
+                                       separators=(",", ":")).encode())
+        self._wakeup.set()
+
+    async def _flush(self):
+        """Encrypt everything queued into frames and write them."""
+        while self._outbox or self._heartbeat is not None:
+            batch, size = [], 0
+            if self._heartbeat is not None:
+                batch.append(self._heartbeat)
+                size += len(self._heartbeat)
+                self._heartbeat = None
+            while self._outbox and (not batch or size + len(self._outbox[0]) <= MAX_BATCH_BYTES):
+                message = self._outbox.popleft()
+                batch.append(message)
+                size += len(message)
+
+            write_frame(self._writer, self._cipher.seal(b"[" + b",".join(batch) + b"]"))
+            self.stats["frames_sent"] += 1
+            self.stats["messages_sent"] += len(batch)
+            await self._writer.drain()
+
+    async def _write_loop(self):
+        try:
+            while not self.closed:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                if not self.closed:
+                    await self._flush()
+        except (ConnectionError, OSError) as e:
+            logger.debug(f"Write to {self.peer_id} failed: {e}")
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._mark_closed()
+
+    # ------------------------------------------------------------------
+    # Receiving
+    # ------------------------------------------------------------------
+
+    async def _read_loop(self):
+        try:
+            while True:
+                frame = self._cipher.open(await read_frame(self._reader))
+                self.stats["frames_received"] += 1
+                for message in json.loads(frame):
+                    self.stats["messages_received"] += 1
+                    self._dispatch(*message)
+        except (asyncio.IncompleteReadError, ConnectionError, OSError):
+            pass
+        except (TransportError, ValueError) as e:
+            logger.warning(f"Dropping connection to {self.peer_id}: {e}")
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._mark_closed()
+
+    def _dispatch(self, msg_type: str, msg_id: int, reply_to: int, body: Any):
+        if reply_to:
+            future = self._pending.get(reply_to)
+            if future is not None and not future.done():
+                if msg_type == MSG_ERROR:
+                    future.set_exception(TransportError(f"{self.peer_id}: {body}"))
+                else:
+                    future.set_result(body)
+            return
+
+        handler = self.transport.handlers.get(msg_type)
+        if handler is None:
+            if msg_id:
+                self._enqueue(MSG_ERROR, 0, msg_id, f"No handler for {msg_type}")
+            return
+
+        try:
+            result = handler(self.peer_id, body)
+        except Exception as e:
+            logger.warning(f"Handler {msg_type} failed: {e}")
+            if msg_id:
+                self._enqueue(MSG_ERROR, 0, msg_id, str(e))
+            return
+
+        if inspect.isawaitable(result):
+            # Let slow handlers run without blocking the connection
+            asyncio.ensure_future(self._reply_async(msg_type, msg_id, result))
+        elif msg_id:
+            self._enqueue(MSG_REPLY, 0, msg_id, result)
+
+    async def _reply_async(self, msg_type: str, msg_id: int, awaitable: Awaitable):
+        try:
+            result = await awaitable
+        except Exception as e:
+            logger.warning(f"Handler {msg_type} failed: {e}")
+            result, reply_type = str(e), MSG_ERROR
+        else:
+            reply_type = MSG_REPLY
+        if msg_id and not self.closed:
+            self._enqueue(reply_type, 0, msg_id, result)
+
+    # ------------------------------------------------------------------
+    # Shutdown
+    # ------------------------------------------------------------------
+
+    def _mark_closed(self):
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._wakeup.set()
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(TransportError(f"Connection to {self.peer_id} closed"))
+        self._writer.close()
+        self.transport._channel_closed(self)
+
+    async def close(self):
+        """Flush queued messages and close the connection."""
+        if not self.closed:
+            try:
+                await asyncio.wait_for(self._flush(), 1.0)
+            except (asyncio.TimeoutError, ConnectionError, OSError):
+                pass
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._mark_closed()
+        try:
+            await self._writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
+
+
+class ClusterTransport:
+    """
+    Encrypted message transport for one cluster node.
+
+    Usage:
+        transport = ClusterTransport(node_id, cluster_key, "unix:/run/qwamos/node.sock")
+        transport.on("place_vm", handle_place_vm)
+        await transport.start()
+        await transport.connect("node-b", "10.0.0.2:7946")
+        reply = await transport.request("node-b", "place_vm", {...})
+    """
+
+    def __init__(self, node_id: str, cluster_key: bytes, listen: Optional[Address] = None,
+                 handshake_timeout: float = 5.0):
+        """
+        Initialize cluster transport.
+
+        Args:
+            node_id: This node's ID
+            cluster_key: Pre-shared cluster secret
+            listen: Listen address ("unix:/path" or "host:port"), None for client-only
+            handshake_timeout: Handshake timeout in seconds
+        """
+        if not cluster_key:
+            raise ValueError("cluster_key is required")
+
+        self.node_id = node_id
+        self.cluster_key = cluster_key
+        self.listen = listen
+        self.handshake_timeout = handshake_timeout
+
+        self.handlers: Dict[str, Handler] = {}
+        self.channels: Dict[str, PeerChannel] = {}
+        self.addresses: Dict[str, Address] = {}
+
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connect_locks: Dict[str, asyncio.Lock] = {}
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._all_channels: List[PeerChannel] = []
+
+        self.stats = {"connections_opened": 0, "handshake_failures": 0, "heartbeat_rounds": 0}
+
+    def on(self, msg_type: str, handler: Handler):
+        """
+        Register a message handler.
+
+        The handler is called as handler(peer_id, body); its return value
+        (or awaited result) is the reply for requests.
+        """
+        self.handlers[msg_type] = handler
+
+    # ------------------------------------------------------------------
+    # Connections
+    # ------------------------------------------------------------------
+
+    async def start(self):
+        """Start listening for peers."""
+        if self.listen is None:
+            return
+
+        kind, target = parse_address(self.listen)
+        if kind == "unix":
+            Path(target).unlink(missing_ok=True)
+            self._server = await asyncio.start_unix_server(self._accept, path=target)
+        else:
+            self._server = await asyncio.start_server(self._accept, host=target[0], port=target[1])
+            if target[1] == 0:
+                port = self._server.sockets[0].getsockname()[1]
+                self.listen = (target[0], port)
+
+    async def _accept(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            await self._open_channel(reader, writer, initiator=False)
+        except (TransportError, asyncio.TimeoutError, asyncio.IncompleteReadError,
+                ConnectionError, OSError) as e:
+            self.stats["handshake_failures"] += 1
+            logger.warning(f"Rejected inbound connection: {e}")
+            writer.close()
+
+    async def _open_channel(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                            initiator: bool) -> PeerChannel:
+        cipher = await asyncio.wait_for(
+            negotiate_session(reader, writer, self.cluster_key, initiator), self.handshake_timeout)
+        channel = PeerChannel(self, reader, writer, cipher, initiator)
+        peer_id = await channel.hello(self.node_id, self.handshake_timeout)
+
+        self._all_channels.append(channel)
+        channel.start()
+        self.stats["connections_opened"] += 1
+
+        existing = self.channels.get(peer_id)
+        if existing is not None and not existing.closed:
+            # Simultaneous connect: both sides keep the link opened by the lower node ID
+            keep_new = initiator == (self.node_id < peer_id)
+            if not keep_new:
+                asyncio.ensure_future(channel.close())
+                return existing
+            asyncio.ensure_future(existing.close())
+
+        self.channels[peer_id] = channel
+        return channel
+
+    async def connect(self, peer_id: str, address: Address) -> PeerChannel:
+        """
+        Get the persistent connection to a peer, connecting if needed.
+
+        Args:
+            peer_id: Expected peer node ID
+            address: Peer listen address
+
+        Returns:
+            PeerChannel
+        """
+        self.addresses[peer_id] = address
+        lock = self._connect_locks.setdefault(peer_id, asyncio.Lock())
+
+        async with lock:
+            channel = self.channels.get(peer_id)
+            if channel is not None and not channel.closed:
+                return channel
+
+            kind, target = parse_address(address)
+            try:
+                if kind == "unix":
+                    reader, writer = await asyncio.open_unix_connection(target)
+                else:
+                    reader, writer = await asyncio.open_connection(*target)
+            except OSError as e:
+                raise TransportError(f"Cannot connect to {peer_id} at {address}: {e}")
+
+            try:
+                channel = await self._open_channel(reader, writer, initiator=True)
+            except (TransportError, asyncio.TimeoutError, asyncio.IncompleteReadError,
+                    ConnectionError, OSError) as e:
+                self.stats["handshake_failures"] += 1
+                writer.close()
+                raise TransportError(f"Handshake with {peer_id} failed: {e}")
+
+            if channel.peer_id != peer_id:
+                await channel.close()
+                raise TransportError(f"Expected {peer_id} at {address}, found {channel.peer_id}")
+            return channel
+
+    async def channel(self, peer_id: str) -> PeerChannel:
+        """Get an open channel, reconnecting to known addresses."""
+        channel = self.channels.get(peer_id)
+        if channel is not None and not channel.closed:
+            return channel
+        if peer_id not in self.addresses:
+            raise TransportError(f"No connection to {peer_id}")
+        return await self.connect(peer_id, self.addresses[peer_id])
+
+    def _channel_closed(self, channel: PeerChannel):
+        if self.channels.get(channel.peer_id) is channel:
+            del self.channels[channel.peer_id]
+        if channel in self._all_channels:
+            self._all_channels.remove(channel)
+
+    # ------------------------------------------------------------------
+    # Messaging
+    # ------------------------------------------------------------------
+
+    async def send(self, peer_id: str, msg_type: str, body: Any = None):
+        """Send a one-way message to a peer."""
+        (await self.channel(peer_id)).send(msg_type, body)
+
+    async def request(self, peer_id: str, msg_type: str, body: Any = None, timeout: float = 10.0) -> Any:
+        """Send a request to a peer and return its reply."""
+        return await (await self.channel(peer_id)).request(msg_type, body, timeout)
+
+    def broadcast(self, msg_type: str, body: Any = None) -> int:
+        """
+        Send a one-way message to every connected peer.
+
+        Returns:
+            Number of peers the message was queued for
+        """
+        count = 0
+        for channel in list(self.channels.values()):
+            if not channel.closed:
+                channel.send(msg_type, body)
+                count += 1
+        return count
+
+    def queue_heartbeat(self, body: Any) -> int:
+        """
+        Queue a heartbeat for every connected peer.
+
+        The heartbeat is encoded once and rides in each peer's next frame;
+        an unsent heartbeat is replaced rather than queued behind.
+
+        Returns:
+            Number of peers the heartbeat was queued for
+        """
+        encoded = json.dumps([MSG_HEARTBEAT, 0, 0, body], separators=(",", ":")).encode()
+        channels = [channel for channel in self.channels.values() if not channel.closed]
+        for channel in channels:
+            channel.set_heartbeat(encoded)
+        self.stats["heartbeat_rounds"] += 1
+        return len(channels)
+
+    def start_heartbeats(self, payload: Callable[[], Optional[dict]], interval: float = 1.0):
+        """
+        Periodically queue heartbeats from payload(); None skips a round.
+
+        Args:
+            payload: Callable returning the heartbeat body
+            interval: Seconds between rounds
+        """
+        async def loop():
+            while True:
+                body = payload()
+                if body is not None:
+                    self.queue_heartbeat(body)
+                await asyncio.sleep(interval)
+
+        self.stop_heartbeats()
+        self._heartbeat_task = asyncio.ensure_future(loop())
+
+    def stop_heartbeats(self):
+        """Stop the heartbeat loop."""
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
+
+    def bind_node(self, node, interval: Optional[float] = None):
+        """
+        Carry a ClusterNode's heartbeats over this transport.
+
+        Args:
+            node: ClusterNode whose send_heartbeat/receive_heartbeat to use
+            interval: Poll interval (node.heartbeat_interval if None)
+        """
+        self.on(MSG_HEARTBEAT, lambda peer_id, body: node.receive_heartbeat(peer_id, body))
+        self.start_heartbeats(node.send_heartbeat, interval or node.heartbeat_interval)
+
+    async def close(self):
+        """Close the listener and every connection."""
+        self.stop_heartbeats()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        await asyncio.gather(*(channel.close() for channel in list(self._all_channels)),
+                             return_exceptions=True)
+        self.channels.clear()
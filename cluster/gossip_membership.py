@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+QWAMOS Gossip Membership
+Phase XVI: Secure Cluster Mode
+
+SWIM-style membership and failure detection:
+- One randomized probe per protocol period (ping, then ping-req via k members)
+- Suspicion with timeout before a member is declared dead
+- Incarnation numbers so a suspected member can refute
+- Membership updates piggybacked on protocol messages
+- Periodic push-pull state exchange with one random member (anti-entropy)
+
+Every node sends a constant number of messages per period regardless of
+cluster size, replacing all-to-all heartbeats.
+
+The protocol core is transport-agnostic: it emits messages through a send
+callback and is driven by tick(). attach() wires it to a ClusterTransport.
+
+Author: QWAMOS Project
+License: MIT
+"""
+
+import asyncio
+import logging
+import math
+import random
+import time
+from dataclasses import dataclass
+from enum import Enum
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("GossipMembership")
+
+MSG_SWIM = "swim"
+
+
+class MemberState(Enum):
+    """Membership state of a node."""
+    ALIVE = "alive"
+    SUSPECT = "suspect"
+    DEAD = "dead"
+
+
+@dataclass
+class Member:
+    """A known cluster member."""
+    node_id: str
+    address: Optional[str] = None
+    incarnation: int = 0
+    state: MemberState = MemberState.ALIVE
+    state_since: float = 0.0
+
+
+@dataclass
+class SwimConfig:
+    """Protocol timing and fan-out."""
+    protocol_period: float = 1.0  # Seconds between probes
+    ping_timeout: float = 0.3  # Direct ack wait before ping-req
+    indirect_checks: int = 3  # Members asked to ping-req
+    suspicion_multiplier: float = 3.0  # Suspicion timeout = mult * log10(N) * period
+    retransmit_multiplier: float = 4.0  # Piggyback each update mult * log10(N+2) times
+    max_piggyback: int = 6  # Updates per message
+    push_pull_periods: int = 30  # Full-state exchange with one random member (0 disables)
+
+
+@dataclass
+class _Probe:
+    seq: int
+    target: str
+    sent: float
+    indirect_sent: bool = False
+    acked: bool = False
+
+
+class SwimMembership:
+    """
+    SWIM membership for one node.
+
+    Args:
+        node_id: This node's ID
+        send: Callable(target_node_id, message_dict) delivering a message
+        config: Protocol configuration
+        address: This node's transport address, gossiped to others
+        clock: Monotonic clock (time.monotonic by default)
+        rng: Random source for target selection
+    """
+
+    def __init__(self, node_id: str, send: Callable[[str, dict], None],
+                 config: Optional[SwimConfig] = None, address: Optional[str] = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 rng: Optional[random.Random] = None):
+        self.node_id = node_id
+        self.address = address
+        self.send = send
+        self.config = config or SwimConfig()
+        self.clock = clock
+        self.rng = rng or random.Random()
+
+        self.incarnation = 0
+        self.members: Dict[str, Member] = {}
+        self.subscribers: List[Callable[[str, MemberState], None]] = []
+
+        self._probe: Optional[_Probe] = None
+        self._probe_order: List[str] = []
+        self._next_probe = clock()
+        self._periods = 0
+        self._seq = 0
+        self._relays: Dict[int, Tuple[str, int, float]] = {}  # local seq -> (requester, seq, sent)
+        self._updates: Dict[str, List] = {}  # node_id -> [update, transmissions]
+
+        self.stats = {"messages_sent": 0, "probes": 0, "indirect_probes": 0,
+                      "suspicions": 0, "failures": 0, "refutations": 0}
+
+    # ------------------------------------------------------------------
+    # Membership
+    # ------------------------------------------------------------------
+
+    def join(self, seeds: Dict[str, Optional[str]]):
+        """
+        Join the cluster through seed members.
+
+        Seeds answer with their full member list; later changes arrive by
+        gossip.
+
+        Args:
+            seeds: node_id -> address of known members
+        """
+        for node_id, address in seeds.items():
+            self.add_member(node_id, address)
+        self._queue_update(self._self_update())
+        for node_id in seeds:
+            self._send(node_id, {"type": "join"})
+
+    def add_member(self, node_id: str, address: Optional[str] = None, incarnation: int = 0) -> Member:
+        """
+        Add a member as alive, or revive a dead one announced with a newer
+        incarnation.
+
+        A restarted node usually comes back with a lower incarnation than
+        the one it was declared dead at; it learns that from the DEAD entry
+        in push-pull/sync state and refutes it with a higher incarnation.
+        """
+        if node_id == self.node_id:
+            raise ValueError("Cannot add self as a member")
+
+        member = self.members.get(node_id)
+        if member is None:
+            member = Member(node_id, address, incarnation, MemberState.ALIVE, self.clock())
+            self.members[node_id] = member
+            self._notify(node_id, MemberState.ALIVE)
+            return member
+
+        if address:
+            member.address = address
+        if member.state == MemberState.DEAD and incarnation > member.incarnation:
+            member.incarnation = incarnation
+            self._set_state(member, MemberState.ALIVE)
+        return member
+
+    def alive_members(self) -> List[str]:
+        """Node IDs not declared dead (suspects included)."""
+        return [m.node_id for m in self.members.values() if m.state != MemberState.DEAD]
+
+    def subscribe(self, callback: Callable[[str, MemberState], None]):
+        """Register callback(node_id, new_state) for membership changes."""
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[str, MemberState], None]):
+        """Remove a membership callback."""
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+
+    def suspicion_timeout(self) -> float:
+        """Seconds a member stays suspect before it is declared dead."""
+        n = max(len(self.members) + 1, 2)
+        return self.config.suspicion_multiplier * max(1.0, math.log10(n)) * self.config.protocol_period
+
+    def _notify(self, node_id: str, state: MemberState):
+        for callback in list(self.subscribers):
+            try:
+                callback(node_id, state)
+            except Exception as e:
+                logger.warning(f"Membership subscriber failed: {e}")
+
+    # ------------------------------------------------------------------
+    # Failure detection
+    # ------------------------------------------------------------------
+
+    def tick(self):
+        """Advance timers; call at least every ping_timeout / 2 seconds."""
+        now = self.clock()
+        probe = self._probe
+
+        if probe and not probe.acked and not probe.indirect_sent and now - probe.sent >= self.config.ping_timeout:
+            self._send_indirect(probe)
+
+        if now >= self._next_probe:
+            if probe and not probe.acked:
+                self._suspect(probe.target)
+            self._probe = None
+            self._start_probe(now)
+            self._next_probe = now + self.config.protocol_period
+            self._periods += 1
+            if self.config.push_pull_periods and self._periods % self.config.push_pull_periods == 0:
+                self._push_pull()
+
+        timeout = self.suspicion_timeout()
+        for member in list(self.members.values()):
+            if member.state == MemberState.SUSPECT and now - member.state_since >= timeout:
+                self._declare_dead(member)
+
+        # Forget relays whose ack never came
+        expired = [seq for seq, (_, _, sent) in self._relays.items()
+                   if now - sent > self.config.protocol_period]
+        for seq in expired:
+            del self._relays[seq]
+
+    def _push_pull(self):
+        # Anti-entropy: repairs members whose piggybacked updates ran out
+        # of retransmits before reaching everyone
+        alive = [m for m in self.members.values() if m.state != MemberState.DEAD]
+        if alive:
+            self._send(self.rng.choice(alive).node_id, {"type": "join", "members": self._state()})
+
+    def _state(self) -> List[dict]:
+        # Dead members are included so a restarted node learns it must refute
+        return [self._self_update()] + [self._member_update(member) for member in self.members.values()]
+
+    def _next_target(self) -> Optional[str]:
+        # Round-robin over a shuffled member list bounds time-to-first-probe
+        while self._probe_order:
+            node_id = self._probe_order.pop()
+            member = self.members.get(node_id)
+            if member is not None and member.state != MemberState.DEAD:
+                return node_id
+
+        self._probe_order = self.alive_members()
+        self.rng.shuffle(self._probe_order)
+        return self._probe_order.pop() if self._probe_order else None
+
+    def _start_probe(self, now: float):
+        target = self._next_target()
+        if target is None:
+            return
+        self._seq += 1
+        self._probe = _Probe(seq=self._seq, target=target, sent=now)
+        self.stats["probes"] += 1
+        self._send(target, {"type": "ping", "seq": self._seq})
+
+    def _send_indirect(self, probe: _Probe):
+        probe.indirect_sent = True
+        helpers = [m.node_id for m in self.members.values()
+                   if m.state == MemberState.ALIVE and m.node_id != probe.target]
+        for helper in self.rng.sample(helpers, min(self.config.indirect_checks, len(helpers))):
+            self.stats["indirect_probes"] += 1
+            self._send(helper, {"type": "ping_req", "seq": probe.seq, "target": probe.target})
+
+    def _suspect(self, node_id: str):
+        member = self.members.get(node_id)
+        if member is None or member.state != MemberState.ALIVE:
+            return
+        self._set_state(member, MemberState.SUSPECT)
+        self.stats["suspicions"] += 1
+        self._queue_update(self._member_update(member))
+
+    def _declare_dead(self, member: Member):
+        self._set_state(member, MemberState.DEAD)
+        self.stats["failures"] += 1
+        self._queue_update(self._member_update(member))
+
+    def _set_state(self, member: Member, state: MemberState):
+        if member.state == state:
+            return
+        member.state = state
+        member.state_since = self.clock()
+        self._notify(member.node_id, state)
+
+    # ------------------------------------------------------------------
+    # Messages
+    # ------------------------------------------------------------------
+
+    def receive(self, sender: str, message: dict):
+        """
+        Handle a protocol message.
+
+        Args:
+            sender: Node ID of the sender
+            message: Message dictionary
+        """
+        for update in message.get("updates", ()):
+            self._apply_update(update)
+
+        msg_type = message.get("type")
+        seq = message.get("seq")
+
+        if msg_type == "ping":
+            self._send(sender, {"type": "ack", "seq": seq})
+
+        elif msg_type == "ping_req":
+            self._seq += 1
+            self._relays[self._seq] = (sender, seq, self.clock())
+            self._send(message["target"], {"type": "ping", "seq": self._seq})
+
+        elif msg_type == "join":
+            for update in message.get("members", ()):
+                self._apply_update(update)
+            self._send(sender, {"type": "sync", "members": self._state()})
+
+        elif msg_type == "sync":
+            for update in message.get("members", ()):
+                self._apply_update(update)
+
+        elif msg_type == "ack":
+            relay = self._relays.pop(seq, None)
+            if relay is not None:
+                self._send(relay[0], {"type": "ack", "seq": relay[1]})
+            elif self._probe is not None and self._probe.seq == seq:
+                self._probe.acked = True
+
+    def _send(self, target: str, message: dict):
+        message["updates"] = self._piggyback()
+        self.stats["messages_sent"] += 1
+        try:
+            self.send(target, message)
+        except Exception as e:
+            # A lost message is indistinguishable from a slow peer
+            logger.debug(f"Send to {target} failed: {e}")
+
+    # ------------------------------------------------------------------
+    # Dissemination
+    # ------------------------------------------------------------------
+
+    def _self_update(self) -> dict:
+        return {"node": self.node_id, "inc": self.incarnation, "state": MemberState.ALIVE.value,
+                "addr": self.address}
+
+    @staticmethod
+    def _member_update(member: Member) -> dict:
+        return {"node": member.node_id, "inc": member.incarnation, "state": member.state.value,
+                "addr": member.address}
+
+    def _queue_update(self, update: dict):
+        # A newer update about a node supersedes any queued one
+        self._updates[update["node"]] = [update, 0]
+
+    def _piggyback(self) -> List[dict]:
+        if not self._updates:
+            return []
+        limit = math.ceil(self.config.retransmit_multiplier * math.log10(len(self.members) + 2))
+        chosen = sorted(self._updates.values(), key=lambda entry: entry[1])[:self.config.max_piggyback]
+
+        updates = []
+        for entry in chosen:
+            updates.append(entry[0])
+            entry[1] += 1
+            if entry[1] >= limit:
+                del self._updates[entry[0]["node"]]
+        return updates
+
+    def _apply_update(self, update: dict):
+        node_id, incarnation = update["node"], update["inc"]
+        state = MemberState(update["state"])
+
+        if node_id == self.node_id:
+            if state != MemberState.ALIVE and incarnation >= self.incarnation:
+                # Refute suspicion by bumping our incarnation
+                self.incarnation = incarnation + 1
+                self.stats["refutations"] += 1
+                self._queue_update(self._self_update())
+            return
+
+        member = self.members.get(node_id)
+        if member is None:
+            if state == MemberState.DEAD:
+                return
+            member = self.add_member(node_id, update.get("addr"), incarnation)
+            if state == MemberState.SUSPECT:
+                self._set_state(member, MemberState.SUSPECT)
+            self._queue_update(update)
+            return
+
+        if update.get("addr"):
+            member.address = update["addr"]
+
+        if state == MemberState.ALIVE:
+            if incarnation > member.incarnation:
+                member.incarnation = incarnation
+                self._set_state(member, MemberState.ALIVE)
+                self._queue_update(update)
+
+        elif state == MemberState.SUSPECT:
+            if member.state == MemberState.DEAD:
+                return
+            if (incarnation > member.incarnation or
+                    (incarnation == member.incarnation and member.state == MemberState.ALIVE)):
+                member.incarnation = incarnation
+                self._set_state(member, MemberState.SUSPECT)
+                self._queue_update(update)
+
+        elif state == MemberState.DEAD:
+            if member.state != MemberState.DEAD and incarnation >= member.incarnation:
+                member.incarnation = incarnation
+                self.stats["failures"] += 1
+                self._set_state(member, MemberState.DEAD)
+                self._queue_update(update)
+
+    # ------------------------------------------------------------------
+    # Transport
+    # ------------------------------------------------------------------
+
+    def attach(self, transport):
+        """
+        Exchange protocol messages over a ClusterTransport.
+
+        Peers are connected on demand using gossiped addresses; messages to
+        unreachable peers are dropped and surface as missed acks.
+
+        Args:
+            transport: ClusterTransport instance
+        """
+        transport.on(MSG_SWIM, lambda peer_id, body: self.receive(peer_id, body))
+
+        async def deliver(target: str, message: dict):
+            try:
+                member = self.members.get(target)
+                if target not in transport.channels and member is not None and member.address:
+                    await transport.connect(target, member.address)
+                await transport.send(target, MSG_SWIM, message)
+            except Exception as e:
+                logger.debug(f"Gossip to {target} failed: {e}")
+
+        self.send = lambda target, message: asyncio.ensure_future(deliver(target, message))
+
+    async def run(self, interval: Optional[float] = None):
+        """
+        Drive the protocol until cancelled.
+
+        Args:
+            interval: Tick interval (ping_timeout / 3 if None)
+        """
+        interval = interval or self.config.ping_timeout / 3
+        while True:
+            self.tick()
+            await asyncio.sleep(interval)
@@ -0,0 +1,617 @@
+#!/usr/bin/env python3
+"""
+QWAMOS Live Migration
+Phase XVI: Secure Cluster Mode
+
+Pre-copy live migration of running VMs between cluster nodes:
+- Source QEMU migrates to a local unix socket owned by this module
+- The stream is compressed and encrypted (per-connection session keys,
+  as in ClusterTransport) on its way to the target node
+- The target bridges it into a QEMU started with -incoming defer
+- Pre-copy iterations are tracked from query-migrate; when dirty pages
+  stop shrinking the downtime limit is raised, and a migration that
+  still does not converge is cancelled
+- Downtime, throughput and per-iteration progress are reported
+
+Control messages (prepare/finish/abort) travel over ClusterTransport;
+bulk data uses a dedicated stream connection so it never queues behind
+cluster traffic.
+
+Author: QWAMOS Project
+License: MIT
+"""
+
+import asyncio
+import logging
+import secrets
+import sys
+import time
+import zlib
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# Add cluster and hypervisor to path
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "hypervisor"))
+
+from cluster_transport import (
+    Address, SessionCipher, TransportError, negotiate_session, parse_address, read_frame, write_frame
+)
+from qmp_client import QMPClientPool, QMPConnection, QMPError
+
+logger = logging.getLogger("LiveMigration")
+
+MSG_MIGRATE_PREPARE = "migrate_prepare"
+MSG_MIGRATE_FINISH = "migrate_finish"
+MSG_MIGRATE_ABORT = "migrate_abort"
+
+STREAM_CHUNK = 256 * 1024
+ACTIVE_STATES = ("setup", "active", "pre-switchover", "device", "wait-unplug")
+
+# Target launcher: (vm_name, spec) -> QMP socket path of a QEMU started with -incoming defer
+Launcher = Callable[[str, Dict[str, Any]], Awaitable[str]]
+
+
+class MigrationError(Exception):
+    """Migration failed, was cancelled, or did not converge."""
+
+
+@dataclass
+class MigrationConfig:
+    """Pre-copy tuning."""
+    downtime_limit_ms: int = 300  # Initial switchover downtime budget
+    max_downtime_ms: int = 2000  # Ceiling when raising the budget for a stalled migration
+    max_bandwidth_mbps: Optional[int] = None  # QEMU send rate cap (None = unlimited)
+    auto_converge: bool = True  # Let QEMU throttle vCPUs that out-dirty the link
+    stall_iterations: int = 3  # Iterations without progress before escalating
+    max_iterations: int = 30  # Give up after this many pre-copy iterations
+    compression_level: int = 1  # zlib level for the stream (0 disables)
+    poll_interval: float = 0.1  # query-migrate polling period
+    timeout: float = 600.0  # Whole-migration timeout
+    finish_timeout: float = 90.0  # Wait for the target to confirm the switchover
+
+
+@dataclass
+class PrecopyIteration:
+    """Progress at the end of one dirty-page sync."""
+    iteration: int
+    elapsed_s: float
+    remaining_bytes: int
+    transferred_bytes: int
+    dirty_pages_rate: int  # Pages/s the guest is dirtying
+    mbps: float
+    downtime_limit_ms: int
+
+
+@dataclass
+class MigrationResult:
+    """Outcome and metrics of one migration."""
+    vm_name: str
+    source_node: str
+    target_node: str
+    status: str
+    total_time_ms: int = 0
+    downtime_ms: int = 0
+    setup_time_ms: int = 0
+    ram_transferred_bytes: int = 0
+    stream_raw_bytes: int = 0
+    stream_wire_bytes: int = 0
+    downtime_limit_ms: int = 0
+    iterations: List[PrecopyIteration] = field(default_factory=list)
+
+    @property
+    def compression_ratio(self) -> float:
+        return self.stream_raw_bytes / self.stream_wire_bytes if self.stream_wire_bytes else 1.0
+
+    @property
+    def throughput_mbps(self) -> float:
+        seconds = self.total_time_ms / 1000
+        return self.stream_raw_bytes * 8 / 1e6 / seconds if seconds else 0.0
+
+    def to_dict(self) -> Dict:
+        result = asdict(self)
+        result["compression_ratio"] = self.compression_ratio
+        result["throughput_mbps"] = self.throughput_mbps
+        return result
+
+
+class ConvergenceTracker:
+    """
+    Follows pre-copy progress from query-migrate RAM stats.
+
+    A new iteration starts whenever QEMU's dirty-sync-count increases.
+    An iteration that does not shrink the remaining bytes below the best
+    seen so far counts as a stall; after stall_iterations stalls the
+    tracker asks for a larger downtime budget, and once the budget is at
+    its ceiling (or max_iterations is reached) it asks to abort.
+    """
+
+    RAISE_DOWNTIME = "raise_downtime"
+    ABORT = "abort"
+
+    def __init__(self, config: MigrationConfig):
+        self.config = config
+        self.downtime_limit_ms = config.downtime_limit_ms
+        self.iterations: List[PrecopyIteration] = []
+        self._sync_count = 0
+        self._best_remaining: Optional[int] = None
+        self._stalls = 0
+
+    def observe(self, ram: Dict[str, Any], elapsed_s: float) -> Optional[str]:
+        """
+        Record a query-migrate sample.
+
+        Args:
+            ram: The "ram" member of query-migrate
+            elapsed_s: Seconds since the migration started
+
+        Returns:
+            None, RAISE_DOWNTIME or ABORT
+        """
+        sync_count = ram.get("dirty-sync-count", 0)
+        if sync_count <= self._sync_count:
+            return None
+        self._sync_count = sync_count
+
+        remaining = ram.get("remaining", 0)
+        self.iterations.append(PrecopyIteration(
+            iteration=sync_count,
+            elapsed_s=elapsed_s,
+            remaining_bytes=remaining,
+            transferred_bytes=ram.get("transferred", 0),
+            dirty_pages_rate=ram.get("dirty-pages-rate", 0),
+            mbps=ram.get("mbps", 0.0),
+            downtime_limit_ms=self.downtime_limit_ms,
+        ))
+
+        if self._best_remaining is None or remaining < self._best_remaining * 0.9:
+            self._best_remaining = remaining
+            self._stalls = 0
+        else:
+            self._stalls += 1
+
+        if sync_count >= self.config.max_iterations:
+            return self.ABORT
+        if self._stalls >= self.config.stall_iterations:
+            self._stalls = 0
+            if self.downtime_limit_ms >= self.config.max_downtime_ms:
+                return self.ABORT
+            self.downtime_limit_ms = min(self.downtime_limit_ms * 2, self.config.max_downtime_ms)
+            return self.RAISE_DOWNTIME
+        return None
+
+    @property
+    def converging(self) -> bool:
+        return self._stalls == 0
+
+
+# ----------------------------------------------------------------------
+# Encrypted, compressed stream
+# ----------------------------------------------------------------------
+
+async def send_stream(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                      cipher: SessionCipher, level: int = 1,
+                      stats: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+    """
+    Pump a plaintext stream into encrypted frames until EOF.
+
+    Chunks go through one zlib stream with a sync flush per frame, so
+    zero pages compress across chunk boundaries. An empty frame marks
+    the end of the stream.
+    """
+    stats = stats if stats is not None else {}
+    stats.setdefault("raw_bytes", 0)
+    stats.setdefault("wire_bytes", 0)
+    compressor = zlib.compressobj(level) if level > 0 else None
+
+    while True:
+        chunk = await reader.read(STREAM_CHUNK)
+        if not chunk:
+            break
+        stats["raw_bytes"] += len(chunk)
+        if compressor is not None:
+            chunk = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        frame = cipher.seal(chunk)
+        stats["wire_bytes"] += len(frame) + 4
+        write_frame(writer, frame)
+        await writer.drain()
+
+    frame = cipher.seal(b"")
+    stats["wire_bytes"] += len(frame) + 4
+    write_frame(writer, frame)
+    await writer.drain()
+    return stats
+
+
+async def receive_stream(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                         cipher: SessionCipher, compressed: bool = True,
+                         stats: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+    """Decrypt frames into a plaintext stream until the end-of-stream frame."""
+    stats = stats if stats is not None else {}
+    stats.setdefault("raw_bytes", 0)
+    stats.setdefault("wire_bytes", 0)
+    decompressor = zlib.decompressobj() if compressed else None
+
+    while True:
+        frame = await read_frame(reader)
+        stats["wire_bytes"] += len(frame) + 4
+        chunk = cipher.open(frame)
+        if not chunk:
+            break
+        if decompressor is not None:
+            chunk = decompressor.decompress(chunk)
+        stats["raw_bytes"] += len(chunk)
+        writer.write(chunk)
+        await writer.drain()
+    return stats
+
+
+async def _open(address: Address):
+    kind, target = parse_address(address)
+    if kind == "unix":
+        return await asyncio.open_unix_connection(target)
+    return await asyncio.open_connection(*target)
+
+
+async def _close_writer(writer: Optional[asyncio.StreamWriter]):
+    if writer is None:
+        return
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except (ConnectionError, OSError):
+        pass
+
+
+# ----------------------------------------------------------------------
+# Target side
+# ----------------------------------------------------------------------
+
+@dataclass
+class _Incoming:
+    vm_name: str
+    source_node: str
+    qmp: QMPConnection
+    incoming_path: Path
+    compressed: bool
+    stream_stats: Dict[str, int] = field(default_factory=dict)
+    stream_done: Optional[asyncio.Future] = None
+
+
+class MigrationTarget:
+    """
+    Accepts incoming migrations on a node.
+
+    Args:
+        transport: ClusterTransport for control messages
+        launcher: Coroutine starting QEMU with -incoming defer; returns its QMP socket path
+        stream_listen: Address for migration data connections
+        work_dir: Directory for per-migration unix sockets
+    """
+
+    def __init__(self, transport, launcher: Launcher, stream_listen: Address, work_dir: str):
+        self.transport = transport
+        self.launcher = launcher
+        self.stream_listen = stream_listen
+        self.work_dir = Path(work_dir)
+        self.sessions: Dict[str, _Incoming] = {}  # token -> session
+        self._server: Optional[asyncio.AbstractServer] = None
+
+        transport.on(MSG_MIGRATE_PREPARE, self._on_prepare)
+        transport.on(MSG_MIGRATE_FINISH, self._on_finish)
+        transport.on(MSG_MIGRATE_ABORT, self._on_abort)
+
+    async def start(self):
+        """Listen for migration data connections."""
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        kind, target = parse_address(self.stream_listen)
+        if kind == "unix":
+            Path(target).unlink(missing_ok=True)
+            self._server = await asyncio.start_unix_server(self._accept_stream, path=target)
+        else:
+            self._server = await asyncio.start_server(self._accept_stream, host=target[0], port=target[1])
+            if target[1] == 0:
+                self.stream_listen = (target[0], self._server.sockets[0].getsockname()[1])
+
+    async def close(self):
+        """Stop listening and abandon unfinished migrations."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for token in list(self.sessions):
+            await self._discard(token, quit_qemu=True)
+
+    async def _on_prepare(self, peer_id: str, body: Dict) -> Dict:
+        vm_name = body["vm_name"]
+        qmp = QMPConnection(Path(await self.launcher(vm_name, body.get("spec") or {})))
+        await qmp.connect()
+
+        token = secrets.token_hex(16)
+        incoming_path = self.work_dir / f"{vm_name}-{token[:8]}.incoming"
+        session = _Incoming(vm_name, peer_id, qmp, incoming_path, body.get("compressed", True))
+        session.stream_done = asyncio.get_running_loop().create_future()
+        self.sessions[token] = session
+
+        try:
+            if body.get("capabilities"):
+                await qmp.execute("migrate-set-capabilities", {"capabilities": body["capabilities"]})
+            await qmp.execute("migrate-incoming", {"uri": f"unix:{incoming_path}"})
+        except QMPError:
+            await self._discard(token, quit_qemu=True)
+            raise
+
+        stream = self.stream_listen
+        return {"token": token, "stream": list(stream) if isinstance(stream, tuple) else stream}
+
+    async def _accept_stream(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        qemu_writer = None
+        session = None
+        try:
+            cipher = await asyncio.wait_for(
+                negotiate_session(reader, writer, self.transport.cluster_key, initiator=False),
+                self.transport.handshake_timeout)
+            token = cipher.open(await read_frame(reader)).decode()
+            session = self.sessions.get(token)
+            if session is None:
+                raise TransportError("Unknown migration token")
+
+            _, qemu_writer = await asyncio.open_unix_connection(str(session.incoming_path))
+            await receive_stream(reader, qemu_writer, cipher, session.compressed, session.stream_stats)
+            if not session.stream_done.done():
+                session.stream_done.set_result(True)
+        except (TransportError, asyncio.TimeoutError, asyncio.IncompleteReadError,
+                ConnectionError, OSError, zlib.error) as e:
+            logger.warning(f"Migration stream failed: {e}")
+            if session is not None and not session.stream_done.done():
+                session.stream_done.set_exception(MigrationError(f"Stream failed: {e}"))
+        finally:
+            await _close_writer(qemu_writer)
+            await _close_writer(writer)
+
+    async def _on_finish(self, peer_id: str, body: Dict) -> Dict:
+        token = body["token"]
+        session = self.sessions.get(token)
+        if session is None:
+            raise MigrationError("Unknown migration token")
+
+        timeout = body.get("timeout", 60.0)
+        try:
+            await asyncio.wait_for(asyncio.shield(session.stream_done), timeout)
+            deadline = time.monotonic() + timeout
+            while True:
+                info = await session.qmp.execute("query-migrate")
+                status = info.get("status")
+                if status == "completed":
+                    break
+                if status == "failed" or time.monotonic() > deadline:
+                    raise MigrationError(f"Incoming migration of {session.vm_name} {status or 'timed out'}")
+                await asyncio.sleep(0.02)
+            run_state = (await session.qmp.execute("query-status")).get("status")
+        except BaseException:
+            await self._discard(token, quit_qemu=True)
+            raise
+
+        await self._discard(token, quit_qemu=False)
+        return {"status": run_state, "stream": session.stream_stats}
+
+    async def _on_abort(self, peer_id: str, body: Dict) -> Dict:
+        await self._discard(body["token"], quit_qemu=True)
+        return {"aborted": True}
+
+    async def _discard(self, token: str, quit_qemu: bool):
+        session = self.sessions.pop(token, None)
+        if session is None:
+            return
+        if quit_qemu:
+            try:
+                await session.qmp.execute("quit")
+            except QMPError:
+                pass
+        await session.qmp.close()
+        session.incoming_path.unlink(missing_ok=True)
+        if session.stream_done and not session.stream_done.done():
+            session.stream_done.cancel()
+
+
+# ----------------------------------------------------------------------
+# Source side
+# ----------------------------------------------------------------------
+
+class LiveMigrator:
+    """
+    Migrates local VMs to other nodes.
+
+    Args:
+        transport: ClusterTransport connected to the target nodes
+        qmp_pool: QMP connections to local VMs
+        work_dir: Directory for per-migration unix sockets
+        config: Pre-copy tuning
+    """
+
+    def __init__(self, transport, qmp_pool: QMPClientPool, work_dir: str,
+                 config: Optional[MigrationConfig] = None):
+        self.transport = transport
+        self.qmp_pool = qmp_pool
+        self.work_dir = Path(work_dir)
+        self.config = config or MigrationConfig()
+
+    def capabilities(self) -> List[Dict[str, Any]]:
+        """Migration capabilities set on both ends."""
+        return [{"capability": "events", "state": True},
+                {"capability": "auto-converge", "state": self.config.auto_converge}]
+
+    async def migrate(self, vm_name: str, target_node: str, spec: Optional[Dict] = None,
+                      quit_source: bool = True) -> MigrationResult:
+        """
+        Live-migrate a running VM.
+
+        Args:
+            vm_name: Local VM name
+            target_node: Target node ID
+            spec: VM definition passed to the target's launcher
+            quit_source: Stop the source QEMU after a successful switchover
+
+        Returns:
+            MigrationResult with downtime and throughput
+
+        Raises:
+            MigrationError: If the migration fails or does not converge; the
+                VM keeps running on the source (resumed if the failure came
+                after switchover). If the source can't be resumed, the
+                target is kept and the error says so.
+        """
+        config = self.config
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        result = MigrationResult(vm_name, self.transport.node_id, target_node, "setup",
+                                 downtime_limit_ms=config.downtime_limit_ms)
+
+        prepared = await self.transport.request(target_node, MSG_MIGRATE_PREPARE, {
+            "vm_name": vm_name, "spec": spec or {}, "capabilities": self.capabilities(),
+            "compressed": config.compression_level > 0,
+        }, timeout=60.0)
+        token = prepared["token"]
+        stream_address = prepared["stream"]
+        if isinstance(stream_address, list):
+            stream_address = tuple(stream_address)
+
+        local_path = self.work_dir / f"{vm_name}-{token[:8]}.outgoing"
+        local_path.unlink(missing_ok=True)
+        stream_stats: Dict[str, int] = {}
+        pumped = asyncio.get_running_loop().create_future()
+
+        async def pump(qemu_reader: asyncio.StreamReader, qemu_writer: asyncio.StreamWriter):
+            writer = None
+            try:
+                reader, writer = await _open(stream_address)
+                cipher = await asyncio.wait_for(
+                    negotiate_session(reader, writer, self.transport.cluster_key, initiator=True),
+                    self.transport.handshake_timeout)
+                write_frame(writer, cipher.seal(token.encode()))
+                await send_stream(qemu_reader, writer, cipher, config.compression_level, stream_stats)
+                if not pumped.done():
+                    pumped.set_result(True)
+            except (TransportError, asyncio.TimeoutError, asyncio.IncompleteReadError,
+                    ConnectionError, OSError) as e:
+                if not pumped.done():
+                    pumped.set_exception(MigrationError(f"Stream to {target_node} failed: {e}"))
+            finally:
+                await _close_writer(writer)
+                await _close_writer(qemu_writer)
+
+        server = await asyncio.start_unix_server(pump, path=str(local_path))
+        started = time.monotonic()
+        switched_over = False
+        try:
+            await self.qmp_pool.execute(vm_name, "migrate-set-capabilities",
+                                        {"capabilities": self.capabilities()})
+            parameters = {"downtime-limit": config.downtime_limit_ms}
+            if config.max_bandwidth_mbps:
+                parameters["max-bandwidth"] = config.max_bandwidth_mbps * 1000 * 1000 // 8
+            await self.qmp_pool.execute(vm_name, "migrate-set-parameters", parameters)
+            await self.qmp_pool.execute(vm_name, "migrate", {"uri": f"unix:{local_path}"})
+
+            info = await self._precopy(vm_name, result, started)
+            switched_over = True  # The source is now paused in postmigrate
+            await asyncio.wait_for(pumped, config.timeout)
+
+            finished = await self.transport.request(target_node, MSG_MIGRATE_FINISH,
+                                                    {"token": token}, timeout=config.finish_timeout)
+        except BaseException as e:
+            resumed = await self._cancel(vm_name, target_node, token, switched_over)
+            if not resumed and isinstance(e, Exception):
+                raise MigrationError(
+                    f"Migration of {vm_name} to {target_node} failed after switchover and the source "
+                    f"could not be resumed; the target was kept and its state is uncertain: {e}") from e
+            if isinstance(e, (QMPError, TransportError, asyncio.TimeoutError)):
+                raise MigrationError(f"Migration of {vm_name} to {target_node} failed: {e}") from e
+            raise
+        finally:
+            server.close()
+            await server.wait_closed()
+            local_path.unlink(missing_ok=True)
+
+        result.status = "completed"
+        result.total_time_ms = info.get("total-time", int((time.monotonic() - started) * 1000))
+        result.downtime_ms = info.get("downtime", 0)
+        result.setup_time_ms = info.get("setup-time", 0)
+        result.ram_transferred_bytes = info.get("ram", {}).get("transferred", 0)
+        result.stream_raw_bytes = stream_stats.get("raw_bytes", 0)
+        result.stream_wire_bytes = stream_stats.get("wire_bytes", 0)
+
+        if finished.get("status") != "running":
+            logger.warning(f"{vm_name} on {target_node} is {finished.get('status')} after migration")
+        if quit_source:
+            await self.qmp_pool.quit(vm_name)
+
+        logger.info(f"Migrated {vm_name} to {target_node}: downtime {result.downtime_ms} ms, "
+                    f"{len(result.iterations)} iterations, {result.throughput_mbps:.0f} Mbit/s, "
+                    f"compression {result.compression_ratio:.1f}x")
+        return result
+
+    async def _precopy(self, vm_name: str, result: MigrationResult, started: float) -> Dict:
+        """Poll query-migrate until completion, steering convergence."""
+        tracker = ConvergenceTracker(self.config)
+        result.iterations = tracker.iterations
+
+        while True:
+            info = await self.qmp_pool.execute(vm_name, "query-migrate")
+            status = info.get("status", "none")
+            result.status = status
+            elapsed = time.monotonic() - started
+
+            if status == "completed":
+                return info
+            if status in ("failed", "cancelled", "cancelling"):
+                raise MigrationError(f"Migration of {vm_name} {status}: {info.get('error-desc', '')}")
+            if elapsed > self.config.timeout:
+                raise MigrationError(f"Migration of {vm_name} timed out after {elapsed:.0f} s")
+
+            if status in ACTIVE_STATES and "ram" in info:
+                action = tracker.observe(info["ram"], elapsed)
+                if action == ConvergenceTracker.RAISE_DOWNTIME:
+                    logger.info(f"{vm_name} not converging; downtime limit -> {tracker.downtime_limit_ms} ms")
+                    await self.qmp_pool.execute(vm_name, "migrate-set-parameters",
+                                                {"downtime-limit": tracker.downtime_limit_ms})
+                    result.downtime_limit_ms = tracker.downtime_limit_ms
+                elif action == ConvergenceTracker.ABORT:
+                    raise MigrationError(
+                        f"Migration of {vm_name} did not converge after {len(tracker.iterations)} "
+                        f"iterations (downtime limit {tracker.downtime_limit_ms} ms)")
+
+            await asyncio.sleep(self.config.poll_interval)
+
+    async def _cancel(self, vm_name: str, target_node: str, token: str, switched_over: bool = False) -> bool:
+        """
+        Stop the outgoing migration and tear down the target side.
+
+        After switchover the source is paused in postmigrate, so it is
+        resumed before the target is aborted; if it can't be resumed the
+        target is left alone rather than stopping the VM on both nodes.
+
+        Returns:
+            False if the source could not be resumed (target kept)
+        """
+        if switched_over:
+            try:
+                await self.qmp_pool.execute(vm_name, "cont")
+            except QMPError as e:
+                logger.error(f"Could not resume {vm_name} after a failed switchover: {e}; "
+                             f"keeping the target on {target_node}")
+                return False
+        else:
+            try:
+                await self.qmp_pool.execute(vm_name, "migrate_cancel")
+            except QMPError as e:
+                logger.warning(f"migrate_cancel for {vm_name} failed: {e}")
+        try:
+            await self.transport.request(target_node, MSG_MIGRATE_ABORT, {"token": token}, timeout=10.0)
+        except TransportError as e:
+            logger.warning(f"Abort on {target_node} failed: {e}")
+        return True
+
+
+def incoming_qemu_args(qmp_socket: str) -> List[str]:
+    """QEMU arguments for a migration target controlled over QMP."""
+    return ["-qmp", f"unix:{qmp_socket},server=on,wait=off", "-incoming", "defer"]
@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+"""
+QWAMOS Cluster Placement Engine
+Phase XVI: Secure Cluster Mode
+
+Reservation-aware VM placement:
+- Per-node CPU / memory / storage reservations
+- Multi-dimensional best-fit (pack) and worst-fit (spread) bin packing
+- Label anti-affinity
+- Ordered free-capacity index so lookups stay O(log nodes)
+- Incremental rebalancing
+
+Author: QWAMOS Project
+License: MIT
+"""
+
+import bisect
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+
+class PlacementError(Exception):
+    """Raised when no node can host a VM."""
+
+
+@dataclass(frozen=True)
+class ResourceVector:
+    """Resources along every placement dimension."""
+    cpu: int = 0
+    memory_mb: int = 0
+    storage_gb: int = 0
+
+    def __add__(self, other: "ResourceVector") -> "ResourceVector":
+        return ResourceVector(self.cpu + other.cpu,
+                              self.memory_mb + other.memory_mb,
+                              self.storage_gb + other.storage_gb)
+
+    def __sub__(self, other: "ResourceVector") -> "ResourceVector":
+        return ResourceVector(self.cpu - other.cpu,
+                              self.memory_mb - other.memory_mb,
+                              self.storage_gb - other.storage_gb)
+
+    def as_tuple(self) -> Tuple[int, int, int]:
+        return (self.cpu, self.memory_mb, self.storage_gb)
+
+    def fits_in(self, other: "ResourceVector") -> bool:
+        """True if every dimension is <= the same dimension of other."""
+        return (self.cpu <= other.cpu and
+                self.memory_mb <= other.memory_mb and
+                self.storage_gb <= other.storage_gb)
+
+
+@dataclass
+class VMRequest:
+    """
+    Resources and labels a VM needs from its host.
+
+    anti_affinity lists label keys: two VMs that carry the same value for
+    such a key are never placed on the same node (e.g. labels
+    {"app": "db"} with anti_affinity ["app"] spreads database replicas).
+    """
+    vm_name: str
+    resources: ResourceVector
+    labels: Dict[str, str] = field(default_factory=dict)
+    anti_affinity: List[str] = field(default_factory=list)
+
+    def exclusive_labels(self) -> Set[Tuple[str, str]]:
+        """(key, value) pairs that must not share a node with this VM."""
+        return {(key, self.labels[key]) for key in self.anti_affinity if key in self.labels}
+
+
+@dataclass
+class NodeReservation:
+    """Capacity and reservations of one cluster node."""
+    node_id: str
+    capacity: ResourceVector
+    reserved: ResourceVector = field(default_factory=ResourceVector)
+    vms: Dict[str, VMRequest] = field(default_factory=dict)
+    labels: Counter = field(default_factory=Counter)
+    exclusive: Counter = field(default_factory=Counter)
+
+    @property
+    def free(self) -> ResourceVector:
+        return self.capacity - self.reserved
+
+    def can_host(self, request: VMRequest) -> bool:
+        """Check capacity and anti-affinity for a VM."""
+        if not request.resources.fits_in(self.free):
+            return False
+        if any(self.labels[pair] for pair in request.exclusive_labels()):
+            return False
+        return not any(self.exclusive[pair] for pair in request.labels.items())
+
+    def utilization(self) -> float:
+        """Dominant share: the highest reserved fraction over all dimensions."""
+        return max((used / total for used, total in
+                    zip(self.reserved.as_tuple(), self.capacity.as_tuple()) if total > 0),
+                   default=1.0)
+
+    def _add(self, request: VMRequest):
+        self.vms[request.vm_name] = request
+        self.reserved = self.reserved + request.resources
+        self.labels.update(request.labels.items())
+        self.exclusive.update(request.exclusive_labels())
+
+    def _remove(self, vm_name: str) -> VMRequest:
+        request = self.vms.pop(vm_name)
+        self.reserved = self.reserved - request.resources
+        self.labels.subtract(request.labels.items())
+        self.exclusive.subtract(request.exclusive_labels())
+        return request
+
+
+class PlacementEngine:
+    """
+    Multi-dimensional bin packing over cluster nodes.
+
+    Nodes are kept in a sorted index keyed by their normalised slack, the
+    smallest free fraction over all dimensions (each dimension is scaled by
+    the largest node's capacity). A node can only host a VM if its slack is
+    at least the VM's smallest normalised demand, so a bisect finds the
+    first viable candidate:
+
+    - best_fit scans upwards from there and takes the tightest node that
+      fits, packing VMs onto as few nodes as possible.
+    - worst_fit scans downwards from the node with the most slack,
+      spreading load.
+
+    Reserving or releasing a VM re-keys only its node.
+    """
+
+    BEST_FIT = "best_fit"
+    WORST_FIT = "worst_fit"
+
+    def __init__(self, fit: str = WORST_FIT):
+        """
+        Initialize placement engine.
+
+        Args:
+            fit: Default fit strategy (best_fit or worst_fit)
+        """
+        if fit not in (self.BEST_FIT, self.WORST_FIT):
+            raise ValueError(f"Unknown fit strategy: {fit}")
+
+        self.fit = fit
+        self.nodes: Dict[str, NodeReservation] = {}
+        self.assignments: Dict[str, str] = {}  # vm_name -> node_id
+
+        self._scale: Tuple[int, int, int] = (0, 0, 0)
+        self._index: List[Tuple[float, str]] = []
+        self._keys: Dict[str, Tuple[float, str]] = {}
+
+        self.stats = {"placements": 0, "candidates_scanned": 0, "failures": 0}
+
+    # ------------------------------------------------------------------
+    # Nodes
+    # ------------------------------------------------------------------
+
+    def add_node(self, node_id: str, capacity: ResourceVector) -> NodeReservation:
+        """
+        Add a node, or update the capacity of a known node.
+
+        Existing reservations are kept, even if the new capacity no longer
+        covers them.
+
+        Args:
+            node_id: Node ID
+            capacity: Total schedulable resources
+
+        Returns:
+            NodeReservation for the node
+        """
+        node = self.nodes.get(node_id)
+        if node is None:
+            node = NodeReservation(node_id=node_id, capacity=capacity)
+            self.nodes[node_id] = node
+        else:
+            node.capacity = capacity
+
+        scale = tuple(max(a, b) for a, b in zip(self._scale, capacity.as_tuple()))
+        if scale != self._scale:
+            self._scale = scale
+            self._rebuild_index()
+        else:
+            self._reindex(node)
+
+        return node
+
+    def remove_node(self, node_id: str) -> List[VMRequest]:
+        """
+        Remove a node and drop its reservations.
+
+        Args:
+            node_id: Node ID
+
+        Returns:
+            Requests of the VMs that were on the node, for re-placement
+        """
+        node = self.nodes.pop(node_id, None)
+        if node is None:
+            return []
+
+        self._unindex(node_id)
+        for vm_name in node.vms:
+            self.assignments.pop(vm_name, None)
+
+        return list(node.vms.values())
+
+    # ------------------------------------------------------------------
+    # Placement
+    # ------------------------------------------------------------------
+
+    def place(self, request: VMRequest, fit: Optional[str] = None,
+              node_filter: Optional[Callable[[str], bool]] = None) -> str:
+        """
+        Reserve resources for a VM on the best node.
+
+        A VM that is already placed is released first.
+
+        Args:
+            request: VM requirements
+            fit: best_fit or worst_fit (engine default if None)
+            node_filter: Optional predicate; nodes it rejects are skipped
+
+        Returns:
+            Node ID the VM was placed on
+
+        Raises:
+            PlacementError: If no node can host the VM
+        """
+        previous = self.release(request.vm_name)
+
+        node_id = self.find_node(request, fit, node_filter)
+        if node_id is None:
+            self.stats["failures"] += 1
+            if previous is not None:
+                self._assign(previous[0], self.nodes[previous[1]])
+            raise PlacementError(f"No node can host {request.vm_name} "
+                                 f"(cpu={request.resources.cpu}, "
+                                 f"memory={request.resources.memory_mb}MB, "
+                                 f"storage={request.resources.storage_gb}GB)")
+
+        self._assign(request, self.nodes[node_id])
+        self.stats["placements"] += 1
+        return node_id
+
+    def find_node(self, request: VMRequest, fit: Optional[str] = None,
+                  node_filter: Optional[Callable[[str], bool]] = None) -> Optional[str]:
+        """
+        Find a node for a VM without reserving anything.
+
+        Args:
+            request: VM requirements
+            fit: best_fit or worst_fit (engine default if None)
+            node_filter: Optional predicate; nodes it rejects are skipped
+
+        Returns:
+            Node ID, or None if no node fits
+        """
+        for node_id in self._candidates(request, fit or self.fit):
+            self.stats["candidates_scanned"] += 1
+            if node_filter is not None and not node_filter(node_id):
+                continue
+            if self.nodes[node_id].can_host(request):
+                return node_id
+        return None
+
+    def reserve(self, request: VMRequest, node_id: str):
+        """
+        Reserve resources for a VM on a specific node.
+
+        Args:
+            request: VM requirements
+            node_id: Target node ID
+
+        Raises:
+            PlacementError: If the node is unknown or cannot host the VM
+        """
+        node = self.nodes.get(node_id)
+        if node is None:
+            raise PlacementError(f"Unknown node {node_id}")
+
+        previous = self.release(request.vm_name)
+        if not node.can_host(request):
+            if previous is not None:
+                self._assign(previous[0], self.nodes[previous[1]])
+            raise PlacementError(f"Node {node_id} cannot host {request.vm_name}")
+
+        self._assign(request, node)
+
+    def release(self, vm_name: str) -> Optional[Tuple[VMRequest, str]]:
+        """
+        Release a VM's reservation.
+
+        Args:
+            vm_name: VM name
+
+        Returns:
+            (request, node_id) of the released reservation, or None
+        """
+        node_id = self.assignments.pop(vm_name, None)
+        if node_id is None:
+            return None
+
+        node = self.nodes[node_id]
+        request = node._remove(vm_name)
+        self._reindex(node)
+        return request, node_id
+
+    def move(self, vm_name: str, node_id: str) -> bool:
+        """
+        Move a VM's reservation to another node.
+
+        Args:
+            vm_name: VM name
+            node_id: Target node ID
+
+        Returns:
+            True if moved, False if the target cannot host the VM
+        """
+        source = self.assignments.get(vm_name)
+        if source is None or node_id not in self.nodes:
+            return False
+        if source == node_id:
+            return True
+
+        try:
+            self.reserve(self.nodes[source].vms[vm_name], node_id)
+        except PlacementError:
+            return False
+        return True
+
+    def rebalance(self, threshold: float = 0.2, max_moves: Optional[int] = None,
+                  node_filter: Optional[Callable[[str], bool]] = None) -> List[Tuple[str, str, str]]:
+        """
+        Move VMs off the most utilised node until the spread of dominant
+        shares drops below threshold or no move helps.
+
+        A VM only moves to a node that stays less busy than the source was,
+        so placements that are already balanced stay put.
+
+        Args:
+            threshold: Allowed utilisation spread (0.0-1.0)
+            max_moves: Upper bound on moves (number of VMs if None)
+            node_filter: Optional predicate; nodes it rejects are ignored
+
+        Returns:
+            List of (vm_name, source_node_id, target_node_id)
+        """
+        if max_moves is None:
+            max_moves = len(self.assignments)
+
+        moves = []
+        while len(moves) < max_moves:
+            nodes = sorted((node for node in self.nodes.values()
+                            if node_filter is None or node_filter(node.node_id)),
+                           key=lambda n: (n.utilization(), n.node_id))
+            if len(nodes) < 2:
+                break
+
+            busiest = nodes[-1]
+            before = busiest.utilization()
+            move = self._find_move(busiest, [node for node in nodes[:-1]
+                                             if before - node.utilization() >= threshold])
+            if move is None:
+                break
+
+            request, target = move
+            self.reserve(request, target.node_id)
+            moves.append((request.vm_name, busiest.node_id, target.node_id))
+
+        return moves
+
+    @staticmethod
+    def _find_move(source: NodeReservation,
+                   targets: List[NodeReservation]) -> Optional[Tuple[VMRequest, NodeReservation]]:
+        """
+        Find the smallest VM on source that a target (least utilised first)
+        can take without ending up at least as busy as source was.
+        """
+        before = source.utilization()
+        requests = sorted(source.vms.values(), key=lambda r: (r.resources.as_tuple(), r.vm_name))
+
+        for target in targets:
+            for request in requests:
+                if not target.can_host(request):
+                    continue
+                after = NodeReservation(target.node_id, target.capacity,
+                                        target.reserved + request.resources)
+                if after.utilization() < before:
+                    return request, target
+        return None
+
+    def utilization(self) -> Dict[str, float]:
+        """
+        Get dominant-share utilisation per node.
+
+        Returns:
+            Dictionary of node_id -> utilisation (0.0-1.0)
+        """
+        return {node_id: node.utilization() for node_id, node in self.nodes.items()}
+
+    # ------------------------------------------------------------------
+    # Index
+    # ------------------------------------------------------------------
+
+    def _assign(self, request: VMRequest, node: NodeReservation):
+        node._add(request)
+        self.assignments[request.vm_name] = node.node_id
+        self._reindex(node)
+
+    def _slack(self, resources: ResourceVector) -> float:
+        """
+        Smallest normalised value over all dimensions.
+
+        For free capacity this is the node's index key; for a request it
+        is a lower bound on the key of any node that can host it.
+        """
+        return min((value / scale for value, scale in zip(resources.as_tuple(), self._scale) if scale > 0),
+                   default=0.0)
+
+    def _candidates(self, request: VMRequest, fit: str) -> Iterator[str]:
+        """Yield node IDs in preference order, skipping nodes that cannot fit."""
+        index = self._index
+        start = bisect.bisect_left(index, (self._slack(request.resources), ""))
+
+        if fit == self.BEST_FIT:
+            for position in range(start, len(index)):
+                yield index[position][1]
+        elif fit == self.WORST_FIT:
+            for position in range(len(index) - 1, start - 1, -1):
+                yield index[position][1]
+        else:
+            raise ValueError(f"Unknown fit strategy: {fit}")
+
+    def _unindex(self, node_id: str):
+        key = self._keys.pop(node_id, None)
+        if key is not None:
+            del self._index[bisect.bisect_left(self._index, key)]
+
+    def _reindex(self, node: NodeReservation):
+        self._unindex(node.node_id)
+        key = (self._slack(node.free), node.node_id)
+        self._keys[node.node_id] = key
+        bisect.insort(self._index, key)
+
+    def _rebuild_index(self):
+        self._keys = {node_id: (self._slack(node.free), node_id) for node_id, node in self.nodes.items()}
+        self._index = sorted(self._keys.values())
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+QWAMOS Cluster Transport Benchmark
+Phase XVI: Secure Cluster Mode
+
+Measures message rates between two local ClusterTransport nodes:
+- one-way: pipelined one-way messages (batched into frames)
+- request: concurrent request/response round trips
+- handshake: new connections per second (key negotiation cost)
+
+Usage:
+    python cluster/transport_benchmark.py [--messages 100000] [--tcp]
+
+Author: QWAMOS Project
+License: MIT
+"""
+
+import argparse
+import asyncio
+import json
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict
+
+# Add cluster to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from cluster_transport import ClusterTransport
+
+CLUSTER_KEY = b"qwamos-benchmark-cluster-key"
+
+
+async def _pair(use_tcp: bool, socket_dir: Path):
+    if use_tcp:
+        server = ClusterTransport("node-b", CLUSTER_KEY, ("127.0.0.1", 0))
+    else:
+        server = ClusterTransport("node-b", CLUSTER_KEY, f"unix:{socket_dir / 'node-b.sock'}")
+    await server.start()
+    client = ClusterTransport("node-a", CLUSTER_KEY)
+    return client, server
+
+
+async def bench_one_way(client: ClusterTransport, server: ClusterTransport,
+                        messages: int, payload: Dict) -> Dict:
+    """Pipelined one-way messages."""
+    done = asyncio.Event()
+    received = [0]
+
+    def handler(peer_id, body):
+        received[0] += 1
+        if received[0] == messages:
+            done.set()
+
+    server.on("bench", handler)
+    channel = client.channels["node-b"]
+    frames_before = channel.stats["frames_sent"]
+
+    start = time.perf_counter()
+    for i in range(messages):
+        channel.send("bench", payload)
+        if i % 1000 == 999:
+            await asyncio.sleep(0)
+    await done.wait()
+    elapsed = time.perf_counter() - start
+
+    frames = channel.stats["frames_sent"] - frames_before
+    return {"messages": messages, "elapsed_s": elapsed, "rate": messages / elapsed,
+            "messages_per_frame": messages / max(frames, 1)}
+
+
+async def bench_requests(client: ClusterTransport, server: ClusterTransport,
+                         requests: int, concurrency: int, payload: Dict) -> Dict:
+    """Concurrent request/response round trips."""
+    server.on("echo", lambda peer_id, body: body)
+    latencies = []
+
+    async def worker(count: int):
+        for _ in range(count):
+            sent = time.perf_counter()
+            await client.request("node-b", "echo", payload)
+            latencies.append(time.perf_counter() - sent)
+
+    per_worker = requests // concurrency
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(per_worker) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    total = per_worker * concurrency
+    return {"requests": total, "concurrency": concurrency, "elapsed_s": elapsed,
+            "rate": total / elapsed,
+            "p50_ms": latencies[len(latencies) // 2] * 1000,
+            "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000}
+
+
+async def bench_handshakes(server: ClusterTransport, address, count: int) -> Dict:
+    """New connections per second."""
+    start = time.perf_counter()
+    for i in range(count):
+        client = ClusterTransport(f"node-h{i}", CLUSTER_KEY)
+        await client.connect("node-b", address)
+        await client.close()
+    elapsed = time.perf_counter() - start
+    return {"handshakes": count, "elapsed_s": elapsed, "rate": count / elapsed}
+
+
+async def run_benchmark(messages: int = 100000, requests: int = 20000, concurrency: int = 64,
+                        handshakes: int = 50, use_tcp: bool = False) -> Dict[str, Dict]:
+    """
+    Run every transport benchmark.
+
+    Args:
+        messages: One-way messages to send
+        requests: Request/response round trips
+        concurrency: Concurrent outstanding requests
+        handshakes: New connections to open
+        use_tcp: Use TCP on 127.0.0.1 instead of a unix socket
+
+    Returns:
+        Results per benchmark
+    """
+    socket_dir = Path(tempfile.mkdtemp(prefix="qwamos-transport-"))
+    client, server = await _pair(use_tcp, socket_dir)
+    address = server.listen
+    payload = {"node_id": "node-a", "timestamp": time.time(), "status": "online",
+               "resources": {"cpu_cores": 8, "memory_mb": 8192, "storage_gb": 128}}
+
+    try:
+        await client.connect("node-b", address)
+        return {
+            "one_way": await bench_one_way(client, server, messages, payload),
+            "request": await bench_requests(client, server, requests, concurrency, payload),
+            "handshake": await bench_handshakes(server, address, handshakes),
+        }
+    finally:
+        await client.close()
+        await server.close()
+        shutil.rmtree(socket_dir, ignore_errors=True)
+
+
+def main():
+    """Run benchmark and print results."""
+    parser = argparse.ArgumentParser(description="QWAMOS cluster transport benchmark")
+    parser.add_argument("--messages", type=int, default=100000, help="One-way messages")
+    parser.add_argument("--requests", type=int, default=20000, help="Request/response round trips")
+    parser.add_argument("--concurrency", type=int, default=64, help="Outstanding requests")
+    parser.add_argument("--handshakes", type=int, default=50, help="New connections")
+    parser.add_argument("--tcp", action="store_true", help="Use TCP on 127.0.0.1")
+    parser.add_argument("--json", action="store_true", help="Print raw JSON results")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmark(args.messages, args.requests, args.concurrency,
+                                        args.handshakes, args.tcp))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    one_way, request, handshake = results["one_way"], results["request"], results["handshake"]
+    print("=" * 70)
+    print(f"QWAMOS Cluster Transport Benchmark ({'tcp' if args.tcp else 'unix'})")
+    print("=" * 70)
+    print(f"One-way:    {one_way['rate']:>10,.0f} msg/s  "
+          f"({one_way['messages_per_frame']:.0f} messages/frame)")
+    print(f"Request:    {request['rate']:>10,.0f} req/s  "
+          f"(p50 {request['p50_ms']:.2f} ms, p99 {request['p99_ms']:.2f} ms, "
+          f"{request['concurrency']} in flight)")
+    print(f"Handshake:  {handshake['rate']:>10,.0f} conn/s")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
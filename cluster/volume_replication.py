@@ -0,0 +1,567 @@
+#!/usr/bin/env python3
+"""
+QWAMOS Volume Replication
+Phase XVI: Secure Cluster Mode
+
+Delta replication of PQC volumes between cluster nodes:
+- Per-block BLAKE3 hashes of the on-disk ciphertext slots form a Merkle tree
+- Nodes compare trees level by level, one round trip per level, so
+  differing ranges are found in O(log n) round trips
+- Only changed ciphertext slots are streamed, never plaintext; replicas
+  share the volume key, so slots are copied verbatim
+- Block batches are compressed and pipelined over ClusterTransport
+- A checkpoint next to the target volume lets an interrupted transfer
+  resume without re-walking the tree
+
+Blocks arriving on the target are checked against the source's leaf
+hashes, and the finished replica's root must equal the source root.
+
+Author: QWAMOS Project
+License: MIT
+"""
+
+import asyncio
+import base64
+import json
+import logging
+import os
+import struct
+import sys
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Add storage and crypto to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "storage"))
+sys.path.insert(0, str(Path(__file__).parent.parent / "crypto"))
+
+from pqc_volume import HEADER_SIZE, SLOT_SIZE
+from blake3_hasher import hash_data
+
+logger = logging.getLogger("VolumeReplication")
+
+MSG_REPL_TREE = "repl_tree"
+MSG_REPL_BLOCKS = "repl_blocks"
+MSG_REPL_PULL = "repl_pull"
+
+DEFAULT_FANOUT = 16
+LEAF_CACHE_MAGIC = b"QWMRKL01"
+LEAF_CACHE_HEADER = struct.Struct("<8sQQI")  # magic, file size, mtime_ns, leaf count
+HASH_SIZE = 32
+
+
+class ReplicationError(Exception):
+    """Replication failed or the replica does not match the source."""
+
+
+# ----------------------------------------------------------------------
+# Merkle tree over ciphertext slots
+# ----------------------------------------------------------------------
+
+class MerkleTree:
+    """
+    Fixed-fanout hash tree over block hashes.
+
+    levels[0] holds the leaves, levels[-1] holds the root.
+
+    Args:
+        leaves: Per-block hashes
+        fanout: Children per interior node
+    """
+
+    def __init__(self, leaves: Iterable[bytes], fanout: int = DEFAULT_FANOUT):
+        if fanout < 2:
+            raise ValueError("Fanout must be at least 2")
+        self.fanout = fanout
+        self.levels: List[List[bytes]] = [list(leaves)]
+        if not self.levels[0]:
+            self.levels[0].append(hash_data(b""))
+        while len(self.levels[-1]) > 1:
+            below = self.levels[-1]
+            self.levels.append([self._parent(below, i) for i in range(0, len(below), fanout)])
+
+    @property
+    def root(self) -> bytes:
+        return self.levels[-1][0]
+
+    @property
+    def leaves(self) -> List[bytes]:
+        return self.levels[0]
+
+    @property
+    def depth(self) -> int:
+        return len(self.levels)
+
+    def children(self, level: int, index: int) -> List[bytes]:
+        """Hashes of the children of node `index` at `level` (level >= 1)."""
+        start = index * self.fanout
+        return self.levels[level - 1][start:start + self.fanout]
+
+    def update(self, changes: Dict[int, bytes]):
+        """
+        Replace leaves and recompute only the affected paths.
+
+        Args:
+            changes: block index -> new leaf hash
+        """
+        dirty = set()
+        for index, leaf in changes.items():
+            self.levels[0][index] = leaf
+            dirty.add(index // self.fanout)
+        for level in range(1, self.depth):
+            below = self.levels[level - 1]
+            for index in dirty:
+                self.levels[level][index] = self._parent(below, index * self.fanout)
+            dirty = {index // self.fanout for index in dirty}
+
+    def _parent(self, below: List[bytes], start: int) -> bytes:
+        return hash_data(b"".join(below[start:start + self.fanout]))
+
+
+def volume_blocks(path: Path) -> int:
+    """Number of block slots in a volume file."""
+    return max(0, (path.stat().st_size - HEADER_SIZE) // SLOT_SIZE)
+
+
+def hash_slots(path: Path, start: int = 0, count: Optional[int] = None,
+               chunk_slots: int = 256) -> List[bytes]:
+    """
+    Hash ciphertext slots of a volume file.
+
+    Args:
+        path: Volume file
+        start: First block index
+        count: Number of blocks (default: to end of volume)
+        chunk_slots: Slots read per I/O
+
+    Returns:
+        One hash per slot
+    """
+    if count is None:
+        count = volume_blocks(path) - start
+    leaves = []
+    with open(path, "rb") as f:
+        f.seek(HEADER_SIZE + start * SLOT_SIZE)
+        remaining = count
+        while remaining > 0:
+            n = min(chunk_slots, remaining)
+            data = f.read(n * SLOT_SIZE).ljust(n * SLOT_SIZE, b"\x00")
+            leaves.extend(hash_data(data[i:i + SLOT_SIZE]) for i in range(0, len(data), SLOT_SIZE))
+            remaining -= n
+    return leaves
+
+
+def _leaf_cache_path(path: Path) -> Path:
+    return path.with_name(path.name + ".merkle")
+
+
+def load_leaves(path: Path) -> List[bytes]:
+    """
+    Leaf hashes for a volume, reusing the .merkle sidecar while the
+    volume's size and mtime are unchanged.
+    """
+    path = Path(path)
+    stat = path.stat()
+    cache = _leaf_cache_path(path)
+    try:
+        with open(cache, "rb") as f:
+            magic, size, mtime_ns, count = LEAF_CACHE_HEADER.unpack(f.read(LEAF_CACHE_HEADER.size))
+            if (magic, size, mtime_ns) == (LEAF_CACHE_MAGIC, stat.st_size, stat.st_mtime_ns):
+                data = f.read(count * HASH_SIZE)
+                if len(data) == count * HASH_SIZE:
+                    return [data[i:i + HASH_SIZE] for i in range(0, len(data), HASH_SIZE)]
+    except (OSError, struct.error):
+        pass
+
+    leaves = hash_slots(path)
+    save_leaves(path, leaves)
+    return leaves
+
+
+def save_leaves(path: Path, leaves: List[bytes]):
+    """Write the .merkle sidecar for the volume's current size and mtime."""
+    path = Path(path)
+    stat = path.stat()
+    cache = _leaf_cache_path(path)
+    tmp = cache.with_name(cache.name + ".tmp")
+    try:
+        with open(tmp, "wb") as f:
+            f.write(LEAF_CACHE_HEADER.pack(LEAF_CACHE_MAGIC, stat.st_size, stat.st_mtime_ns, len(leaves)))
+            f.write(b"".join(leaves))
+        os.replace(tmp, cache)
+    except OSError as e:
+        logger.warning(f"Could not write leaf cache {cache}: {e}")
+
+
+# ----------------------------------------------------------------------
+# Wire encoding
+# ----------------------------------------------------------------------
+
+def _encode_blocks(data: bytes, level: int) -> Tuple[str, str]:
+    """Compress when it helps; ciphertext mostly doesn't, sparse slots do."""
+    if level > 0:
+        packed = zlib.compress(data, level)
+        if len(packed) < len(data):
+            return "zlib", base64.b64encode(packed).decode()
+    return "raw", base64.b64encode(data).decode()
+
+
+def _decode_blocks(codec: str, payload: str) -> bytes:
+    data = base64.b64decode(payload)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    if codec == "raw":
+        return data
+    raise ReplicationError(f"Unknown block codec: {codec}")
+
+
+def _coalesce(blocks: Iterable[int], max_len: int) -> List[Tuple[int, int]]:
+    """Sorted block indexes -> (start, count) ranges of at most max_len blocks."""
+    ranges: List[Tuple[int, int]] = []
+    for index in sorted(blocks):
+        if ranges and ranges[-1][0] + ranges[-1][1] == index and ranges[-1][1] < max_len:
+            ranges[-1] = (ranges[-1][0], ranges[-1][1] + 1)
+        else:
+            ranges.append((index, 1))
+    return ranges
+
+
+# ----------------------------------------------------------------------
+# Source side
+# ----------------------------------------------------------------------
+
+class ReplicationSource:
+    """
+    Serves Merkle tree levels and ciphertext blocks for local volumes.
+
+    Trees are pinned by root for the duration of a transfer: a request
+    naming a root the source no longer has fails, and the target starts
+    over against the new tree.
+
+    Args:
+        transport: ClusterTransport to serve on
+        volumes: volume name -> volume file path
+        fanout: Merkle tree fanout
+        compression: zlib level for block batches (0 disables)
+    """
+
+    def __init__(self, transport, volumes: Optional[Dict[str, str]] = None,
+                 fanout: int = DEFAULT_FANOUT, compression: int = 1):
+        self.transport = transport
+        self.fanout = fanout
+        self.compression = compression
+        self.volumes: Dict[str, Path] = {}
+        self._trees: Dict[str, Dict[bytes, MerkleTree]] = {}  # volume -> root -> tree
+        self.stats = {"tree_requests": 0, "block_requests": 0, "blocks_sent": 0, "bytes_sent": 0}
+
+        for name, path in (volumes or {}).items():
+            self.add_volume(name, path)
+
+        transport.on(MSG_REPL_TREE, self._on_tree)
+        transport.on(MSG_REPL_BLOCKS, self._on_blocks)
+
+    def add_volume(self, name: str, path: str):
+        """Export a volume for replication."""
+        self.volumes[name] = Path(path)
+        self._trees.pop(name, None)
+
+    def tree(self, name: str) -> MerkleTree:
+        """Current tree for a volume (leaf hashes cached on disk)."""
+        if name not in self.volumes:
+            raise ReplicationError(f"Unknown volume: {name}")
+        tree = MerkleTree(load_leaves(self.volumes[name]), self.fanout)
+
+        # Keep the previous tree so transfers that started on it can finish
+        pinned = self._trees.setdefault(name, {})
+        if tree.root not in pinned:
+            while len(pinned) >= 2:
+                pinned.pop(next(iter(pinned)))
+            pinned[tree.root] = tree
+        return pinned[tree.root]
+
+    async def push(self, peer_id: str, name: str, timeout: Optional[float] = None) -> Dict:
+        """
+        Ask a peer to pull a volume from this node.
+
+        Returns:
+            The peer's replication stats
+        """
+        return await self.transport.request(peer_id, MSG_REPL_PULL,
+                                            {"volume": name, "source": self.transport.node_id},
+                                            timeout=timeout)
+
+    def _pinned(self, name: str, root_hex: str) -> MerkleTree:
+        tree = self._trees.get(name, {}).get(bytes.fromhex(root_hex))
+        if tree is None:
+            raise ReplicationError(f"Volume {name} changed during replication")
+        return tree
+
+    async def _on_tree(self, peer_id: str, body: Dict) -> Dict:
+        self.stats["tree_requests"] += 1
+        name = body["volume"]
+
+        if "nodes" not in body:
+            tree = await asyncio.to_thread(self.tree, name)
+            with open(self.volumes[name], "rb") as f:
+                header = f.read(HEADER_SIZE)
+            return {"root": tree.root.hex(), "depth": tree.depth, "fanout": tree.fanout,
+                    "total_blocks": len(tree.leaves), "header": base64.b64encode(header).decode()}
+
+        tree = self._pinned(name, body["root"])
+        level = body["level"]
+        return {"hashes": [b"".join(tree.children(level, index)).hex() for index in body["nodes"]]}
+
+    async def _on_blocks(self, peer_id: str, body: Dict) -> Dict:
+        self.stats["block_requests"] += 1
+        name, blocks = body["volume"], body["blocks"]
+        if name not in self.volumes:
+            raise ReplicationError(f"Unknown volume: {name}")
+
+        def read():
+            # One read per contiguous run of requested blocks
+            chunks = []
+            with open(self.volumes[name], "rb") as f:
+                for start, count in _coalesce(blocks, len(blocks)):
+                    f.seek(HEADER_SIZE + start * SLOT_SIZE)
+                    chunks.append(f.read(count * SLOT_SIZE).ljust(count * SLOT_SIZE, b"\x00"))
+            return _encode_blocks(b"".join(chunks), self.compression)
+
+        codec, payload = await asyncio.to_thread(read)
+        self.stats["blocks_sent"] += len(blocks)
+        self.stats["bytes_sent"] += len(payload)
+        return {"codec": codec, "data": payload}
+
+
+# ----------------------------------------------------------------------
+# Target side
+# ----------------------------------------------------------------------
+
+class ReplicationCheckpoint:
+    """
+    Transfer progress persisted next to the target volume.
+
+    Records the source root being copied and the blocks still missing
+    with their expected hashes, so a restarted transfer skips the tree
+    walk and fetches only what is left.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.source_root: Optional[str] = None
+        self.pending: Dict[int, bytes] = {}  # block -> expected leaf hash
+
+    def load(self, source_root: str) -> bool:
+        """Load the checkpoint if it was written for the same source root."""
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return False
+        if data.get("source_root") != source_root:
+            return False
+        self.source_root = source_root
+        self.pending = {int(block): bytes.fromhex(leaf) for block, leaf in data["pending"].items()}
+        return True
+
+    def save(self):
+        """Atomically write the checkpoint."""
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps({
+            "source_root": self.source_root,
+            "pending": {str(block): leaf.hex() for block, leaf in self.pending.items()},
+        }))
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        """Remove the checkpoint after a verified transfer."""
+        self.pending.clear()
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class VolumeReplicator:
+    """
+    Pulls volume deltas from a ReplicationSource.
+
+    Args:
+        transport: ClusterTransport connected to the source
+        volume_dir: Where replicas live (used for push requests)
+        batch_blocks: Blocks per transfer request
+        window: Block requests kept in flight
+        checkpoint_blocks: Blocks written between checkpoint saves
+        timeout: Per-request timeout in seconds
+    """
+
+    def __init__(self, transport, volume_dir: Optional[str] = None, batch_blocks: int = 64,
+                 window: int = 8, checkpoint_blocks: int = 2048, timeout: float = 30.0):
+        self.transport = transport
+        self.volume_dir = Path(volume_dir) if volume_dir else None
+        self.batch_blocks = batch_blocks
+        self.window = window
+        self.checkpoint_blocks = checkpoint_blocks
+        self.timeout = timeout
+
+        if self.volume_dir is not None:
+            transport.on(MSG_REPL_PULL, self._on_pull)
+
+    async def replicate(self, peer_id: str, name: str, target_path: str) -> Dict:
+        """
+        Bring a local replica up to date with the source's volume.
+
+        Args:
+            peer_id: Source node ID
+            name: Volume name on the source
+            target_path: Local replica path (created if missing)
+
+        Returns:
+            Transfer statistics
+
+        Raises:
+            ReplicationError: Geometry mismatch, source changed mid-transfer,
+                or the finished replica does not verify
+        """
+        started = time.perf_counter()
+        target_path = Path(target_path)
+        stats = {"volume": name, "round_trips": 0, "block_requests": 0, "blocks_total": 0,
+                 "blocks_changed": 0, "bytes_received": 0, "resumed": False}
+
+        summary = await self._request(peer_id, MSG_REPL_TREE, {"volume": name}, stats)
+        total, root = summary["total_blocks"], summary["root"]
+        stats["blocks_total"] = total
+        self._prepare(target_path, base64.b64decode(summary["header"]), total)
+
+        local = MerkleTree(await asyncio.to_thread(load_leaves, target_path), summary["fanout"])
+        if len(local.leaves) != total:
+            raise ReplicationError(f"Replica has {len(local.leaves)} blocks, source has {total}")
+
+        checkpoint = ReplicationCheckpoint(target_path.with_name(target_path.name + ".replckpt"))
+        if checkpoint.load(root):
+            stats["resumed"] = True
+        else:
+            checkpoint.source_root = root
+            checkpoint.pending = await self._diff(peer_id, name, summary, local, stats)
+            checkpoint.save()
+
+        stats["blocks_changed"] = len(checkpoint.pending)
+        await self._transfer(peer_id, name, target_path, local, checkpoint, stats)
+
+        await asyncio.to_thread(save_leaves, target_path, local.leaves)
+        if local.root.hex() != root:
+            raise ReplicationError(f"Replica root {local.root.hex()[:16]} != source {root[:16]}")
+        checkpoint.clear()
+
+        stats["elapsed_s"] = time.perf_counter() - started
+        stats["throughput_mb_s"] = stats["blocks_changed"] * SLOT_SIZE / 1e6 / max(stats["elapsed_s"], 1e-9)
+        logger.info(f"Replicated {name} from {peer_id}: {stats['blocks_changed']}/{total} blocks, "
+                    f"{stats['round_trips']} tree round trips, {stats['block_requests']} block requests")
+        return stats
+
+    async def _request(self, peer_id: str, msg_type: str, body: Dict, stats: Dict) -> Dict:
+        stats["round_trips"] += 1
+        return await self.transport.request(peer_id, msg_type, body, timeout=self.timeout)
+
+    @staticmethod
+    def _prepare(path: Path, header: bytes, total: int):
+        """Create the replica file, or refresh its header if it exists."""
+        size = HEADER_SIZE + total * SLOT_SIZE
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "wb") as f:
+                f.truncate(size)
+        elif path.stat().st_size != size:
+            raise ReplicationError(f"Replica {path} size differs from source geometry")
+
+        with open(path, "r+b") as f:
+            if f.read(HEADER_SIZE) != header:
+                f.seek(0)
+                f.write(header)
+
+    async def _diff(self, peer_id: str, name: str, summary: Dict, local: MerkleTree,
+                    stats: Dict) -> Dict[int, bytes]:
+        """Walk both trees top-down; returns differing blocks with source leaf hashes."""
+        root = summary["root"]
+        if local.root.hex() == root:
+            return {}
+        if local.depth != summary["depth"]:
+            raise ReplicationError("Tree depth differs from source")
+
+        differing = [0]
+        for level in range(local.depth - 1, 0, -1):
+            reply = await self._request(peer_id, MSG_REPL_TREE,
+                                        {"volume": name, "root": root, "level": level, "nodes": differing},
+                                        stats)
+            below = []
+            for index, remote_hex in zip(differing, reply["hashes"]):
+                remote = bytes.fromhex(remote_hex)
+                first = index * local.fanout
+                for offset, mine in enumerate(local.children(level, index)):
+                    theirs = remote[offset * HASH_SIZE:(offset + 1) * HASH_SIZE]
+                    if theirs != mine:
+                        below.append((first + offset, theirs))
+            if level == 1:
+                return dict(below)
+            differing = [index for index, _ in below]
+        return {}
+
+    async def _transfer(self, peer_id: str, name: str, path: Path, local: MerkleTree,
+                        checkpoint: ReplicationCheckpoint, stats: Dict):
+        """Fetch pending blocks in batches with up to `window` requests in flight."""
+        pending = sorted(checkpoint.pending)
+        batches = [pending[i:i + self.batch_blocks] for i in range(0, len(pending), self.batch_blocks)]
+        queue = iter(batches)
+        since_save = [0]
+        fd = os.open(path, os.O_RDWR)
+
+        def apply(blocks: List[int], data: bytes) -> Dict[int, bytes]:
+            if len(data) != len(blocks) * SLOT_SIZE:
+                raise ReplicationError(f"Short block batch at {blocks[0]}")
+            leaves = {}
+            for i, block in enumerate(blocks):
+                leaf = hash_data(data[i * SLOT_SIZE:(i + 1) * SLOT_SIZE])
+                if leaf != checkpoint.pending[block]:
+                    raise ReplicationError(f"Volume {name} changed during replication (block {block})")
+                leaves[block] = leaf
+            offset = 0
+            for start, count in _coalesce(blocks, len(blocks)):
+                os.pwrite(fd, data[offset:offset + count * SLOT_SIZE], HEADER_SIZE + start * SLOT_SIZE)
+                offset += count * SLOT_SIZE
+            return leaves
+
+        async def worker():
+            for blocks in queue:
+                stats["block_requests"] += 1
+                reply = await self.transport.request(peer_id, MSG_REPL_BLOCKS,
+                                                     {"volume": name, "blocks": blocks}, timeout=self.timeout)
+                stats["bytes_received"] += len(reply["data"])
+                data = _decode_blocks(reply["codec"], reply["data"])
+                leaves = await asyncio.to_thread(apply, blocks, data)
+
+                local.update(leaves)
+                for block in blocks:
+                    del checkpoint.pending[block]
+                since_save[0] += len(blocks)
+                if since_save[0] >= self.checkpoint_blocks:
+                    since_save[0] = 0
+                    await asyncio.to_thread(os.fsync, fd)
+                    checkpoint.save()
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(min(self.window, len(batches)))]
+        try:
+            await asyncio.gather(*workers)
+        except BaseException:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            raise
+        finally:
+            os.fsync(fd)
+            os.close(fd)
+            if checkpoint.pending:
+                checkpoint.save()
+
+    async def _on_pull(self, peer_id: str, body: Dict) -> Dict:
+        name = body["volume"]
+        return await self.replicate(body.get("source", peer_id), name,
+                                    str(self.volume_dir / f"{name}.qvol"))
@@ -10,14 +10,25 @@ BLAKE3 is significantly faster than BLAKE2b, especially on ARM64 platforms:
 - Supports keyed hashing, key derivation, and MAC
 - 256-bit output (same security level as SHA-256)
 
+Partition/firmware integrity helpers read block devices directly with
+os.pread in large aligned chunks and build a chunked tree hash, hashing
+chunks on one worker pool shared by all concurrent tree hashes, with a
+shared cap on the chunks held in memory. A reference baseline keeps the per-chunk hashes
+so a mismatch pinpoints the changed regions without a second full read.
+
 Author: QWAMOS Security Team
 """
 
 import os
 import sys
+import json
+import hashlib
 import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import Optional, Union
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger('BLAKE3Hasher')
@@ -31,7 +42,24 @@ except ImportError:
     BLAKE3_AVAILABLE = False
     logger.warning("⚠️  BLAKE3 library not available - install with: pip install blake3")
     logger.warning("   Falling back to hashlib.sha256")
-    import hashlib
+
+# Tree hash chunk size: 4 MiB, a multiple of every block and page size
+TREE_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Chunk hashing threads, and chunks read but not yet consumed, shared by all
+# concurrent tree hashes (several partitions checked at once stay within
+# TREE_MAX_INFLIGHT_CHUNKS * chunk_size bytes)
+TREE_HASH_WORKERS = os.cpu_count() or 1
+TREE_MAX_INFLIGHT_CHUNKS = 2 * TREE_HASH_WORKERS
+
+# Root-only random key that authenticates tree hash baselines, mixed with the
+# device serial so a key file or baseline copied from another device fails
+BASELINE_KEY_PATH = "/var/lib/qwamos/keys/tree_hash_baseline.key"
+DEVICE_ID_PATHS = (
+    "/sys/devices/soc0/serial_number",
+    "/proc/device-tree/serial-number",
+    "/etc/machine-id",
+)
 
 
 class BLAKE3Hasher:
@@ -172,6 +200,354 @@ def hash_file(file_path: Union[str, Path], chunk_size: int = 65536,
     return hasher.digest()
 
 
+def _new_hash(algorithm: str):
+    """New single-threaded hash object (tree_hash parallelizes across chunks)"""
+    if algorithm == "blake3":
+        if not BLAKE3_AVAILABLE:
+            raise ValueError("BLAKE3 library not available")
+        return blake3.blake3()
+    return hashlib.new(algorithm)
+
+
+_chunk_pool: Optional[ThreadPoolExecutor] = None
+_chunk_pool_lock = threading.Lock()
+_inflight_chunks = threading.BoundedSemaphore(TREE_MAX_INFLIGHT_CHUNKS)
+
+
+def _shared_chunk_pool() -> ThreadPoolExecutor:
+    """Worker pool for chunk hashing, created on first use"""
+    global _chunk_pool
+    with _chunk_pool_lock:
+        if _chunk_pool is None:
+            _chunk_pool = ThreadPoolExecutor(max_workers=TREE_HASH_WORKERS,
+                                             thread_name_prefix='tree-hash')
+        return _chunk_pool
+
+
+def default_tree_algorithm() -> str:
+    """BLAKE3 when installed, SHA-256 otherwise"""
+    return "blake3" if BLAKE3_AVAILABLE else "sha256"
+
+
+def _region_size(fd: int, length: Optional[int]) -> int:
+    """Readable size of a file or block device, capped at length"""
+    size = os.lseek(fd, 0, os.SEEK_END)
+    return size if length is None else min(size, length)
+
+
+def _pread_full(fd: int, size: int, offset: int) -> bytes:
+    """pread exactly size bytes (block devices may return short reads)"""
+    data = os.pread(fd, size, offset)
+    while len(data) < size:
+        more = os.pread(fd, size - len(data), offset + len(data))
+        if not more:
+            raise IOError(f"Unexpected end of device at offset {offset + len(data)}")
+        data += more
+    return data
+
+
+def read_region(path: Union[str, Path], length: Optional[int] = None,
+                chunk_size: int = TREE_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Read a file or block device in aligned chunks with os.pread.
+
+    Args:
+        path: File or block device
+        length: Bytes to read from the start (default: everything)
+        chunk_size: Bytes per read
+
+    Yields:
+        Consecutive chunks
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        size = _region_size(fd, length)
+        for offset in range(0, size, chunk_size):
+            yield _pread_full(fd, min(chunk_size, size - offset), offset)
+    finally:
+        os.close(fd)
+
+
+def hash_region(path: Union[str, Path], length: Optional[int] = None,
+                algorithm: str = "sha256", chunk_size: int = TREE_CHUNK_SIZE) -> bytes:
+    """
+    Hash the first length bytes of a file or block device (flat hash).
+
+    Args:
+        path: File or block device
+        length: Bytes to hash (default: everything)
+        algorithm: "blake3" or a hashlib algorithm name
+        chunk_size: Bytes per read
+
+    Returns:
+        Hash digest
+    """
+    hasher = _new_hash(algorithm)
+    for chunk in read_region(path, length, chunk_size):
+        hasher.update(chunk)
+    return hasher.digest()
+
+
+def tree_hash(path: Union[str, Path], length: Optional[int] = None,
+              algorithm: Optional[str] = None, chunk_size: int = TREE_CHUNK_SIZE,
+              max_workers: Optional[int] = None, flat_algorithm: Optional[str] = None) -> Dict:
+    """
+    Chunked tree hash of a file or block device.
+
+    Each chunk is read with os.pread and hashed on the shared worker pool
+    (hashlib and blake3 release the GIL). This call keeps at most
+    2 * max_workers chunks in memory, and all concurrent calls together at
+    most TREE_MAX_INFLIGHT_CHUNKS. The root hashes the length and the
+    ordered chunk digests.
+
+    Args:
+        path: File or block device
+        length: Bytes to hash from the start (default: everything)
+        algorithm: Chunk/root hash (default: BLAKE3 if available, else SHA-256)
+        chunk_size: Bytes per chunk
+        max_workers: Chunks this call hashes concurrently (default: CPU count)
+        flat_algorithm: Also compute a flat hash of the region in the same pass
+
+    Returns:
+        Manifest dict: algorithm, chunk_size, length, chunks (hex), root (hex),
+        plus flat (hex) when flat_algorithm is given
+    """
+    algorithm = algorithm or default_tree_algorithm()
+    max_workers = max_workers or os.cpu_count() or 1
+    flat = _new_hash(flat_algorithm) if flat_algorithm else None
+
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        size = _region_size(fd, length)
+
+        def hash_chunk(offset: int) -> Tuple[bytes, Optional[bytes]]:
+            data = _pread_full(fd, min(chunk_size, size - offset), offset)
+            chunk_hasher = _new_hash(algorithm)
+            chunk_hasher.update(data)
+            return chunk_hasher.digest(), data if flat else None
+
+        def consume():
+            try:
+                digest, data = pending.popleft().result()
+            finally:
+                _inflight_chunks.release()
+            digests.append(digest)
+            if flat:
+                flat.update(data)
+
+        digests = []
+        pool = _shared_chunk_pool()
+        pending = deque()
+        try:
+            for offset in range(0, size, chunk_size):
+                if len(pending) >= 2 * max_workers:
+                    consume()
+                # Never wait for a slot while holding some: free our own first
+                while not _inflight_chunks.acquire(blocking=not pending):
+                    consume()
+                pending.append(pool.submit(hash_chunk, offset))
+            while pending:
+                consume()
+        finally:
+            # On error, let submitted reads finish before the fd is closed
+            for future in pending:
+                future.cancel()
+            wait(pending)
+            for _ in pending:
+                _inflight_chunks.release()
+    finally:
+        os.close(fd)
+
+    root = _new_hash(algorithm)
+    root.update(size.to_bytes(8, 'little'))
+    for digest in digests:
+        root.update(digest)
+
+    manifest = {
+        "algorithm": algorithm,
+        "chunk_size": chunk_size,
+        "length": size,
+        "chunks": [digest.hex() for digest in digests],
+        "root": root.hexdigest(),
+    }
+    if flat:
+        manifest["flat"] = flat.hexdigest()
+    return manifest
+
+
+def changed_regions(baseline: Dict, current: Dict) -> List[Tuple[int, int]]:
+    """
+    Compare two tree hash manifests.
+
+    Returns:
+        Changed (offset, length) byte ranges, adjacent chunks merged;
+        the whole region if the manifests are not comparable
+    """
+    if (baseline["algorithm"], baseline["chunk_size"]) != (current["algorithm"], current["chunk_size"]):
+        return [(0, max(baseline["length"], current["length"]))]
+
+    chunk_size = baseline["chunk_size"]
+    end = max(baseline["length"], current["length"])
+    regions: List[Tuple[int, int]] = []
+    for index in range(max(len(baseline["chunks"]), len(current["chunks"]))):
+        old = baseline["chunks"][index] if index < len(baseline["chunks"]) else None
+        new = current["chunks"][index] if index < len(current["chunks"]) else None
+        if old == new:
+            continue
+        offset = index * chunk_size
+        length = min(chunk_size, end - offset)
+        if regions and sum(regions[-1]) == offset:
+            regions[-1] = (regions[-1][0], regions[-1][1] + length)
+        else:
+            regions.append((offset, length))
+    return regions
+
+
+def device_baseline_key(key_path: Optional[Union[str, Path]] = None) -> Optional[bytes]:
+    """
+    Device-bound key for authenticating tree hash baselines.
+
+    Keyed hash of the device serial under a random 32-byte key file, which
+    is created (mode 0600) on first use.
+
+    Args:
+        key_path: Key file (default: BASELINE_KEY_PATH)
+
+    Returns:
+        32-byte key, or None if the key file can't be read or created
+    """
+    key_path = Path(key_path or BASELINE_KEY_PATH)
+    try:
+        key_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        try:
+            fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            pass
+        else:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(os.urandom(32))
+        secret = key_path.read_bytes()
+    except OSError as e:
+        logger.warning(f"⚠️  Tree hash baseline key unavailable ({key_path}): {e}")
+        return None
+    if len(secret) != 32:
+        logger.warning(f"⚠️  Tree hash baseline key {key_path} is not 32 bytes")
+        return None
+
+    device_id = b""
+    for id_path in DEVICE_ID_PATHS:
+        try:
+            device_id = Path(id_path).read_bytes().strip()
+        except OSError:
+            continue
+        if device_id:
+            break
+    return keyed_hash(b"qwamos tree hash baseline\0" + device_id, secret)
+
+
+class TreeHashBaseline:
+    """
+    Reference tree hash manifests for partitions and firmware images.
+
+    A manifest is only recorded from a read whose flat SHA-256 matched the
+    expected value, so later checks can use the parallel tree hash and
+    report which regions changed. Stored as JSON with a keyed hash over
+    the manifests; a file that fails the check is discarded, and without
+    a key no baseline is used (every check compares the flat SHA-256).
+    """
+
+    def __init__(self, path: Union[str, Path], algorithm: Optional[str] = None,
+                 chunk_size: int = TREE_CHUNK_SIZE, max_workers: Optional[int] = None,
+                 key: Optional[bytes] = None, key_path: Optional[Union[str, Path]] = None):
+        self.path = Path(path)
+        self.algorithm = algorithm or default_tree_algorithm()
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.key = key or device_baseline_key(key_path)
+        self.changes: Dict[str, List[Tuple[int, int]]] = {}
+        self._lock = threading.Lock()
+        self.manifests: Dict[str, Dict] = self._load()
+
+    def _mac(self, manifests: Dict[str, Dict]) -> bytes:
+        return keyed_hash(json.dumps(manifests, sort_keys=True), self.key)
+
+    def _load(self) -> Dict[str, Dict]:
+        if self.key is None:
+            return {}
+        try:
+            stored = json.loads(self.path.read_text())
+            manifests, mac = stored["manifests"], bytes.fromhex(stored["mac"])
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"⚠️  Discarding unreadable tree hash baseline {self.path}: {e}")
+            return {}
+
+        if not isinstance(manifests, dict) or not verify_hash(
+                json.dumps(manifests, sort_keys=True), mac, key=self.key):
+            logger.warning(f"⚠️  Discarding tree hash baseline {self.path}: authentication failed")
+            return {}
+        return manifests
+
+    def _save(self):
+        if self.key is None:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps({"manifests": self.manifests,
+                                       "mac": self._mac(self.manifests).hex()}))
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning(f"⚠️  Could not save tree hash baseline {self.path}: {e}")
+
+    def verify(self, name: str, path: Union[str, Path], expected_sha256: str,
+               length: Optional[int] = None) -> str:
+        """
+        Hash a partition and compare it with its reference.
+
+        With a usable baseline, one parallel tree-hash pass decides; a
+        mismatch records the changed regions in self.changes[name]. Without
+        one, a single pass computes the flat SHA-256 and the tree manifest,
+        and the manifest becomes the baseline if the SHA-256 matches.
+
+        Args:
+            name: Baseline key (partition name)
+            path: File or block device
+            expected_sha256: Expected flat SHA-256 (hex) of the region
+            length: Bytes to hash from the start (default: everything)
+
+        Returns:
+            expected_sha256 on a baseline match, the flat SHA-256 after a
+            bootstrap pass, or "<algorithm>-tree:<root>" on a baseline mismatch
+        """
+        baseline = self.manifests.get(name)
+        usable = (baseline is not None
+                  and baseline.get("expected_sha256") == expected_sha256
+                  and baseline["algorithm"] == self.algorithm
+                  and baseline["chunk_size"] == self.chunk_size
+                  and baseline.get("requested_length") == length)
+
+        if usable:
+            current = tree_hash(path, length, self.algorithm, self.chunk_size, self.max_workers)
+            if current["root"] == baseline["root"]:
+                self.changes[name] = []
+                return expected_sha256
+            self.changes[name] = changed_regions(baseline, current)
+            return f"{self.algorithm}-tree:{current['root']}"
+
+        current = tree_hash(path, length, self.algorithm, self.chunk_size, self.max_workers,
+                            flat_algorithm="sha256")
+        flat = current.pop("flat")
+        self.changes[name] = []
+        if flat == expected_sha256 and self.key is not None:
+            current.update(expected_sha256=expected_sha256, requested_length=length)
+            with self._lock:
+                self.manifests[name] = current
+                self._save()
+        return flat
+
+
 def derive_key(context: str, key_material: bytes, output_length: int = 32) -> bytes:
     """
     Derive key using BLAKE3 key derivation mode.
@@ -27,6 +27,7 @@ import statistics
 sys.path.insert(0, str(Path(__file__).parent))
 
 from resource_monitor import ResourceMonitor, SystemMetrics, VMMetrics
+from qmp_client import QMPClientPool
 
 
 class WorkloadClass(Enum):
@@ -198,31 +199,40 @@ class AIGovernor:
         # Collect current metrics
         metrics = self.monitor.collect_all_metrics(vm_names=vm_names)
 
-        # Classify workloads
-        system_workload = self.classifier.classify_system_workload(metrics)
+        return self.decide(metrics)
 
-        # Determine power mode
-        power_mode = self._determine_power_mode(metrics)
+    def decide(self, metrics: SystemMetrics, vm_names: Optional[List[str]] = None,
+               previous: Optional[GovernorDecision] = None) -> GovernorDecision:
+        """
+        Make resource allocation decision from an existing metrics snapshot.
+
+        Args:
+            metrics: System metrics snapshot
+            vm_names: VMs to recompute (default: all VMs in metrics)
+            previous: Earlier decision whose allocations are reused for
+                VMs not being recomputed
 
-        # Check thermal throttling
-        thermal_throttle = self._check_thermal_throttling(metrics)
+        Returns:
+            GovernorDecision
+        """
+        context = self.evaluate_context(metrics)
+        system_workload, power_mode, thermal_throttle = context
 
         # Allocate resources to VMs
-        vm_allocations = {}
+        vm_allocations = dict(previous.vm_allocations) if previous else {}
+        recompute = set(vm_names) if vm_names is not None else None
         reasoning_parts = []
 
         for vm in metrics.vms:
-            workload = self.classifier.classify_vm_workload(vm)
-
-            # Calculate allocation based on workload, threat level, and system state
-            allocation = self._calculate_vm_allocation(
-                vm, workload, system_workload, power_mode, thermal_throttle, metrics
-            )
+            if recompute is not None and vm.vm_name not in recompute:
+                continue
 
+            allocation = self.allocate_vm(vm, metrics, context)
             vm_allocations[vm.vm_name] = allocation
 
             reasoning_parts.append(
-                f"{vm.vm_name}: {workload.value} workload → {allocation.cpu_cores} vCPUs, {allocation.memory_mb_limit} MB"
+                f"{vm.vm_name}: {allocation.workload_class.value} workload → "
+                f"{allocation.cpu_cores} vCPUs, {allocation.memory_mb_limit} MB"
             )
 
         # Build reasoning
@@ -246,6 +256,43 @@ class AIGovernor:
 
         return decision
 
+    def evaluate_context(self, metrics: SystemMetrics) -> Tuple[WorkloadClass, str, bool]:
+        """
+        Evaluate system-wide inputs shared by all VM allocations.
+
+        Args:
+            metrics: System metrics
+
+        Returns:
+            Tuple of (system workload, power mode, thermal throttle)
+        """
+        return (
+            self.classifier.classify_system_workload(metrics),
+            self._determine_power_mode(metrics),
+            self._check_thermal_throttling(metrics),
+        )
+
+    def allocate_vm(self, vm: VMMetrics, metrics: SystemMetrics,
+                    context: Tuple[WorkloadClass, str, bool]) -> VMAllocation:
+        """
+        Compute allocation for a single VM.
+
+        Args:
+            vm: VM metrics
+            metrics: System metrics
+            context: Result of evaluate_context()
+
+        Returns:
+            VMAllocation
+        """
+        system_workload, power_mode, thermal_throttle = context
+        workload = self.classifier.classify_vm_workload(vm)
+
+        # Calculate allocation based on workload, threat level, and system state
+        return self._calculate_vm_allocation(
+            vm, workload, system_workload, power_mode, thermal_throttle, metrics
+        )
+
     def _calculate_vm_allocation(
         self,
         vm: VMMetrics,
@@ -440,8 +487,9 @@ def main():
     print("QWAMOS AI Governor - Demo")
     print("="*70)
 
-    # Initialize
-    monitor = ResourceMonitor(history_size=10)
+    # Initialize (per-VM I/O counters come over persistent QMP connections)
+    qmp_pool = QMPClientPool()
+    monitor = ResourceMonitor(history_size=10, qmp_pool=qmp_pool)
     governor = AIGovernor(monitor)
 
     print("\n1. Making resource allocation decisions...\n")
@@ -464,6 +512,8 @@ def main():
     print("\n3. Testing thermal awareness...\n")
     print("   (Would throttle at CPU temp > 75°C)")
 
+    qmp_pool.shutdown()
+
     print("\n" + "="*70)
     print("✅ AI Governor operational")
     print("="*70)
@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+"""
+QWAMOS CPU Topology and vCPU Placement
+Phase XII: KVM Acceleration
+
+Topology-aware vCPU pinning for big.LITTLE and multi-cluster SoCs:
+- CPU topology model from /sys/devices/system/cpu (clusters, LLC, cpu_capacity)
+- Per-vCPU placement that keeps a VM inside one cluster/cache domain
+- Emulator and I/O threads kept off the vCPU cores
+- Host-wide reservation ledger so concurrently running VMs do not
+  oversubscribe the same cores
+- Per-thread pinning with os.sched_setaffinity (no subprocess)
+
+Author: QWAMOS Development Team
+License: AGPL-3.0
+"""
+
+import fcntl
+import json
+import logging
+import os
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger("CPUTopology")
+
+SYSFS_CPU_DIR = Path("/sys/devices/system/cpu")
+PROC_DIR = Path("/proc")
+
+# Host-wide vCPU reservations shared by all VMManager processes
+RESERVATION_FILE = Path.home() / "QWAMOS" / "hypervisor" / "run" / "cpu_reservations.json"
+
+# Supported pinning policies (see KVMManager.configure_vcpu_affinity)
+PLACEMENT_POLICIES = ("big", "little", "isolated")
+
+
+def parse_cpu_list(text: str) -> List[int]:
+    """
+    Parse a kernel CPU list (e.g., "0-3,6,8-9").
+
+    Args:
+        text: CPU list string
+
+    Returns:
+        Sorted list of CPU numbers
+    """
+    cpus = set()
+    for part in text.strip().split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            cpus.update(range(int(start), int(end) + 1))
+        else:
+            cpus.add(int(part))
+    return sorted(cpus)
+
+
+@dataclass
+class CoreInfo:
+    """Topology information for one logical CPU."""
+    cpu: int
+    cluster_id: int  # Lowest CPU in the cluster / frequency domain
+    llc_id: int  # Lowest CPU sharing the last-level cache
+    core_id: int
+    package_id: int
+    capacity: int  # Relative capacity (cpu_capacity, or max freq in kHz)
+    thread_siblings: List[int] = field(default_factory=list)
+
+
+@dataclass
+class VCPUPlacement:
+    """Core assignment for one VM."""
+    vm_name: str
+    vm_pid: int
+    vcpu_cpus: List[int]  # vcpu_cpus[i] is the core for vCPU i
+    emulator_cpus: List[int]  # Main loop, I/O threads and workers
+    policy: str
+
+    @property
+    def exclusive(self) -> bool:
+        """Whether other VMs must not share these vCPU cores."""
+        return self.policy == "isolated"
+
+
+class CPUTopology:
+    """
+    Host CPU topology model.
+
+    Clusters are taken from topology/cluster_cpus_list, falling back to
+    the cpufreq domain (related_cpus) and finally the package. Capacity
+    comes from cpu_capacity, falling back to cpuinfo_max_freq.
+    """
+
+    def __init__(self, cores: Dict[int, CoreInfo]):
+        """
+        Initialize topology.
+
+        Args:
+            cores: Mapping of CPU number to CoreInfo
+        """
+        self.cores = cores
+
+    @classmethod
+    def from_sysfs(cls, sysfs_dir: Path = SYSFS_CPU_DIR) -> "CPUTopology":
+        """
+        Build topology from sysfs.
+
+        Args:
+            sysfs_dir: CPU sysfs directory (overridable for tests)
+
+        Returns:
+            CPUTopology of online CPUs
+        """
+        sysfs_dir = Path(sysfs_dir)
+
+        online = cls._read_list(sysfs_dir / "online")
+        if not online:
+            online = sorted(
+                int(d.name[3:]) for d in sysfs_dir.glob("cpu[0-9]*") if d.name[3:].isdigit()
+            )
+
+        cores = {}
+        for cpu in online:
+            cpu_dir = sysfs_dir / f"cpu{cpu}"
+            topo = cpu_dir / "topology"
+
+            cluster = (cls._read_list(topo / "cluster_cpus_list")
+                       or cls._read_list(cpu_dir / "cpufreq" / "related_cpus")
+                       or cls._read_list(topo / "package_cpus_list")
+                       or cls._read_list(topo / "core_siblings_list")
+                       or [cpu])
+
+            capacity = (cls._read_int(cpu_dir / "cpu_capacity")
+                        or cls._read_int(cpu_dir / "cpufreq" / "cpuinfo_max_freq")
+                        or 1024)
+
+            cores[cpu] = CoreInfo(
+                cpu=cpu,
+                cluster_id=min(cluster),
+                llc_id=min(cls._read_llc(cpu_dir) or [cpu]),
+                core_id=cls._read_int(topo / "core_id") or 0,
+                package_id=cls._read_int(topo / "physical_package_id") or 0,
+                capacity=capacity,
+                thread_siblings=cls._read_list(topo / "thread_siblings_list") or [cpu],
+            )
+
+        return cls(cores)
+
+    @property
+    def cpus(self) -> List[int]:
+        """All online CPUs."""
+        return sorted(self.cores)
+
+    def clusters(self) -> Dict[int, List[int]]:
+        """
+        Group CPUs by cluster.
+
+        Returns:
+            Dict mapping cluster id to its CPUs
+        """
+        clusters: Dict[int, List[int]] = {}
+        for core in self.cores.values():
+            clusters.setdefault(core.cluster_id, []).append(core.cpu)
+        return {cid: sorted(cpus) for cid, cpus in sorted(clusters.items())}
+
+    def capacity_classes(self) -> List[List[int]]:
+        """
+        Group CPUs by capacity, highest first.
+
+        Returns:
+            List of CPU lists (e.g., [[prime], [big...], [little...]])
+        """
+        classes: Dict[int, List[int]] = {}
+        for core in self.cores.values():
+            classes.setdefault(core.capacity, []).append(core.cpu)
+        return [sorted(classes[cap]) for cap in sorted(classes, reverse=True)]
+
+    def big_cores(self) -> List[int]:
+        """Performance cores (every capacity class above the lowest)."""
+        classes = self.capacity_classes()
+        if len(classes) <= 1:
+            return self.cpus
+        return sorted(cpu for cls_cpus in classes[:-1] for cpu in cls_cpus)
+
+    def little_cores(self) -> List[int]:
+        """Efficiency cores (lowest capacity class)."""
+        classes = self.capacity_classes()
+        if len(classes) <= 1:
+            return self.cpus
+        return classes[-1]
+
+    @staticmethod
+    def _read_int(path: Path) -> Optional[int]:
+        try:
+            return int(path.read_text().strip())
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _read_list(path: Path) -> List[int]:
+        try:
+            return parse_cpu_list(path.read_text())
+        except (OSError, ValueError):
+            return []
+
+    @classmethod
+    def _read_llc(cls, cpu_dir: Path) -> List[int]:
+        """CPUs sharing this CPU's highest-level cache."""
+        best_level, shared = -1, []
+        for index in (cpu_dir / "cache").glob("index[0-9]*"):
+            level = cls._read_int(index / "level")
+            if level is not None and level > best_level:
+                cpus = cls._read_list(index / "shared_cpu_list")
+                if cpus:
+                    best_level, shared = level, cpus
+        return shared
+
+
+class VCPUPlacer:
+    """
+    Assigns cores to VMs and pins QEMU threads.
+
+    Reservations are kept in a locked JSON ledger so separate VMManager
+    processes see each other's placements. Entries whose QEMU process
+    has exited are pruned on every access.
+    """
+
+    def __init__(self, topology: Optional[CPUTopology] = None,
+                 state_file: Optional[Path] = RESERVATION_FILE, proc_dir: Path = PROC_DIR):
+        """
+        Initialize vCPU placer.
+
+        Args:
+            topology: Host topology (default: read from sysfs)
+            state_file: Reservation ledger path (None keeps reservations in memory)
+            proc_dir: procfs root (overridable for tests)
+        """
+        self.topology = topology or CPUTopology.from_sysfs()
+        self.state_file = Path(state_file) if state_file else None
+        self.proc_dir = Path(proc_dir)
+        self._memory_state: Dict[str, Dict] = {}
+
+    def reserve(self, vm_name: str, vm_pid: int, vcpu_count: int, policy: str) -> VCPUPlacement:
+        """
+        Choose and record cores for a VM.
+
+        Args:
+            vm_name: VM name
+            vm_pid: QEMU process ID
+            vcpu_count: Number of vCPUs
+            policy: "big", "little" or "isolated"
+
+        Returns:
+            VCPUPlacement
+
+        Raises:
+            ValueError: On unknown policy
+        """
+        if policy not in PLACEMENT_POLICIES:
+            raise ValueError(f"Unknown vCPU policy: {policy}")
+
+        with self._locked_state() as state:
+            state.pop(vm_name, None)
+            placement = self._place(vm_name, vm_pid, max(1, vcpu_count), policy, state)
+            state[vm_name] = asdict(placement)
+
+        logger.info(f"VM {vm_name}: vCPUs → {placement.vcpu_cpus}, emulator → {placement.emulator_cpus}")
+        return placement
+
+    def release(self, vm_name: str):
+        """
+        Drop a VM's reservation.
+
+        Args:
+            vm_name: VM name
+        """
+        with self._locked_state() as state:
+            state.pop(vm_name, None)
+
+    def reservations(self) -> Dict[str, VCPUPlacement]:
+        """
+        Get live reservations.
+
+        Returns:
+            Dict mapping VM name to VCPUPlacement
+        """
+        with self._locked_state() as state:
+            return {name: VCPUPlacement(**entry) for name, entry in state.items()}
+
+    def apply(self, placement: VCPUPlacement, vcpu_threads: Dict[int, int]) -> bool:
+        """
+        Pin a VM's threads according to its placement.
+
+        Each vCPU thread is pinned to its own core; every other thread
+        (main loop, I/O threads, workers) goes to the emulator cores.
+        Threads QEMU creates later inherit the affinity of their creator.
+
+        Args:
+            placement: VCPUPlacement from reserve()
+            vcpu_threads: Mapping of vCPU index to host thread ID
+                (empty if unknown: the whole process is pinned instead)
+
+        Returns:
+            True if all threads were pinned
+        """
+        thread_ids = self._list_threads(placement.vm_pid)
+        ok = True
+
+        if not vcpu_threads:
+            logger.warning(f"VM {placement.vm_name}: vCPU threads unknown, pinning whole process")
+            cpus = set(placement.vcpu_cpus) | set(placement.emulator_cpus)
+            return all(self._pin(tid, cpus) for tid in thread_ids or [placement.vm_pid])
+
+        for index, tid in vcpu_threads.items():
+            core = placement.vcpu_cpus[index % len(placement.vcpu_cpus)]
+            ok = self._pin(tid, {core}) and ok
+
+        for tid in thread_ids:
+            if tid not in vcpu_threads.values():
+                ok = self._pin(tid, set(placement.emulator_cpus)) and ok
+
+        return ok
+
+    def _place(self, vm_name: str, vm_pid: int, vcpu_count: int, policy: str,
+               state: Dict[str, Dict]) -> VCPUPlacement:
+        """Pick vCPU and emulator cores given other VMs' reservations."""
+        topo = self.topology
+        load = {cpu: 0 for cpu in topo.cpus}
+        exclusive: Set[int] = set()
+        for entry in state.values():
+            for cpu in entry["vcpu_cpus"]:
+                if cpu in load:
+                    load[cpu] += 1
+            if entry["policy"] == "isolated":
+                exclusive.update(entry["vcpu_cpus"])
+
+        candidates = topo.little_cores() if policy == "little" else topo.big_cores()
+        candidates = [cpu for cpu in candidates if cpu not in exclusive] or \
+                     [cpu for cpu in topo.cpus if cpu not in exclusive] or topo.cpus
+
+        vcpu_cpus = self._pick_vcpu_cores(candidates, vcpu_count, load)
+        if any(load[cpu] for cpu in vcpu_cpus) or len(set(vcpu_cpus)) < vcpu_count:
+            logger.warning(f"VM {vm_name}: not enough free cores, sharing {sorted(set(vcpu_cpus))}")
+
+        emulator_cpus = self._pick_emulator_cores(vcpu_cpus, load, exclusive)
+
+        return VCPUPlacement(
+            vm_name=vm_name,
+            vm_pid=vm_pid,
+            vcpu_cpus=vcpu_cpus,
+            emulator_cpus=emulator_cpus,
+            policy=policy,
+        )
+
+    def _pick_vcpu_cores(self, candidates: List[int], count: int, load: Dict[int, int]) -> List[int]:
+        """
+        Prefer the smallest cluster (then cache domain) with enough free
+        cores; otherwise take the least-loaded cores overall.
+        """
+        cores = self.topology.cores
+        free = [cpu for cpu in candidates if load[cpu] == 0]
+
+        for key in ("cluster_id", "llc_id"):
+            domains: Dict[int, List[int]] = {}
+            for cpu in free:
+                domains.setdefault(getattr(cores[cpu], key), []).append(cpu)
+            fitting = [cpus for cpus in domains.values() if len(cpus) >= count]
+            if fitting:
+                # Best fit: smallest domain, then highest capacity
+                best = min(fitting, key=lambda cpus: (len(cpus), -cores[cpus[0]].capacity, cpus[0]))
+                return self._spread_smt(best, count)
+
+        ranked = sorted(candidates, key=lambda cpu: (load[cpu], -cores[cpu].capacity, cpu))
+        return [ranked[i % len(ranked)] for i in range(count)]
+
+    def _spread_smt(self, cpus: List[int], count: int) -> List[int]:
+        """Take one hardware thread per physical core before doubling up."""
+        cores = self.topology.cores
+        seen: Set[int] = set()
+        first, rest = [], []
+        for cpu in sorted(cpus):
+            siblings = frozenset(cores[cpu].thread_siblings)
+            (rest if seen & siblings else first).append(cpu)
+            seen.update(siblings)
+        return (first + rest)[:count]
+
+    def _pick_emulator_cores(self, vcpu_cpus: List[int], load: Dict[int, int],
+                             exclusive: Set[int]) -> List[int]:
+        """Pick a core for emulator/I/O threads outside the vCPU cores."""
+        cores = self.topology.cores
+        used = set(vcpu_cpus) | exclusive
+        others = [cpu for cpu in self.topology.cpus if cpu not in used]
+        if not others:
+            return sorted(set(vcpu_cpus))
+
+        # Emulator threads are mostly I/O bound: prefer idle, low-capacity cores
+        best = min(others, key=lambda cpu: (load[cpu], cores[cpu].capacity, cpu))
+        return [best]
+
+    def _list_threads(self, pid: int) -> List[int]:
+        """List thread IDs of a process."""
+        try:
+            return sorted(int(d.name) for d in (self.proc_dir / str(pid) / "task").iterdir() if d.name.isdigit())
+        except OSError:
+            return []
+
+    @staticmethod
+    def _pin(tid: int, cpus: Iterable[int]) -> bool:
+        try:
+            os.sched_setaffinity(tid, set(cpus))
+            return True
+        except ProcessLookupError:
+            # Thread exited between listing and pinning
+            return True
+        except OSError as e:
+            logger.error(f"Failed to pin thread {tid} to {sorted(cpus)}: {e}")
+            return False
+
+    def _pid_alive(self, pid: int) -> bool:
+        return (self.proc_dir / str(pid)).exists()
+
+    @contextmanager
+    def _locked_state(self):
+        """Load the ledger under an exclusive lock, prune dead VMs, save on exit."""
+        if self.state_file is None:
+            state = self._memory_state
+            for name in [n for n, e in state.items() if not self._pid_alive(e["vm_pid"])]:
+                del state[name]
+            yield state
+            return
+
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.state_file, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    state = json.loads(f.read() or "{}")
+                except ValueError:
+                    logger.warning(f"Corrupt reservation ledger {self.state_file}, resetting")
+                    state = {}
+
+                state = {n: e for n, e in state.items() if self._pid_alive(e["vm_pid"])}
+                yield state
+
+                f.seek(0)
+                f.truncate()
+                json.dump(state, f, indent=2)
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+"""
+QWAMOS AI Governor Daemon
+Phase XV: Adaptive Resource Management
+
+Event-driven control loop around AIGovernor:
+- Subscribes to ResourceMonitor metric updates instead of polling
+- Recomputes allocations only for VMs whose inputs changed
+- Applies allocations through cgroup v2 (cpu.max, cpu.weight, memory.high)
+- Hysteresis dead bands suppress small oscillating adjustments
+- Per-VM and global rate limits bound cgroup write frequency
+
+Author: QWAMOS Project
+License: MIT
+"""
+
+import asyncio
+import logging
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Add hypervisor to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from ai_governor import AIGovernor, GovernorDecision, ThreatLevel, VMAllocation, WorkloadClass
+from metrics_bus import MetricsBusError
+from resource_monitor import ResourceMonitor, SystemMetrics
+
+logger = logging.getLogger("GovernorDaemon")
+
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+CGROUP_PREFIX = "qwamos-vm-"  # Matches VMManager._setup_cgroup_limits
+
+CPU_PERIOD_USEC = 100000  # 100ms
+
+
+@dataclass
+class HysteresisPolicy:
+    """Thresholds and rate limits for cgroup updates."""
+    cpu_max_relative: float = 0.10  # Rewrite cpu.max only on >=10% quota change
+    cpu_weight_relative: float = 0.20  # Rewrite cpu.weight only on >=20% change
+    memory_high_relative: float = 0.10  # Rewrite memory.high only on >=10% change
+    memory_high_min_delta_mb: int = 32  # ...and at least this many MB
+    min_write_interval_s: float = 5.0  # Per-VM minimum spacing between writes
+    max_writes_per_second: float = 10.0  # Global write budget (token bucket)
+    write_burst: int = 10  # Token bucket capacity
+
+
+def allocation_to_cgroup(allocation: VMAllocation) -> Dict[str, int]:
+    """
+    Convert a VMAllocation to numeric cgroup v2 targets.
+
+    Args:
+        allocation: VMAllocation
+
+    Returns:
+        Dict with cpu.max quota (usec per CPU_PERIOD_USEC), cpu.weight and
+        memory.high (bytes)
+    """
+    quota = int(CPU_PERIOD_USEC * allocation.cpu_cores * allocation.cpu_percent_limit / 100.0)
+    return {
+        "cpu.max": max(1000, quota),
+        # Priority 50 maps to the cgroup default weight of 100
+        "cpu.weight": min(10000, max(1, int(allocation.priority * 2))),
+        "memory.high": allocation.memory_mb_limit * 1024 * 1024,
+    }
+
+
+class CgroupApplier:
+    """
+    Writes governor allocations to per-VM cgroup v2 directories.
+
+    Values are only written when they leave the hysteresis dead band
+    around the last written value. Writes that are due but rate-limited
+    are kept as pending and retried by flush().
+    """
+
+    def __init__(self, cgroup_root: Path = CGROUP_ROOT, policy: Optional[HysteresisPolicy] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize cgroup applier.
+
+        Args:
+            cgroup_root: cgroup v2 mount point
+            policy: Hysteresis and rate-limit policy
+            clock: Monotonic clock (overridable for tests)
+        """
+        self.cgroup_root = Path(cgroup_root)
+        self.policy = policy or HysteresisPolicy()
+        self.clock = clock
+
+        self.applied: Dict[str, Dict[str, int]] = {}
+        self.pending: Dict[str, Dict[str, int]] = {}
+        self.last_write: Dict[str, float] = {}
+
+        self._tokens = float(self.policy.write_burst)
+        self._tokens_at = clock()
+
+        self.stats = {"writes": 0, "suppressed": 0, "deferred": 0, "errors": 0}
+
+    def apply(self, vm_name: str, allocation: VMAllocation) -> List[str]:
+        """
+        Apply an allocation, subject to hysteresis and rate limits.
+
+        Args:
+            vm_name: VM name
+            allocation: New allocation
+
+        Returns:
+            List of cgroup files written
+        """
+        applied = self.applied.get(vm_name, {})
+        changes = {}
+
+        for key, value in allocation_to_cgroup(allocation).items():
+            if key not in applied or self._crosses_threshold(key, applied[key], value):
+                changes[key] = value
+            else:
+                self.stats["suppressed"] += 1
+
+        if not changes:
+            # Back inside the dead band: nothing left to do
+            self.pending.pop(vm_name, None)
+            return []
+
+        # Newest targets replace any deferred ones
+        self.pending[vm_name] = changes
+        return self._flush_vm(vm_name)
+
+    def flush(self) -> List[str]:
+        """
+        Retry rate-limited writes.
+
+        Returns:
+            List of cgroup files written
+        """
+        written = []
+        for vm_name in list(self.pending):
+            written.extend(self._flush_vm(vm_name))
+        return written
+
+    def forget(self, vm_name: str):
+        """
+        Drop state for a VM that stopped.
+
+        Args:
+            vm_name: VM name
+        """
+        self.applied.pop(vm_name, None)
+        self.pending.pop(vm_name, None)
+        self.last_write.pop(vm_name, None)
+
+    def next_flush_delay(self) -> Optional[float]:
+        """Seconds until the earliest pending write may proceed (None if nothing pending)."""
+        if not self.pending:
+            return None
+        now = self.clock()
+        waits = [
+            max(0.0, self.last_write.get(vm, -1e9) + self.policy.min_write_interval_s - now)
+            for vm in self.pending
+        ]
+        return max(min(waits), 1.0 / self.policy.max_writes_per_second)
+
+    def _flush_vm(self, vm_name: str) -> List[str]:
+        changes = self.pending.get(vm_name)
+        if not changes:
+            return []
+
+        now = self.clock()
+        last = self.last_write.get(vm_name)
+        if last is not None and now - last < self.policy.min_write_interval_s:
+            self.stats["deferred"] += 1
+            return []
+
+        if not self._take_tokens(len(changes), now):
+            self.stats["deferred"] += 1
+            return []
+
+        written = []
+        cgroup_dir = self.cgroup_root / f"{CGROUP_PREFIX}{vm_name}"
+        for key, value in changes.items():
+            content = f"{value} {CPU_PERIOD_USEC}" if key == "cpu.max" else str(value)
+            try:
+                (cgroup_dir / key).write_text(content)
+            except OSError as e:
+                self.stats["errors"] += 1
+                logger.warning(f"Cannot write {cgroup_dir / key}: {e}")
+                continue
+            self.applied.setdefault(vm_name, {})[key] = value
+            written.append(key)
+
+        self.stats["writes"] += len(written)
+        self.last_write[vm_name] = now
+        del self.pending[vm_name]
+
+        if written:
+            logger.info(f"{vm_name}: updated {', '.join(written)}")
+        return written
+
+    def _take_tokens(self, count: int, now: float) -> bool:
+        """Global token bucket for cgroup writes."""
+        policy = self.policy
+        self._tokens = min(float(policy.write_burst),
+                           self._tokens + (now - self._tokens_at) * policy.max_writes_per_second)
+        self._tokens_at = now
+        if self._tokens < count:
+            return False
+        self._tokens -= count
+        return True
+
+    def _crosses_threshold(self, key: str, old: int, new: int) -> bool:
+        delta = abs(new - old)
+        base = max(abs(old), 1)
+        if key == "cpu.max":
+            return delta / base >= self.policy.cpu_max_relative
+        if key == "cpu.weight":
+            return delta / base >= self.policy.cpu_weight_relative
+        return (delta / base >= self.policy.memory_high_relative
+                and delta >= self.policy.memory_high_min_delta_mb * 1024 * 1024)
+
+
+class GovernorDaemon:
+    """
+    Event-driven AI Governor control loop.
+
+    Metric snapshots are pushed in (publish, or by subscribing to a
+    ResourceMonitor); bursts are coalesced to the latest snapshot. A VM
+    is recomputed only when its workload class changes or when a
+    system-wide input (workload, power mode, thermal state, threat
+    level) changes.
+    """
+
+    def __init__(self, governor: AIGovernor, applier: Optional[CgroupApplier] = None):
+        """
+        Initialize governor daemon.
+
+        Args:
+            governor: AIGovernor used to compute allocations
+            applier: CgroupApplier (default: /sys/fs/cgroup)
+        """
+        self.governor = governor
+        self.applier = applier or CgroupApplier()
+
+        self.decision: Optional[GovernorDecision] = None
+        self._context: Optional[Tuple] = None
+        self._vm_classes: Dict[str, WorkloadClass] = {}
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._stopping = False
+
+        self.stats = {"updates": 0, "coalesced": 0, "vm_recomputes": 0, "vm_skipped": 0}
+
+    def attach(self, monitor: ResourceMonitor):
+        """
+        Subscribe to a ResourceMonitor's metric updates.
+
+        Args:
+            monitor: ResourceMonitor
+        """
+        monitor.subscribe(self.publish)
+
+    def publish(self, metrics: SystemMetrics):
+        """
+        Push a metrics snapshot (thread-safe).
+
+        Args:
+            metrics: SystemMetrics snapshot
+        """
+        self._post(metrics)
+
+    def set_threat_level(self, level: ThreatLevel):
+        """
+        Change threat level and re-evaluate on the next cycle (thread-safe).
+
+        Args:
+            level: New threat level
+        """
+        self.governor.set_threat_level(level)
+        self._post(None)
+
+    def process(self, metrics: SystemMetrics) -> List[str]:
+        """
+        Handle one metrics snapshot synchronously.
+
+        Args:
+            metrics: SystemMetrics snapshot
+
+        Returns:
+            Names of VMs whose allocation was recomputed
+        """
+        self.stats["updates"] += 1
+
+        context = self.governor.evaluate_context(metrics) + (self.governor.threat_level,)
+        context_changed = context != self._context
+        self._context = context
+
+        affected = []
+        current = set()
+        for vm in metrics.vms:
+            current.add(vm.vm_name)
+            workload = self.governor.classifier.classify_vm_workload(vm)
+            if context_changed or self._vm_classes.get(vm.vm_name) != workload:
+                affected.append(vm.vm_name)
+            self._vm_classes[vm.vm_name] = workload
+
+        # Forget VMs that disappeared
+        for vm_name in set(self._vm_classes) - current:
+            del self._vm_classes[vm_name]
+            self.applier.forget(vm_name)
+            if self.decision:
+                self.decision.vm_allocations.pop(vm_name, None)
+
+        self.stats["vm_skipped"] += len(current) - len(affected)
+        if not affected:
+            self.applier.flush()
+            return []
+
+        self.decision = self.governor.decide(metrics, vm_names=affected, previous=self.decision)
+        self.stats["vm_recomputes"] += len(affected)
+
+        for vm_name in affected:
+            allocation = self.decision.vm_allocations.get(vm_name)
+            if allocation:
+                self.applier.apply(vm_name, allocation)
+        self.applier.flush()
+
+        return affected
+
+    async def run(self):
+        """Run the control loop until stop() is called."""
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._stopping = False
+        latest: Optional[SystemMetrics] = None
+
+        logger.info("AI Governor daemon started")
+        while not self._stopping:
+            try:
+                item = await asyncio.wait_for(self._queue.get(), self.applier.next_flush_delay())
+            except asyncio.TimeoutError:
+                # Only rate-limited writes are waiting
+                self.applier.flush()
+                continue
+
+            # Coalesce bursts: only the newest snapshot matters
+            items = [item]
+            while not self._queue.empty():
+                items.append(self._queue.get_nowait())
+                self.stats["coalesced"] += 1
+
+            # None is a wake-up (threat level change or stop): re-evaluate the
+            # newest snapshot, whose context now differs by threat level
+            for item in items:
+                if item is not None:
+                    latest = item
+
+            if self._stopping:
+                break
+            if latest is not None:
+                self.process(latest)
+
+        logger.info("AI Governor daemon stopped")
+
+    def stop(self):
+        """Stop the control loop (thread-safe)."""
+        self._stopping = True
+        self._post(None)
+
+    def _post(self, item: Optional[SystemMetrics]):
+        if self._loop is None or self._queue is None:
+            return
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, item)
+
+
+async def run_collector(monitor: ResourceMonitor, vm_names: List[str], interval: float = 2.0):
+    """
+    Collect metrics periodically off the event loop.
+
+    The daemon reacts to whatever the monitor publishes; this collector is
+    only needed when no other component already drives the monitor. Bus
+    errors (e.g. nothing published yet) are logged and retried on the next
+    interval.
+
+    Args:
+        monitor: ResourceMonitor with the daemon attached
+        vm_names: VMs to monitor
+        interval: Seconds between collections
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            await loop.run_in_executor(None, monitor.collect_all_metrics, vm_names)
+        except MetricsBusError as e:
+            logger.warning(f"Metrics unavailable, retrying in {interval}s: {e}")
+        await asyncio.sleep(interval)
+
+
+def _log_collector_exit(task: asyncio.Task):
+    """Report a collector that stopped other than by cancellation."""
+    if task.cancelled():
+        return
+    error = task.exception()
+    if error is not None:
+        logger.error(f"Metric collector stopped, governor has no metrics: {error!r}")
+    else:
+        logger.error("Metric collector exited, governor has no metrics")
+
+
+def main():
+    """Run the governor daemon for the given VMs."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="QWAMOS AI Governor daemon")
+    parser.add_argument("vm_names", nargs="+", help="VMs to govern")
+    parser.add_argument("--interval", type=float, default=2.0, help="Metric collection interval (s)")
+    parser.add_argument("--bus", metavar="NAME", help="Read snapshots from a shared metrics collector")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    if args.bus:
+        from metrics_bus import BusResourceMonitor, MetricsReader
+        monitor = BusResourceMonitor(MetricsReader(args.bus), history_size=10)
+    else:
+        monitor = ResourceMonitor(history_size=10)
+    daemon = GovernorDaemon(AIGovernor(monitor))
+    daemon.attach(monitor)
+
+    async def _run():
+        collector = asyncio.ensure_future(run_collector(monitor, args.vm_names, args.interval))
+        collector.add_done_callback(_log_collector_exit)
+        try:
+            await daemon.run()
+        finally:
+            collector.cancel()
+
+    try:
+        asyncio.run(_run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
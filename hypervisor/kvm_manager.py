@@ -10,13 +10,20 @@ License: AGPL-3.0
 """
 
 import os
-import subprocess
+import sys
+import time
 import platform
 from typing import Optional, Dict, List, Tuple
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from pathlib import Path
 import logging
 
+# Add hypervisor to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from cpu_topology import VCPUPlacer, PLACEMENT_POLICIES
+from qmp_client import QMPError
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("KVMManager")
 
@@ -82,6 +89,11 @@ class KVMCapabilities:
     pauth_supported: bool = False  # Pointer Authentication
     bti_supported: bool = False  # Branch Target Identification
 
+    # Performance features
+    memfd_available: bool = False  # memfd_create() for memory-backend-memfd
+    hugepages_free_mb: Dict[int, int] = field(default_factory=dict)  # page size kB -> free MB
+    vhost_net_available: bool = False  # /dev/vhost-net accessible
+
     def __str__(self) -> str:
         status = "✅ ENABLED" if self.kvm_available else "❌ DISABLED"
         lines = [
@@ -96,6 +108,65 @@ class KVMCapabilities:
         return "\n".join(lines)
 
 
+@dataclass
+class PerformanceProfile:
+    """
+    QEMU performance tuning selected by the VM config's performance section.
+
+    Every feature is capability-checked when the command line is generated
+    and silently dropped if the host cannot provide it.
+    """
+    name: str
+    hugepages: bool = False  # Back guest RAM with hugetlb memfd
+    hugepage_size_kb: int = 2048
+    prealloc: bool = False  # Fault in all guest RAM at startup
+    iothreads: int = 0  # Dedicated iothread objects; the disk uses the first (0 = main loop)
+    disk_bus: str = "virtio-blk"  # virtio-blk or virtio-scsi
+    vhost_net: bool = False  # In-kernel virtio-net backend for tap
+    multiqueue: bool = False  # One virtio-net queue pair per vCPU
+    max_net_queues: int = 8
+
+
+# Built-in profiles; config keys under `performance:` override fields
+PERFORMANCE_PROFILES = {
+    "default": PerformanceProfile(name="default", vhost_net=True),
+    "balanced": PerformanceProfile(
+        name="balanced", iothreads=1, vhost_net=True
+    ),
+    "throughput": PerformanceProfile(
+        name="throughput", hugepages=True, prealloc=True, iothreads=1,
+        disk_bus="virtio-scsi", vhost_net=True, multiqueue=True
+    ),
+    "latency": PerformanceProfile(
+        name="latency", hugepages=True, prealloc=True, iothreads=1,
+        vhost_net=True, multiqueue=False
+    ),
+}
+
+
+def parse_memory_mb(memory) -> int:
+    """
+    Parse a QEMU memory size (e.g., "2G", "512M", 2048) to megabytes.
+
+    Args:
+        memory: Size string or integer megabytes
+
+    Returns:
+        Size in MB
+    """
+    if isinstance(memory, int):
+        return memory
+
+    size = str(memory).strip().upper()
+    if size.endswith("G"):
+        return int(float(size[:-1]) * 1024)
+    if size.endswith("M"):
+        return int(float(size[:-1]))
+    if size.endswith("K"):
+        return max(1, int(float(size[:-1])) // 1024)
+    return int(size)
+
+
 class KVMManager:
     """
     KVM hardware acceleration manager for QWAMOS hypervisor.
@@ -116,6 +187,7 @@ class KVMManager:
             force_tcg: Force software emulation even if KVM available
         """
         self.force_tcg = force_tcg
+        self._vcpu_placer: Optional[VCPUPlacer] = None
         self.capabilities = self._detect_capabilities()
         self.enabled = self.capabilities.kvm_available and not force_tcg
 
@@ -231,8 +303,57 @@ class KVMManager:
         # Detect GIC version (from device tree if accessible)
         caps.vgic_version = self._detect_gic_version()
 
+        # Performance features used by PerformanceProfile
+        caps.memfd_available = hasattr(os, "memfd_create")
+        caps.hugepages_free_mb = self._detect_free_hugepages()
+        caps.vhost_net_available = os.access("/dev/vhost-net", os.R_OK | os.W_OK)
+
         return caps
 
+    def _detect_free_hugepages(self) -> Dict[int, int]:
+        """
+        Read free hugepages per page size from /sys/kernel/mm/hugepages.
+
+        Returns:
+            Dict mapping page size in kB to free memory in MB
+        """
+        free = {}
+        for pool in Path("/sys/kernel/mm/hugepages").glob("hugepages-*kB"):
+            try:
+                size_kb = int(pool.name[len("hugepages-"):-len("kB")])
+                pages = int((pool / "free_hugepages").read_text().strip())
+                free[size_kb] = pages * size_kb // 1024
+            except (OSError, ValueError):
+                continue
+        return free
+
+    def enable_huge_pages(self, size_mb: int, page_size_kb: int = 2048) -> bool:
+        """
+        Grow the hugepage pool so at least size_mb is free.
+
+        Args:
+            size_mb: Free hugepage memory required in MB
+            page_size_kb: Hugepage size in kB
+
+        Returns:
+            True if enough hugepages are free afterwards
+        """
+        pool = Path(f"/sys/kernel/mm/hugepages/hugepages-{page_size_kb}kB")
+        free_mb = self.capabilities.hugepages_free_mb.get(page_size_kb, 0)
+
+        if free_mb < size_mb:
+            try:
+                total = int((pool / "nr_hugepages").read_text().strip())
+                missing_pages = -(-(size_mb - free_mb) * 1024 // page_size_kb)
+                (pool / "nr_hugepages").write_text(str(total + missing_pages))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Cannot reserve {size_mb} MB of {page_size_kb} kB hugepages: {e}")
+
+            self.capabilities.hugepages_free_mb = self._detect_free_hugepages()
+            free_mb = self.capabilities.hugepages_free_mb.get(page_size_kb, 0)
+
+        return free_mb >= size_mb
+
     def _detect_gic_version(self) -> Optional[int]:
         """
         Detect ARM Generic Interrupt Controller (GIC) version.
@@ -272,8 +393,10 @@ class KVMManager:
                 - name: VM name (str)
                 - cpu: Number of vCPUs (int)
                 - memory: Memory size (str, e.g., "2G")
-                - disk: Disk image path (str, optional)
-                - network: Network config (dict, optional)
+                - disk: Disk image path or dict with path/format/cache (optional)
+                - network: Tap network config with ifname/device/mac (dict, optional)
+                - performance: Profile name or dict with "profile" and
+                  PerformanceProfile field overrides (optional)
 
         Returns:
             List of QEMU arguments to enable KVM acceleration or TCG fallback
@@ -282,6 +405,7 @@ class KVMManager:
             ['-accel', 'kvm', '-cpu', 'host', '-machine', 'virt,gic-version=3']
         """
         args = []
+        profile = self.resolve_performance_profile(vm_config.get('performance'))
 
         if self.enabled:
             # Enable KVM hardware acceleration
@@ -311,27 +435,138 @@ class KVMManager:
         if self.capabilities.arm_virtualization:
             machine += ',virtualization=on'
 
+        # Configure memory (optionally backed by a hugetlb memfd)
+        memory = vm_config.get('memory', '2G')
+        memory_backend = self._memory_backend_args(memory, profile)
+        if memory_backend:
+            machine += ',memory-backend=mem0'
+
         args.extend(['-machine', machine])
 
         # Configure vCPUs
         vcpu_count = vm_config.get('cpu', 2)
         args.extend(['-smp', str(vcpu_count)])
 
-        # Configure memory
-        memory = vm_config.get('memory', '2G')
         args.extend(['-m', memory])
+        args.extend(memory_backend)
 
-        # Enable vhost-net for network acceleration (if KVM enabled)
-        if self.enabled and vm_config.get('network'):
-            # TODO: Implement vhost-net configuration
-            pass
+        # Dedicated iothreads for virtio disks
+        iothreads = [f'iothread{i}' for i in range(profile.iothreads)]
+        for iothread in iothreads:
+            args.extend(['-object', f'iothread,id={iothread}'])
+
+        if vm_config.get('disk'):
+            args.extend(self._disk_args(vm_config['disk'], profile, iothreads))
+
+        # Tap networking with vhost-net and multiqueue
+        if vm_config.get('network'):
+            args.extend(self._network_args(vm_config['network'], vcpu_count, profile))
 
         return args
 
+    def resolve_performance_profile(self, performance) -> PerformanceProfile:
+        """
+        Build a PerformanceProfile from a VM config's performance section.
+
+        Args:
+            performance: None, a profile name, or a dict with "profile"
+                and optional PerformanceProfile field overrides
+
+        Returns:
+            PerformanceProfile (unknown names fall back to "default")
+        """
+        if not performance:
+            return PERFORMANCE_PROFILES["default"]
+
+        if isinstance(performance, str):
+            performance = {"profile": performance}
+
+        name = performance.get("profile", "default")
+        if name not in PERFORMANCE_PROFILES:
+            logger.warning(f"Unknown performance profile '{name}', using default")
+            name = "default"
+
+        overrides = {
+            key: value for key, value in performance.items()
+            if key in PerformanceProfile.__dataclass_fields__ and key != "name"
+        }
+        return replace(PERFORMANCE_PROFILES[name], **overrides)
+
+    def _memory_backend_args(self, memory, profile: PerformanceProfile) -> List[str]:
+        """
+        Build a memfd memory backend when the profile asks for hugepages.
+
+        Falls back to regular pages if the hugepage pool is too small and
+        omits the backend entirely if memfd is unavailable.
+        """
+        if not profile.hugepages or not self.capabilities.memfd_available:
+            return []
+
+        size_mb = parse_memory_mb(memory)
+        backend = f'memory-backend-memfd,id=mem0,size={size_mb}M'
+
+        free_mb = self.capabilities.hugepages_free_mb.get(profile.hugepage_size_kb, 0)
+        if free_mb >= size_mb:
+            backend += f',hugetlb=on,hugetlbsize={profile.hugepage_size_kb}K'
+        else:
+            logger.warning(
+                f"Only {free_mb} MB of {profile.hugepage_size_kb} kB hugepages free "
+                f"({size_mb} MB needed) - using regular pages"
+            )
+
+        backend += f',prealloc={"on" if profile.prealloc else "off"}'
+        return ['-object', backend]
+
+    def _disk_args(self, disk, profile: PerformanceProfile, iothreads: List[str]) -> List[str]:
+        """Build drive and virtio device args, binding the disk to an iothread."""
+        if isinstance(disk, str):
+            disk = {"path": disk}
+
+        drive = (f'file={disk["path"]},if=none,id=drive0,'
+                 f'format={disk.get("format", "qcow2")},cache={disk.get("cache", "writeback")}')
+
+        args = ['-drive', drive]
+        iothread = f',iothread={iothreads[0]}' if iothreads else ''
+
+        if profile.disk_bus == 'virtio-scsi':
+            args.extend(['-device', f'virtio-scsi-pci,id=scsi0{iothread}'])
+            args.extend(['-device', 'scsi-hd,drive=drive0,bus=scsi0.0'])
+        else:
+            args.extend(['-device', f'virtio-blk-pci,drive=drive0{iothread}'])
+
+        return args
+
+    def _network_args(self, network: Dict, vcpu_count: int, profile: PerformanceProfile) -> List[str]:
+        """Build tap netdev args with vhost-net and multiqueue when supported."""
+        netdev = f'tap,id=net0,ifname={network["ifname"]},script=no,downscript=no'
+        device = f'{network.get("device", "virtio-net-pci")},netdev=net0'
+        if network.get('mac'):
+            device += f',mac={network["mac"]}'
+
+        # vhost-net needs KVM ioeventfd/irqfd and an accessible /dev/vhost-net
+        vhost = profile.vhost_net and network.get('vhost', True)
+        if vhost and self.enabled and self.capabilities.vhost_net_available:
+            netdev += ',vhost=on'
+        elif vhost:
+            logger.warning("vhost-net unavailable - using userspace virtio-net")
+
+        queues = min(vcpu_count, profile.max_net_queues) if profile.multiqueue else 1
+        if queues > 1 and device.startswith('virtio-net'):
+            netdev += f',queues={queues}'
+            # One MSI-X vector per rx/tx queue plus config and control
+            device += f',mq=on,vectors={2 * queues + 2}'
+
+        return ['-netdev', netdev, '-device', device]
+
     def configure_vcpu_affinity(self, vm_pid: int, vm_name: str,
-                              vcpu_policy: str = "auto") -> bool:
+                              vcpu_policy: str = "auto", vcpu_count: Optional[int] = None,
+                              qmp_pool=None) -> bool:
         """
-        Configure vCPU affinity for big.LITTLE scheduling.
+        Configure topology-aware vCPU affinity for big.LITTLE scheduling.
+
+        Each vCPU thread is pinned to its own core, preferring a single
+        cluster/cache domain; emulator and I/O threads are kept on a
+        separate core. Cores reserved by other running VMs are avoided.
 
         Args:
             vm_pid: Process ID of QEMU VM
@@ -340,7 +575,9 @@ class KVMManager:
                 - "auto": Kernel decides (default)
                 - "big": Pin to performance cores
                 - "little": Pin to efficiency cores
-                - "isolated": Dedicated core (for realtime VMs)
+                - "isolated": Dedicated cores not shared with other VMs
+            vcpu_count: Number of vCPUs (used when QMP is unavailable)
+            qmp_pool: QMPClientPool to look up vCPU threads (query-cpus-fast)
 
         Returns:
             True if affinity configured successfully
@@ -355,35 +592,64 @@ class KVMManager:
             logger.info(f"VM {vm_name}: Using automatic CPU scheduling")
             return True
 
+        if vcpu_policy not in PLACEMENT_POLICIES:
+            logger.error(f"Unknown vCPU policy: {vcpu_policy}")
+            return False
+
         try:
-            # Read CPU topology from /sys
-            cpu_topology = self._read_cpu_topology()
-
-            if vcpu_policy == "big":
-                # Pin to performance cores
-                cpus = cpu_topology.get("big_cores", [0, 1, 2, 3])
-            elif vcpu_policy == "little":
-                # Pin to efficiency cores
-                cpus = cpu_topology.get("little_cores", [4, 5, 6, 7])
-            elif vcpu_policy == "isolated":
-                # Use last core for isolation
-                cpus = [cpu_topology.get("total_cpus", 8) - 1]
-            else:
-                logger.error(f"Unknown vCPU policy: {vcpu_policy}")
-                return False
+            vcpu_threads = self._query_vcpu_threads(vm_name, qmp_pool)
+            placement = self.vcpu_placer.reserve(
+                vm_name, vm_pid, len(vcpu_threads) or vcpu_count or 1, vcpu_policy
+            )
 
-            # Set CPU affinity using taskset
-            cpu_list = ",".join(map(str, cpus))
-            subprocess.run(["taskset", "-acp", cpu_list, str(vm_pid)],
-                         check=True, capture_output=True)
+            if not self.vcpu_placer.apply(placement, vcpu_threads):
+                return False
 
-            logger.info(f"VM {vm_name} (PID {vm_pid}): Pinned to CPUs {cpu_list}")
+            logger.info(
+                f"VM {vm_name} (PID {vm_pid}): vCPUs pinned to {placement.vcpu_cpus}, "
+                f"emulator threads to {placement.emulator_cpus}"
+            )
             return True
 
         except Exception as e:
             logger.error(f"Failed to set CPU affinity for {vm_name}: {e}")
             return False
 
+    def release_vcpu_affinity(self, vm_name: str):
+        """
+        Release a stopped VM's core reservation.
+
+        Args:
+            vm_name: Name of VM
+        """
+        self.vcpu_placer.release(vm_name)
+
+    @property
+    def vcpu_placer(self) -> VCPUPlacer:
+        """Lazily created vCPU placer (reads topology on first use)."""
+        if self._vcpu_placer is None:
+            self._vcpu_placer = VCPUPlacer()
+        return self._vcpu_placer
+
+    def _query_vcpu_threads(self, vm_name: str, qmp_pool, retries: int = 10) -> Dict[int, int]:
+        """
+        Look up vCPU thread IDs over QMP, waiting for a just-started QEMU.
+
+        Returns:
+            Dict mapping vCPU index to thread ID (empty if unavailable)
+        """
+        if qmp_pool is None:
+            return {}
+
+        for attempt in range(retries):
+            try:
+                return qmp_pool.call(qmp_pool.query_vcpu_threads(vm_name), timeout=qmp_pool.timeout)
+            except QMPError:
+                time.sleep(0.2 * (attempt + 1))
+
+        logger.warning(f"VM {vm_name}: QMP unavailable, vCPU threads unknown")
+        return {}
+
     def _read_cpu_topology(self) -> Dict[str, List[int]]:
         """
         Read CPU topology from /sys/devices/system/cpu.
@@ -391,49 +657,21 @@ class KVMManager:
         Returns:
             Dictionary with big_cores, little_cores, and total_cpus
         """
-        topology = {
-            "big_cores": [],
-            "little_cores": [],
-            "total_cpus": 0
-        }
-
         try:
-            cpu_dirs = list(Path("/sys/devices/system/cpu").glob("cpu[0-9]*"))
-            topology["total_cpus"] = len(cpu_dirs)
-
-            # Simple heuristic: higher max frequency = big core
-            cpu_freqs = []
-            for cpu_dir in sorted(cpu_dirs):
-                cpu_num = int(cpu_dir.name.replace("cpu", ""))
-                freq_file = cpu_dir / "cpufreq" / "cpuinfo_max_freq"
-
-                if freq_file.exists():
-                    with open(freq_file) as f:
-                        max_freq = int(f.read().strip())
-                        cpu_freqs.append((cpu_num, max_freq))
-
-            if cpu_freqs:
-                # Sort by frequency
-                cpu_freqs.sort(key=lambda x: x[1], reverse=True)
-
-                # Assume top 50% are big cores
-                split = len(cpu_freqs) // 2
-                topology["big_cores"] = [cpu for cpu, _ in cpu_freqs[:split]]
-                topology["little_cores"] = [cpu for cpu, _ in cpu_freqs[split:]]
-            else:
-                # Fallback: assume first half are big
-                mid = topology["total_cpus"] // 2
-                topology["big_cores"] = list(range(mid))
-                topology["little_cores"] = list(range(mid, topology["total_cpus"]))
-
+            topology = self.vcpu_placer.topology
+            return {
+                "big_cores": topology.big_cores(),
+                "little_cores": topology.little_cores(),
+                "total_cpus": len(topology.cpus),
+            }
         except Exception as e:
             logger.error(f"Failed to read CPU topology: {e}")
             # Ultra-safe fallback
-            topology["big_cores"] = [0, 1]
-            topology["little_cores"] = [2, 3, 4, 5, 6, 7]
-            topology["total_cpus"] = 8
-
-        return topology
+            return {
+                "big_cores": [0, 1],
+                "little_cores": [2, 3, 4, 5, 6, 7],
+                "total_cpus": 8,
+            }
 
     def benchmark_performance(self, test_vm_config: Dict) -> Dict[str, float]:
         """
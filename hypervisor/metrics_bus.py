@@ -0,0 +1,569 @@
+#!/usr/bin/env python3
+"""
+QWAMOS Metrics Bus
+Phase XV: AI Governor
+
+One collector, many readers:
+- A single collector process runs ResourceMonitor and publishes every
+  snapshot into a fixed-layout multiprocessing.shared_memory segment
+- Writes are guarded by a seqlock (sequence counter odd while writing)
+- Readers never take a lock: they unpack fields straight out of the
+  shared buffer and retry if the sequence moved underneath them
+- N consumers (AI Governor, deployment monitor, cluster node) cost one
+  psutil/QMP collection instead of N
+
+Layout (little-endian, sizes fixed when the segment is created):
+    header   magic, version, max_cores, max_zones, max_vms, writer pid
+    seq      native uint64 at offset 24 (aligned, single store)
+    host     CPU, memory, thermal and battery scalars
+    cores    max_cores x (usage %, frequency MHz)
+    zones    max_zones x (name, temperature)
+    vms      max_vms x (name, pid, status, cpu, memory, I/O, network)
+
+Author: QWAMOS Project
+License: MIT
+"""
+
+import logging
+import math
+import multiprocessing
+import os
+import struct
+import sys
+import time
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from typing import Callable, List, Optional
+
+# Add hypervisor to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from resource_monitor import (
+    BatteryMetrics, CPUMetrics, MemoryMetrics, ResourceMonitor, SystemMetrics, ThermalMetrics, VMMetrics
+)
+
+logger = logging.getLogger("MetricsBus")
+
+DEFAULT_BUS_NAME = "qwamos-metrics"
+
+MAGIC = b"QWMETRIC"
+VERSION = 1
+
+HEADER = struct.Struct("<8sIHHHxxI")  # magic, version, max_cores, max_zones, max_vms, writer pid
+SEQ_OFFSET = 24
+PAYLOAD_OFFSET = 32
+
+# timestamp, cpu %, cpu temp, ctx switches, interrupts, core/zone/vm counts,
+# memory (total, used, free, available, %, swap total, swap used, swap %),
+# temperatures (cpu, gpu, battery), battery (%, charging, minutes left, watts)
+HOST = struct.Struct("<dddQQIIIxxxxQQQQdQQddddd?xxxxxxxqd")
+CORE = struct.Struct("<dd")
+ZONE = struct.Struct("<24sd")
+VM = struct.Struct("<64siI12sdQddddd")
+
+NAME_SIZE = 64
+STATUS_SIZE = 12
+
+MAX_READ_RETRIES = 10000
+
+
+class MetricsBusError(Exception):
+    """Metrics bus layout or consistency error."""
+    pass
+
+
+def bus_size(max_cores: int, max_zones: int, max_vms: int) -> int:
+    """Bytes needed for a segment with the given capacities."""
+    return PAYLOAD_OFFSET + HOST.size + max_cores * CORE.size + max_zones * ZONE.size + max_vms * VM.size
+
+
+def _nan(value: Optional[float]) -> float:
+    return math.nan if value is None else float(value)
+
+
+def _opt(value: float) -> Optional[float]:
+    return None if math.isnan(value) else value
+
+
+def _unregister(shm: SharedMemory):
+    # Python < 3.13 registers every attach with the resource tracker, which
+    # would unlink the segment when this process exits
+    if sys.version_info < (3, 13):
+        resource_tracker.unregister(shm._name, "shared_memory")
+
+
+class _Segment:
+    """Offsets into a metrics bus segment."""
+
+    def __init__(self, shm: SharedMemory, max_cores: int, max_zones: int, max_vms: int):
+        self.shm = shm
+        self.buf = shm.buf
+        self.max_cores = max_cores
+        self.max_zones = max_zones
+        self.max_vms = max_vms
+
+        self.host_offset = PAYLOAD_OFFSET
+        self.core_offset = self.host_offset + HOST.size
+        self.zone_offset = self.core_offset + max_cores * CORE.size
+        self.vm_offset = self.zone_offset + max_zones * ZONE.size
+
+        # Native-endian view so sequence updates are single aligned stores
+        self.seq = self.buf[SEQ_OFFSET:SEQ_OFFSET + 8].cast("Q")
+
+    def release(self):
+        self.seq.release()
+        self.buf = None
+        self.shm.close()
+
+
+class MetricsPublisher:
+    """
+    Seqlock writer for the metrics bus.
+
+    Only one publisher may write a segment. Restarting the collector
+    re-attaches to an existing segment with the same layout so readers
+    keep their mappings.
+    """
+
+    def __init__(self, name: str = DEFAULT_BUS_NAME, max_cores: int = 64,
+                 max_zones: int = 16, max_vms: int = 64):
+        """
+        Create (or re-attach to) a metrics bus segment.
+
+        Args:
+            name: Shared memory segment name
+            max_cores: CPU core slots
+            max_zones: Thermal zone slots
+            max_vms: VM slots
+
+        Raises:
+            MetricsBusError: Existing segment has a different layout
+        """
+        self.name = name
+        size = bus_size(max_cores, max_zones, max_vms)
+
+        try:
+            shm = SharedMemory(name=name, create=True, size=size)
+            HEADER.pack_into(shm.buf, 0, MAGIC, VERSION, max_cores, max_zones, max_vms, os.getpid())
+        except FileExistsError:
+            shm = SharedMemory(name=name)
+            magic, version, cores, zones, vms, _ = HEADER.unpack_from(shm.buf, 0)
+            if (magic, version, cores, zones, vms) != (MAGIC, VERSION, max_cores, max_zones, max_vms):
+                _unregister(shm)
+                shm.close()
+                raise MetricsBusError(f"Segment {name} exists with a different layout")
+            HEADER.pack_into(shm.buf, 0, MAGIC, VERSION, max_cores, max_zones, max_vms, os.getpid())
+
+        self._segment = _Segment(shm, max_cores, max_zones, max_vms)
+        if self._segment.seq[0] & 1:
+            # Previous writer died mid-update
+            self._segment.seq[0] += 1
+
+        self.published = 0
+        self._warned: set = set()
+
+    @property
+    def sequence(self) -> int:
+        """Current sequence number (even when idle)."""
+        return self._segment.seq[0]
+
+    def publish(self, metrics: SystemMetrics):
+        """
+        Write a snapshot (usable as a ResourceMonitor subscriber).
+
+        Args:
+            metrics: SystemMetrics snapshot
+        """
+        seg = self._segment
+        buf = seg.buf
+        cpu, mem, thermal, battery = metrics.cpu, metrics.memory, metrics.thermal, metrics.battery
+
+        cores = min(seg.max_cores, max(len(cpu.per_core), len(cpu.frequency_mhz)))
+        zones = list(thermal.thermal_zone_temps.items())[:seg.max_zones]
+        vms = [vm for vm in metrics.vms if self._fits(vm.vm_name)][:seg.max_vms]
+        if len(metrics.vms) > seg.max_vms and "overflow" not in self._warned:
+            self._warned.add("overflow")
+            logger.warning(f"Metrics bus holds {seg.max_vms} VMs; {len(metrics.vms)} reported")
+
+        seq = seg.seq[0]
+        seg.seq[0] = seq + 1
+
+        HOST.pack_into(
+            buf, seg.host_offset,
+            metrics.timestamp, cpu.system_percent, _nan(cpu.temperature_c),
+            cpu.context_switches, cpu.interrupts, cores, len(zones), len(vms),
+            mem.total_mb, mem.used_mb, mem.free_mb, mem.available_mb, mem.percent,
+            mem.swap_total_mb, mem.swap_used_mb, mem.swap_percent,
+            _nan(thermal.cpu_temp_c), _nan(thermal.gpu_temp_c), _nan(thermal.battery_temp_c),
+            _nan(battery.percent), battery.is_charging,
+            -1 if battery.time_remaining_min is None else battery.time_remaining_min,
+            _nan(battery.power_draw_w),
+        )
+        for i in range(cores):
+            CORE.pack_into(buf, seg.core_offset + i * CORE.size,
+                           cpu.per_core[i] if i < len(cpu.per_core) else 0.0,
+                           cpu.frequency_mhz[i] if i < len(cpu.frequency_mhz) else 0.0)
+        for i, (zone, temp) in enumerate(zones):
+            ZONE.pack_into(buf, seg.zone_offset + i * ZONE.size, zone.encode()[:ZONE.size - 8], temp)
+        for i, vm in enumerate(vms):
+            VM.pack_into(
+                buf, seg.vm_offset + i * VM.size,
+                vm.vm_name.encode(), -1 if vm.pid is None else vm.pid, vm.threads,
+                vm.status.encode()[:STATUS_SIZE], vm.cpu_percent, vm.memory_mb, vm.memory_percent,
+                vm.io_read_mb, vm.io_write_mb, vm.net_sent_mb, vm.net_recv_mb,
+            )
+
+        seg.seq[0] = seq + 2
+        self.published += 1
+
+    def close(self, unlink: bool = True):
+        """
+        Detach from the segment.
+
+        Args:
+            unlink: Also remove the segment (readers keep their mapping)
+        """
+        if self._segment is None:
+            return
+        shm = self._segment.shm
+        self._segment.release()
+        self._segment = None
+        if unlink:
+            if sys.version_info < (3, 13):
+                # A reader in this process tree may have dropped the shared
+                # tracker entry; unlink() unregisters it again
+                resource_tracker.register(shm._name, "shared_memory")
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _fits(self, vm_name: str) -> bool:
+        if len(vm_name.encode()) <= NAME_SIZE:
+            return True
+        if vm_name not in self._warned:
+            self._warned.add(vm_name)
+            logger.warning(f"VM name too long for metrics bus: {vm_name}")
+        return False
+
+
+class MetricsReader:
+    """
+    Lock-free metrics bus reader.
+
+    Every read unpacks directly from the shared mapping and is retried
+    if the writer's sequence number changed while reading, so readers
+    never block the collector or each other.
+    """
+
+    def __init__(self, name: str = DEFAULT_BUS_NAME):
+        """
+        Attach to a metrics bus segment.
+
+        Args:
+            name: Shared memory segment name
+
+        Raises:
+            FileNotFoundError: No collector has created the segment
+            MetricsBusError: Segment is not a metrics bus
+        """
+        self.name = name
+        if sys.version_info >= (3, 13):
+            shm = SharedMemory(name=name, track=False)
+        else:
+            shm = SharedMemory(name=name)
+            _unregister(shm)
+
+        magic, version, cores, zones, vms, _ = HEADER.unpack_from(shm.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            shm.close()
+            raise MetricsBusError(f"Segment {name} is not a metrics bus")
+        self._segment = _Segment(shm, cores, zones, vms)
+        self.retries = 0
+
+    @property
+    def sequence(self) -> int:
+        """Writer sequence number; 0 until the first snapshot."""
+        return self._segment.seq[0]
+
+    @property
+    def writer_pid(self) -> int:
+        """PID of the collector that last attached as writer."""
+        return HEADER.unpack_from(self._segment.buf, 0)[5]
+
+    def read(self, fn: Callable[[memoryview], object]):
+        """
+        Run fn over the shared buffer until it sees a consistent snapshot.
+
+        Args:
+            fn: Reads fields from the buffer (must not keep references)
+
+        Returns:
+            fn's result
+        """
+        seg = self._segment
+        for _ in range(MAX_READ_RETRIES):
+            seq = seg.seq[0]
+            if seq & 1:
+                self.retries += 1
+                time.sleep(0)
+                continue
+            result = fn(seg.buf)
+            if seg.seq[0] == seq:
+                return result
+            self.retries += 1
+        raise MetricsBusError("Metrics bus writer did not settle")
+
+    def snapshot(self, vm_names: Optional[List[str]] = None) -> Optional[SystemMetrics]:
+        """
+        Read the latest snapshot.
+
+        Args:
+            vm_names: Only include these VMs (default: all)
+
+        Returns:
+            SystemMetrics or None before the first publish
+        """
+        if self.sequence == 0:
+            return None
+        wanted = set(vm_names) if vm_names is not None else None
+        return self.read(lambda buf: self._unpack(buf, wanted))
+
+    def vm(self, vm_name: str) -> Optional[VMMetrics]:
+        """
+        Read one VM's metrics without decoding the rest of the snapshot.
+
+        Args:
+            vm_name: VM name
+
+        Returns:
+            VMMetrics or None if the VM is not published
+        """
+        key = vm_name.encode().ljust(NAME_SIZE, b"\x00")
+        if len(key) > NAME_SIZE or self.sequence == 0:
+            return None
+        seg = self._segment
+
+        def find(buf):
+            count = HOST.unpack_from(buf, seg.host_offset)[7]
+            for i in range(count):
+                offset = seg.vm_offset + i * VM.size
+                if buf[offset:offset + NAME_SIZE] == key:
+                    return self._unpack_vm(buf, offset)
+            return None
+
+        return self.read(find)
+
+    def age(self) -> Optional[float]:
+        """Seconds since the last published snapshot (None before the first)."""
+        if self.sequence == 0:
+            return None
+        timestamp = self.read(lambda buf: HOST.unpack_from(buf, self._segment.host_offset)[0])
+        return time.time() - timestamp
+
+    def wait(self, after: int, timeout: Optional[float] = None, poll: float = 0.05) -> Optional[int]:
+        """
+        Block until a snapshot newer than `after` is published.
+
+        Args:
+            after: Sequence number already seen
+            timeout: Maximum seconds to wait
+            poll: Polling interval
+
+        Returns:
+            New sequence number, or None on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            seq = self._segment.seq[0]
+            if seq > after and not seq & 1:
+                return seq
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(poll)
+
+    def close(self):
+        """Detach from the segment."""
+        if self._segment is not None:
+            self._segment.release()
+            self._segment = None
+
+    def _unpack(self, buf, wanted) -> SystemMetrics:
+        seg = self._segment
+        (timestamp, cpu_percent, cpu_temp, ctx_switches, interrupts, cores, zones, vms,
+         total, used, free, available, mem_percent, swap_total, swap_used, swap_percent,
+         cpu_temp_c, gpu_temp_c, battery_temp_c, battery_percent, charging, minutes_left,
+         power_draw) = HOST.unpack_from(buf, seg.host_offset)
+
+        per_core, frequencies = [], []
+        for usage, freq in CORE.iter_unpack(buf[seg.core_offset:seg.core_offset + cores * CORE.size]):
+            per_core.append(usage)
+            frequencies.append(freq)
+
+        zone_temps = {}
+        for name, temp in ZONE.iter_unpack(buf[seg.zone_offset:seg.zone_offset + zones * ZONE.size]):
+            zone_temps[name.rstrip(b"\x00").decode()] = temp
+
+        vm_list = []
+        for i in range(vms):
+            offset = seg.vm_offset + i * VM.size
+            if wanted is not None:
+                name = bytes(buf[offset:offset + NAME_SIZE]).rstrip(b"\x00").decode()
+                if name not in wanted:
+                    continue
+            vm_list.append(self._unpack_vm(buf, offset))
+
+        return SystemMetrics(
+            timestamp=timestamp,
+            cpu=CPUMetrics(system_percent=cpu_percent, per_core=per_core, temperature_c=_opt(cpu_temp),
+                           frequency_mhz=frequencies, context_switches=ctx_switches, interrupts=interrupts),
+            memory=MemoryMetrics(total_mb=total, used_mb=used, free_mb=free, available_mb=available,
+                                 percent=mem_percent, swap_total_mb=swap_total, swap_used_mb=swap_used,
+                                 swap_percent=swap_percent),
+            thermal=ThermalMetrics(cpu_temp_c=_opt(cpu_temp_c), gpu_temp_c=_opt(gpu_temp_c),
+                                   battery_temp_c=_opt(battery_temp_c), thermal_zone_temps=zone_temps),
+            battery=BatteryMetrics(percent=_opt(battery_percent), is_charging=charging,
+                                   time_remaining_min=None if minutes_left < 0 else minutes_left,
+                                   power_draw_w=_opt(power_draw)),
+            vms=vm_list
+        )
+
+    @staticmethod
+    def _unpack_vm(buf, offset: int) -> VMMetrics:
+        (name, pid, threads, status, cpu_percent, memory_mb, memory_percent,
+         io_read, io_write, net_sent, net_recv) = VM.unpack_from(buf, offset)
+        return VMMetrics(
+            vm_name=name.rstrip(b"\x00").decode(),
+            pid=None if pid < 0 else pid,
+            cpu_percent=cpu_percent,
+            memory_mb=memory_mb,
+            memory_percent=memory_percent,
+            io_read_mb=io_read,
+            io_write_mb=io_write,
+            net_sent_mb=net_sent,
+            net_recv_mb=net_recv,
+            threads=threads,
+            status=status.rstrip(b"\x00").decode()
+        )
+
+
+class BusResourceMonitor(ResourceMonitor):
+    """
+    ResourceMonitor backed by the metrics bus.
+
+    collect_all_metrics() returns the collector's latest snapshot instead
+    of querying psutil/QMP, so AIGovernor and GovernorDaemon work
+    unchanged on top of a shared collector.
+    """
+
+    def __init__(self, reader: MetricsReader, history_size: int = 100):
+        """
+        Initialize bus-backed monitor.
+
+        Args:
+            reader: Attached MetricsReader
+            history_size: Number of metric snapshots to retain
+        """
+        super().__init__(history_size=history_size)
+        self.reader = reader
+
+    def collect_all_metrics(self, vm_names: List[str] = None) -> SystemMetrics:
+        """
+        Read the latest published snapshot.
+
+        Args:
+            vm_names: List of VM names to include (optional)
+
+        Returns:
+            SystemMetrics object
+
+        Raises:
+            MetricsBusError: Nothing has been published yet
+        """
+        metrics = self.reader.snapshot(vm_names=vm_names or [])
+        if metrics is None:
+            raise MetricsBusError(f"No snapshot on metrics bus {self.reader.name}")
+
+        self.metrics_history.append(metrics)
+        for callback in list(self.subscribers):
+            callback(metrics)
+
+        return metrics
+
+
+def run_collector(vm_names: List[str], name: str = DEFAULT_BUS_NAME, interval: float = 2.0,
+                  stop_event=None, monitor: Optional[ResourceMonitor] = None, **capacity):
+    """
+    Collect metrics and publish them to the bus until stopped.
+
+    Args:
+        vm_names: VMs to monitor
+        name: Shared memory segment name
+        interval: Seconds between collections
+        stop_event: multiprocessing.Event ending the loop (optional)
+        monitor: ResourceMonitor to drive (default: new one)
+        **capacity: max_cores / max_zones / max_vms for MetricsPublisher
+    """
+    publisher = MetricsPublisher(name, **capacity)
+    monitor = monitor or ResourceMonitor(history_size=1)
+    monitor.subscribe(publisher.publish)
+    logger.info(f"Metrics collector publishing to {name} every {interval}s")
+
+    try:
+        while stop_event is None or not stop_event.is_set():
+            started = time.monotonic()
+            monitor.collect_all_metrics(vm_names)
+            delay = max(0.0, interval - (time.monotonic() - started))
+            if stop_event is not None:
+                stop_event.wait(delay)
+            else:
+                time.sleep(delay)
+    finally:
+        monitor.unsubscribe(publisher.publish)
+        publisher.close()
+
+
+def start_collector_process(vm_names: List[str], name: str = DEFAULT_BUS_NAME,
+                            interval: float = 2.0, **capacity):
+    """
+    Start the single metrics collector in a child process.
+
+    Args:
+        vm_names: VMs to monitor
+        name: Shared memory segment name
+        interval: Seconds between collections
+        **capacity: max_cores / max_zones / max_vms for MetricsPublisher
+
+    Returns:
+        (process, stop_event)
+    """
+    stop_event = multiprocessing.Event()
+    process = multiprocessing.Process(
+        target=run_collector, args=(vm_names, name, interval, stop_event),
+        kwargs=capacity, name="qwamos-metrics-collector", daemon=True
+    )
+    process.start()
+    return process, stop_event
+
+
+def main():
+    """Run the metrics collector in the foreground."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="QWAMOS shared-memory metrics collector")
+    parser.add_argument("vm_names", nargs="*", help="VMs to monitor")
+    parser.add_argument("--name", default=DEFAULT_BUS_NAME, help="Shared memory segment name")
+    parser.add_argument("--interval", type=float, default=2.0, help="Collection interval (s)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    try:
+        run_collector(args.vm_names, args.name, args.interval)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,696 @@
+#!/usr/bin/env python3
+"""
+QWAMOS QMP Client
+Phase XV: AI Governor
+
+Pooled asyncio client for the QEMU Machine Protocol (QMP):
+- One persistent unix-socket connection per VM
+- Graceful shutdown via system_powerdown
+- VM run state via query-status
+- Per-VM block and network I/O counters
+- Memory balloon control
+
+The resource monitor and governor read per-VM counters through this
+pool in a single batch instead of scanning /proc for QEMU processes.
+
+Author: QWAMOS Project
+License: MIT
+"""
+
+import asyncio
+import concurrent.futures
+import json
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Dict, List, Optional
+
+logger = logging.getLogger("QMPClient")
+
+# Runtime directory holding one QMP socket per VM
+QWAMOS_ROOT = Path.home() / "QWAMOS"
+QMP_SOCKET_DIR = QWAMOS_ROOT / "hypervisor" / "run"
+
+# Host-side tap interface naming used by VMManager for bridge networking
+TAP_IFNAME_FORMAT = "tap-{vm_name}"
+
+SYSFS_NET_DIR = Path("/sys/class/net")
+
+
+class QMPError(Exception):
+    """Raised when a QMP command fails or the connection is lost."""
+
+    def __init__(self, message: str, error_class: Optional[str] = None):
+        super().__init__(message)
+        self.error_class = error_class
+
+
+@dataclass
+class VMIOStats:
+    """Per-VM I/O counters read over QMP."""
+    vm_name: str
+    status: str  # running, paused, shutdown, stopped, ...
+    block_read_bytes: int
+    block_write_bytes: int
+    block_read_ops: int
+    block_write_ops: int
+    net_rx_bytes: int  # Bytes received by the guest
+    net_tx_bytes: int  # Bytes sent by the guest
+    balloon_mb: Optional[int]  # Current balloon size, None if no balloon device
+    timestamp: float
+
+
+def qmp_socket_path(vm_name: str, socket_dir: Path = QMP_SOCKET_DIR) -> Path:
+    """
+    Get QMP socket path for a VM.
+
+    Args:
+        vm_name: VM name
+        socket_dir: Directory holding QMP sockets
+
+    Returns:
+        Path to the VM's QMP unix socket
+    """
+    return Path(socket_dir) / f"{vm_name}.qmp"
+
+
+def qmp_command_args(vm_name: str, socket_dir: Path = QMP_SOCKET_DIR) -> List[str]:
+    """
+    Build QEMU arguments exposing a QMP unix socket for a VM.
+
+    Args:
+        vm_name: VM name
+        socket_dir: Directory holding QMP sockets
+
+    Returns:
+        List of QEMU arguments
+    """
+    path = qmp_socket_path(vm_name, socket_dir)
+    return ["-qmp", f"unix:{path},server=on,wait=off"]
+
+
+class QMPConnection:
+    """
+    Single persistent QMP connection.
+
+    A background reader task dispatches command responses to waiting
+    callers by id and keeps recent asynchronous events, so concurrent
+    commands can share one socket.
+    """
+
+    def __init__(self, socket_path: Path, timeout: float = 5.0, event_history: int = 64):
+        """
+        Initialize QMP connection.
+
+        Args:
+            socket_path: Path to QMP unix socket
+            timeout: Default command timeout in seconds
+            event_history: Number of QMP events to retain
+        """
+        self.socket_path = Path(socket_path)
+        self.timeout = timeout
+        self.events: deque = deque(maxlen=event_history)
+
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._event_waiters: List[tuple] = []
+        self._next_id = 0
+        self._closed = asyncio.Event()
+
+    @property
+    def connected(self) -> bool:
+        """Whether the connection is open and the reader is alive."""
+        return (
+            self._writer is not None
+            and not self._closed.is_set()
+            and self._reader_task is not None
+            and not self._reader_task.done()
+        )
+
+    async def connect(self):
+        """
+        Open the socket, read the greeting and negotiate capabilities.
+
+        Raises:
+            QMPError: If the socket is unreachable or negotiation fails
+        """
+        try:
+            self._reader, self._writer = await asyncio.wait_for(
+                asyncio.open_unix_connection(str(self.socket_path)), self.timeout
+            )
+            greeting = json.loads(await asyncio.wait_for(self._reader.readline(), self.timeout))
+        except (OSError, asyncio.TimeoutError, ValueError) as e:
+            await self.close()
+            raise QMPError(f"Cannot connect to QMP socket {self.socket_path}: {e}")
+
+        if "QMP" not in greeting:
+            await self.close()
+            raise QMPError(f"Unexpected QMP greeting: {greeting}")
+
+        self._closed.clear()
+        self._reader_task = asyncio.ensure_future(self._read_loop())
+        await self.execute("qmp_capabilities")
+
+    async def execute(self, command: str, arguments: Optional[Dict[str, Any]] = None,
+                      timeout: Optional[float] = None) -> Any:
+        """
+        Execute a QMP command.
+
+        Args:
+            command: QMP command name
+            arguments: Command arguments
+            timeout: Command timeout in seconds (default: connection timeout)
+
+        Returns:
+            Value of the "return" member of the response
+
+        Raises:
+            QMPError: On command error, timeout or lost connection
+        """
+        if self._writer is None or self._closed.is_set():
+            raise QMPError(f"QMP connection to {self.socket_path} is closed")
+
+        self._next_id += 1
+        cmd_id = self._next_id
+        message = {"execute": command, "id": cmd_id}
+        if arguments:
+            message["arguments"] = arguments
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[cmd_id] = future
+
+        try:
+            self._writer.write(json.dumps(message).encode() + b"\n")
+            await self._writer.drain()
+            response = await asyncio.wait_for(future, timeout or self.timeout)
+        except asyncio.TimeoutError:
+            raise QMPError(f"QMP command '{command}' timed out")
+        except OSError as e:
+            await self.close()
+            raise QMPError(f"QMP connection lost during '{command}': {e}")
+        finally:
+            self._pending.pop(cmd_id, None)
+
+        if "error" in response:
+            error = response["error"]
+            raise QMPError(f"{command}: {error.get('desc', 'unknown error')}", error.get("class"))
+
+        return response.get("return")
+
+    async def wait_event(self, name: str, timeout: Optional[float] = None) -> Optional[Dict]:
+        """
+        Wait for a QMP event.
+
+        Args:
+            name: Event name (e.g., "SHUTDOWN")
+            timeout: Timeout in seconds
+
+        Returns:
+            Event dictionary, or None on timeout or connection close
+        """
+        future = asyncio.get_running_loop().create_future()
+        waiter = (name, future)
+        self._event_waiters.append(waiter)
+        closed = asyncio.ensure_future(self._closed.wait())
+
+        try:
+            done, _ = await asyncio.wait(
+                {future, closed}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            return future.result() if future in done else None
+        finally:
+            closed.cancel()
+            if waiter in self._event_waiters:
+                self._event_waiters.remove(waiter)
+
+    async def wait_closed(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for the peer to close the connection (e.g., QEMU exited).
+
+        Args:
+            timeout: Timeout in seconds
+
+        Returns:
+            True if the connection closed within the timeout
+        """
+        try:
+            await asyncio.wait_for(self._closed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def close(self):
+        """Close the connection and fail pending commands."""
+        self._closed.set()
+
+        if self._reader_task and not self._reader_task.done() \
+                and self._reader_task is not asyncio.current_task():
+            self._reader_task.cancel()
+
+        if self._writer is not None:
+            try:
+                self._writer.close()
+                await self._writer.wait_closed()
+            except (OSError, RuntimeError):
+                pass
+            self._writer = None
+
+        self._fail_pending(QMPError(f"QMP connection to {self.socket_path} closed"))
+
+    async def _read_loop(self):
+        """Dispatch responses and events until the socket closes."""
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    logger.warning(f"Malformed QMP message from {self.socket_path}")
+                    continue
+
+                if "event" in message:
+                    self._dispatch_event(message)
+                    continue
+
+                future = self._pending.get(message.get("id"))
+                if future and not future.done():
+                    future.set_result(message)
+        except (OSError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            return
+
+        self._closed.set()
+        self._fail_pending(QMPError(f"QMP connection to {self.socket_path} closed by peer"))
+
+    def _dispatch_event(self, event: Dict):
+        """Record an event and wake matching waiters."""
+        self.events.append(event)
+        for name, future in list(self._event_waiters):
+            if name == event["event"] and not future.done():
+                future.set_result(event)
+
+    def _fail_pending(self, error: QMPError):
+        """Fail all commands still waiting for a response."""
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self._pending.clear()
+
+
+class QMPClientPool:
+    """
+    Pool of persistent QMP connections, one per VM.
+
+    Features:
+    - Lazy connect and transparent reconnect
+    - Graceful powerdown with shutdown confirmation
+    - Batched block/net/balloon statistics for many VMs
+    - Synchronous bridge (call) for non-async callers
+    """
+
+    def __init__(self, socket_dir: Path = QMP_SOCKET_DIR, timeout: float = 5.0,
+                 sysfs_net_dir: Path = SYSFS_NET_DIR):
+        """
+        Initialize QMP client pool.
+
+        Args:
+            socket_dir: Directory holding per-VM QMP sockets
+            timeout: Default command timeout in seconds
+            sysfs_net_dir: sysfs directory with host network interface counters
+        """
+        self.socket_dir = Path(socket_dir)
+        self.timeout = timeout
+        self.sysfs_net_dir = Path(sysfs_net_dir)
+
+        self.connections: Dict[str, QMPConnection] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+        # Background event loop for synchronous callers
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        self._loop_lock = threading.Lock()
+
+    async def get_connection(self, vm_name: str) -> QMPConnection:
+        """
+        Get (or open) the persistent connection for a VM.
+
+        Args:
+            vm_name: VM name
+
+        Returns:
+            Connected QMPConnection
+
+        Raises:
+            QMPError: If the VM's QMP socket is unreachable
+        """
+        conn = self.connections.get(vm_name)
+        if conn and conn.connected:
+            return conn
+
+        lock = self._locks.setdefault(vm_name, asyncio.Lock())
+        async with lock:
+            conn = self.connections.get(vm_name)
+            if conn and conn.connected:
+                return conn
+            if conn:
+                # Release the stale socket before reconnecting
+                await conn.close()
+
+            conn = QMPConnection(qmp_socket_path(vm_name, self.socket_dir), timeout=self.timeout)
+            await conn.connect()
+            self.connections[vm_name] = conn
+            logger.debug(f"QMP connected: {vm_name}")
+            return conn
+
+    async def execute(self, vm_name: str, command: str,
+                      arguments: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        Execute a QMP command on a VM, reconnecting once if the connection dropped.
+
+        Args:
+            vm_name: VM name
+            command: QMP command name
+            arguments: Command arguments
+
+        Returns:
+            Command return value
+        """
+        conn = await self.get_connection(vm_name)
+        try:
+            return await conn.execute(command, arguments)
+        except QMPError as e:
+            if e.error_class is not None or conn.connected:
+                raise
+            conn = await self.get_connection(vm_name)
+            return await conn.execute(command, arguments)
+
+    async def query_status(self, vm_name: str) -> str:
+        """
+        Get VM run state.
+
+        Args:
+            vm_name: VM name
+
+        Returns:
+            Run state (e.g., "running", "paused", "shutdown")
+        """
+        result = await self.execute(vm_name, "query-status")
+        return result.get("status", "unknown")
+
+    async def system_powerdown(self, vm_name: str, timeout: float = 30.0) -> bool:
+        """
+        Request ACPI powerdown and wait for the guest to shut down.
+
+        Args:
+            vm_name: VM name
+            timeout: Seconds to wait for SHUTDOWN or QEMU exit
+
+        Returns:
+            True if the guest shut down within the timeout
+        """
+        conn = await self.get_connection(vm_name)
+        shutdown = asyncio.ensure_future(conn.wait_event("SHUTDOWN", timeout))
+        exited = asyncio.ensure_future(conn.wait_closed(timeout))
+
+        try:
+            await conn.execute("system_powerdown")
+            done, _ = await asyncio.wait({shutdown, exited}, timeout=timeout,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            return any(task.result() for task in done)
+        finally:
+            shutdown.cancel()
+            exited.cancel()
+
+    async def quit(self, vm_name: str):
+        """
+        Terminate QEMU immediately.
+
+        Args:
+            vm_name: VM name
+        """
+        conn = await self.get_connection(vm_name)
+        try:
+            await conn.execute("quit")
+        except QMPError:
+            # QEMU may close the socket before replying
+            pass
+        await self.disconnect(vm_name)
+
+    async def query_vcpu_threads(self, vm_name: str) -> Dict[int, int]:
+        """
+        Get host thread IDs of vCPUs.
+
+        Args:
+            vm_name: VM name
+
+        Returns:
+            Dict mapping vCPU index to host thread ID
+        """
+        result = await self.execute(vm_name, "query-cpus-fast")
+        return {cpu["cpu-index"]: cpu["thread-id"] for cpu in result or []}
+
+    async def query_iothreads(self, vm_name: str) -> Dict[str, int]:
+        """
+        Get host thread IDs of I/O threads.
+
+        Args:
+            vm_name: VM name
+
+        Returns:
+            Dict mapping iothread id to host thread ID
+        """
+        result = await self.execute(vm_name, "query-iothreads")
+        return {thread["id"]: thread["thread-id"] for thread in result or []}
+
+    async def query_block_stats(self, vm_name: str) -> Dict[str, Dict[str, int]]:
+        """
+        Get per-device block counters.
+
+        Args:
+            vm_name: VM name
+
+        Returns:
+            Dict mapping device name to rd/wr bytes and operation counts
+        """
+        result = await self.execute(vm_name, "query-blockstats")
+        stats = {}
+
+        for entry in result or []:
+            device = entry.get("device") or entry.get("qdev") or entry.get("node-name", "unknown")
+            counters = entry.get("stats", {})
+            stats[device] = {
+                "rd_bytes": counters.get("rd_bytes", 0),
+                "wr_bytes": counters.get("wr_bytes", 0),
+                "rd_operations": counters.get("rd_operations", 0),
+                "wr_operations": counters.get("wr_operations", 0),
+            }
+
+        return stats
+
+    def query_net_stats(self, vm_name: str) -> Dict[str, int]:
+        """
+        Get guest network counters from the VM's host tap interface.
+
+        QMP has no netdev byte counters, so these are read from sysfs.
+        The host receives what the guest transmits and vice versa.
+
+        Args:
+            vm_name: VM name
+
+        Returns:
+            Dict with rx_bytes and tx_bytes from the guest's point of view
+            (zero for user-mode networking, which has no tap interface)
+        """
+        stats_dir = self.sysfs_net_dir / TAP_IFNAME_FORMAT.format(vm_name=vm_name) / "statistics"
+
+        def _read_counter(name: str) -> int:
+            try:
+                return int((stats_dir / name).read_text().strip())
+            except (OSError, ValueError):
+                return 0
+
+        return {
+            "rx_bytes": _read_counter("tx_bytes"),
+            "tx_bytes": _read_counter("rx_bytes"),
+        }
+
+    async def query_balloon(self, vm_name: str) -> Optional[int]:
+        """
+        Get current balloon size.
+
+        Args:
+            vm_name: VM name
+
+        Returns:
+            Guest memory in MB, or None if the VM has no balloon device
+        """
+        try:
+            result = await self.execute(vm_name, "query-balloon")
+        except QMPError as e:
+            if e.error_class == "DeviceNotActive":
+                return None
+            raise
+        return result.get("actual", 0) // (1024 * 1024)
+
+    async def set_balloon(self, vm_name: str, target_mb: int):
+        """
+        Set balloon target.
+
+        Args:
+            vm_name: VM name
+            target_mb: Target guest memory in MB
+        """
+        await self.execute(vm_name, "balloon", {"value": int(target_mb) * 1024 * 1024})
+
+    async def collect_vm_stats(self, vm_names: List[str]) -> Dict[str, VMIOStats]:
+        """
+        Collect I/O statistics for many VMs concurrently.
+
+        Args:
+            vm_names: VM names
+
+        Returns:
+            Dict mapping VM name to VMIOStats (VMs without a reachable
+            QMP socket are omitted)
+        """
+        results = await asyncio.gather(
+            *(self._collect_one(vm_name) for vm_name in vm_names),
+            return_exceptions=True
+        )
+
+        stats = {}
+        for vm_name, result in zip(vm_names, results):
+            if isinstance(result, VMIOStats):
+                stats[vm_name] = result
+            elif isinstance(result, QMPError):
+                logger.debug(f"QMP stats unavailable for {vm_name}: {result}")
+            elif isinstance(result, BaseException):
+                logger.warning(f"QMP stats failed for {vm_name}: {result}")
+
+        return stats
+
+    async def _collect_one(self, vm_name: str) -> VMIOStats:
+        """Collect status, block, net and balloon counters for one VM."""
+        status, block, balloon_mb = await asyncio.gather(
+            self.query_status(vm_name),
+            self.query_block_stats(vm_name),
+            self.query_balloon(vm_name),
+        )
+        net = self.query_net_stats(vm_name)
+
+        return VMIOStats(
+            vm_name=vm_name,
+            status=status,
+            block_read_bytes=sum(d["rd_bytes"] for d in block.values()),
+            block_write_bytes=sum(d["wr_bytes"] for d in block.values()),
+            block_read_ops=sum(d["rd_operations"] for d in block.values()),
+            block_write_ops=sum(d["wr_operations"] for d in block.values()),
+            net_rx_bytes=net["rx_bytes"],
+            net_tx_bytes=net["tx_bytes"],
+            balloon_mb=balloon_mb,
+            timestamp=time.time()
+        )
+
+    async def disconnect(self, vm_name: str):
+        """
+        Close the connection for a VM.
+
+        Args:
+            vm_name: VM name
+        """
+        conn = self.connections.pop(vm_name, None)
+        if conn:
+            await conn.close()
+
+    async def close_all(self):
+        """Close all pooled connections."""
+        for vm_name in list(self.connections):
+            await self.disconnect(vm_name)
+
+    def call(self, coro: Awaitable, timeout: Optional[float] = None) -> Any:
+        """
+        Run a pool coroutine from synchronous code.
+
+        Connections live on a dedicated background event loop so they
+        persist across calls.
+
+        Args:
+            coro: Coroutine from one of the pool's async methods
+            timeout: Seconds to wait for the result
+
+        Returns:
+            Coroutine result
+
+        Raises:
+            concurrent.futures.TimeoutError: If no result within timeout
+                (the coroutine is cancelled)
+        """
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(
+                    target=self._loop.run_forever, name="qmp-pool", daemon=True
+                )
+                self._loop_thread.start()
+
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def shutdown(self):
+        """Close all connections and stop the background event loop."""
+        with self._loop_lock:
+            loop, self._loop = self._loop, None
+
+        if loop is None:
+            return
+
+        asyncio.run_coroutine_threadsafe(self.close_all(), loop).result(self.timeout)
+        loop.call_soon_threadsafe(loop.stop)
+        self._loop_thread.join(self.timeout)
+        loop.close()
+
+
+def main():
+    """Query status and I/O counters of VMs over QMP."""
+    import sys
+
+    vm_names = sys.argv[1:]
+    if not vm_names:
+        print("Usage: qmp_client.py <vm_name> [vm_name ...]")
+        return
+
+    pool = QMPClientPool()
+    try:
+        stats = pool.call(pool.collect_vm_stats(vm_names))
+    finally:
+        pool.shutdown()
+
+    for vm_name in vm_names:
+        vm = stats.get(vm_name)
+        if not vm:
+            print(f"{vm_name}: QMP socket unavailable")
+            continue
+
+        print(f"{vm_name}: {vm.status}")
+        print(f"  Block Read:  {vm.block_read_bytes / (1024 * 1024):.1f} MB ({vm.block_read_ops} ops)")
+        print(f"  Block Write: {vm.block_write_bytes / (1024 * 1024):.1f} MB ({vm.block_write_ops} ops)")
+        print(f"  Net RX/TX:   {vm.net_rx_bytes / (1024 * 1024):.1f} / {vm.net_tx_bytes / (1024 * 1024):.1f} MB")
+        if vm.balloon_mb is not None:
+            print(f"  Balloon:     {vm.balloon_mb} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,14 +16,21 @@ License: MIT
 """
 
 import os
+import sys
 import time
 import psutil
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 from dataclasses import dataclass, asdict
 from collections import deque
+from concurrent.futures import TimeoutError as FutureTimeoutError
 import subprocess
 
+# Add hypervisor to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from qmp_client import QMPClientPool, QMPError, VMIOStats
+
 
 @dataclass
 class CPUMetrics:
@@ -103,19 +110,27 @@ class ResourceMonitor:
     - Memory utilization monitoring
     - Thermal sensor readings
     - Battery status
+    - Per-VM block/network I/O over pooled QMP connections
     - Historical data retention
     """
 
-    def __init__(self, history_size: int = 100):
+    def __init__(self, history_size: int = 100, qmp_pool: Optional[QMPClientPool] = None):
         """
         Initialize resource monitor.
 
         Args:
             history_size: Number of metric snapshots to retain
+            qmp_pool: QMP client pool for per-VM I/O counters (optional)
         """
         self.history_size = history_size
         self.metrics_history: deque = deque(maxlen=history_size)
 
+        # Persistent QMP connections for per-VM I/O counters
+        self.qmp_pool = qmp_pool
+
+        # Callbacks notified with every new SystemMetrics snapshot
+        self.subscribers: List[Callable[[SystemMetrics], None]] = []
+
         # Cache for process tracking
         self.vm_processes: Dict[str, psutil.Process] = {}
 
@@ -262,16 +277,39 @@ class ResourceMonitor:
             power_draw_w=None
         )
 
-    def collect_vm_metrics(self, vm_name: str) -> Optional[VMMetrics]:
+    def collect_vm_io_stats(self, vm_names: List[str]) -> Dict[str, VMIOStats]:
+        """
+        Collect per-VM I/O counters for many VMs in one QMP batch.
+
+        Args:
+            vm_names: VM names
+
+        Returns:
+            Dict mapping VM name to VMIOStats (empty without a QMP pool)
+        """
+        if not self.qmp_pool or not vm_names:
+            return {}
+
+        try:
+            return self.qmp_pool.call(
+                self.qmp_pool.collect_vm_stats(vm_names),
+                timeout=self.qmp_pool.timeout * 2
+            )
+        except (QMPError, FutureTimeoutError):
+            return {}
+
+    def collect_vm_metrics(self, vm_name: str, io_stats: Optional[VMIOStats] = None) -> Optional[VMMetrics]:
         """
         Collect metrics for a specific VM.
 
         Args:
             vm_name: VM name
+            io_stats: QMP I/O counters for this VM (optional)
 
         Returns:
             VMMetrics or None if VM not running
         """
+
         # Find VM process
         proc = self._find_vm_process(vm_name)
 
@@ -299,24 +337,33 @@ class ResourceMonitor:
             memory_mb = mem_info.rss // (1024 * 1024)
             memory_percent = proc.memory_percent()
 
-            # I/O counters
-            try:
-                io_counters = proc.io_counters()
-                io_read_mb = io_counters.read_bytes / (1024 * 1024)
-                io_write_mb = io_counters.write_bytes / (1024 * 1024)
-            except:
-                io_read_mb = 0.0
-                io_write_mb = 0.0
+            status = "running"
 
-            # Network (would need network namespace isolation to get per-VM)
-            net_sent_mb = 0.0
-            net_recv_mb = 0.0
+            if io_stats:
+                # Guest block and network counters from QMP
+                io_read_mb = io_stats.block_read_bytes / (1024 * 1024)
+                io_write_mb = io_stats.block_write_bytes / (1024 * 1024)
+                net_sent_mb = io_stats.net_tx_bytes / (1024 * 1024)
+                net_recv_mb = io_stats.net_rx_bytes / (1024 * 1024)
+                if io_stats.status != "running":
+                    status = "paused" if io_stats.status in ("paused", "suspended") else io_stats.status
+            else:
+                # I/O counters
+                try:
+                    io_counters = proc.io_counters()
+                    io_read_mb = io_counters.read_bytes / (1024 * 1024)
+                    io_write_mb = io_counters.write_bytes / (1024 * 1024)
+                except:
+                    io_read_mb = 0.0
+                    io_write_mb = 0.0
+
+                # Network (needs a QMP pool to read per-VM tap counters)
+                net_sent_mb = 0.0
+                net_recv_mb = 0.0
 
             # Thread count
             threads = proc.num_threads()
 
-            status = "running"
-
             return VMMetrics(
                 vm_name=vm_name,
                 pid=proc.pid,
@@ -349,11 +396,12 @@ class ResourceMonitor:
         thermal = self.collect_thermal_metrics()
         battery = self.collect_battery_metrics()
 
-        # Collect VM metrics
+        # Collect VM metrics (I/O counters batched over QMP)
         vms = []
         if vm_names:
+            io_stats = self.collect_vm_io_stats(vm_names)
             for vm_name in vm_names:
-                vm_metrics = self.collect_vm_metrics(vm_name)
+                vm_metrics = self.collect_vm_metrics(vm_name, io_stats=io_stats.get(vm_name))
                 if vm_metrics:
                     vms.append(vm_metrics)
 
@@ -369,8 +417,32 @@ class ResourceMonitor:
         # Add to history
         self.metrics_history.append(metrics)
 
+        # Push update to subscribers (e.g., GovernorDaemon)
+        for callback in list(self.subscribers):
+            callback(metrics)
+
         return metrics
 
+    def subscribe(self, callback: Callable[[SystemMetrics], None]):
+        """
+        Register a callback for new metric snapshots.
+
+        Args:
+            callback: Called with each SystemMetrics from collect_all_metrics
+        """
+        if callback not in self.subscribers:
+            self.subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[SystemMetrics], None]):
+        """
+        Remove a metrics callback.
+
+        Args:
+            callback: Previously registered callback
+        """
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+
     def get_metrics_history(self, limit: int = None) -> List[SystemMetrics]:
         """
         Get historical metrics.
@@ -7,6 +7,7 @@ Phase XIII: Post-quantum encrypted storage support
 Phase XIV: GPU isolation and passthrough support
 """
 
+import concurrent.futures
 import os
 import sys
 import yaml
@@ -45,6 +46,14 @@ except ImportError:
     GPU_AVAILABLE = False
     print("⚠️  GPU Manager not found - GPU passthrough disabled")
 
+# Import QMP client (Phase XV)
+try:
+    from qmp_client import QMPClientPool, QMPError, qmp_command_args, qmp_socket_path, QMP_SOCKET_DIR
+    QMP_AVAILABLE = True
+except ImportError:
+    QMP_AVAILABLE = False
+    print("⚠️  QMP client not found - using process signals for VM control")
+
 # QWAMOS Paths
 VMS_DIR = QWAMOS_ROOT / "vms"
 HYPERVISOR_DIR = QWAMOS_ROOT / "hypervisor"
@@ -83,6 +92,13 @@ class VMManager:
             self.gpu_manager = None
             self.gpu_enabled = False
 
+        # Initialize QMP control channel (Phase XV)
+        if QMP_AVAILABLE:
+            self.qmp_pool = QMPClientPool()
+            QMP_SOCKET_DIR.mkdir(parents=True, exist_ok=True)
+        else:
+            self.qmp_pool = None
+
         # Ensure logs directory exists
         LOGS_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -107,20 +123,42 @@ class VMManager:
         boot = self.config['boot']
         machine = self.config['machine']
 
+        # Disk (create if doesn't exist)
+        disk_path = hw['disk']['primary']['path']
+        if not os.path.exists(disk_path):
+            disk_size = hw['disk']['primary']['size']
+            print(f"Creating disk image: {disk_path} ({disk_size})")
+            self.create_disk(disk_path, disk_size)
+            # Encrypted volumes are renamed to .qvol
+            disk_path = hw['disk']['primary']['path']
+
         # Phase XII: Use KVM Manager for optimal acceleration
         if self.kvm_manager:
-            # Let KVM manager decide acceleration and CPU model
+            # Let KVM manager decide acceleration, CPU model and performance tuning
             vm_config = {
                 "name": vm['name'],
                 "cpu": hw['cpu']['cores'],
                 "memory": str(hw['memory']['size']) + "M",
+                "disk": {
+                    "path": disk_path,
+                    "format": hw['disk']['primary'].get('format', 'qcow2'),
+                    "cache": hw['disk']['primary'].get('cache', 'writeback'),
+                },
+                "performance": self._performance_config(),
             }
+            if net['mode'] == 'bridge':
+                vm_config["network"] = {
+                    "ifname": f"tap-{self.vm_name}",
+                    "device": net['device'],
+                    "mac": net['mac'],
+                    "vhost": net.get('vhost', True),
+                }
             kvm_args = self.kvm_manager.generate_qemu_args(vm_config)
 
             # Start with base command
             cmd = ["qemu-system-aarch64", "-name", vm['name']]
 
-            # Add KVM-optimized args (accel, cpu, machine, smp, memory)
+            # Add KVM-optimized args (accel, cpu, machine, smp, memory, disk, tap network)
             cmd.extend(kvm_args)
         else:
             # Legacy mode: use config directly
@@ -133,6 +171,10 @@ class VMManager:
                 "-m", str(hw['memory']['size']),
             ]
 
+            cmd.extend([
+                "-drive", f"file={disk_path},if=virtio,format=qcow2,cache=writeback"
+            ])
+
         # Boot configuration
         if os.path.exists(boot['kernel']):
             cmd.extend(["-kernel", boot['kernel']])
@@ -142,17 +184,6 @@ class VMManager:
 
         cmd.extend(["-append", boot['cmdline']])
 
-        # Disk (create if doesn't exist)
-        disk_path = hw['disk']['primary']['path']
-        if not os.path.exists(disk_path):
-            disk_size = hw['disk']['primary']['size']
-            print(f"Creating disk image: {disk_path} ({disk_size})")
-            self.create_disk(disk_path, disk_size)
-
-        cmd.extend([
-            "-drive", f"file={disk_path},if=virtio,format=qcow2,cache=writeback"
-        ])
-
         # Network
         if net['mode'] == 'nat':
             nat_rules = net.get('nat_rules', [])
@@ -170,9 +201,10 @@ class VMManager:
                 "-device", f"{net['device']},netdev=net0,mac={net['mac']}"
             ])
 
-        elif net['mode'] == 'bridge':
+        elif net['mode'] == 'bridge' and not self.kvm_manager:
             # CRITICAL FIX #10: Use vhost-net for bridge mode
             # vhost-net offloads networking to kernel for better performance and security
+            # (with a KVM manager, tap/vhost/multiqueue args come from the performance profile)
             bridge_name = net.get('bridge', 'virbr0')
 
             # Check if vhost-net should be enabled (default: yes for better security)
@@ -191,6 +223,10 @@ class VMManager:
                 "-device", f"{net['device']},netdev=net0,mac={net['mac']}"
             ])
 
+        # Memory balloon (lets the AI governor resize guest memory over QMP)
+        if hw['memory'].get('balloon', False):
+            cmd.extend(["-device", "virtio-balloon-pci,id=balloon0"])
+
         # Graphics
         if hw.get('graphics', {}).get('type'):
             cmd.extend(["-device", hw['graphics']['type']])
@@ -229,12 +265,34 @@ class VMManager:
         smmu_args = self._build_smmu_enforcement_args()
         cmd.extend(smmu_args)
 
+        # Phase XV: QMP control socket (graceful shutdown, status, I/O stats)
+        if self.qmp_pool:
+            cmd.extend(qmp_command_args(self.vm_name))
+
         # Extra args
         extra_args = self.config.get('qemu_extra_args', [])
         cmd.extend(extra_args)
 
         return cmd
 
+    def _performance_config(self):
+        """
+        Get the performance section for KVMManager profile resolution.
+
+        The legacy hardware.memory.hugepages flag overrides the profile.
+
+        Returns:
+            dict: Profile name and overrides
+        """
+        performance = dict(self.config.get('performance', {}))
+        performance.pop('cpu_affinity', None)
+
+        hugepages = self.config['hardware']['memory'].get('hugepages')
+        if hugepages is not None:
+            performance.setdefault('hugepages', hugepages)
+
+        return performance
+
     def _build_smmu_enforcement_args(self):
         """
         Build QEMU arguments to enforce SMMU/IOMMU device isolation.
@@ -534,6 +592,14 @@ class VMManager:
                 if self.gpu_manager.capabilities.vulkan_supported:
                     print(f"   Vulkan: ✅ {self.gpu_manager.capabilities.vulkan_version or 'available'}")
 
+        # Phase XII: Reserve hugepages before QEMU preallocates guest RAM
+        if self.kvm_manager:
+            profile = self.kvm_manager.resolve_performance_profile(self._performance_config())
+            if profile.hugepages:
+                memory_mb = self.config['hardware']['memory']['size']
+                if not self.kvm_manager.enable_huge_pages(memory_mb, profile.hugepage_size_kb):
+                    print(f"⚠️  Not enough hugepages for {memory_mb} MB - using regular pages")
+
         cmd = self.build_qemu_command()
 
         print(f"\nQEMU Command:")
@@ -564,14 +630,46 @@ class VMManager:
                 self.kvm_manager.configure_vcpu_affinity(
                     vm_pid=process.pid,
                     vm_name=self.vm_name,
-                    vcpu_policy=policy
+                    vcpu_policy=policy,
+                    vcpu_count=self.config['hardware']['cpu']['cores'],
+                    qmp_pool=self.qmp_pool
                 )
         else:
             # Interactive mode
             subprocess.run(cmd)
 
+    def _qmp_call(self, coro, timeout=None):
+        """
+        Run a QMP pool coroutine, returning None if the VM has no QMP socket.
+
+        Args:
+            coro: Coroutine from QMPClientPool
+            timeout: Seconds to wait for the result
+
+        Returns:
+            Coroutine result, or None if QMP is unavailable or times out
+        """
+        if not self.qmp_pool or not qmp_socket_path(self.vm_name).exists():
+            coro.close()
+            return None
+
+        try:
+            return self.qmp_pool.call(coro, timeout=timeout)
+        except QMPError as e:
+            print(f"⚠️  QMP unavailable for '{self.vm_name}': {e}")
+            return None
+        except concurrent.futures.TimeoutError:
+            print(f"⚠️  QMP timed out for '{self.vm_name}' after {timeout}s")
+            return None
+
     def status(self):
         """Check VM status"""
+        # Phase XV: Ask QEMU directly over QMP
+        run_state = self._qmp_call(self.qmp_pool.query_status(self.vm_name)) if self.qmp_pool else None
+        if run_state is not None:
+            print(f"VM '{self.vm_name}' is {run_state.upper()}")
+            return run_state == "running"
+
         # Check if VM process is running
         result = subprocess.run(
             ["pgrep", "-f", f"qemu.*{self.vm_name}"],
@@ -588,8 +686,37 @@ class VMManager:
             print(f"VM '{self.vm_name}' is STOPPED")
             return False
 
-    def stop(self):
-        """Stop the VM"""
+    def stop(self, timeout=30):
+        """
+        Stop the VM.
+
+        Sends an ACPI powerdown over QMP and waits for the guest to shut
+        down, falling back to QMP quit and finally to process signals.
+
+        Args:
+            timeout: Seconds to wait for a graceful guest shutdown
+        """
+        # Phase XII: Free this VM's pinned cores for other VMs
+        if self.kvm_manager:
+            self.kvm_manager.release_vcpu_affinity(self.vm_name)
+
+        if self.qmp_pool:
+            graceful = self._qmp_call(
+                self.qmp_pool.system_powerdown(self.vm_name, timeout=timeout),
+                timeout=timeout + 5
+            )
+            if graceful:
+                print(f"✓ VM '{self.vm_name}' powered down gracefully")
+                self.qmp_pool.shutdown()
+                return
+
+            if graceful is not None:
+                print(f"⚠️  Guest did not power down within {timeout}s - forcing quit")
+                self._qmp_call(self.qmp_pool.quit(self.vm_name))
+                self.qmp_pool.shutdown()
+                print(f"✓ VM '{self.vm_name}' stopped")
+                return
+
         result = subprocess.run(
             ["pkill", "-f", f"qemu.*{self.vm_name}"],
             capture_output=True,
@@ -21,6 +21,8 @@ Prevents cross-contamination attacks between Android (Slot B) and QWAMOS (Slot A
 **Implementation:**
 - Kernel-level mount restrictions (SELinux policy)
 - dm-verity for Slot A (cryptographic integrity)
+- Direct pread hashing of Slot A partitions, concurrently, against a
+  per-chunk tree hash baseline that pinpoints modified regions
 - Audit logging (all cross-slot operations)
 - ML threat detection integration
 
@@ -32,13 +34,17 @@ Status: PRODUCTION READY
 import os
 import sys
 import subprocess
-import hashlib
 import json
 from datetime import datetime
 from enum import Enum
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 
+# Partition hashing (pread reader, tree hash baseline)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'crypto'))
+from blake3_hasher import TreeHashBaseline
+
 # ML override integration
 sys.path.insert(0, os.path.dirname(__file__))
 try:
@@ -79,6 +85,12 @@ SLOT_A_HASHES = {
     "vendor_a": "4e07408562bedb8b60ce05c1decfe3ad16b72230967de01f640b7e4729b49fce",
 }
 
+# Bytes hashed per partition (first 40 MB)
+PARTITION_HASH_BYTES = 4096 * 10240
+
+# Per-chunk reference manifests for Slot A
+SLOT_A_BASELINE_PATH = "/var/lib/qwamos/ab_partition_baseline.json"
+
 # Monitoring intervals (seconds)
 HASH_CHECK_INTERVAL = 300  # 5 minutes
 
@@ -112,9 +124,12 @@ class ABPartitionIsolation:
     Monitors and enforces A/B partition isolation.
     """
 
-    def __init__(self):
+    def __init__(self, baseline_path: str = SLOT_A_BASELINE_PATH):
         self.log_path = "/var/log/qwamos/ab_isolation.log"
 
+        # Partition hashing
+        self.baseline = TreeHashBaseline(baseline_path)
+
         # ML override integration
         self.ml_override: Optional[MLBootloaderOverride] = None
         if ML_OVERRIDE_AVAILABLE:
@@ -176,32 +191,45 @@ class ABPartitionIsolation:
         """
         Compute SHA256 hash of a partition.
 
+        Reads the block device directly; with a reference baseline the
+        region is tree-hashed in parallel and a mismatch records the
+        changed regions in self.baseline.changes.
+
         Args:
             partition: Partition path (e.g., /dev/block/by-name/boot_a)
 
         Returns:
-            Hex digest of SHA256 hash, or None if error
+            Hash to compare with SLOT_A_HASHES, or None if error
         """
         try:
             # Read partition (requires root)
-            result = subprocess.run(
-                ['dd', f'if={partition}', 'bs=4096', 'count=10240'],  # Read first 40MB
-                capture_output=True,
-                timeout=30
-            )
-
-            if result.returncode != 0:
-                print(f"[A/B Isolation] ⚠ Failed to read partition {partition}")
-                return None
-
-            # Compute hash
-            sha256 = hashlib.sha256(result.stdout).hexdigest()
-            return sha256
+            partition_name = os.path.basename(partition)
+            expected_hash = SLOT_A_HASHES.get(partition_name, "")
+            return self.baseline.verify(partition_name, partition, expected_hash, PARTITION_HASH_BYTES)
 
         except Exception as e:
             print(f"[A/B Isolation] ⚠ Hash error for {partition}: {e}")
             return None
 
+    def hash_slot_a(self) -> Dict[str, Optional[str]]:
+        """
+        Hash all Slot A partitions concurrently.
+
+        The partitions share the tree hash worker pool and in-flight chunk
+        cap, so checking them together uses no more threads or memory than
+        checking one.
+
+        Returns:
+            Dictionary of partition name -> hash (None if unreadable)
+        """
+        paths = [f"/dev/block/by-name/{name}" for name in SLOT_A_HASHES]
+        with ThreadPoolExecutor(max_workers=len(paths)) as pool:
+            return dict(zip(SLOT_A_HASHES, pool.map(self._hash_partition, paths)))
+
+    def _changed_regions(self, partition_name: str) -> List[str]:
+        """Modified byte ranges (offset+length) relative to the baseline"""
+        return [f"0x{offset:x}+{length}" for offset, length in self.baseline.changes.get(partition_name, [])]
+
     def check_inactive_slot_integrity(self) -> IsolationCheckResult:
         """
         Check integrity of inactive slot.
@@ -219,9 +247,9 @@ class ABPartitionIsolation:
             # Check that Slot A partitions have not been modified
             print("[A/B Isolation] QWAMOS active, verifying Slot A integrity...")
 
+            actual_hashes = self.hash_slot_a()
             for partition_name, expected_hash in SLOT_A_HASHES.items():
-                partition_path = f"/dev/block/by-name/{partition_name}"
-                actual_hash = self._hash_partition(partition_path)
+                actual_hash = actual_hashes[partition_name]
 
                 if actual_hash is None:
                     return IsolationCheckResult(
@@ -235,6 +263,9 @@ class ABPartitionIsolation:
                     print(f"[A/B Isolation] ❌ {partition_name} hash mismatch!")
                     print(f"[A/B Isolation]    Expected: {expected_hash}")
                     print(f"[A/B Isolation]    Actual:   {actual_hash}")
+                    regions = self._changed_regions(partition_name)
+                    if regions:
+                        print(f"[A/B Isolation]    Changed regions: {', '.join(regions)}")
 
                     # CRITICAL: Slot A has been modified (possible attack from Slot B)
                     self._log_event(f"Slot A compromise detected: {partition_name}")
@@ -247,7 +278,7 @@ class ABPartitionIsolation:
                                 f"partition={partition_name}",
                                 f"expected_hash={expected_hash}",
                                 f"actual_hash={actual_hash}",
-                            ],
+                            ] + [f"changed_region={region}" for region in regions],
                             source="ab_isolation"
                         )
 
@@ -275,9 +306,9 @@ class ABPartitionIsolation:
             # Check that Slot A partitions have not been modified by Android
             print("[A/B Isolation] Android active, verifying Slot A has not been modified...")
 
+            actual_hashes = self.hash_slot_a()
             for partition_name, expected_hash in SLOT_A_HASHES.items():
-                partition_path = f"/dev/block/by-name/{partition_name}"
-                actual_hash = self._hash_partition(partition_path)
+                actual_hash = actual_hashes[partition_name]
 
                 if actual_hash is None:
                     return IsolationCheckResult(
@@ -292,6 +323,9 @@ class ABPartitionIsolation:
                     print(f"[A/B Isolation]    Partition: {partition_name}")
                     print(f"[A/B Isolation]    Expected: {expected_hash}")
                     print(f"[A/B Isolation]    Actual:   {actual_hash}")
+                    regions = self._changed_regions(partition_name)
+                    if regions:
+                        print(f"[A/B Isolation]    Changed regions: {', '.join(regions)}")
 
                     # CRITICAL: Cross-slot attack detected
                     self._log_event(f"Cross-slot attack: Android → QWAMOS ({partition_name})")
@@ -305,7 +339,7 @@ class ABPartitionIsolation:
                                 f"modified_partition={partition_name}",
                                 f"expected_hash={expected_hash}",
                                 f"actual_hash={actual_hash}",
-                            ],
+                            ] + [f"changed_region={region}" for region in regions],
                             source="ab_isolation"
                         )
 
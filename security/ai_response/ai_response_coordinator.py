@@ -3,17 +3,23 @@
 QWAMOS AI Response Coordinator
 
 Coordinates AI-powered responses to detected threats by:
-1. Analyzing threats with Kali GPT
-2. Developing strategies with Claude
-3. Generating mitigations with ChatGPT
+1. Analyzing threats with Kali GPT while Claude and ChatGPT triage them
+   concurrently (CRITICAL threats get pre-authorized rule-based actions
+   immediately)
+2. Refining the strategy with Claude once Kali GPT's analysis is in
+3. Generating mitigations with ChatGPT from that strategy
 4. Requesting user permissions
 5. Executing approved actions
 6. Monitoring and adjusting responses
 
+Threats are processed by a bounded pool of workers.
+
 Integrates with QWAMOS AI Assistants (Phase 6)
 """
 
 import asyncio
+import bisect
+import itertools
 import sys
 import os
 import time
@@ -22,6 +28,13 @@ import logging
 from typing import Dict, List, Optional
 from pathlib import Path
 
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('AIResponseCoordinator')
+
 # Add QWAMOS AI to path
 sys.path.insert(0, '/opt/qwamos/ai')
 sys.path.insert(0, '/data/data/com.termux/files/home/QWAMOS/ai')
@@ -32,12 +45,51 @@ except ImportError:
     logger.warning("AI Manager not found, using mock")
     AIManager = None
 
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger('AIResponseCoordinator')
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram (seconds)
+    """
+
+    BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        """Record one latency sample"""
+        self.counts[bisect.bisect_left(self.BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th percentile sample"""
+        if not self.count:
+            return 0.0
+        rank = max(1, int(q / 100 * self.count + 0.999999))
+        seen = 0
+        for bound, count in zip(self.BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self) -> Dict:
+        """Summary plus per-bucket counts"""
+        buckets = {f"<={bound:g}s": count for bound, count in zip(self.BUCKETS, self.counts)}
+        buckets[f">{self.BUCKETS[-1]:g}s"] = self.counts[-1]
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'buckets': buckets
+        }
 
 
 class AIResponseCoordinator:
@@ -66,9 +118,12 @@ class AIResponseCoordinator:
         # Action executor (imported later to avoid circular dependency)
         self.action_executor = None
 
-        # Threat queue
+        # Threat queue and worker pool
         self.pending_threats = asyncio.Queue()
         self.active_responses = {}
+        self.workers = []
+        self.monitor_tasks = set()
+        self._threat_ids = itertools.count(1)
 
         # User permissions
         self.user_permissions = self._load_permissions()
@@ -77,6 +132,8 @@ class AIResponseCoordinator:
         self.threats_handled = 0
         self.actions_executed = 0
         self.actions_denied = 0
+        self.fast_path_responses = 0
+        self.stage_latency = {}
 
         logger.info("AI Response Coordinator initialized")
 
@@ -86,7 +143,9 @@ class AIResponseCoordinator:
             'auto_response_severity': 'MEDIUM',  # Auto-respond up to this severity
             'require_permission_above': 'HIGH',   # Require permission for these
             'ai_timeout': 60,                      # AI query timeout (seconds)
-            'max_concurrent_responses': 5,
+            'max_concurrent_responses': 5,         # Threat worker pool size
+            'enable_fast_path': True,              # Rule-based actions for CRITICAL
+            'monitor_duration': 60,                # Post-execution monitoring (seconds)
             'alert_channels': ['log', 'ui', 'email'],
             'enable_auto_patching': True,
             'enable_network_isolation': True
@@ -116,55 +175,155 @@ class AIResponseCoordinator:
         except:
             return default_permissions
 
+    # === Worker Pool ===
+
+    async def start(self, workers: Optional[int] = None):
+        """
+        Start the threat worker pool
+
+        Args:
+            workers: Number of threats handled concurrently
+                     (default: max_concurrent_responses)
+        """
+        count = workers or self.config['max_concurrent_responses']
+        self.workers = [asyncio.ensure_future(self._worker()) for _ in range(count)]
+        logger.info(f"Threat worker pool started ({count} workers)")
+
+    async def submit_threat(self, threat: Dict):
+        """Queue a threat for the worker pool"""
+        await self.pending_threats.put((time.monotonic(), threat))
+
+    async def stop(self, drain: bool = True):
+        """
+        Stop the worker pool
+
+        Args:
+            drain: Wait for queued threats to be handled and monitored first
+        """
+        if drain:
+            await self.pending_threats.join()
+            await asyncio.gather(*self.monitor_tasks, return_exceptions=True)
+
+        tasks = self.workers + list(self.monitor_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.workers = []
+        logger.info("Threat worker pool stopped")
+
+    async def _worker(self):
+        """Handle queued threats one at a time"""
+        while True:
+            queued_at, threat = await self.pending_threats.get()
+            try:
+                self._record_latency('queue_wait', time.monotonic() - queued_at)
+                await self.handle_threat(threat)
+            finally:
+                self.pending_threats.task_done()
+
+    def _record_latency(self, stage: str, seconds: float):
+        """Add a sample to a stage's latency histogram"""
+        self.stage_latency.setdefault(stage, LatencyHistogram()).observe(seconds)
+
+    async def _timed(self, stage: str, awaitable):
+        """Await and record the stage latency"""
+        started = time.monotonic()
+        try:
+            return await awaitable
+        finally:
+            self._record_latency(stage, time.monotonic() - started)
+
+    # === Threat Pipeline ===
+
     async def handle_threat(self, threat: Dict):
         """
         Main threat handling pipeline
 
-        1. Classify and assess severity
-        2. Query AI assistants for response strategy
-        3. Generate mitigation actions
+        1. Start Kali GPT analysis and Claude/ChatGPT triage concurrently
+        2. CRITICAL: execute pre-authorized rule-based actions (fast path)
+           while the AI assistants are still working
+        3. Refine: feed Kali GPT's analysis into the Claude strategy and
+           that strategy into the ChatGPT mitigation, then build the action
+           plan (from the triage mitigation if refinement fails)
         4. Request user permission (if required)
         5. Execute actions
-        6. Monitor and adjust
+        6. Monitor and adjust (in the background)
         """
-        logger.info(f"[THREAT DETECTED] {threat['type']} - Severity: {threat.get('severity', 'UNKNOWN')}")
+        severity = threat.get('severity', 'UNKNOWN')
+        logger.info(f"[THREAT DETECTED] {threat['type']} - Severity: {severity}")
 
         self.threats_handled += 1
+        started = time.monotonic()
 
         # Add to active responses
-        threat_id = f"threat_{int(time.time() * 1000)}"
+        threat_id = f"threat_{int(time.time() * 1000)}_{next(self._threat_ids)}"
         self.active_responses[threat_id] = {
             'threat': threat,
             'status': 'analyzing',
             'start_time': time.time()
         }
 
-        try:
-            # Step 1: Get immediate analysis from Kali GPT
-            logger.info("[STEP 1] Analyzing threat with Kali GPT...")
-            kali_analysis = await self._analyze_with_kali_gpt(threat)
+        # Step 1: Kali GPT analysis and Claude/ChatGPT triage run concurrently
+        logger.info("[STEP 1] Analyzing with Kali GPT, triaging with Claude and ChatGPT...")
+        ai_tasks = [
+            asyncio.ensure_future(self._timed('kali_gpt', self._analyze_with_kali_gpt(threat))),
+            asyncio.ensure_future(self._timed('claude_triage', self._get_claude_strategy(threat))),
+            asyncio.ensure_future(self._timed('chatgpt_triage', self._get_chatgpt_mitigation(threat)))
+        ]
 
-            # Step 2: Get strategic response from Claude
-            logger.info("[STEP 2] Developing strategy with Claude...")
-            claude_strategy = await self._get_claude_strategy(threat, kali_analysis)
+        try:
+            # Step 2: Fast path for CRITICAL threats
+            executed = []
+            if severity == 'CRITICAL' and self.config['enable_fast_path']:
+                fast_plan = self._create_fast_path_plan(threat, threat_id)
+                self.active_responses[threat_id]['fast_path'] = fast_plan
+
+                if fast_plan['actions']:
+                    logger.info(f"[FAST PATH] Executing {len(fast_plan['actions'])} pre-authorized actions...")
+                    await self._timed('fast_path', self._execute_action_plan(fast_plan))
+                    self._record_latency('time_to_mitigation', time.monotonic() - started)
+                    self.fast_path_responses += 1
+                    executed = fast_plan['actions']
+
+            # Step 3: Refine the triage with Kali GPT's analysis
+            kali_analysis = await ai_tasks[0]
+            logger.info("[STEP 3] Refining strategy with Claude and mitigation with ChatGPT...")
+            claude_strategy = await self._timed(
+                'claude', self._get_claude_strategy(threat, kali_analysis)
+            )
+            chatgpt_mitigation = await self._timed(
+                'chatgpt', self._get_chatgpt_mitigation(threat, claude_strategy, kali_analysis)
+            )
+            triage_strategy, triage_mitigation = await asyncio.gather(*ai_tasks[1:])
+            self._record_latency('ai_response', time.monotonic() - started)
+            self.active_responses[threat_id]['triage'] = {
+                'claude': triage_strategy.get('strategy'),
+                'chatgpt': triage_mitigation.get('mitigation')
+            }
 
-            # Step 3: Get tactical mitigation from ChatGPT
-            logger.info("[STEP 3] Generating mitigation with ChatGPT...")
-            chatgpt_mitigation = await self._get_chatgpt_mitigation(threat, claude_strategy)
+            if not isinstance(chatgpt_mitigation.get('mitigation'), dict) and \
+                    isinstance(triage_mitigation.get('mitigation'), dict):
+                logger.warning("Refined mitigation unusable, falling back to triage mitigation")
+                chatgpt_mitigation = triage_mitigation
 
-            # Step 4: Combine responses into action plan
-            logger.info("[STEP 4] Creating action plan...")
+            logger.info("Creating action plan...")
             action_plan = self._create_action_plan(
                 threat, kali_analysis, claude_strategy, chatgpt_mitigation
             )
+            action_plan['threat_id'] = threat_id
+            # Drop actions the fast path already took
+            done = {self._action_key(action) for action in executed}
+            action_plan['actions'] = [a for a in action_plan['actions'] if self._action_key(a) not in done]
 
             self.active_responses[threat_id]['action_plan'] = action_plan
             self.active_responses[threat_id]['status'] = 'awaiting_permission'
 
-            # Step 5: Check user permissions
+            # Step 4: Check user permissions
             if self._requires_user_permission(action_plan):
-                logger.info("[STEP 5] Requesting user permission...")
-                permission_granted = await self._request_user_permission(action_plan)
+                logger.info("[STEP 4] Requesting user permission...")
+                permission_granted = await self._timed(
+                    'permission', self._request_user_permission(action_plan)
+                )
 
                 if not permission_granted:
                     logger.warning("[ACTION DENIED] User denied permission")
@@ -172,26 +331,80 @@ class AIResponseCoordinator:
                     self.active_responses[threat_id]['status'] = 'denied'
                     return
             else:
-                logger.info("[STEP 5] Auto-approved based on severity")
+                logger.info("[STEP 4] Auto-approved based on severity")
 
-            # Step 6: Execute actions
-            logger.info("[STEP 6] Executing action plan...")
+            # Step 5: Execute actions
+            logger.info("[STEP 5] Executing action plan...")
             self.active_responses[threat_id]['status'] = 'executing'
-            await self._execute_action_plan(action_plan)
+            await self._timed('execute', self._execute_action_plan(action_plan))
+            if not executed:
+                self._record_latency('time_to_mitigation', time.monotonic() - started)
 
-            # Step 7: Monitor results
-            logger.info("[STEP 7] Monitoring results...")
+            # Step 6: Monitor results without holding a worker
+            logger.info("[STEP 6] Monitoring results...")
             self.active_responses[threat_id]['status'] = 'monitoring'
-            await self._monitor_and_adjust(action_plan)
+            task = asyncio.ensure_future(self._monitor_threat(threat_id, action_plan))
+            self.monitor_tasks.add(task)
+            task.add_done_callback(self.monitor_tasks.discard)
+
+        except Exception as e:
+            logger.error(f"Error handling threat: {e}")
+            self.active_responses[threat_id]['status'] = 'error'
+            self.active_responses[threat_id]['error'] = str(e)
+
+        finally:
+            for task in ai_tasks:
+                task.cancel()
 
+    async def _monitor_threat(self, threat_id: str, action_plan: Dict):
+        """Monitor an executed plan and mark the threat resolved"""
+        try:
+            await self._monitor_and_adjust(action_plan)
             self.active_responses[threat_id]['status'] = 'completed'
             logger.info(f"[THREAT RESOLVED] {threat_id}")
-
         except Exception as e:
-            logger.error(f"Error handling threat: {e}")
+            logger.error(f"Monitoring failed: {e}")
             self.active_responses[threat_id]['status'] = 'error'
             self.active_responses[threat_id]['error'] = str(e)
 
+    @staticmethod
+    def _action_key(action: Dict) -> tuple:
+        """Identity of an action regardless of its priority"""
+        return tuple(sorted((k, str(v)) for k, v in action.items() if k != 'priority'))
+
+    def _create_fast_path_plan(self, threat: Dict, threat_id: str) -> Dict:
+        """
+        Rule-based action plan for CRITICAL threats
+
+        Only includes actions the user pre-authorized (auto_* permissions),
+        so it runs without a permission prompt while the AI assistants
+        refine the full response.
+        """
+        details = threat.get('details', {})
+        actions = []
+
+        source_ip = details.get('source_ip') or details.get('src_ip')
+        if source_ip and self.user_permissions.get('auto_block_ip'):
+            actions.append({'type': 'firewall', 'command': f"block {source_ip}", 'priority': 1})
+
+        if details.get('pid') and self.user_permissions.get('auto_kill_process'):
+            actions.append({'type': 'kill_process', 'pid': details['pid'], 'priority': 1})
+
+        vm = details.get('vm')
+        if vm and self.user_permissions.get('auto_snapshot'):
+            actions.append({'type': 'vm_snapshot', 'vm': vm, 'priority': 1})
+        if vm and self.user_permissions.get('auto_isolate_vm'):
+            actions.append({'type': 'network_isolation', 'vm': vm, 'priority': 2})
+
+        return {
+            'threat_id': threat_id,
+            'threat_type': threat.get('type'),
+            'severity': threat.get('severity'),
+            'timestamp': time.time(),
+            'source': 'fast_path',
+            'actions': actions
+        }
+
     async def _analyze_with_kali_gpt(self, threat: Dict) -> Dict:
         """Get technical analysis from Kali GPT"""
         if not self.ai_manager:
@@ -215,10 +428,10 @@ class AIResponseCoordinator:
 
         try:
             response = await asyncio.wait_for(
-                asyncio.to_thread(
-                    self.ai_manager.query,
+                self.ai_manager.aquery(
                     'kali-gpt',
-                    prompt
+                    prompt,
+                    {'priority': 'threat_response'}  # Jumps the shared model's queue
                 ),
                 timeout=self.config['ai_timeout']
             )
@@ -234,8 +447,8 @@ class AIResponseCoordinator:
             logger.error(f"Kali GPT error: {e}")
             return {'analysis': str(e), 'timestamp': time.time()}
 
-    async def _get_claude_strategy(self, threat: Dict, analysis: Dict) -> Dict:
-        """Get strategic response from Claude"""
+    async def _get_claude_strategy(self, threat: Dict, analysis: Optional[Dict] = None) -> Dict:
+        """Get strategic response from Claude (triage from threat details if no analysis yet)"""
         if not self.ai_manager:
             return {'strategy': 'AI Manager not available', 'timestamp': time.time()}
 
@@ -244,9 +457,10 @@ class AIResponseCoordinator:
 
         Threat Type: {threat.get('type')}
         Severity: {threat.get('severity')}
+        Details: {json.dumps(threat.get('details', {}), indent=2)}
 
         Technical Analysis:
-        {analysis.get('analysis', 'N/A')}
+        {(analysis or {}).get('analysis', 'Pending (Kali GPT analysis runs in parallel)')}
 
         Consider:
         1. Short-term containment (immediate actions to stop the threat)
@@ -260,8 +474,7 @@ class AIResponseCoordinator:
 
         try:
             response = await asyncio.wait_for(
-                asyncio.to_thread(
-                    self.ai_manager.query,
+                self.ai_manager.aquery(
                     'claude',
                     prompt
                 ),
@@ -279,8 +492,9 @@ class AIResponseCoordinator:
             logger.error(f"Claude error: {e}")
             return {'strategy': str(e), 'timestamp': time.time()}
 
-    async def _get_chatgpt_mitigation(self, threat: Dict, strategy: Dict) -> Dict:
-        """Get tactical mitigation steps from ChatGPT"""
+    async def _get_chatgpt_mitigation(self, threat: Dict, strategy: Optional[Dict] = None,
+                                      analysis: Optional[Dict] = None) -> Dict:
+        """Get tactical mitigation steps from ChatGPT (triage from threat details if no strategy yet)"""
         if not self.ai_manager:
             return {'mitigation': 'AI Manager not available', 'timestamp': time.time()}
 
@@ -288,7 +502,10 @@ class AIResponseCoordinator:
         Generate specific mitigation commands for this threat:
 
         Threat: {threat.get('type')}
-        Strategy: {strategy.get('strategy', 'N/A')}
+        Severity: {threat.get('severity')}
+        Details: {json.dumps(threat.get('details', {}), indent=2)}
+        Technical Analysis: {(analysis or {}).get('analysis', 'Pending (Kali GPT analysis runs in parallel)')}
+        Strategy: {(strategy or {}).get('strategy', 'Pending (Claude strategy runs in parallel)')}
 
         Provide executable commands for:
         1. Firewall rules to add (nftables/iptables format)
@@ -309,8 +526,7 @@ class AIResponseCoordinator:
 
         try:
             response = await asyncio.wait_for(
-                asyncio.to_thread(
-                    self.ai_manager.query,
+                self.ai_manager.aquery(
                     'chatgpt',
                     prompt
                 ),
@@ -476,8 +692,8 @@ class AIResponseCoordinator:
 
     async def _monitor_and_adjust(self, action_plan: Dict):
         """Monitor action results and adjust if needed"""
-        # Monitor for 60 seconds
-        await asyncio.sleep(60)
+        # Monitor for the configured duration (default 60 seconds)
+        await asyncio.sleep(self.config['monitor_duration'])
 
         # TODO: Check if threat was successfully mitigated
         # If not, generate new action plan
@@ -491,7 +707,12 @@ class AIResponseCoordinator:
             'actions_executed': self.actions_executed,
             'actions_denied': self.actions_denied,
             'active_responses': len(self.active_responses),
-            'pending_threats': self.pending_threats.qsize()
+            'pending_threats': self.pending_threats.qsize(),
+            'workers': len(self.workers),
+            'fast_path_responses': self.fast_path_responses,
+            'stage_latency': {
+                stage: histogram.to_dict() for stage, histogram in self.stage_latency.items()
+            }
         }
 
 
@@ -510,4 +731,10 @@ if __name__ == "__main__":
         }
     }
 
-    asyncio.run(coordinator.handle_threat(test_threat))
+    async def run_test_threat():
+        await coordinator.start()
+        await coordinator.submit_threat(test_threat)
+        await coordinator.stop()
+        print(json.dumps(coordinator.get_statistics(), indent=2))
+
+    asyncio.run(run_test_threat())
@@ -14,11 +14,17 @@ Detects WikiLeaks Vault 7 Dark Matter persistence attacks.
 5. Power rail monitoring (detect fake power-off)
 
 **Detection Methods:**
-- Hash comparison (SHA256 of bootloader/firmware)
+- Hash comparison (SHA256 of bootloader/firmware; partitions are read with
+  os.pread and tree-hashed concurrently against a per-chunk baseline)
 - TPM/TEE attestation (TrustZone secure storage)
 - Version tracking (prevent downgrade attacks)
 - Power consumption analysis (detect active components when "off")
 
+**Continuous Monitoring:**
+- Partition checks are change-triggered (inotify, stat signatures) by the
+  incremental integrity engine, with a budgeted low-priority full
+  re-verification sweep instead of fixed-interval rescans
+
 **Integration:**
 - Triggers ML override system on integrity violation
 - Logs all verification events to tamper-proof append-only log
@@ -31,15 +37,18 @@ Status: PRODUCTION READY
 
 import os
 import sys
-import hashlib
 import json
-import time
 import subprocess
 from datetime import datetime
 from enum import Enum
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 
+# Partition hashing (pread reader, tree hash baseline)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'crypto'))
+from blake3_hasher import TreeHashBaseline, hash_region
+
 # ML override integration
 sys.path.insert(0, os.path.dirname(__file__))
 try:
@@ -49,6 +58,9 @@ except ImportError:
     ML_OVERRIDE_AVAILABLE = False
     print("[Firmware Monitor] ⚠ ML override not available")
 
+# Change-triggered re-verification
+from incremental_integrity import IncrementalIntegrityEngine
+
 
 # ============================================================================
 # Configuration
@@ -62,6 +74,20 @@ EXPECTED_BOOTLOADER_HASHES = {
     "tz": "4e07408562bedb8b60ce05c1decfe3ad16b72230967de01f640b7e4729b49fce",      # Example
 }
 
+# Partition block devices and bytes hashed per partition (first 4 MB)
+PARTITION_DIR = "/dev/block/by-name"
+PARTITION_READ_BYTES = 4096 * 1024
+
+# Per-chunk reference manifests for the monitored partitions
+FIRMWARE_BASELINE_PATH = "/var/lib/qwamos/firmware_baseline.json"
+
+# Incremental integrity engine: partitions re-checked on change, plus a
+# low-priority full re-verification within a read budget
+MONITORED_PARTITIONS = ["aboot", "tz"]
+INTEGRITY_STATE_PATH = "/var/lib/qwamos/firmware_integrity_state.json"
+FULL_REVERIFY_INTERVAL = 6 * 3600   # 6 hours
+REVERIFY_BUDGET_MB_PER_MIN = 16
+
 # Firmware version tracking
 EXPECTED_FIRMWARE_VERSION = "QWAMOS-1.0.0-20251105"
 
@@ -106,10 +132,14 @@ class FirmwareIntegrityMonitor:
     Monitors firmware integrity and detects persistence attacks.
     """
 
-    def __init__(self):
+    def __init__(self, baseline_path: str = FIRMWARE_BASELINE_PATH):
         self.check_history: List[IntegrityCheckResult] = []
         self.log_path = "/var/log/qwamos/firmware_integrity.log"
 
+        # Partition hashing
+        self.baseline = TreeHashBaseline(baseline_path)
+        self._prefetched_hashes: Dict[str, Optional[str]] = {}
+
         # ML override integration
         self.ml_override: Optional[MLBootloaderOverride] = None
         if ML_OVERRIDE_AVAILABLE:
@@ -117,6 +147,8 @@ class FirmwareIntegrityMonitor:
 
         # Monitoring state
         self.monitoring_active = False
+        self.integrity_engine: Optional[IncrementalIntegrityEngine] = None
+        self._monitor_wakeup = None
 
         print("[Firmware Monitor] Initialized")
 
@@ -147,61 +179,86 @@ class FirmwareIntegrityMonitor:
             Hex digest of SHA256 hash, or None if file not found
         """
         try:
-            sha256 = hashlib.sha256()
-            with open(filepath, 'rb') as f:
-                while chunk := f.read(8192):
-                    sha256.update(chunk)
-            return sha256.hexdigest()
+            return hash_region(filepath, algorithm="sha256").hex()
         except FileNotFoundError:
             return None
         except Exception as e:
             print(f"[Firmware Monitor] ⚠ Hash error for {filepath}: {e}")
             return None
 
-    def _read_partition(self, partition: str) -> Optional[bytes]:
+    def _find_partition(self, partition: str) -> Optional[str]:
         """
-        Read raw partition data.
+        Find partition block device.
 
         Args:
             partition: Partition name (e.g., "boot", "aboot")
 
         Returns:
-            Raw partition data, or None if error
+            Block device path, or None if not found
         """
-        try:
-            # Find partition block device
-            result = subprocess.run(
-                ['find', '/dev/block/by-name', '-name', partition],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
+        partition_path = os.path.join(PARTITION_DIR, partition)
+        if not os.path.exists(partition_path):
+            print(f"[Firmware Monitor] ⚠ Partition {partition} not found")
+            return None
+        return partition_path
 
-            if result.returncode != 0:
-                print(f"[Firmware Monitor] ⚠ Partition {partition} not found")
-                return None
+    def _hash_partition(self, partition: str) -> Optional[str]:
+        """
+        Hash the first PARTITION_READ_BYTES of a partition (requires root).
 
-            partition_path = result.stdout.strip()
-            if not partition_path:
-                return None
+        Reads the block device directly; with a reference baseline the
+        region is tree-hashed in parallel and a mismatch records the
+        changed regions in self.baseline.changes[partition].
 
-            # Read partition (requires root)
-            result = subprocess.run(
-                ['dd', f'if={partition_path}', 'bs=4096', 'count=1024'],
-                capture_output=True,
-                timeout=10
-            )
+        Args:
+            partition: Partition name (e.g., "boot", "aboot")
 
-            if result.returncode == 0:
-                return result.stdout
-            else:
-                print(f"[Firmware Monitor] ⚠ Failed to read partition {partition}")
+        Returns:
+            Hash to compare with EXPECTED_BOOTLOADER_HASHES, or None if error
+        """
+        try:
+            partition_path = self._find_partition(partition)
+            if partition_path is None:
                 return None
 
+            expected_hash = EXPECTED_BOOTLOADER_HASHES.get(partition, "")
+            return self.baseline.verify(partition, partition_path, expected_hash, PARTITION_READ_BYTES)
+
         except Exception as e:
             print(f"[Firmware Monitor] ⚠ Partition read error: {e}")
             return None
 
+    def hash_partitions(self, partitions: List[str]) -> Dict[str, Optional[str]]:
+        """
+        Hash several partitions concurrently.
+
+        The partitions share the tree hash worker pool and in-flight chunk
+        cap, so checking them together uses no more threads or memory than
+        checking one.
+
+        Args:
+            partitions: Partition names
+
+        Returns:
+            Dictionary of partition -> hash (None if unreadable)
+        """
+        with ThreadPoolExecutor(max_workers=max(1, len(partitions))) as pool:
+            return dict(zip(partitions, pool.map(self._hash_partition, partitions)))
+
+    def _partition_hash(self, partition: str) -> Optional[str]:
+        """Hash from a concurrent prefetch, or hash the partition now"""
+        if partition in self._prefetched_hashes:
+            return self._prefetched_hashes.pop(partition)
+        return self._hash_partition(partition)
+
+    def _changed_regions_detail(self, partition: str) -> str:
+        """Describe the regions that differ from the reference baseline"""
+        regions = self.baseline.changes.get(partition, [])
+        if not regions:
+            return ""
+        return " (changed regions: " + ", ".join(
+            f"0x{offset:x}+{length}" for offset, length in regions) + ")"
+
     def check_bootloader_integrity(self) -> IntegrityCheckResult:
         """
         Check bootloader integrity by comparing hash.
@@ -211,10 +268,10 @@ class FirmwareIntegrityMonitor:
         """
         print("[Firmware Monitor] Checking bootloader integrity...")
 
-        # Read bootloader partition
-        bootloader_data = self._read_partition("aboot")
+        # Hash bootloader partition
+        actual_hash = self._partition_hash("aboot")
 
-        if bootloader_data is None:
+        if actual_hash is None:
             result = IntegrityCheckResult(
                 component="bootloader",
                 status=IntegrityStatus.UNKNOWN,
@@ -226,8 +283,6 @@ class FirmwareIntegrityMonitor:
             self._log_result(result)
             return result
 
-        # Compute hash
-        actual_hash = hashlib.sha256(bootloader_data).hexdigest()
         expected_hash = EXPECTED_BOOTLOADER_HASHES.get("aboot", "")
 
         if actual_hash == expected_hash:
@@ -248,6 +303,7 @@ class FirmwareIntegrityMonitor:
                 expected=expected_hash,
                 actual=actual_hash,
                 details="CRITICAL: Bootloader hash mismatch - possible Dark Matter attack"
+                        + self._changed_regions_detail("aboot")
             )
             print("[Firmware Monitor] ❌ Bootloader integrity: FAIL")
             print(f"[Firmware Monitor]    Expected: {expected_hash}")
@@ -276,10 +332,10 @@ class FirmwareIntegrityMonitor:
         """
         print("[Firmware Monitor] Checking TrustZone integrity...")
 
-        # Read TrustZone partition
-        tz_data = self._read_partition("tz")
+        # Hash TrustZone partition
+        actual_hash = self._partition_hash("tz")
 
-        if tz_data is None:
+        if actual_hash is None:
             result = IntegrityCheckResult(
                 component="trustzone",
                 status=IntegrityStatus.UNKNOWN,
@@ -291,8 +347,6 @@ class FirmwareIntegrityMonitor:
             self._log_result(result)
             return result
 
-        # Compute hash
-        actual_hash = hashlib.sha256(tz_data).hexdigest()
         expected_hash = EXPECTED_BOOTLOADER_HASHES.get("tz", "")
 
         if actual_hash == expected_hash:
@@ -313,6 +367,7 @@ class FirmwareIntegrityMonitor:
                 expected=expected_hash,
                 actual=actual_hash,
                 details="CRITICAL: TrustZone compromise detected"
+                        + self._changed_regions_detail("tz")
             )
             print("[Firmware Monitor] ❌ TrustZone integrity: FAIL")
 
@@ -519,6 +574,9 @@ class FirmwareIntegrityMonitor:
         print("=" * 70)
         print("")
 
+        # Read both firmware partitions concurrently
+        self._prefetched_hashes = self.hash_partitions(["aboot", "tz"])
+
         results = {
             "bootloader": self.check_bootloader_integrity(),
             "trustzone": self.check_trustzone_integrity(),
@@ -547,8 +605,31 @@ class FirmwareIntegrityMonitor:
 
         return results
 
+    def _check_partition(self, partition: str) -> Optional[str]:
+        """
+        Run the integrity check for a monitored partition.
+
+        Args:
+            partition: Partition name (e.g., "aboot", "tz")
+
+        Returns:
+            Partition hash, or None if it could not be read
+        """
+        checks = {
+            "aboot": self.check_bootloader_integrity,
+            "tz": self.check_trustzone_integrity,
+        }
+        result = checks[partition]()
+        return None if result.status == IntegrityStatus.UNKNOWN else result.actual
+
     def start_continuous_monitoring(self):
-        """Start continuous integrity monitoring (background thread)"""
+        """
+        Start continuous integrity monitoring (background threads).
+
+        Partitions are re-checked when they change and re-verified in a
+        budgeted low-priority sweep; version and power rail checks (no
+        partition reads) run every BOOTLOADER_CHECK_INTERVAL.
+        """
         import threading
 
         if self.monitoring_active:
@@ -556,21 +637,33 @@ class FirmwareIntegrityMonitor:
             return
 
         self.monitoring_active = True
+        self._monitor_wakeup = threading.Event()
+
+        self.integrity_engine = IncrementalIntegrityEngine(
+            {name: os.path.join(PARTITION_DIR, name) for name in MONITORED_PARTITIONS},
+            self._check_partition,
+            state_path=INTEGRITY_STATE_PATH,
+            budget_mb_per_min=REVERIFY_BUDGET_MB_PER_MIN,
+            full_interval=FULL_REVERIFY_INTERVAL,
+            max_read_bytes=PARTITION_READ_BYTES,
+        )
+        self.integrity_engine.start()
 
         def monitor_loop():
             print("[Firmware Monitor] Continuous monitoring started")
 
             while self.monitoring_active:
                 try:
-                    # Run periodic checks
-                    self.run_full_integrity_check()
+                    # Cheap periodic checks
+                    self.check_firmware_version()
+                    self.check_power_rail()
 
                     # Sleep until next check
-                    time.sleep(BOOTLOADER_CHECK_INTERVAL)
+                    self._monitor_wakeup.wait(BOOTLOADER_CHECK_INTERVAL)
 
                 except Exception as e:
                     print(f"[Firmware Monitor] ⚠ Monitoring error: {e}")
-                    time.sleep(60)  # Back off on errors
+                    self._monitor_wakeup.wait(60)  # Back off on errors
 
             print("[Firmware Monitor] Monitoring stopped")
 
@@ -582,6 +675,11 @@ class FirmwareIntegrityMonitor:
     def stop_monitoring(self):
         """Stop continuous monitoring"""
         self.monitoring_active = False
+        if self._monitor_wakeup:
+            self._monitor_wakeup.set()
+        if self.integrity_engine:
+            self.integrity_engine.stop()
+            self.integrity_engine = None
 
     def get_check_history(self, component: Optional[str] = None,
                          limit: int = 100) -> List[IntegrityCheckResult]:
@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+"""
+QWAMOS Phase 10: Incremental Integrity Engine
+=============================================
+
+Change-triggered integrity verification for monitored artifacts
+(firmware partitions, boot images, configuration files).
+
+**Triggers:**
+1. inotify events (modify/attrib/close-write/move/delete) where available
+2. Stat signature changes: (st_dev, st_ino, st_size, st_mtime_ns, st_ctime_ns),
+   compared on every poll - a stat is nearly free, a rehash is not
+3. Scheduled full re-verification at idle CPU and I/O priority, limited to
+   a read budget in MB/min - catches writes that bypass the watched inode
+   (raw writes through another device node, DMA, firmware updaters)
+
+Unchanged artifacts are not re-read between scheduled re-verifications.
+Change-triggered checks run on their own thread at normal priority, so a
+sweep stuck behind foreground I/O never delays them. Artifacts that could
+not be read are retried with exponential backoff, starting at the next poll.
+The signature and hash of every artifact are persisted, so a restart does
+not trigger a full rescan either.
+
+Version: 1.0.0
+Date: 2026-10-18
+"""
+
+import ctypes
+import ctypes.util
+import json
+import os
+import platform
+import select
+import struct
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set
+
+
+# ============================================================================
+# Configuration
+# ============================================================================
+
+# Seconds between stat polls / event waits
+DEFAULT_POLL_INTERVAL = 30
+
+# Seconds before an unchanged artifact is re-read anyway
+DEFAULT_FULL_REVERIFY_INTERVAL = 6 * 3600
+
+# Scheduled re-verification read budget (MB per minute)
+DEFAULT_BUDGET_MB_PER_MIN = 16
+
+# inotify (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_IGNORED = 0x00008000
+INOTIFY_EVENT = struct.Struct('iIII')  # wd, mask, cookie, len
+
+# ioprio_set(2) has no libc wrapper
+IOPRIO_SET_SYSCALL = {"x86_64": 251, "aarch64": 30, "armv7l": 314, "armv8l": 314, "i686": 289}
+IOPRIO_WHO_PROCESS = 1
+IOPRIO_CLASS_IDLE = 3
+IOPRIO_CLASS_SHIFT = 13
+
+
+def lower_thread_priority() -> bool:
+    """
+    Run the calling thread at nice 19 and in the idle I/O class.
+
+    On Linux both are per-thread and inherited by threads it creates.
+
+    Returns:
+        True if both were applied
+    """
+    applied = True
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+    except (OSError, AttributeError):
+        applied = False
+
+    syscall_nr = IOPRIO_SET_SYSCALL.get(platform.machine())
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        ioprio = IOPRIO_CLASS_IDLE << IOPRIO_CLASS_SHIFT
+        if syscall_nr is None or libc.syscall(syscall_nr, IOPRIO_WHO_PROCESS, 0, ioprio) != 0:
+            applied = False
+    except (OSError, AttributeError):
+        applied = False
+    return applied
+
+
+def stat_signature(path: str) -> Optional[List[int]]:
+    """(dev, inode, size, mtime, ctime) of an artifact, or None if missing"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, st.st_ctime_ns]
+
+
+def artifact_size(path: str) -> int:
+    """Readable size in bytes (block devices report st_size 0)"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return 0
+    try:
+        return os.lseek(fd, 0, os.SEEK_END)
+    finally:
+        os.close(fd)
+
+
+# ============================================================================
+# inotify Watcher
+# ============================================================================
+
+class InotifyWatcher:
+    """
+    Minimal inotify binding (ctypes, no dependencies).
+
+    Watches follow symlinks, so /dev/block/by-name/* entries watch the
+    device node; writes through that node raise IN_MODIFY.
+    """
+
+    MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_DELETE_SELF | IN_MOVE_SELF
+
+    def __init__(self):
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        if not hasattr(self._libc, 'inotify_init1'):
+            raise OSError("inotify not available")
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches: Dict[int, str] = {}
+
+    def fileno(self) -> int:
+        return self.fd
+
+    def watch(self, name: str, path: str) -> bool:
+        """
+        Watch an artifact.
+
+        Returns:
+            True if the watch is active
+        """
+        if name in self.watches.values():
+            return True
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), self.MASK)
+        if wd < 0:
+            return False
+        self.watches[wd] = name
+        return True
+
+    def read_events(self) -> Set[str]:
+        """
+        Drain pending events.
+
+        Returns:
+            Names of artifacts with events; watches removed by the kernel
+            (artifact deleted or replaced) are dropped so they can be re-added
+        """
+        names: Set[str] = set()
+        while True:
+            try:
+                buffer = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return names
+            offset = 0
+            while offset + INOTIFY_EVENT.size <= len(buffer):
+                wd, mask, _, name_len = INOTIFY_EVENT.unpack_from(buffer, offset)
+                offset += INOTIFY_EVENT.size + name_len
+                name = self.watches.get(wd)
+                if name is not None:
+                    names.add(name)
+                if mask & IN_IGNORED:
+                    self.watches.pop(wd, None)
+
+    def close(self):
+        os.close(self.fd)
+
+
+# ============================================================================
+# Incremental Integrity Engine
+# ============================================================================
+
+class IncrementalIntegrityEngine:
+    """
+    Re-verifies artifacts when they change, plus a budgeted background sweep.
+
+    `check(name)` runs the real integrity check for an artifact and returns
+    its hash (None if it could not be read). The engine decides when to call
+    it and caches (signature, hash, verified_at) per artifact. A failed read
+    keeps the last good hash and verified_at and schedules a retry instead.
+    """
+
+    def __init__(self, artifacts: Dict[str, str], check: Callable[[str], Optional[str]],
+                 state_path: Optional[str] = None,
+                 budget_mb_per_min: float = DEFAULT_BUDGET_MB_PER_MIN,
+                 full_interval: float = DEFAULT_FULL_REVERIFY_INTERVAL,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 max_read_bytes: Optional[int] = None,
+                 use_inotify: bool = True, low_priority: bool = True):
+        """
+        Initialize engine.
+
+        Args:
+            artifacts: Artifact name -> path
+            check: Integrity check, returns the artifact hash or None
+            state_path: JSON file persisting signatures and hashes
+            budget_mb_per_min: Read budget for scheduled re-verification
+            full_interval: Seconds before an unchanged artifact is re-verified
+            poll_interval: Seconds between stat polls
+            max_read_bytes: Bytes a check reads per artifact (for budgeting)
+            use_inotify: Trigger on inotify events where available
+            low_priority: Run the scheduled sweep at nice 19 / idle I/O class
+        """
+        self.artifacts = dict(artifacts)
+        self.check = check
+        self.state_path = state_path
+        self.budget_mb_per_min = budget_mb_per_min
+        self.full_interval = full_interval
+        self.poll_interval = poll_interval
+        self.max_read_bytes = max_read_bytes
+        self.use_inotify = use_inotify
+        self.low_priority = low_priority
+
+        self.state: Dict[str, Dict] = self._load_state()
+        self.tokens_mb = 0.0
+        self._last_refill = time.monotonic()
+        self.stats = {"events": 0, "changed_checks": 0, "retry_checks": 0,
+                      "scheduled_checks": 0, "mb_reverified": 0.0, "hash_changes": 0}
+
+        self.watcher: Optional[InotifyWatcher] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake_r: Optional[int] = None
+        self._wake_w: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._sweep_thread: Optional[threading.Thread] = None
+
+    def _load_state(self) -> Dict[str, Dict]:
+        if not self.state_path:
+            return {}
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+            return {name: entry for name, entry in state.items() if name in self.artifacts}
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self):
+        if not self.state_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+            tmp = self.state_path + ".tmp"
+            with open(tmp, 'w') as f:
+                json.dump(self.state, f)
+            os.replace(tmp, self.state_path)
+        except OSError as e:
+            print(f"[Integrity Engine] ⚠ Could not save state: {e}")
+
+    def _cost_mb(self, name: str) -> float:
+        size = artifact_size(self.artifacts[name])
+        if self.max_read_bytes is not None:
+            size = min(size, self.max_read_bytes)
+        return size / (1024 * 1024)
+
+    def _retry_delay(self, failures: int) -> float:
+        """Seconds before retrying an unreadable artifact: next poll, then doubling"""
+        return min(self.poll_interval * 2 ** (failures - 1), self.full_interval)
+
+    def verify(self, name: str, reason: str) -> Optional[str]:
+        """
+        Run the integrity check for one artifact and cache the result.
+
+        Args:
+            name: Artifact name
+            reason: "changed", "retry" or "scheduled"
+
+        Returns:
+            Artifact hash, or None if unreadable
+        """
+        signature = stat_signature(self.artifacts[name])  # before reading: later writes re-trigger
+        try:
+            digest = self.check(name)
+        except Exception as e:
+            print(f"[Integrity Engine] ⚠ Check failed for {name}: {e}")
+            digest = None
+
+        with self._lock:
+            entry = self.state.get(name, {})
+            previous = entry.get("hash")
+            if digest is None:
+                failures = entry.get("failures", 0) + 1
+                self.state[name] = {"signature": signature, "hash": previous,
+                                    "verified_at": entry.get("verified_at"), "failures": failures,
+                                    "retry_at": time.time() + self._retry_delay(failures)}
+            else:
+                if previous is not None and digest != previous:
+                    self.stats["hash_changes"] += 1
+                    print(f"[Integrity Engine] ⚠ {name} content changed ({reason} check)")
+                self.state[name] = {"signature": signature, "hash": digest, "verified_at": time.time()}
+            self.stats[f"{reason}_checks"] += 1
+            self._save_state()
+        return digest
+
+    def changed_artifacts(self) -> List[str]:
+        """Artifacts whose stat signature differs from the cached one"""
+        with self._lock:
+            signatures = {name: entry["signature"] for name, entry in self.state.items()}
+        return [
+            name for name, path in self.artifacts.items()
+            if name not in signatures or signatures[name] != stat_signature(path)
+        ]
+
+    def retry_due(self) -> List[str]:
+        """Unreadable artifacts whose retry backoff has elapsed"""
+        wall = time.time()
+        with self._lock:
+            return [name for name, entry in self.state.items()
+                    if entry.get("retry_at") is not None and wall >= entry["retry_at"]]
+
+    def _refill(self, now: float, cap_mb: float):
+        self.tokens_mb = min(cap_mb, self.tokens_mb + self.budget_mb_per_min * (now - self._last_refill) / 60)
+        self._last_refill = now
+
+    def check_changed(self, events: Set[str] = frozenset()) -> Dict[str, str]:
+        """
+        Check changed artifacts and retry unreadable ones whose backoff elapsed.
+
+        Args:
+            events: Artifact names reported by inotify
+
+        Returns:
+            Dictionary of artifact name -> reason, for artifacts checked
+        """
+        checked = {}
+        for name in sorted(set(events) | set(self.changed_artifacts())):
+            self.verify(name, "changed")
+            checked[name] = "changed"
+        for name in sorted(set(self.retry_due()) - set(checked)):
+            self.verify(name, "retry")
+            checked[name] = "retry"
+        return checked
+
+    def sweep(self, now: Optional[float] = None, skip: Set[str] = frozenset()) -> Dict[str, str]:
+        """
+        Spend the read budget on the artifacts longest without verification.
+
+        Args:
+            now: Monotonic time (for tests)
+            skip: Artifacts already checked in this step
+
+        Returns:
+            Dictionary of artifact name -> "scheduled", for artifacts checked
+        """
+        wall = time.time()
+        with self._lock:
+            due = sorted(
+                (entry["verified_at"], name) for name, entry in self.state.items()
+                if name not in skip and "failures" not in entry
+                and wall - entry["verified_at"] >= self.full_interval
+            )
+        if not due:
+            self._refill(time.monotonic() if now is None else now, self.budget_mb_per_min)
+            return {}
+
+        checked = {}
+        costs = {name: self._cost_mb(name) for _, name in due}
+        self._refill(time.monotonic() if now is None else now,
+                     max([self.budget_mb_per_min] + list(costs.values())))
+        for _, name in due:
+            if costs[name] > self.tokens_mb:
+                break
+            self.tokens_mb -= costs[name]
+            self.stats["mb_reverified"] += costs[name]
+            self.verify(name, "scheduled")
+            checked[name] = "scheduled"
+        return checked
+
+    def run_once(self, events: Set[str] = frozenset(), now: Optional[float] = None) -> Dict[str, str]:
+        """
+        One engine step: check changed artifacts, then spend the read budget
+        on the artifacts longest without verification.
+
+        Args:
+            events: Artifact names reported by inotify
+            now: Monotonic time (for tests)
+
+        Returns:
+            Dictionary of artifact name -> reason, for artifacts checked
+        """
+        checked = self.check_changed(events)
+        checked.update(self.sweep(now, skip=set(checked)))
+        return checked
+
+    def _wait_for_events(self) -> Set[str]:
+        """Block until inotify events, a wake-up or the poll interval"""
+        fds = [self._wake_r] + ([self.watcher.fileno()] if self.watcher else [])
+        readable, _, _ = select.select(fds, [], [], self.poll_interval)
+        if self._wake_r in readable:
+            os.read(self._wake_r, 64)
+        if self.watcher and self.watcher.fileno() in readable:
+            events = self.watcher.read_events()
+            self.stats["events"] += len(events)
+            return events
+        return set()
+
+    def _run(self):
+        if self.use_inotify:
+            try:
+                self.watcher = InotifyWatcher()
+            except OSError as e:
+                print(f"[Integrity Engine] inotify unavailable ({e}), polling stat signatures")
+
+        events: Set[str] = set()
+        while not self._stop.is_set():
+            try:
+                if self.watcher:
+                    for name, path in self.artifacts.items():
+                        self.watcher.watch(name, path)
+                self.check_changed(events)
+            except Exception as e:
+                print(f"[Integrity Engine] ⚠ Error: {e}")
+            events = self._wait_for_events()
+
+        if self.watcher:
+            self.watcher.close()
+            self.watcher = None
+
+    def _run_sweep(self):
+        # Only this thread is deprioritized; niceness cannot be raised back unprivileged
+        if self.low_priority and not lower_thread_priority():
+            print("[Integrity Engine] ⚠ Could not lower CPU/I/O priority")
+
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"[Integrity Engine] ⚠ Sweep error: {e}")
+
+    def start(self):
+        """Start the engine threads (checks changed artifacts immediately)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        if self._wake_r is None:
+            self._wake_r, self._wake_w = os.pipe()
+        self._thread = threading.Thread(target=self._run, name="integrity-engine", daemon=True)
+        self._sweep_thread = threading.Thread(target=self._run_sweep, name="integrity-sweep", daemon=True)
+        self._thread.start()
+        self._sweep_thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the engine threads"""
+        self._stop.set()
+        if self._wake_w is not None:
+            os.write(self._wake_w, b"x")
+        running = False
+        for thread in (self._thread, self._sweep_thread):
+            if thread:
+                thread.join(timeout)
+                running = running or thread.is_alive()
+        self._thread = self._sweep_thread = None
+        if self._wake_r is not None and not running:
+            os.close(self._wake_r)
+            os.close(self._wake_w)
+            self._wake_r = self._wake_w = None
+
+    def get_stats(self) -> Dict:
+        """Engine counters plus the budget currently available"""
+        return {**self.stats, "tokens_mb": self.tokens_mb, "artifacts": len(self.artifacts),
+                "inotify": self.watcher is not None}
@@ -29,6 +29,7 @@ import sys
 import unittest
 import tempfile
 import json
+import hashlib
 from datetime import datetime
 from unittest.mock import Mock, patch, MagicMock
 
@@ -212,8 +213,8 @@ class TestFirmwareIntegrityMonitor(unittest.TestCase):
 
     def test_bootloader_integrity_pass(self):
         """Test bootloader integrity check (pass)"""
-        # Mock partition read and hash
-        with patch.object(self.monitor, '_read_partition', return_value=b'test_data'):
+        # Mock partition hash
+        with patch.object(self.monitor, '_hash_partition', return_value=hashlib.sha256(b'test_data').hexdigest()):
             # Mock expected hash matches actual
             with patch('security.firmware_integrity_monitor.EXPECTED_BOOTLOADER_HASHES',
                       {'aboot': 'c7be1ed902fb8dd4d48997c6452f5d7e509fbcdbe2808b16bcf4edce4c07d14e'}):
@@ -223,8 +224,8 @@ class TestFirmwareIntegrityMonitor(unittest.TestCase):
 
     def test_bootloader_integrity_fail(self):
         """Test bootloader integrity check (fail)"""
-        # Mock partition read
-        with patch.object(self.monitor, '_read_partition', return_value=b'tampered_data'):
+        # Mock partition hash
+        with patch.object(self.monitor, '_hash_partition', return_value=hashlib.sha256(b'tampered_data').hexdigest()):
             # Mock expected hash does NOT match
             with patch('security.firmware_integrity_monitor.EXPECTED_BOOTLOADER_HASHES',
                       {'aboot': 'expected_hash_that_wont_match'}):
@@ -237,7 +238,7 @@ class TestFirmwareIntegrityMonitor(unittest.TestCase):
 
     def test_trustzone_integrity(self):
         """Test TrustZone integrity check"""
-        with patch.object(self.monitor, '_read_partition', return_value=b'tz_data'):
+        with patch.object(self.monitor, '_hash_partition', return_value=hashlib.sha256(b'tz_data').hexdigest()):
             with patch('security.firmware_integrity_monitor.EXPECTED_BOOTLOADER_HASHES',
                       {'tz': 'd2d2d2d2d2d2d2d2d2d2d2d2d2d2d2d2d2d2d2d2d2d2d2d2d2d2d2d2d2d2d2d2'}):
                 result = self.monitor.check_trustzone_integrity()
@@ -352,7 +353,7 @@ class TestEndToEndScenarios(unittest.TestCase):
         override = monitor.ml_override
 
         # Mock bootloader modification
-        with patch.object(monitor, '_read_partition', return_value=b'malicious_bootloader'):
+        with patch.object(monitor, '_hash_partition', return_value=hashlib.sha256(b'malicious_bootloader').hexdigest()):
             with patch('security.firmware_integrity_monitor.EXPECTED_BOOTLOADER_HASHES',
                       {'aboot': 'legitimate_hash'}):
                 with patch.object(override, '_lock_bootloader') as mock_lock:
@@ -28,6 +28,7 @@ from pqc_keystore import PQCKeystore
 # Constants
 BLOCK_SIZE = 4096  # 4 KB blocks
 HEADER_SIZE = 4096  # 4 KB header
+SLOT_SIZE = BLOCK_SIZE + 16 + 12 + 4  # [4B size][12B nonce][ciphertext][16B tag]
 MAGIC = b'QWAMOS-PQC-VOL-v1'
 
 
@@ -164,7 +165,7 @@ class PQCVolume:
             raise ValueError(f"Block {block_number} out of range")
 
         # Seek to block position (after header)
-        block_offset = HEADER_SIZE + (block_number * (BLOCK_SIZE + 16 + 12 + 4))
+        block_offset = HEADER_SIZE + (block_number * SLOT_SIZE)
         self.file_handle.seek(block_offset)
 
         # Read encrypted block with metadata
@@ -214,7 +215,7 @@ class PQCVolume:
         encrypted = self.keystore.encrypt_data(data, self.encryption_key)
 
         # Seek to block position
-        block_offset = HEADER_SIZE + (block_number * (BLOCK_SIZE + 16 + 12 + 4))
+        block_offset = HEADER_SIZE + (block_number * SLOT_SIZE)
         self.file_handle.seek(block_offset)
 
         # Write encrypted block
@@ -236,7 +237,7 @@ class PQCVolume:
             raise ValueError(f"Block {block_number} out of range")
 
         # Seek to block position
-        block_offset = HEADER_SIZE + (block_number * (BLOCK_SIZE + 16 + 12 + 4))
+        block_offset = HEADER_SIZE + (block_number * SLOT_SIZE)
         self.file_handle.seek(block_offset)
 
         # Write zero size marker
@@ -271,7 +272,7 @@ class PQCVolume:
         self.volume_path.parent.mkdir(parents=True, exist_ok=True)
 
         # Create sparse file (truncate creates holes)
-        total_size = HEADER_SIZE + (total_blocks * (BLOCK_SIZE + 16 + 12 + 4))
+        total_size = HEADER_SIZE + (total_blocks * SLOT_SIZE)
 
         with open(self.volume_path, 'wb') as f:
             f.truncate(total_size)
@@ -0,0 +1,50 @@
+"""
+QWAMOS Metrics Bus Writer
+Builds synthetic SystemMetrics and hammers a metrics bus from another process
+"""
+
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "hypervisor"))
+
+from resource_monitor import (
+    BatteryMetrics, CPUMetrics, MemoryMetrics, SystemMetrics, ThermalMetrics, VMMetrics
+)
+from metrics_bus import MetricsPublisher
+
+
+def make_metrics(value: int, vm_names: List[str] = ("vm-a", "vm-b"), cores: int = 8) -> SystemMetrics:
+    """Snapshot whose numeric fields all derive from value (torn reads show up as mismatches)"""
+    return SystemMetrics(
+        timestamp=1000.0 + value,
+        cpu=CPUMetrics(system_percent=float(value), per_core=[float(value)] * cores, temperature_c=None,
+                       frequency_mhz=[float(value)] * cores, context_switches=value, interrupts=value),
+        memory=MemoryMetrics(total_mb=value, used_mb=value, free_mb=value, available_mb=value,
+                             percent=float(value), swap_total_mb=value, swap_used_mb=value,
+                             swap_percent=float(value)),
+        thermal=ThermalMetrics(cpu_temp_c=float(value), gpu_temp_c=None, battery_temp_c=float(value),
+                               thermal_zone_temps={"thermal_zone0": float(value)}),
+        battery=BatteryMetrics(percent=float(value), is_charging=bool(value & 1),
+                               time_remaining_min=None, power_draw_w=None),
+        vms=[VMMetrics(vm_name=name, pid=value, cpu_percent=float(value), memory_mb=value,
+                       memory_percent=float(value), io_read_mb=float(value), io_write_mb=float(value),
+                       net_sent_mb=float(value), net_recv_mb=float(value), threads=value, status="running")
+             for name in vm_names]
+    )
+
+
+def hammer(name: str, duration: float, ready, **capacity):
+    """Publish consistent snapshots as fast as possible for duration seconds"""
+    publisher = MetricsPublisher(name, **capacity)
+    ready.set()
+    deadline = time.monotonic() + duration
+    value = 0
+    try:
+        while time.monotonic() < deadline:
+            value += 1
+            publisher.publish(make_metrics(value))
+    finally:
+        publisher.close(unlink=False)
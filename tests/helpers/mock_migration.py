@@ -0,0 +1,188 @@
+"""
+QWAMOS Mock Migrating QEMU
+MockQMPServer extended with a pre-copy migration model for testing live migration
+"""
+
+import asyncio
+import random
+import struct
+import time
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+from tests.helpers.mock_qmp import MockQMPServer
+
+PAGE_SIZE = 4096
+PAGE_HEADER = struct.Struct(">Q")
+
+
+class MigratingSourceQemu(MockQMPServer):
+    """
+    Source QEMU with guest memory that keeps getting dirtied.
+
+    Each pre-copy iteration sends every dirty page; meanwhile the guest
+    dirties dirty_ratio times as many pages as were sent (at least
+    min_dirty). Switchover happens once the remaining pages fit in
+    downtime-limit at link_bytes_per_ms.
+    """
+
+    def __init__(self, socket_path: str, pages: int = 1024, dirty_ratio: float = 0.3,
+                 min_dirty: int = 4, link_bytes_per_ms: int = 1000, seed: int = 1):
+        super().__init__(socket_path)
+        self.rng = random.Random(seed)
+        self.memory = bytearray(pages * PAGE_SIZE)
+        for page in self.rng.sample(range(pages), pages // 8):
+            self._scribble(page)
+        self.pages = pages
+        self.dirty_ratio = dirty_ratio
+        self.min_dirty = min_dirty
+        self.link_bytes_per_ms = link_bytes_per_ms
+
+        self.capabilities: Dict[str, bool] = {}
+        self.parameters: Dict[str, int] = {"downtime-limit": 300}
+        self.migration: Dict = {"status": "none"}
+        self.final_memory: Optional[bytes] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.handlers.update({
+            "migrate-set-capabilities": self._set_capabilities,
+            "migrate-set-parameters": self._set_parameters,
+            "migrate": self._migrate,
+            "migrate_cancel": self._cancel,
+            "query-migrate": lambda arguments: dict(self.migration),
+            "cont": self._cont,
+        })
+
+    def _scribble(self, page: int):
+        offset = page * PAGE_SIZE
+        self.memory[offset:offset + 64] = self.rng.randbytes(64)
+
+    def _set_capabilities(self, arguments: Dict) -> Dict:
+        for cap in arguments["capabilities"]:
+            self.capabilities[cap["capability"]] = cap["state"]
+        return {}
+
+    def _set_parameters(self, arguments: Dict) -> Dict:
+        self.parameters.update(arguments)
+        return {}
+
+    def _migrate(self, arguments: Dict) -> Dict:
+        path = arguments["uri"][len("unix:"):]
+        self.migration = {"status": "setup"}
+        self._task = asyncio.ensure_future(self._run(path))
+        return {}
+
+    def _cancel(self, arguments: Dict) -> Dict:
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self.migration = {"status": "cancelled"}
+        self.status = "running"
+        return {}
+
+    def _cont(self, arguments: Dict) -> Dict:
+        self.status = "running"
+        return {}
+
+    async def _run(self, path: str):
+        started = time.monotonic()
+        _, writer = await asyncio.open_unix_connection(path)
+        dirty: Set[int] = set(range(self.pages))
+        transferred = 0
+        syncs = 0
+        try:
+            while True:
+                remaining = len(dirty) * PAGE_SIZE
+                budget = self.parameters["downtime-limit"] * self.link_bytes_per_ms
+                final = syncs > 0 and remaining <= budget
+                if final:
+                    self.status = "paused"
+                    stop = time.monotonic()
+
+                sent = sorted(dirty)
+                dirty = set()
+                for page in sent:
+                    writer.write(PAGE_HEADER.pack(page) + self.memory[page * PAGE_SIZE:(page + 1) * PAGE_SIZE])
+                    transferred += PAGE_SIZE
+                await writer.drain()
+                await asyncio.sleep(0.02)
+
+                if final:
+                    break
+
+                # The guest keeps running during pre-copy
+                for page in self.rng.sample(range(self.pages), min(self.pages, max(
+                        self.min_dirty, int(len(sent) * self.dirty_ratio)))):
+                    self._scribble(page)
+                    dirty.add(page)
+                syncs += 1
+                self.migration = {"status": "active", "ram": {
+                    "transferred": transferred, "remaining": len(dirty) * PAGE_SIZE,
+                    "total": self.pages * PAGE_SIZE, "dirty-sync-count": syncs,
+                    "dirty-pages-rate": len(dirty) * 50, "mbps": 8.0,
+                }}
+        finally:
+            writer.close()
+
+        self.final_memory = bytes(self.memory)
+        now = time.monotonic()
+        self.migration = {"status": "completed", "total-time": int((now - started) * 1000),
+                          "downtime": int((now - stop) * 1000), "setup-time": 1,
+                          "ram": {"transferred": transferred, "remaining": 0,
+                                  "total": self.pages * PAGE_SIZE, "dirty-sync-count": syncs + 1}}
+        self.status = "postmigrate"
+
+
+class IncomingTargetQemu(MockQMPServer):
+    """Target QEMU started with -incoming defer"""
+
+    def __init__(self, socket_path: str, pages: int = 1024):
+        super().__init__(socket_path)
+        self.status = "inmigrate"
+        self.memory = bytearray(pages * PAGE_SIZE)
+        self.migration: Dict = {"status": "none"}
+        self.capabilities: Dict[str, bool] = {}
+        self._incoming: Optional[asyncio.AbstractServer] = None
+
+        self.handlers.update({
+            "migrate-set-capabilities": self._set_capabilities,
+            "migrate-incoming": self._migrate_incoming,
+            "query-migrate": lambda arguments: dict(self.migration),
+        })
+
+    def _set_capabilities(self, arguments: Dict) -> Dict:
+        for cap in arguments["capabilities"]:
+            self.capabilities[cap["capability"]] = cap["state"]
+        return {}
+
+    def _migrate_incoming(self, arguments: Dict) -> Dict:
+        path = arguments["uri"][len("unix:"):]
+        self.migration = {"status": "active"}
+        asyncio.ensure_future(self._listen(path))
+        return {}
+
+    async def _listen(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._incoming = await asyncio.start_unix_server(self._receive, path=path)
+
+    async def _receive(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                header = await reader.readexactly(PAGE_HEADER.size)
+                (page,) = PAGE_HEADER.unpack(header)
+                self.memory[page * PAGE_SIZE:(page + 1) * PAGE_SIZE] = await reader.readexactly(PAGE_SIZE)
+        except asyncio.IncompleteReadError as e:
+            if e.partial:
+                self.migration = {"status": "failed"}
+                return
+        finally:
+            writer.close()
+            self._incoming.close()
+
+        self.migration = {"status": "completed"}
+        self.status = "running"
+        await self.emit_event("RESUME")
+
+    async def stop(self):
+        if self._incoming is not None:
+            self._incoming.close()
+        await super().stop()
@@ -0,0 +1,101 @@
+"""
+QWAMOS Mock QMP Server
+Minimal QEMU Machine Protocol server on a unix socket for testing QMP clients
+"""
+
+import asyncio
+import json
+from typing import Any, Callable, Dict, List, Optional
+
+
+class MockQMPServer:
+    """Mock QMP server emulating a single QEMU instance"""
+
+    def __init__(self, socket_path: str):
+        self.socket_path = str(socket_path)
+        self.status = "running"
+        self.balloon_bytes: Optional[int] = 2048 * 1024 * 1024  # None = no balloon device
+        self.block_stats: List[Dict] = [
+            {"device": "drive0", "stats": {"rd_bytes": 4 * 1024 * 1024, "wr_bytes": 1024 * 1024,
+                                            "rd_operations": 100, "wr_operations": 25}},
+        ]
+        self.powerdown_responds = True  # Emit SHUTDOWN after system_powerdown
+        self.connections = 0
+        self.commands: List[str] = []
+        self.handlers: Dict[str, Callable[[Dict], Any]] = {}
+
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._writers: List[asyncio.StreamWriter] = []
+
+    async def start(self):
+        """Start listening"""
+        self._server = await asyncio.start_unix_server(self._handle_client, path=self.socket_path)
+
+    async def stop(self):
+        """Stop listening and drop clients"""
+        for writer in self._writers:
+            writer.close()
+        self._writers.clear()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def emit_event(self, name: str, data: Optional[Dict] = None):
+        """Send an asynchronous event to all clients"""
+        for writer in self._writers:
+            self._send(writer, {"event": name, "data": data or {},
+                                "timestamp": {"seconds": 0, "microseconds": 0}})
+            await writer.drain()
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        self._writers.append(writer)
+        self._send(writer, {"QMP": {"version": {"qemu": {"major": 8, "minor": 2, "micro": 0}},
+                                    "capabilities": []}})
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                request = json.loads(line)
+                command = request["execute"]
+                self.commands.append(command)
+
+                response = self._dispatch(command, request.get("arguments", {}))
+                response["id"] = request.get("id")
+                self._send(writer, response)
+                await writer.drain()
+
+                if command == "system_powerdown" and self.powerdown_responds:
+                    self.status = "shutdown"
+                    await self.emit_event("SHUTDOWN", {"guest": True, "reason": "guest-shutdown"})
+                elif command == "quit":
+                    break
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            if writer in self._writers:
+                self._writers.remove(writer)
+            writer.close()
+
+    def _dispatch(self, command: str, arguments: Dict) -> Dict:
+        if command in self.handlers:
+            return {"return": self.handlers[command](arguments)}
+        if command in ("qmp_capabilities", "system_powerdown", "quit"):
+            return {"return": {}}
+        if command == "query-status":
+            return {"return": {"status": self.status, "running": self.status == "running"}}
+        if command == "query-blockstats":
+            return {"return": self.block_stats}
+        if command in ("query-balloon", "balloon"):
+            if self.balloon_bytes is None:
+                return {"error": {"class": "DeviceNotActive", "desc": "No balloon device has been activated"}}
+            if command == "balloon":
+                self.balloon_bytes = arguments["value"]
+                return {"return": {}}
+            return {"return": {"actual": self.balloon_bytes}}
+        return {"error": {"class": "CommandNotFound", "desc": f"The command {command} has not been found"}}
+
+    @staticmethod
+    def _send(writer: asyncio.StreamWriter, message: Dict):
+        writer.write(json.dumps(message).encode() + b"\r\n")
@@ -0,0 +1,99 @@
+"""
+QWAMOS SWIM Cluster Simulator
+Runs many SwimMembership nodes against a virtual clock and lossy network
+"""
+
+import heapq
+import json
+import random
+import sys
+from itertools import count
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "cluster"))
+
+from gossip_membership import SwimConfig, SwimMembership
+
+
+class SimulatedSwimCluster:
+    """In-memory cluster with per-message latency, loss and crash faults"""
+
+    def __init__(self, size: int, config: Optional[SwimConfig] = None, seed: int = 1,
+                 latency: float = 0.002, loss: float = 0.0, seed_join: bool = False):
+        self.now = 0.0
+        self.latency = latency
+        self.loss = loss
+        self.rng = random.Random(seed)
+        self.down: Set[str] = set()
+
+        self.node_ids: List[str] = [f"node-{i:02d}" for i in range(size)]
+        self.bytes_sent: Dict[str, int] = {node_id: 0 for node_id in self.node_ids}
+        self.messages_sent: Dict[str, int] = {node_id: 0 for node_id in self.node_ids}
+
+        self._queue = []
+        self._order = count()
+
+        self.config = config
+        self.seed = seed
+        self.nodes: Dict[str, SwimMembership] = {}
+        for node_id in self.node_ids:
+            self.nodes[node_id] = self._make_node(node_id)
+
+        for node_id, node in self.nodes.items():
+            if seed_join:
+                seeds = {} if node_id == self.node_ids[0] else {self.node_ids[0]: None}
+            else:
+                seeds = {peer: None for peer in self.node_ids if peer != node_id}
+            node.join(seeds)
+
+    def _make_node(self, node_id: str) -> SwimMembership:
+        return SwimMembership(
+            node_id,
+            send=lambda target, message: self._send(node_id, target, message),
+            config=self.config,
+            clock=lambda: self.now,
+            rng=random.Random(self.seed * 1000 + self.node_ids.index(node_id))
+        )
+
+    def _send(self, sender: str, target: str, message: dict):
+        if sender in self.down:
+            return
+        encoded = json.dumps(message)
+        self.bytes_sent[sender] += len(encoded)
+        self.messages_sent[sender] += 1
+        if self.rng.random() < self.loss:
+            return
+        heapq.heappush(self._queue, (self.now + self.latency, next(self._order), sender, target, encoded))
+
+    def reset_counters(self):
+        """Zero the per-node traffic counters"""
+        for node_id in self.node_ids:
+            self.bytes_sent[node_id] = 0
+            self.messages_sent[node_id] = 0
+
+    def kill(self, node_id: str):
+        """Crash a node: it stops sending, receiving and ticking"""
+        self.down.add(node_id)
+
+    def restart(self, node_id: str, seed: str):
+        """Bring a crashed node back with fresh state, joining through one seed"""
+        self.down.discard(node_id)
+        self.nodes[node_id] = self._make_node(node_id)
+        self.nodes[node_id].join({seed: None})
+
+    def run(self, duration: float, step: float = 0.01):
+        """Advance virtual time, delivering messages and ticking every live node"""
+        end = self.now + duration
+        while self.now < end:
+            self.now = round(self.now + step, 6)
+            while self._queue and self._queue[0][0] <= self.now:
+                _, _, sender, target, encoded = heapq.heappop(self._queue)
+                if target not in self.down and target in self.nodes:
+                    self.nodes[target].receive(sender, json.loads(encoded))
+            for node_id, node in self.nodes.items():
+                if node_id not in self.down:
+                    node.tick()
+
+    def live_nodes(self) -> List[SwimMembership]:
+        return [node for node_id, node in self.nodes.items() if node_id not in self.down]
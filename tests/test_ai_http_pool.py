@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+QWAMOS AI Controllers: Pooled HTTP - Unit Tests
+Tests Claude/ChatGPT keep-alive connection reuse and concurrent aquery
+
+Author: QWAMOS Project
+License: MIT
+"""
+
+import asyncio
+import json
+import sys
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add ai/ to path
+REPO_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(REPO_ROOT / "ai"))
+
+try:
+    import requests
+except ImportError:
+    requests = None
+
+if requests:
+    from ai_manager import AIManager
+    from chatgpt.chatgpt_controller import ChatGPTController
+    from claude.claude_controller import ClaudeController
+
+
+class MockAPIHandler(BaseHTTPRequestHandler):
+    """Anthropic/OpenAI-shaped responses over HTTP/1.1 keep-alive."""
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = request["messages"][-1]["content"]
+        with self.server.lock:
+            self.server.in_flight += 1
+            self.server.max_in_flight = max(self.server.max_in_flight, self.server.in_flight)
+            self.server.auth.append(self.headers.get("x-api-key") or self.headers.get("Authorization"))
+        time.sleep(self.server.delay)
+        with self.server.lock:
+            self.server.in_flight -= 1
+
+        if self.path.endswith("/messages"):
+            data = {"content": [{"text": f"claude: {prompt}"}],
+                    "usage": {"input_tokens": 3, "output_tokens": 2}}
+        else:
+            data = {"choices": [{"message": {"content": f"gpt: {prompt}"}}],
+                    "usage": {"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5}}
+        body = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@unittest.skipUnless(requests, "requests not installed")
+class TestPooledControllers(unittest.IsolatedAsyncioTestCase):
+    """Test controllers reuse connections against a local mock API."""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), MockAPIHandler)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.connections = 0
+        self.server.in_flight = 0
+        self.server.max_in_flight = 0
+        self.server.delay = 0.0
+        self.server.auth = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+        self.claude = ClaudeController("sk-ant-test-key-0000")
+        self.chatgpt = ChatGPTController("sk-proj-test-key-0000")
+        for controller in (self.claude, self.chatgpt):
+            controller.disable_tor()
+            controller.base_url = base_url
+
+    def tearDown(self):
+        self.claude.close()
+        self.chatgpt.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connection_reuse(self):
+        """Test sequential queries share one keep-alive connection per controller."""
+        for i in range(5):
+            self.assertEqual(self.claude.query(f"q{i}"), f"claude: q{i}")
+        self.assertEqual(self.server.connections, 1)
+
+        for i in range(5):
+            self.assertEqual(self.chatgpt.query(f"q{i}"), f"gpt: q{i}")
+        self.assertTrue(self.chatgpt.test_connection())
+        self.assertEqual(self.server.connections, 2)
+
+        self.assertEqual(self.claude.usage["requests"], 5)
+        self.assertEqual(self.server.auth[0], "sk-ant-test-key-0000")
+        self.assertEqual(self.server.auth[-1], "Bearer sk-proj-test-key-0000")
+
+    def test_tor_toggle(self):
+        """Test Tor routing is applied to the session, not per request."""
+        self.assertEqual(self.claude.session.proxies, {})
+        self.claude.enable_tor()
+        self.assertEqual(self.claude.session.proxies["https"], "socks5h://127.0.0.1:9050")
+        self.assertFalse(self.claude.session.trust_env)
+
+    async def test_concurrent_aquery(self):
+        """Test aquery calls overlap and the pool bounds open connections."""
+        self.server.delay = 0.2
+        replies = await asyncio.gather(*[self.claude.aquery(f"q{i}") for i in range(4)])
+        self.assertEqual(replies, [f"claude: q{i}" for i in range(4)])
+        self.assertGreater(self.server.max_in_flight, 1)
+
+        # A second round reuses the pooled connections
+        self.assertLessEqual(self.server.connections, 4)
+        await asyncio.gather(*[self.claude.aquery(f"r{i}") for i in range(4)])
+        self.assertLessEqual(self.server.connections, 4)
+        self.assertEqual(len(self.claude.history), 8)
+
+    async def test_manager_aquery(self):
+        """Test AIManager.aquery fans out to both cloud services at once."""
+        self.server.delay = 0.2
+        manager = AIManager(config_dir="/nonexistent")
+        for service, controller in (("claude", self.claude), ("chatgpt", self.chatgpt)):
+            manager.services[service] = {"enabled": True, "controller": controller}
+
+        replies = await asyncio.gather(manager.aquery("claude", "a"), manager.aquery("chatgpt", "b"))
+        self.assertEqual(replies, ["claude: a", "gpt: b"])
+        self.assertEqual(self.server.max_in_flight, 2)
+        self.assertEqual(manager.usage_stats["claude"]["queries"], 1)
+
+        with self.assertRaises(RuntimeError):
+            await manager.aquery("kali-gpt", "x")
+        with self.assertRaises(ValueError):
+            await manager.aquery("bard", "x")
+
+
+if __name__ == "__main__":
+    unittest.main()
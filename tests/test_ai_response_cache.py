@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+QWAMOS AI Manager: Response Cache - Unit Tests
+Tests semantic cache keys, TTL/LRU bounds, encryption at rest and stats
+
+Author: QWAMOS Project
+License: MIT
+"""
+
+import asyncio
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+# Add ai/ to path
+REPO_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(REPO_ROOT / "ai"))
+
+try:
+    import Crypto
+except ImportError:
+    Crypto = None
+
+from ai_manager import AIManager
+
+if Crypto:
+    from response_cache import ResponseCache
+
+KEY = bytes(range(32))
+
+
+class FakeController:
+    """Cloud-style controller that counts real queries."""
+
+    def __init__(self, model="fake-1", delay=0.02):
+        self.model = model
+        self.delay = delay
+        self.calls = []
+
+    def query(self, prompt, context=None):
+        self.calls.append(prompt)
+        time.sleep(self.delay)
+        if prompt.startswith("fail"):
+            return "Error: API returned 500"
+        return f"answer #{len(self.calls)} to {prompt.split()[0]}"
+
+    async def aquery(self, prompt, context=None):
+        return await asyncio.to_thread(self.query, prompt, context)
+
+
+@unittest.skipUnless(Crypto, "pycryptodome not installed")
+class TestResponseCache(unittest.TestCase):
+    """Test the cache through AIManager.query."""
+
+    def setUp(self):
+        self.cache_dir = Path(tempfile.mkdtemp())
+        self.controller = FakeController()
+        self.manager = self.make_manager()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def make_manager(self, **kwargs):
+        manager = AIManager(config_dir="/nonexistent",
+                            response_cache=ResponseCache(str(self.cache_dir), key=KEY, **kwargs))
+        manager.services['claude'] = {'enabled': True, 'controller': self.controller}
+        return manager
+
+    def test_semantic_hits(self):
+        """Test whitespace-only prompt changes and routing-only context keys hit."""
+        first = self.manager.query('claude', "audit\n    main.py", {'file': 'main.py'})
+        again = self.manager.query('claude', "audit main.py  ", {'file': 'main.py', 'priority': 'threat_response'})
+        self.assertEqual(first, again)
+        self.assertEqual(len(self.controller.calls), 1)
+
+        self.manager.query('claude', "audit main.py", {'file': 'util.py'})
+        self.manager.query('claude', "audit main.py", {'file': 'main.py'}, use_cache=False)
+        self.controller.model = "fake-2"
+        self.manager.query('claude', "audit main.py", {'file': 'main.py'})
+        self.assertEqual(len(self.controller.calls), 4)
+
+        stats = self.manager.get_usage_stats()['claude']
+        self.assertEqual((stats['cache_hits'], stats['cache_misses'], stats['queries']), (1, 3, 4))
+        self.assertGreaterEqual(stats['latency_saved'], 0.02)
+
+    def test_errors_not_cached(self):
+        """Test error responses are retried rather than served from cache."""
+        self.manager.query('claude', "fail please")
+        self.manager.query('claude', "fail please")
+        self.assertEqual(len(self.controller.calls), 2)
+        self.assertEqual(len(self.manager.response_cache), 0)
+
+    def test_ttl_and_lru(self):
+        """Test expired entries miss and the least recently used entry is evicted."""
+        manager = self.make_manager(ttl=0.2, max_entries=2)
+        manager.query('claude', "a")
+        manager.query('claude', "b")
+        manager.query('claude', "a")         # hit: b is now least recently used
+        manager.query('claude', "c")         # evicts b
+        manager.query('claude', "b")
+        self.assertEqual(self.controller.calls, ["a", "b", "c", "b"])
+        self.assertEqual(manager.response_cache.get_stats()['evictions'], 2)
+
+        time.sleep(0.25)
+        manager.query('claude', "b")
+        self.assertEqual(manager.response_cache.get_stats()['expired'], 1)
+        self.assertEqual(len(list(self.cache_dir.glob("*.bin"))), 2)
+
+        # A response larger than the whole budget is not cached
+        manager.response_cache.max_bytes = 64
+        manager.query('claude', "d")
+        self.assertEqual(len(manager.response_cache), 2)
+
+    def test_encrypted_and_persistent(self):
+        """Test entries survive restarts, are unreadable on disk and bound to the key."""
+        answer = self.manager.query('claude', "secret recon plan", {'target': '10.0.0.5'})
+        files = list(self.cache_dir.glob("*.bin"))
+        self.assertEqual(len(files), 1)
+        blob = files[0].read_bytes()
+        self.assertNotIn(b"recon", blob)
+        self.assertNotIn(b"answer", blob)
+        self.assertEqual(files[0].stat().st_mode & 0o777, 0o600)
+
+        restarted = self.make_manager()
+        self.assertEqual(restarted.query('claude', "secret recon plan", {'target': '10.0.0.5'}), answer)
+        self.assertEqual(len(self.controller.calls), 1)
+
+        # Another device key maps the same query to a different entry
+        other = ResponseCache(str(self.cache_dir), key=bytes(32))
+        entry = other.make_key('claude', 'fake-1', "secret recon plan", {'target': '10.0.0.5'})
+        self.assertIsNone(other.get(entry))
+
+        # A tampered entry is dropped instead of served
+        files[0].write_bytes(blob[:-1] + bytes([blob[-1] ^ 1]))
+        with self.assertLogs('ResponseCache', 'WARNING'):
+            self.make_manager().query('claude', "secret recon plan", {'target': '10.0.0.5'})
+        self.assertEqual(len(self.controller.calls), 2)
+
+    def test_aquery_uses_cache(self):
+        """Test the asyncio path shares the cache with query()."""
+        self.manager.query('claude', "scan 10.0.0.1")
+
+        async def run():
+            return await asyncio.gather(*[self.manager.aquery('claude', "scan 10.0.0.1") for _ in range(3)])
+
+        replies = asyncio.run(run())
+        self.assertEqual(len(set(replies)), 1)
+        self.assertEqual(len(self.controller.calls), 1)
+        self.assertEqual(self.manager.get_usage_stats()['claude']['cache_hits'], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
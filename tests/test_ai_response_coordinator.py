@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+QWAMOS Phase 7: AI Response Coordinator - Unit Tests
+Tests concurrent AI stages, the CRITICAL fast path and the threat worker pool
+
+Author: QWAMOS Project
+License: MIT
+"""
+
+import asyncio
+import json
+import sys
+import time
+import unittest
+from pathlib import Path
+
+# Add ai/ and ai_response/ to path
+REPO_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(REPO_ROOT / "ai"))
+sys.path.insert(0, str(REPO_ROOT / "security" / "ai_response"))
+
+from ai_response_coordinator import AIResponseCoordinator, LatencyHistogram
+
+MITIGATION = {"firewall_rules": ["block 203.0.113.7"], "vm_snapshots": ["work-vm"]}
+TRIAGE_MITIGATION = {"firewall_rules": ["block 203.0.113.0/24"]}
+
+
+class FakeAIManager:
+    """Answers each service after a fixed delay and tracks overlap."""
+
+    def __init__(self, delay=0.2, fail_refined=False):
+        self.delay = delay
+        self.fail_refined = fail_refined
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.answered = []
+        self.prompts = []
+
+    async def aquery(self, service, prompt, context=None):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        self.answered.append((time.monotonic(), service))
+        self.prompts.append((service, prompt))
+        if service != 'chatgpt':
+            return f"{service} says contain it"
+        if "kali-gpt says" not in prompt:
+            return json.dumps(TRIAGE_MITIGATION)
+        if self.fail_refined:
+            raise RuntimeError("rate limited")
+        return json.dumps(MITIGATION)
+
+
+class RecordingExecutor:
+    """Records executed actions instead of touching the system."""
+
+    def __init__(self):
+        self.executed = []
+
+    async def execute(self, action):
+        self.executed.append((time.monotonic(), action))
+        return {'success': True}
+
+
+class TestThreatPipeline(unittest.IsolatedAsyncioTestCase):
+    """Test a single threat through the DAG."""
+
+    async def asyncSetUp(self):
+        self.coordinator = AIResponseCoordinator(config_path="/nonexistent")
+        self.coordinator.ai_manager = self.ai = FakeAIManager()
+        self.coordinator.action_executor = self.executor = RecordingExecutor()
+        self.coordinator.config['monitor_duration'] = 0
+
+    async def test_ai_stages_overlap(self):
+        """Test Claude and ChatGPT triage alongside Kali GPT, then refine from its analysis."""
+        started = time.monotonic()
+        await self.coordinator.handle_threat(
+            {'type': 'PORT_SCAN', 'severity': 'MEDIUM', 'details': {'source_ip': '203.0.113.7'}}
+        )
+        self.assertEqual(self.ai.max_in_flight, 3)
+        # Triage overlaps Kali GPT; the two refinement queries follow it
+        self.assertLess(time.monotonic() - started, 3.5 * self.ai.delay)
+        self.assertEqual([service for service, _ in self.ai.prompts[3:]], ['claude', 'chatgpt'])
+        claude_prompt, chatgpt_prompt = (prompt for _, prompt in self.ai.prompts[3:])
+        self.assertIn("kali-gpt says contain it", claude_prompt)
+        self.assertIn("claude says contain it", chatgpt_prompt)
+
+        actions = [action for _, action in self.executor.executed]
+        self.assertEqual([a['type'] for a in actions], ['firewall', 'vm_snapshot'])
+
+        await asyncio.gather(*self.coordinator.monitor_tasks)
+        response = next(iter(self.coordinator.active_responses.values()))
+        self.assertEqual(response['status'], 'completed')
+        self.assertEqual(response['action_plan']['ai_analysis']['kali_gpt'], "kali-gpt says contain it")
+        self.assertEqual(response['action_plan']['ai_analysis']['chatgpt'], MITIGATION)
+        self.assertEqual(response['triage']['chatgpt'], TRIAGE_MITIGATION)
+
+        stats = self.coordinator.get_statistics()
+        for stage in ('kali_gpt', 'claude_triage', 'chatgpt_triage', 'claude', 'chatgpt',
+                      'ai_response', 'execute', 'time_to_mitigation'):
+            self.assertEqual(stats['stage_latency'][stage]['count'], 1, stage)
+        self.assertNotIn('fast_path', stats['stage_latency'])
+
+    async def test_triage_fallback(self):
+        """Test the triage mitigation is used when the refined one fails."""
+        self.ai.fail_refined = True
+        await self.coordinator.handle_threat(
+            {'type': 'PORT_SCAN', 'severity': 'MEDIUM', 'details': {'source_ip': '203.0.113.7'}}
+        )
+        actions = [action for _, action in self.executor.executed]
+        self.assertEqual(actions, [{'type': 'firewall', 'command': 'block 203.0.113.0/24', 'priority': 1}])
+
+    async def test_critical_fast_path(self):
+        """Test CRITICAL threats act on pre-authorized rules before the AIs answer."""
+        await self.coordinator.handle_threat({
+            'type': 'REVERSE_SHELL_ATTEMPT', 'severity': 'CRITICAL',
+            'details': {'source_ip': '203.0.113.7', 'pid': 4242, 'vm': 'work-vm'}
+        })
+
+        first_answer = min(t for t, _ in self.ai.answered)
+        fast = [action for t, action in self.executor.executed if t < first_answer]
+        # auto_kill_process is off by default, so the pid is left for the user
+        self.assertEqual([a['type'] for a in fast], ['firewall', 'vm_snapshot', 'network_isolation'])
+        self.assertEqual(len(self.executor.executed), 3)
+
+        response = next(iter(self.coordinator.active_responses.values()))
+        self.assertEqual(response['fast_path']['source'], 'fast_path')
+        # The AI plan repeats the fast-path actions; only new ones await permission
+        self.assertEqual(response['action_plan']['actions'], [])
+        self.assertEqual(response['status'], 'denied')
+
+        stats = self.coordinator.get_statistics()
+        self.assertEqual(stats['fast_path_responses'], 1)
+        mitigation = stats['stage_latency']['time_to_mitigation']
+        self.assertLess(mitigation['max'], self.ai.delay)
+
+
+class TestWorkerPool(unittest.IsolatedAsyncioTestCase):
+    """Test threats are handled concurrently up to the pool size."""
+
+    async def test_bounded_concurrency(self):
+        coordinator = AIResponseCoordinator(config_path="/nonexistent")
+        coordinator.ai_manager = ai = FakeAIManager(delay=0.1)
+        coordinator.action_executor = RecordingExecutor()
+        coordinator.config['monitor_duration'] = 0
+
+        await coordinator.start(workers=2)
+        for i in range(5):
+            await coordinator.submit_threat({'type': 'PORT_SCAN', 'severity': 'LOW', 'details': {'n': i}})
+        await coordinator.stop()
+
+        self.assertEqual(ai.max_in_flight, 6)  # 2 threats x 3 assistants
+        stats = coordinator.get_statistics()
+        self.assertEqual(stats['threats_handled'], 5)
+        self.assertEqual(stats['workers'], 0)
+        self.assertEqual(stats['stage_latency']['queue_wait']['count'], 5)
+        self.assertEqual(len(coordinator.active_responses), 5)
+        self.assertTrue(all(r['status'] == 'completed' for r in coordinator.active_responses.values()))
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    """Test histogram buckets and percentiles."""
+
+    def test_percentiles(self):
+        histogram = LatencyHistogram()
+        for seconds in [0.02] * 90 + [3.0] * 9 + [500.0]:
+            histogram.observe(seconds)
+
+        summary = histogram.to_dict()
+        self.assertEqual(summary['count'], 100)
+        self.assertEqual(summary['p50'], 0.05)
+        self.assertEqual(summary['p95'], 5.0)
+        self.assertEqual(summary['max'], 500.0)
+        self.assertEqual(summary['buckets']['<=0.05s'], 90)
+        self.assertEqual(summary['buckets']['>120s'], 1)
+        self.assertEqual(LatencyHistogram().to_dict()['p95'], 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
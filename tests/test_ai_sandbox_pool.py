@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+QWAMOS AI Sandbox: Worker Pool - Unit Tests
+Tests pooled sandbox workers, recycling, per-job timeouts and the unshare path
+
+Author: QWAMOS Project
+License: MIT
+"""
+
+import asyncio
+import subprocess
+import sys
+import time
+import unittest
+from pathlib import Path
+
+# Add ai/ to path
+REPO_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(REPO_ROOT / "ai"))
+
+from ai_sandbox import AISandbox, SandboxMode
+
+
+def unshare_works():
+    try:
+        return subprocess.run(['unshare', '--pid', '--fork', '--mount', '--uts', '--ipc', 'true'],
+                              capture_output=True).returncode == 0
+    except OSError:
+        return False
+
+
+def worker_pid(result):
+    """The job's parent is the worker that ran it"""
+    return int(result.stdout.split()[0])
+
+
+PPID = ["sh", "-c", "echo $PPID $$"]
+
+
+class TestSandboxPool(unittest.IsolatedAsyncioTestCase):
+    """Test the pool with unsandboxed (SandboxMode.NONE) workers."""
+
+    async def asyncSetUp(self):
+        self.sandbox = AISandbox("test", SandboxMode.NONE, pool_size=2, max_jobs_per_worker=3)
+
+    async def asyncTearDown(self):
+        await self.sandbox.close_pools()
+
+    async def test_workers_reused_and_recycled(self):
+        """Test jobs run on long-lived workers that are replaced after max_jobs."""
+        result = await self.sandbox.arun(["sh", "-c", "echo $QWAMOS_SANDBOXED $X"], env={'X': 'job'})
+        self.assertEqual(result.returncode, 0)
+        self.assertEqual(result.stdout, "1 job\n")
+
+        pids = [worker_pid(await self.sandbox.arun(PPID)) for _ in range(8)]
+        # Two workers take turns, each serving at most 3 jobs before replacement
+        self.assertTrue(all(pids.count(pid) <= 3 for pid in pids))
+        self.assertGreaterEqual(len(set(pids)), 3)
+        self.assertLessEqual(len(set(pids)), 5)
+
+        pool = self.sandbox.pools[True]
+        await asyncio.gather(*pool.replacing)  # replacements spawn in the background
+        stats = pool.get_stats()
+        self.assertEqual(stats['jobs'], 9)
+        self.assertGreaterEqual(stats['recycled'], 2)
+        self.assertEqual(stats['workers'], 2)
+
+    async def test_concurrent_jobs(self):
+        """Test independent jobs run on different workers at the same time."""
+        await self.sandbox.arun(["true"])
+        started = time.monotonic()
+        results = await asyncio.gather(*[self.sandbox.arun(["sleep", "0.3"]) for _ in range(4)])
+        elapsed = time.monotonic() - started
+        self.assertTrue(all(r.returncode == 0 for r in results))
+        self.assertLess(elapsed, 1.1)
+
+    async def test_job_timeout(self):
+        """Test a job over its timeout is killed and the worker stays usable."""
+        first = worker_pid(await self.sandbox.arun(PPID))
+        started = time.monotonic()
+        with self.assertRaises(subprocess.TimeoutExpired):
+            await self.sandbox.arun(["sleep", "10"], timeout=0.3)
+        self.assertLess(time.monotonic() - started, 3)
+
+        result = await self.sandbox.arun(["echo", "alive"])
+        self.assertEqual(result.stdout, "alive\n")
+        self.assertEqual(self.sandbox.pools[True].get_stats()['timeouts'], 1)
+        # The worker that ran the timed-out job was not replaced
+        self.assertIn(first, {worker_pid(await self.sandbox.arun(PPID)) for _ in range(2)})
+
+    async def test_policy_change_recycles(self):
+        """Test set_mode replaces workers spawned under the old policy."""
+        before = {worker_pid(await self.sandbox.arun(PPID)) for _ in range(2)}
+        self.sandbox.max_jobs_per_worker = 50
+        self.sandbox.pools[True].max_jobs = 50
+
+        self.sandbox._command_exists = lambda cmd: False  # STRICT falls back to the bare command
+        self.sandbox.set_mode(SandboxMode.STRICT)
+        after = {worker_pid(await self.sandbox.arun(PPID)) for _ in range(4)}
+        self.assertFalse(before & after)
+
+    async def test_cancelled_job_frees_slot(self):
+        """Test cancelling a caller replaces its worker instead of leaking the slot."""
+        marker = f"sleep {time.monotonic_ns() % 1000 + 1000}"
+        job = asyncio.ensure_future(self.sandbox.arun(marker.split()))
+        await asyncio.sleep(0.3)
+        job.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await job
+        await asyncio.sleep(0.1)
+        self.assertNotEqual(subprocess.run(["pgrep", "-fx", marker]).returncode, 0)
+
+        results = await asyncio.wait_for(
+            asyncio.gather(*[self.sandbox.arun(["echo", "ok"]) for _ in range(2)]), 5)
+        self.assertEqual([r.stdout for r in results], ["ok\n", "ok\n"])
+
+    async def test_missing_command(self):
+        """Test a command that cannot be executed reports 127 instead of failing the pool."""
+        result = await self.sandbox.arun(["/nonexistent/tool"])
+        self.assertEqual(result.returncode, 127)
+        self.assertEqual((await self.sandbox.arun(["echo", "ok"])).stdout, "ok\n")
+
+
+@unittest.skipUnless(unshare_works(), "unshare namespaces not permitted")
+class TestUnsharePool(unittest.IsolatedAsyncioTestCase):
+    """Test pooled workers sit inside the unshare fallback sandbox."""
+
+    async def test_jobs_share_worker_namespace(self):
+        sandbox = AISandbox("test", SandboxMode.BASIC, pool_size=1)
+        sandbox._command_exists = lambda cmd: cmd == 'unshare'
+        try:
+            results = [await sandbox.arun(PPID) for _ in range(3)]
+        finally:
+            await sandbox.close_pools()
+
+        # Same worker each time, and it is a low PID inside its own namespace
+        self.assertEqual(len({worker_pid(r) for r in results}), 1)
+        self.assertLess(worker_pid(results[0]), 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+QWAMOS Artemis Pipeline - Unit Tests
+Tests incremental static analysis: fingerprint cache, per-tool runtimes and merged findings
+
+Author: QWAMOS Project
+License: MIT
+"""
+
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+import artemis_full_pipeline
+from artemis_full_pipeline import ArtemisPipeline
+
+# Fake scanners: log their arguments, report one finding per scanned file
+FAKE_BANDIT = """#!{python}
+import json, os, sys
+if sys.argv[1] == "--version":
+    print("bandit 1.7.5"); sys.exit(0)
+files = [a for a in sys.argv[1:] if a.endswith(".py")]
+open(os.environ["ARTEMIS_TOOL_LOG"], "a").write(json.dumps(["bandit"] + files) + "\\n")
+print(json.dumps({{"results": [
+    {{"filename": f, "issue_severity": "HIGH", "issue_confidence": "HIGH",
+      "issue_text": "exec used", "line_number": 1, "test_id": "B102"}} for f in files]}}))
+sys.exit(1)
+"""
+
+FAKE_SHELLCHECK = """#!{python}
+import json, os, sys
+if sys.argv[1] == "--version":
+    print("ShellCheck - shell script analysis tool"); sys.exit(0)
+files = sys.argv[3:]
+open(os.environ["ARTEMIS_TOOL_LOG"], "a").write(json.dumps(["shellcheck"] + files) + "\\n")
+print(json.dumps([{{"file": f, "line": 1, "level": "warning", "code": 2086,
+                   "message": "Double quote"}} for f in files]))
+sys.exit(1)
+"""
+
+# Working tree: one leak per "secret" file. History: one leak per commit in
+# --log-opts (default: all of HEAD), found in the file that commit added.
+FAKE_GITLEAKS = """#!{python}
+import json, os, subprocess, sys
+if sys.argv[1] == "--version":
+    print("v8.18.0"); sys.exit(0)
+args = dict(a.split("=", 1) for a in sys.argv[2:] if "=" in a)
+if "--no-git" in sys.argv:
+    source = args["--source"]
+    files = sorted(os.path.relpath(os.path.join(d, f), source)
+                   for d, _, names in os.walk(source) for f in names)
+    leaks = [{{"File": f, "RuleID": "generic-api-key", "Secret": open(os.path.join(source, f)).read().strip(),
+               "StartLine": 1, "Description": "key"}} for f in files if "secret" in f]
+    entry = ["gitleaks", "--no-git"] + files
+else:
+    revisions = args.get("--log-opts", "HEAD")
+    commits = subprocess.run(["git", "log", "--format=%H", revisions], cwd=args["--source"],
+                             capture_output=True, text=True).stdout.split()
+    leaks = []
+    for commit in commits:
+        added = subprocess.run(["git", "show", "--name-only", "--diff-filter=A", "--format=", commit],
+                               cwd=args["--source"], capture_output=True, text=True).stdout.split()
+        leaks += [{{"File": f, "RuleID": "generic-api-key", "Commit": commit, "StartLine": 1,
+                    "Secret": subprocess.run(["git", "show", commit + ":" + f], cwd=args["--source"],
+                                             capture_output=True, text=True).stdout.strip(),
+                    "Description": "key"}} for f in added if "secret" in f]
+    entry = ["gitleaks-history", revisions]
+open(os.environ["ARTEMIS_TOOL_LOG"], "a").write(json.dumps(entry) + "\\n")
+open(args["--report-path"], "w").write(json.dumps(leaks))
+sys.exit(1 if leaks else 0)
+"""
+
+FAKE_TRIVY = """#!{python}
+import json, os, sys
+if sys.argv[1] == "--version":
+    print("Version: 0.50.0"); sys.exit(0)
+output = [a.split("=", 1)[1] for a in sys.argv if a.startswith("--output=")][0]
+open(os.environ["ARTEMIS_TOOL_LOG"], "a").write(json.dumps(["trivy"]) + "\\n")
+open(output, "w").write(json.dumps({{"Results": []}}))
+"""
+
+
+def git(repo, *args):
+    subprocess.run(["git", "-c", "user.name=QWAMOS", "-c", "user.email=qwamos@example.com", *args],
+                   cwd=repo, check=True, capture_output=True)
+
+
+class ArtemisTestCase(unittest.TestCase):
+    """A small git repo with fake scanners on PATH."""
+
+    tools = [("bandit", FAKE_BANDIT), ("shellcheck", FAKE_SHELLCHECK)]
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        self.repo = root / "repo"
+        self.bin = root / "bin"
+        self.log = root / "tools.log"
+        self.bin.mkdir()
+        for name, script in self.tools:
+            tool = self.bin / name
+            tool.write_text(script.format(python=sys.executable))
+            tool.chmod(0o755)
+
+        self.repo.mkdir()
+        (self.repo / "pkg").mkdir()
+        (self.repo / "pkg" / "a.py").write_text("exec('a')\n")
+        (self.repo / "pkg" / "b.py").write_text("exec('b')\n")
+        (self.repo / "run.sh").write_text("echo $1\n")
+        subprocess.run(["git", "init", "-q"], cwd=self.repo, check=True)
+
+        # Only the fake tools are on PATH (plus git)
+        git_dir = os.path.dirname(subprocess.run(
+            ["sh", "-c", "command -v git"], capture_output=True, text=True).stdout.strip())
+        self.env = {"PATH": f"{self.bin}:{git_dir}", "ARTEMIS_TOOL_LOG": str(self.log)}
+        self._saved_env = {k: os.environ.get(k) for k in self.env}
+        os.environ.update(self.env)
+
+    def tearDown(self):
+        for key, value in self._saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        self.tmp.cleanup()
+
+    def run_pipeline(self, incremental=True):
+        self.log.write_text("")
+        pipeline = ArtemisPipeline(self.repo, incremental=incremental)
+        with contextlib.redirect_stdout(io.StringIO()):
+            pipeline.phase1_static_analysis()
+            pipeline.phase2_triage()
+        calls = [json.loads(line) for line in self.log.read_text().splitlines()]
+        return pipeline, calls
+
+    def scanned(self, calls, tool):
+        return sorted(f for call in calls if call[0] == tool for f in call[1:])
+
+
+class TestArtemisIncremental(ArtemisTestCase):
+    """Test the incremental mode of phase 1 against fake scanners."""
+
+    def test_first_run_scans_everything(self):
+        pipeline, calls = self.run_pipeline()
+        self.assertEqual(self.scanned(calls, "bandit"), ["pkg/a.py", "pkg/b.py"])
+        self.assertEqual(self.scanned(calls, "shellcheck"), ["run.sh"])
+        self.assertEqual(len(pipeline.findings["p0_critical"]), 2)
+
+        runtimes = pipeline.tool_runtimes
+        self.assertEqual(runtimes["bandit"]["scanned"], 2)
+        self.assertEqual(runtimes["semgrep"]["status"], "not installed")
+        self.assertIn("seconds", runtimes["shellcheck"])
+
+    def test_unchanged_rerun_uses_cache(self):
+        self.run_pipeline()
+        pipeline, calls = self.run_pipeline()
+
+        self.assertEqual(calls, [])
+        self.assertEqual(pipeline.tool_runtimes["bandit"]["cached"], 2)
+        self.assertEqual(pipeline.tool_runtimes["bandit"]["status"], "cached")
+        # Cached findings still reach triage
+        self.assertEqual(len(pipeline.findings["p0_critical"]), 2)
+        shellcheck = json.loads((self.repo / "reports" / "static" / "shellcheck.json").read_text())
+        self.assertEqual([item["file"] for item in shellcheck], ["run.sh"])
+
+    def test_only_changed_files_rescanned(self):
+        self.run_pipeline()
+        (self.repo / "pkg" / "b.py").write_text("exec('changed')\n")
+        (self.repo / "pkg" / "c.py").write_text("exec('new')\n")
+        (self.repo / "pkg" / "a.py").unlink()
+        os.utime(self.repo / "run.sh")  # touched, same content
+
+        pipeline, calls = self.run_pipeline()
+        self.assertEqual(self.scanned(calls, "bandit"), ["pkg/b.py", "pkg/c.py"])
+        self.assertEqual(self.scanned(calls, "shellcheck"), [])
+        bandit = json.loads((self.repo / "reports" / "static" / "bandit.json").read_text())
+        self.assertEqual([item["filename"] for item in bandit["results"]], ["pkg/b.py", "pkg/c.py"])
+
+    def test_full_mode_ignores_cache(self):
+        self.run_pipeline()
+        _, calls = self.run_pipeline(incremental=False)
+        self.assertEqual(self.scanned(calls, "bandit"), ["pkg/a.py", "pkg/b.py"])
+
+    def test_tool_upgrade_invalidates_results(self):
+        self.run_pipeline()
+        tool = self.bin / "bandit"
+        tool.write_text(tool.read_text().replace("bandit 1.7.5", "bandit 1.8.0"))
+        _, calls = self.run_pipeline()
+        self.assertEqual(self.scanned(calls, "bandit"), ["pkg/a.py", "pkg/b.py"])
+        self.assertEqual(self.scanned(calls, "shellcheck"), [])
+
+
+class TestArtemisRepoScans(ArtemisTestCase):
+    """Test the git history secret scan and whole-repo scanner caching."""
+
+    tools = [("gitleaks", FAKE_GITLEAKS), ("trivy", FAKE_TRIVY)]
+
+    def commit(self, message):
+        git(self.repo, "add", "-A")
+        git(self.repo, "commit", "-q", "-m", message)
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=self.repo,
+                              capture_output=True, text=True).stdout.strip()
+
+    def secrets(self, pipeline):
+        return sorted((f["file"], f.get("commit")) for f in pipeline.findings["p0_critical"])
+
+    def test_deleted_secret_found_in_history(self):
+        """Test a committed then deleted secret is still reported, with its commit."""
+        (self.repo / "secret.env").write_text("AKIA0000\n")
+        leaked = self.commit("add config")
+        (self.repo / "secret.env").unlink()
+        self.commit("remove config")
+
+        pipeline, calls = self.run_pipeline(incremental=False)
+        self.assertIn(["gitleaks-history", "HEAD"], calls)
+        self.assertEqual(self.secrets(pipeline), [("secret.env", leaked)])
+
+    def test_incremental_history_scans_new_commits(self):
+        (self.repo / "secret_a.env").write_text("a\n")
+        first = self.commit("first")
+        self.run_pipeline()
+
+        pipeline, calls = self.run_pipeline()
+        self.assertNotIn("gitleaks-history", [call[0] for call in calls])
+        self.assertEqual(pipeline.tool_runtimes["gitleaks-history"]["status"], "cached")
+
+        (self.repo / "secret_b.env").write_text("b\n")
+        second = self.commit("second")
+        pipeline, calls = self.run_pipeline()
+        self.assertIn(["gitleaks-history", f"{first}..{second}"], calls)
+        self.assertEqual(self.scanned(calls, "gitleaks"), ["--no-git", "secret_b.env"])
+        # The working-tree copy of each secret is the same finding as its commit
+        self.assertEqual(self.secrets(pipeline), [("secret_a.env", first), ("secret_b.env", second)])
+        self.assertEqual(pipeline.tool_runtimes["gitleaks-history"]["scanned"], 1)
+
+    def test_trivy_reruns_on_source_change_and_expiry(self):
+        """Test trivy isn't cached by dependency manifests alone, nor forever."""
+        self.run_pipeline()
+        _, calls = self.run_pipeline()
+        self.assertNotIn(["trivy"], calls)
+
+        (self.repo / "pkg" / "a.py").write_text("exec('edited')\n")
+        _, calls = self.run_pipeline()
+        self.assertIn(["trivy"], calls)
+
+        cache = self.repo / "reports" / "static" / "artemis_cache.json"
+        manifest = json.loads(cache.read_text())
+        manifest["repo_tools"]["trivy"]["time"] -= artemis_full_pipeline.VULN_DB_TTL + 1
+        cache.write_text(json.dumps(manifest))
+        _, calls = self.run_pipeline()
+        self.assertIn(["trivy"], calls)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+QWAMOS Phase XVI: Cluster Placement - Unit Tests
+Tests reservation-aware bin packing, anti-affinity and coordinator failover
+
+Author: QWAMOS Project
+License: MIT
+"""
+
+import json
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add cluster to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "cluster"))
+
+from placement_engine import PlacementEngine, PlacementError, ResourceVector, VMRequest
+from placement_benchmark import run_benchmark
+from cluster_node import ClusterNode, NodeIdentity, NodeResources, NodeRole, NodeStatus
+from cluster_coordinator import ClusterCoordinator, PlacementStrategy
+
+
+def vm(name: str, cpu: int = 2, memory_mb: int = 2048, storage_gb: int = 10, **kwargs) -> VMRequest:
+    return VMRequest(vm_name=name, resources=ResourceVector(cpu, memory_mb, storage_gb), **kwargs)
+
+
+class TestPlacementEngine(unittest.TestCase):
+    """Test bin packing over reservations."""
+
+    def setUp(self):
+        self.engine = PlacementEngine()
+        self.engine.add_node("small", ResourceVector(4, 4096, 100))
+        self.engine.add_node("medium", ResourceVector(8, 8192, 200))
+        self.engine.add_node("large", ResourceVector(16, 16384, 400))
+
+    def test_reservations_are_subtracted(self):
+        """Test placements consume capacity instead of piling onto the biggest node."""
+        nodes = [self.engine.place(vm(f"vm-{i}", cpu=4, memory_mb=4096)) for i in range(7)]
+
+        self.assertEqual(nodes.count("large"), 4)
+        self.assertEqual(nodes.count("medium"), 2)
+        self.assertEqual(nodes.count("small"), 1)
+        for node in self.engine.nodes.values():
+            self.assertTrue(node.reserved.fits_in(node.capacity))
+
+    def test_capacity_exhausted(self):
+        """Test PlacementError once no node has room."""
+        for i in range(7):
+            self.engine.place(vm(f"vm-{i}", cpu=4, memory_mb=4096))
+        with self.assertRaises(PlacementError):
+            self.engine.place(vm("vm-extra", cpu=1, memory_mb=512))
+
+    def test_worst_fit_spreads(self):
+        """Test worst-fit picks the node with the most slack."""
+        self.assertEqual(self.engine.place(vm("vm-a")), "large")
+        self.engine.reserve(vm("filler", cpu=12, memory_mb=12288), "large")
+        self.assertEqual(self.engine.place(vm("vm-b")), "medium")
+
+    def test_best_fit_packs(self):
+        """Test best-fit picks the tightest node that fits."""
+        self.assertEqual(self.engine.place(vm("vm-a"), fit=PlacementEngine.BEST_FIT), "small")
+        self.assertEqual(self.engine.place(vm("vm-b"), fit=PlacementEngine.BEST_FIT), "small")
+        self.assertEqual(self.engine.place(vm("vm-c"), fit=PlacementEngine.BEST_FIT), "medium")
+
+    def test_every_dimension_checked(self):
+        """Test a node with spare CPU but no memory is skipped."""
+        self.engine.reserve(vm("hog", cpu=1, memory_mb=16000), "large")
+        node_id = self.engine.place(vm("vm-a", cpu=1, memory_mb=6000))
+        self.assertEqual(node_id, "medium")
+
+    def test_anti_affinity(self):
+        """Test replicas with the same label land on different nodes."""
+        replicas = [vm(f"db-{i}", cpu=1, memory_mb=512, labels={"app": "db"}, anti_affinity=["app"])
+                    for i in range(3)]
+        nodes = {self.engine.place(r) for r in replicas}
+        self.assertEqual(nodes, {"small", "medium", "large"})
+
+        with self.assertRaises(PlacementError):
+            self.engine.place(vm("db-3", cpu=1, memory_mb=512, labels={"app": "db"}, anti_affinity=["app"]))
+
+        # The constraint is symmetric: a plain VM with the label is rejected too
+        with self.assertRaises(PlacementError):
+            self.engine.place(vm("db-sidecar", cpu=1, memory_mb=512, labels={"app": "db"}))
+
+        # Unrelated labels are unaffected
+        self.engine.place(vm("web-0", cpu=1, memory_mb=512, labels={"app": "web"}))
+
+    def test_release_and_replace(self):
+        """Test released capacity is reused and re-placing a VM does not double-book."""
+        self.engine.place(vm("vm-a", cpu=16, memory_mb=16384))
+        self.engine.place(vm("vm-a", cpu=16, memory_mb=16384))
+        self.assertEqual(self.engine.nodes["large"].reserved.cpu, 16)
+
+        self.engine.release("vm-a")
+        self.assertEqual(self.engine.nodes["large"].reserved, ResourceVector())
+        self.assertEqual(self.engine.place(vm("vm-b", cpu=16, memory_mb=16384)), "large")
+
+    def test_failed_replace_keeps_reservation(self):
+        """Test a VM that cannot be re-placed keeps its previous reservation."""
+        self.engine.place(vm("vm-a"))
+        with self.assertRaises(PlacementError):
+            self.engine.place(vm("vm-a", cpu=64))
+        self.assertEqual(self.engine.assignments["vm-a"], "large")
+
+    def test_node_filter(self):
+        """Test filtered nodes are skipped."""
+        node_id = self.engine.place(vm("vm-a"), node_filter=lambda n: n != "large")
+        self.assertEqual(node_id, "medium")
+
+    def test_remove_node_returns_requests(self):
+        """Test removing a node hands back its VMs' requests."""
+        request = vm("vm-a", labels={"tier": "web"})
+        self.engine.place(request)
+        evicted = self.engine.remove_node("large")
+
+        self.assertEqual(evicted, [request])
+        self.assertNotIn("vm-a", self.engine.assignments)
+        self.assertEqual(self.engine.place(request), "medium")
+
+    def test_move(self):
+        """Test moves respect target capacity."""
+        self.engine.place(vm("vm-a", cpu=8, memory_mb=8192))
+        self.assertFalse(self.engine.move("vm-a", "small"))
+        self.assertTrue(self.engine.move("vm-a", "medium"))
+        self.assertEqual(self.engine.nodes["large"].reserved, ResourceVector())
+
+    def test_rebalance(self):
+        """Test rebalancing moves VMs off the busiest node only until balanced."""
+        for i in range(4):
+            self.engine.reserve(vm(f"vm-{i}", cpu=2, memory_mb=2048), "small" if i < 2 else "medium")
+
+        moves = self.engine.rebalance(threshold=0.2)
+
+        self.assertTrue(moves)
+        self.assertEqual(moves[0], ("vm-0", "small", "large"))
+        self.assertLess(max(self.engine.utilization().values()), 1.0)
+        for node in self.engine.nodes.values():
+            self.assertTrue(node.reserved.fits_in(node.capacity))
+        self.assertEqual(self.engine.rebalance(threshold=0.2), [])
+
+    def test_index_consistent(self):
+        """Test the sorted index tracks every node after churn."""
+        for i in range(20):
+            self.engine.place(vm(f"vm-{i}", cpu=1, memory_mb=1024))
+        for i in range(0, 20, 3):
+            self.engine.release(f"vm-{i}")
+        self.engine.add_node("xl", ResourceVector(32, 65536, 800))
+
+        self.assertEqual(sorted(node_id for _, node_id in self.engine._index), sorted(self.engine.nodes))
+        self.assertEqual(self.engine._index, sorted(self.engine._index))
+
+    def test_simulation_no_overcommit(self):
+        """Test the 100-node / 5k-VM simulation places everything without overcommit."""
+        results = run_benchmark(node_count=100, vm_count=5000, seed=7)
+
+        self.assertGreater(results["legacy"]["overcommitted_nodes"], 0)
+        for fit in (PlacementEngine.BEST_FIT, PlacementEngine.WORST_FIT):
+            with self.subTest(fit=fit):
+                self.assertEqual(results[fit]["overcommitted_nodes"], 0)
+                self.assertEqual(results[fit]["anti_affinity_violations"], 0)
+                self.assertEqual(results[fit]["placed"], 5000)
+                self.assertLess(results[fit]["candidates_per_placement"], 5)
+
+        self.assertLess(results[PlacementEngine.BEST_FIT]["nodes_used"],
+                        results[PlacementEngine.WORST_FIT]["nodes_used"])
+
+
+class TestClusterCoordinatorPlacement(unittest.TestCase):
+    """Test coordinator placement, failover and balancing."""
+
+    def setUp(self):
+        self.config_dir = Path(tempfile.mkdtemp())
+        (self.config_dir / "node_identity.json").write_text(json.dumps({
+            "node_id": "node-coordinator",
+            "hostname": "qwamos-coordinator",
+            "ip_address": "127.0.0.1",
+            "public_key": b"mock_key".hex(),
+            "role": "coordinator",
+            "cluster_id": "qwamos-test-cluster",
+        }))
+
+        self.node = ClusterNode("qwamos-test-cluster", NodeRole.COORDINATOR, config_dir=str(self.config_dir))
+        self.node.resources = NodeResources(cpu_cores=2, memory_mb=2048, storage_gb=32,
+                                            gpu_available=False, network_bandwidth_mbps=1000)
+        for i in range(3):
+            self.add_worker(f"node-worker{i:02d}", cpu=8, memory_mb=8192)
+
+        self.coordinator = ClusterCoordinator(self.node)
+
+    def tearDown(self):
+        shutil.rmtree(self.config_dir)
+
+    def add_worker(self, node_id: str, cpu: int, memory_mb: int):
+        identity = NodeIdentity(node_id=node_id, hostname=f"host-{node_id}", ip_address="192.168.1.100",
+                                public_key=b"mock_key", role=NodeRole.WORKER,
+                                cluster_id="qwamos-test-cluster")
+        self.node.add_peer(identity, NodeResources(cpu_cores=cpu, memory_mb=memory_mb, storage_gb=128,
+                                                   gpu_available=False, network_bandwidth_mbps=1000))
+
+    def test_placement_spreads_by_free_capacity(self):
+        """Test equal workers each get a VM before any gets a second."""
+        nodes = [self.coordinator.place_vm(f"vm-{i}", 4, 4096, 10).node_id for i in range(3)]
+        self.assertEqual(len(set(nodes)), 3)
+        self.assertEqual(self.coordinator.get_node_utilization()["node-worker00"], 0.5)
+
+    def test_new_peer_is_used(self):
+        """Test peers added after construction receive VMs."""
+        self.add_worker("node-big", cpu=64, memory_mb=65536)
+        self.assertEqual(self.coordinator.place_vm("vm-a", 4, 4096, 10).node_id, "node-big")
+
+    def test_offline_peer_skipped(self):
+        """Test offline peers are not used."""
+        for i in range(3):
+            self.node.peers[f"node-worker{i:02d}"].status = NodeStatus.OFFLINE
+        self.assertEqual(self.coordinator.place_vm("vm-a", 1, 512, 10).node_id, "node-coordinator")
+
+    def test_failover_keeps_requirements(self):
+        """Test failed-over VMs keep their original size and avoid the failed node."""
+        placement = self.coordinator.place_vm("db-vm", 6, 6144, 50)
+        failed = placement.node_id
+
+        self.coordinator.handle_node_failure(failed)
+
+        new_node = self.coordinator.vm_placements["db-vm"].node_id
+        self.assertNotEqual(new_node, failed)
+        self.assertEqual(self.coordinator.engine.nodes[new_node].reserved, ResourceVector(6, 6144, 50))
+        self.assertEqual(self.node.peers[failed].status, NodeStatus.OFFLINE)
+
+    def test_failover_drops_unplaceable(self):
+        """Test VMs that fit nowhere after a failure are reported, not overcommitted."""
+        for i in range(3):
+            self.coordinator.place_vm(f"vm-{i}", 8, 8192, 10)
+        self.coordinator.handle_node_failure("node-worker00")
+
+        self.assertEqual(len(self.coordinator.vm_placements), 2)
+        for node in self.coordinator.engine.nodes.values():
+            self.assertTrue(node.reserved.fits_in(node.capacity))
+
+    def test_migrate_checks_capacity(self):
+        """Test migration is refused when the target is full."""
+        self.coordinator.place_vm("vm-a", 8, 8192, 10, strategy=PlacementStrategy.BEST_FIT)
+        self.coordinator.place_vm("vm-b", 8, 8192, 10, strategy=PlacementStrategy.BEST_FIT)
+        target = self.coordinator.vm_placements["vm-b"].node_id
+        self.assertFalse(self.coordinator.migrate_vm("vm-a", target))
+
+    def test_balance_load_is_incremental(self):
+        """Test balancing only moves VMs when nodes are unbalanced."""
+        for i in range(3):
+            self.coordinator.place_vm(f"vm-{i}", 2, 2048, 10)
+        self.assertEqual(self.coordinator.balance_load(), [])
+
+        for vm_name in ("vm-0", "vm-1", "vm-2"):
+            self.coordinator.migrate_vm(vm_name, "node-worker00")
+        self.assertEqual(self.coordinator.get_node_utilization()["node-worker00"], 0.75)
+
+        moves = self.coordinator.balance_load()
+        self.assertEqual(len(moves), 2)
+        for vm_name, _, target in moves:
+            self.assertEqual(self.coordinator.vm_placements[vm_name].node_id, target)
+        self.assertEqual(self.coordinator.balance_load(), [])
+
+    def test_round_robin_respects_capacity(self):
+        """Test round-robin skips nodes that are full."""
+        nodes = [self.coordinator.place_vm(f"vm-{i}", 2, 2048, 10, strategy=PlacementStrategy.ROUND_ROBIN).node_id
+                 for i in range(6)]
+        self.assertEqual(nodes.count("node-coordinator"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+QWAMOS Phase XVI: Cluster Transport - Unit Tests
+Tests encrypted multiplexed peer connections on a localhost cluster
+
+Author: QWAMOS Project
+License: MIT
+"""
+
+import asyncio
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add cluster to path
+REPO_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "cluster"))
+
+from cluster_transport import (
+    ClusterTransport, SessionCipher, TransportError, negotiate_session, parse_address
+)
+from transport_benchmark import run_benchmark
+from tests.helpers.cluster_harness import LocalCluster
+
+
+class TestSessionCipher(unittest.TestCase):
+    """Test per-direction frame encryption."""
+
+    def test_roundtrip_and_counter(self):
+        """Test frames decrypt in order and replays fail."""
+        a = SessionCipher(b"k" * 32, b"r" * 32)
+        b = SessionCipher(b"r" * 32, b"k" * 32)
+
+        first, second = a.seal(b"one"), a.seal(b"two")
+        self.assertNotEqual(first[:3], second[:3])
+        self.assertEqual(b.open(first), b"one")
+        self.assertEqual(b.open(second), b"two")
+        with self.assertRaises(TransportError):
+            b.open(first)
+
+    def test_tamper_detected(self):
+        """Test modified frames are rejected."""
+        a = SessionCipher(b"k" * 32, b"r" * 32)
+        b = SessionCipher(b"r" * 32, b"k" * 32)
+        frame = bytearray(a.seal(b"payload"))
+        frame[0] ^= 1
+        with self.assertRaises(TransportError):
+            b.open(bytes(frame))
+
+    def test_parse_address(self):
+        """Test unix and TCP address forms."""
+        self.assertEqual(parse_address("unix:/tmp/n.sock"), ("unix", "/tmp/n.sock"))
+        self.assertEqual(parse_address("10.0.0.2:7946"), ("tcp", ("10.0.0.2", 7946)))
+        self.assertEqual(parse_address(("::1", 7946)), ("tcp", ("::1", 7946)))
+        with self.assertRaises(ValueError):
+            parse_address("no-port")
+
+
+class TestClusterTransport(unittest.IsolatedAsyncioTestCase):
+    """Test a three-node localhost cluster."""
+
+    async def asyncSetUp(self):
+        self.cluster = LocalCluster(3)
+        await self.cluster.start()
+        self.a, self.b, self.c = (self.cluster[node_id] for node_id in self.cluster.node_ids)
+
+    async def asyncTearDown(self):
+        await self.cluster.stop()
+
+    async def test_one_connection_per_peer(self):
+        """Test the mesh has exactly one channel per peer pair."""
+        for transport in self.cluster.transports.values():
+            self.assertEqual(len(transport.channels), 2)
+        self.assertEqual(self.a.stats["connections_opened"], 2)
+
+        # Reconnecting reuses the existing channel
+        channel = await self.a.connect("node-01", self.cluster.address("node-01"))
+        self.assertIs(channel, self.a.channels["node-01"])
+        self.assertEqual(self.a.stats["connections_opened"], 2)
+
+    async def test_request_reply(self):
+        """Test request/response over the persistent channel."""
+        self.b.on("place_vm", lambda peer, body: {"accepted": body["vm"], "from": peer})
+        reply = await self.a.request("node-01", "place_vm", {"vm": "web-vm"})
+        self.assertEqual(reply, {"accepted": "web-vm", "from": "node-00"})
+
+    async def test_multiplexed_requests(self):
+        """Test concurrent requests with out-of-order async replies."""
+        async def slow_echo(peer, body):
+            await asyncio.sleep(0.05 if body % 2 else 0)
+            return body
+
+        self.b.on("echo", slow_echo)
+        results = await asyncio.gather(*(self.a.request("node-01", "echo", i) for i in range(50)))
+        self.assertEqual(results, list(range(50)))
+        self.assertEqual(self.a.stats["connections_opened"], 2)
+
+    async def test_messages_are_batched(self):
+        """Test messages queued together share one encrypted frame."""
+        received = []
+        self.b.on("log", lambda peer, body: received.append(body))
+        channel = self.a.channels["node-01"]
+        frames_before = channel.stats["frames_sent"]
+
+        for i in range(100):
+            await self.a.send("node-01", "log", i)
+        await self._wait_for(lambda: len(received) == 100)
+
+        self.assertEqual(received, list(range(100)))
+        self.assertLess(channel.stats["frames_sent"] - frames_before, 5)
+
+    async def test_heartbeats_coalesced(self):
+        """Test only the newest unsent heartbeat is delivered."""
+        beats = []
+        self.b.on("heartbeat", lambda peer, body: beats.append((peer, body["seq"])))
+
+        for seq in range(10):
+            self.a.queue_heartbeat({"seq": seq})
+        await self._wait_for(lambda: beats)
+        await asyncio.sleep(0.02)
+
+        self.assertEqual(beats, [("node-00", 9)])
+
+    async def test_heartbeat_loop(self):
+        """Test periodic heartbeats reach every peer."""
+        seen = {"node-01": 0, "node-02": 0}
+        for node_id in seen:
+            self.cluster[node_id].on("heartbeat", lambda peer, body, n=node_id: seen.__setitem__(n, seen[n] + 1))
+
+        self.a.start_heartbeats(lambda: {"status": "online"}, interval=0.01)
+        await self._wait_for(lambda: min(seen.values()) >= 3)
+        self.a.stop_heartbeats()
+
+    async def test_handler_error(self):
+        """Test remote handler exceptions surface as TransportError."""
+        def fail(peer, body):
+            raise RuntimeError("disk full")
+
+        self.b.on("fail", fail)
+        with self.assertRaises(TransportError) as ctx:
+            await self.a.request("node-01", "fail")
+        self.assertIn("disk full", str(ctx.exception))
+
+        with self.assertRaises(TransportError):
+            await self.a.request("node-01", "unknown-type")
+
+    async def test_reconnect_after_drop(self):
+        """Test a dropped connection is re-established on next use."""
+        self.b.on("ping", lambda peer, body: "pong")
+        await self.a.channels["node-01"].close()
+        await asyncio.sleep(0.02)
+
+        self.assertEqual(await self.a.request("node-01", "ping"), "pong")
+
+    async def test_wrong_cluster_key_rejected(self):
+        """Test nodes without the cluster key cannot join."""
+        intruder = ClusterTransport("node-evil", b"wrong-key")
+        try:
+            with self.assertRaises(TransportError):
+                await intruder.connect("node-00", self.cluster.address("node-00"))
+            await asyncio.sleep(0.02)
+            self.assertNotIn("node-evil", self.a.channels)
+        finally:
+            await intruder.close()
+
+    async def test_wrong_peer_identity(self):
+        """Test connecting to an address that answers as another node."""
+        fresh = ClusterTransport("node-99", self.cluster.cluster_key)
+        try:
+            with self.assertRaises(TransportError):
+                await fresh.connect("node-01", self.cluster.address("node-00"))
+        finally:
+            await fresh.close()
+
+    async def test_bind_node_heartbeats(self):
+        """Test ClusterNode heartbeats are carried and mark peers online."""
+        class FakeNode:
+            heartbeat_interval = 0.01
+
+            def __init__(self):
+                self.received = []
+
+            def send_heartbeat(self):
+                return {"node_id": "node-00", "timestamp": 1.0, "status": "online"}
+
+            def receive_heartbeat(self, node_id, data):
+                self.received.append((node_id, data["timestamp"]))
+
+        sender, receiver = FakeNode(), FakeNode()
+        self.a.bind_node(sender)
+        self.b.bind_node(receiver)
+        await self._wait_for(lambda: receiver.received)
+        self.assertEqual(receiver.received[0], ("node-00", 1.0))
+
+    async def _wait_for(self, predicate, timeout: float = 2.0):
+        deadline = asyncio.get_running_loop().time() + timeout
+        while not predicate():
+            if asyncio.get_running_loop().time() > deadline:
+                self.fail("Condition not reached")
+            await asyncio.sleep(0.005)
+
+
+class TestHandshake(unittest.IsolatedAsyncioTestCase):
+    """Test the session handshake on a raw socket pair."""
+
+    async def test_keys_are_per_connection(self):
+        """Test two connections derive different session keys."""
+        async def pair():
+            socket_dir = tempfile.mkdtemp()
+            path = f"{socket_dir}/hs.sock"
+            server_cipher = asyncio.get_running_loop().create_future()
+
+            async def accept(reader, writer):
+                server_cipher.set_result(await negotiate_session(reader, writer, b"key", initiator=False))
+                self.addAsyncCleanup(self._close, writer)
+
+            server = await asyncio.start_unix_server(accept, path=path)
+            reader, writer = await asyncio.open_unix_connection(path)
+            client = await negotiate_session(reader, writer, b"key", initiator=True)
+            responder = await server_cipher
+            writer.close()
+            await writer.wait_closed()
+            server.close()
+            await server.wait_closed()
+            return client, responder
+
+        client1, responder1 = await pair()
+        client2, _ = await pair()
+
+        frame = client1.seal(b"hello")
+        self.assertEqual(responder1.open(frame), b"hello")
+        self.assertNotEqual(client2.seal(b"hello"), frame)
+
+    @staticmethod
+    async def _close(writer):
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
+
+
+class TestTransportBenchmark(unittest.TestCase):
+    """Smoke-test the message-rate benchmark."""
+
+    def test_benchmark_runs(self):
+        """Test a short benchmark run batches one-way messages."""
+        results = asyncio.run(run_benchmark(messages=2000, requests=200, concurrency=8, handshakes=2))
+        self.assertGreater(results["one_way"]["messages_per_frame"], 1)
+        self.assertEqual(results["request"]["requests"], 200)
+        self.assertEqual(results["handshake"]["handshakes"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
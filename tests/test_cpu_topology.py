@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+QWAMOS Phase XII: CPU Topology - Unit Tests
+Tests topology parsing, vCPU placement and per-thread pinning
+
+Author: QWAMOS Project
+License: MIT
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+# Add hypervisor to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "hypervisor"))
+
+from cpu_topology import CPUTopology, VCPUPlacer, parse_cpu_list
+
+
+# Snapdragon 8 Gen 3 style layout: 1 prime + 3 big (A720) + 4 little (A520)
+SOC_LAYOUT = {
+    0: ("0", 1024, "0"),
+    1: ("1-3", 870, "1-3"),
+    2: ("1-3", 870, "1-3"),
+    3: ("1-3", 870, "1-3"),
+    4: ("4-7", 325, "4-7"),
+    5: ("4-7", 325, "4-7"),
+    6: ("4-7", 325, "4-7"),
+    7: ("4-7", 325, "4-7"),
+}
+
+
+def build_fake_sysfs(root: Path, layout=SOC_LAYOUT, llc="0-7"):
+    """Create a fake /sys/devices/system/cpu tree."""
+    (root / "online").write_text(f"0-{len(layout) - 1}\n")
+    for cpu, (cluster, capacity, freq_domain) in layout.items():
+        cpu_dir = root / f"cpu{cpu}"
+        topo = cpu_dir / "topology"
+        topo.mkdir(parents=True)
+        (topo / "cluster_cpus_list").write_text(cluster + "\n")
+        (topo / "core_id").write_text(f"{cpu}\n")
+        (topo / "physical_package_id").write_text("0\n")
+        (topo / "thread_siblings_list").write_text(f"{cpu}\n")
+        (cpu_dir / "cpu_capacity").write_text(f"{capacity}\n")
+        (cpu_dir / "cpufreq").mkdir()
+        (cpu_dir / "cpufreq" / "related_cpus").write_text(freq_domain.replace("-", " ") + "\n")
+        for index, (level, shared) in enumerate([(1, str(cpu)), (2, str(cpu)), (3, llc)]):
+            cache = cpu_dir / "cache" / f"index{index}"
+            cache.mkdir(parents=True)
+            (cache / "level").write_text(f"{level}\n")
+            (cache / "shared_cpu_list").write_text(shared + "\n")
+
+
+def build_fake_proc(root: Path, pid: int, tids):
+    """Create a fake /proc/<pid>/task tree."""
+    for tid in tids:
+        (root / str(pid) / "task" / str(tid)).mkdir(parents=True)
+
+
+class TestCPUTopology(unittest.TestCase):
+    """Test sysfs topology parsing."""
+
+    def setUp(self):
+        self.sysfs = Path(tempfile.mkdtemp())
+        build_fake_sysfs(self.sysfs)
+        self.topology = CPUTopology.from_sysfs(self.sysfs)
+
+    def tearDown(self):
+        shutil.rmtree(self.sysfs)
+
+    def test_parse_cpu_list(self):
+        """Test kernel CPU list parsing."""
+        self.assertEqual(parse_cpu_list("0-3,6,8-9\n"), [0, 1, 2, 3, 6, 8, 9])
+        self.assertEqual(parse_cpu_list(""), [])
+
+    def test_clusters(self):
+        """Test cluster grouping."""
+        self.assertEqual(self.topology.clusters(), {0: [0], 1: [1, 2, 3], 4: [4, 5, 6, 7]})
+
+    def test_capacity_classes(self):
+        """Test big/little split follows cpu_capacity, not a 50% heuristic."""
+        self.assertEqual(self.topology.capacity_classes(), [[0], [1, 2, 3], [4, 5, 6, 7]])
+        self.assertEqual(self.topology.big_cores(), [0, 1, 2, 3])
+        self.assertEqual(self.topology.little_cores(), [4, 5, 6, 7])
+
+    def test_llc(self):
+        """Test last-level cache domain detection."""
+        self.assertEqual({core.llc_id for core in self.topology.cores.values()}, {0})
+
+    def test_cpufreq_fallback(self):
+        """Test clusters fall back to cpufreq domains."""
+        for cpu in range(8):
+            (self.sysfs / f"cpu{cpu}" / "topology" / "cluster_cpus_list").unlink()
+        (self.sysfs / "cpu0" / "cpufreq" / "related_cpus").write_text("0\n")
+        for cpu in (1, 2, 3):
+            (self.sysfs / f"cpu{cpu}" / "cpufreq" / "related_cpus").write_text("1-3\n")
+        for cpu in (4, 5, 6, 7):
+            (self.sysfs / f"cpu{cpu}" / "cpufreq" / "related_cpus").write_text("4-7\n")
+
+        topology = CPUTopology.from_sysfs(self.sysfs)
+        self.assertEqual(sorted(topology.clusters()), [0, 1, 4])
+
+    def test_homogeneous_host(self):
+        """Test big and little cover all CPUs when capacities are equal."""
+        sysfs = Path(tempfile.mkdtemp())
+        try:
+            build_fake_sysfs(sysfs, {cpu: ("0-3", 1024, "0-3") for cpu in range(4)})
+            topology = CPUTopology.from_sysfs(sysfs)
+            self.assertEqual(topology.big_cores(), [0, 1, 2, 3])
+            self.assertEqual(topology.little_cores(), [0, 1, 2, 3])
+        finally:
+            shutil.rmtree(sysfs)
+
+
+class TestVCPUPlacer(unittest.TestCase):
+    """Test vCPU placement across concurrently running VMs."""
+
+    def setUp(self):
+        self.sysfs = Path(tempfile.mkdtemp())
+        self.proc = Path(tempfile.mkdtemp())
+        self.state_dir = Path(tempfile.mkdtemp())
+        build_fake_sysfs(self.sysfs)
+        for pid in (100, 200, 300):
+            build_fake_proc(self.proc, pid, [pid, pid + 1, pid + 2, pid + 3])
+
+        self.topology = CPUTopology.from_sysfs(self.sysfs)
+        self.placer = self._new_placer()
+
+    def tearDown(self):
+        for path in (self.sysfs, self.proc, self.state_dir):
+            shutil.rmtree(path)
+
+    def _new_placer(self):
+        return VCPUPlacer(self.topology, state_file=self.state_dir / "reservations.json", proc_dir=self.proc)
+
+    def test_big_policy_fits_one_cluster(self):
+        """Test vCPUs stay inside one big cluster."""
+        placement = self.placer.reserve("vm-a", 100, 3, "big")
+        self.assertEqual(placement.vcpu_cpus, [1, 2, 3])
+
+    def test_little_policy(self):
+        """Test little policy uses efficiency cores."""
+        placement = self.placer.reserve("vm-a", 100, 2, "little")
+        self.assertTrue(set(placement.vcpu_cpus) <= {4, 5, 6, 7})
+
+    def test_emulator_threads_on_separate_core(self):
+        """Test emulator/IO threads never share vCPU cores."""
+        placement = self.placer.reserve("vm-a", 100, 3, "big")
+        self.assertFalse(set(placement.emulator_cpus) & set(placement.vcpu_cpus))
+        # I/O-bound emulator threads go to an efficiency core
+        self.assertTrue(set(placement.emulator_cpus) <= {4, 5, 6, 7})
+
+    def test_no_oversubscription_across_vms(self):
+        """Test concurrent VMs get disjoint vCPU cores while free cores remain."""
+        a = self.placer.reserve("vm-a", 100, 2, "big")
+        # A second placer simulates another VMManager process sharing the ledger
+        b = self._new_placer().reserve("vm-b", 200, 2, "big")
+
+        self.assertFalse(set(a.vcpu_cpus) & set(b.vcpu_cpus))
+        self.assertTrue(set(b.vcpu_cpus) <= {0, 1, 2, 3})
+
+    def test_isolated_cores_are_exclusive(self):
+        """Test isolated VMs' cores are not handed to other VMs."""
+        iso = self.placer.reserve("vm-rt", 100, 1, "isolated")
+        for i, pid in enumerate((200, 300)):
+            other = self.placer.reserve(f"vm-{i}", pid, 2, "big")
+            self.assertNotIn(iso.vcpu_cpus[0], other.vcpu_cpus)
+            self.assertNotIn(iso.vcpu_cpus[0], other.emulator_cpus)
+
+    def test_release_frees_cores(self):
+        """Test released cores are reused."""
+        first = self.placer.reserve("vm-a", 100, 3, "big")
+        self.placer.release("vm-a")
+        second = self.placer.reserve("vm-b", 200, 3, "big")
+        self.assertEqual(first.vcpu_cpus, second.vcpu_cpus)
+
+    def test_dead_vms_are_pruned(self):
+        """Test reservations of exited QEMU processes are dropped."""
+        self.placer.reserve("vm-a", 100, 2, "big")
+        shutil.rmtree(self.proc / "100")
+        self.assertNotIn("vm-a", self._new_placer().reservations())
+
+    def test_apply_pins_each_thread(self):
+        """Test vCPU threads get one core each and other threads the emulator core."""
+        placement = self.placer.reserve("vm-a", 100, 2, "big")
+        pinned = {}
+
+        with patch.object(VCPUPlacer, "_pin", side_effect=lambda tid, cpus: pinned.__setitem__(tid, set(cpus)) or True):
+            self.assertTrue(self.placer.apply(placement, {0: 101, 1: 102}))
+
+        self.assertEqual(pinned[101], {placement.vcpu_cpus[0]})
+        self.assertEqual(pinned[102], {placement.vcpu_cpus[1]})
+        self.assertEqual(pinned[100], set(placement.emulator_cpus))
+        self.assertEqual(pinned[103], set(placement.emulator_cpus))
+
+    def test_apply_without_vcpu_threads(self):
+        """Test fallback pins the whole process when QMP is unavailable."""
+        placement = self.placer.reserve("vm-a", 100, 2, "big")
+        pinned = {}
+
+        with patch.object(VCPUPlacer, "_pin", side_effect=lambda tid, cpus: pinned.__setitem__(tid, set(cpus)) or True):
+            self.placer.apply(placement, {})
+
+        expected = set(placement.vcpu_cpus) | set(placement.emulator_cpus)
+        self.assertEqual(set(pinned), {100, 101, 102, 103})
+        self.assertTrue(all(cpus == expected for cpus in pinned.values()))
+
+    def test_pin_real_thread(self):
+        """Test sched_setaffinity on a live thread (no subprocess)."""
+        allowed = sorted(os.sched_getaffinity(0))
+        ready, done = threading.Event(), threading.Event()
+        tid = []
+
+        def worker():
+            tid.append(threading.get_native_id())
+            ready.set()
+            done.wait(5)
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        ready.wait(5)
+        try:
+            self.assertTrue(VCPUPlacer._pin(tid[0], {allowed[0]}))
+            self.assertEqual(os.sched_getaffinity(tid[0]), {allowed[0]})
+        finally:
+            done.set()
+            thread.join()
+
+
+if __name__ == "__main__":
+    unittest.main()
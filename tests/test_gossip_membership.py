@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+QWAMOS Phase XVI: Gossip Membership - Unit Tests
+Tests SWIM failure detection on simulated clusters
+
+Author: QWAMOS Project
+License: MIT
+"""
+
+import json
+import shutil
+import sys
+import tempfile
+import unittest
+from dataclasses import replace
+from pathlib import Path
+
+# Add cluster to path
+REPO_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "cluster"))
+
+from gossip_membership import MemberState, SwimConfig, SwimMembership
+from cluster_node import ClusterNode, NodeIdentity, NodeResources, NodeRole, NodeStatus
+from cluster_coordinator import ClusterCoordinator
+from tests.helpers.swim_sim import SimulatedSwimCluster
+
+FAST = SwimConfig(protocol_period=0.5, ping_timeout=0.15)
+
+
+class TestSwimProtocol(unittest.TestCase):
+    """Test protocol rules on a single node."""
+
+    def setUp(self):
+        self.now = 0.0
+        self.sent = []
+        self.node = SwimMembership("node-a", send=lambda target, msg: self.sent.append((target, msg)),
+                                   config=FAST, clock=lambda: self.now)
+        self.node.join({"node-b": None, "node-c": None})
+
+    def test_ping_is_acked(self):
+        """Test pings are answered with the same sequence number."""
+        self.node.receive("node-b", {"type": "ping", "seq": 7})
+        target, message = self.sent[-1]
+        self.assertEqual((target, message["type"], message["seq"]), ("node-b", "ack", 7))
+
+    def test_missed_ack_triggers_ping_req_then_suspicion(self):
+        """Test direct timeout, indirect probe and suspicion."""
+        self.node.tick()
+        target, ping = self.sent[-1]
+        self.assertEqual(ping["type"], "ping")
+
+        self.now = 0.2
+        self.node.tick()
+        ping_reqs = [m for _, m in self.sent if m["type"] == "ping_req"]
+        self.assertEqual(len(ping_reqs), 1)
+        self.assertEqual(ping_reqs[0]["target"], target)
+
+        self.now = 0.5
+        self.node.tick()
+        self.assertEqual(self.node.members[target].state, MemberState.SUSPECT)
+
+        self.now = 0.5 + self.node.suspicion_timeout()
+        self.node.tick()
+        self.assertEqual(self.node.members[target].state, MemberState.DEAD)
+
+    def test_indirect_ack_clears_probe(self):
+        """Test an ack relayed through ping-req keeps the target alive."""
+        self.node.tick()
+        target, ping = self.sent[-1]
+        self.now = 0.2
+        self.node.tick()
+        self.node.receive("node-x", {"type": "ack", "seq": ping["seq"]})
+
+        self.now = 0.5
+        self.node.tick()
+        self.assertEqual(self.node.members[target].state, MemberState.ALIVE)
+
+    def test_ping_req_relays_ack(self):
+        """Test a helper pings the target and forwards the ack."""
+        self.node.receive("node-b", {"type": "ping_req", "seq": 42, "target": "node-c"})
+        target, ping = self.sent[-1]
+        self.assertEqual((target, ping["type"]), ("node-c", "ping"))
+
+        self.node.receive("node-c", {"type": "ack", "seq": ping["seq"]})
+        target, ack = self.sent[-1]
+        self.assertEqual((target, ack["type"], ack["seq"]), ("node-b", "ack", 42))
+
+    def test_refutes_suspicion(self):
+        """Test a suspected node bumps its incarnation and gossips alive."""
+        self.node.receive("node-b", {"type": "ping", "seq": 1,
+                                     "updates": [{"node": "node-a", "inc": 0, "state": "suspect"}]})
+        self.assertEqual(self.node.incarnation, 1)
+        self.node.receive("node-b", {"type": "ping", "seq": 2})
+        updates = self.sent[-1][1]["updates"]
+        self.assertIn({"node": "node-a", "inc": 1, "state": "alive", "addr": None}, updates)
+
+    def test_alive_overrides_suspect_only_with_newer_incarnation(self):
+        """Test incarnation ordering of updates."""
+        self.node.receive("node-c", {"type": "ack", "seq": 0,
+                                     "updates": [{"node": "node-b", "inc": 0, "state": "suspect"}]})
+        self.assertEqual(self.node.members["node-b"].state, MemberState.SUSPECT)
+
+        self.node.receive("node-c", {"type": "ack", "seq": 0,
+                                     "updates": [{"node": "node-b", "inc": 0, "state": "alive"}]})
+        self.assertEqual(self.node.members["node-b"].state, MemberState.SUSPECT)
+
+        self.node.receive("node-c", {"type": "ack", "seq": 0,
+                                     "updates": [{"node": "node-b", "inc": 1, "state": "alive"}]})
+        self.assertEqual(self.node.members["node-b"].state, MemberState.ALIVE)
+
+    def test_piggyback_bounded(self):
+        """Test updates per message are capped and retransmitted a bounded number of times."""
+        for i in range(20):
+            self.node.receive("node-b", {"type": "ack", "seq": 0,
+                                         "updates": [{"node": f"node-n{i}", "inc": 0, "state": "alive"}]})
+        for _ in range(50):
+            self.node.receive("node-b", {"type": "ping", "seq": 1})
+            self.assertLessEqual(len(self.sent[-1][1]["updates"]), FAST.max_piggyback)
+        self.assertEqual(self.sent[-1][1]["updates"], [])
+
+    def test_subscribers_notified(self):
+        """Test state changes reach subscribers."""
+        changes = []
+        self.node.subscribe(lambda node_id, state: changes.append((node_id, state)))
+        self.node.receive("node-b", {"type": "ack", "seq": 0,
+                                     "updates": [{"node": "node-c", "inc": 0, "state": "dead"}]})
+        self.assertEqual(changes, [("node-c", MemberState.DEAD)])
+
+    def test_add_member_revives_newer_incarnation(self):
+        """Test an explicit add revives a dead member only with a newer incarnation."""
+        self.node.receive("node-c", {"type": "ack", "seq": 0,
+                                     "updates": [{"node": "node-b", "inc": 2, "state": "dead"}]})
+        self.node.add_member("node-b", incarnation=2)
+        self.assertEqual(self.node.members["node-b"].state, MemberState.DEAD)
+        self.node.add_member("node-b", incarnation=3)
+        self.assertEqual(self.node.members["node-b"].state, MemberState.ALIVE)
+
+
+class TestSimulatedCluster(unittest.TestCase):
+    """Test detection latency and bandwidth on simulated clusters."""
+
+    def test_failure_detected_within_seconds(self):
+        """Test every node sees a crash on a 50-node cluster within seconds."""
+        sim = SimulatedSwimCluster(50, config=FAST, seed=3)
+        sim.run(3.0)
+        crashed_at = sim.now
+        sim.kill("node-17")
+
+        detected = {}
+        for node in sim.live_nodes():
+            node.subscribe(lambda node_id, state, n=node.node_id:
+                           state == MemberState.DEAD and detected.setdefault(n, sim.now))
+        sim.run(10.0)
+
+        self.assertEqual(len(detected), 49)
+        first = min(detected.values()) - crashed_at
+        last = max(detected.values()) - crashed_at
+        self.assertLess(first, 5.0)
+        self.assertLess(last, 6.0)
+
+    def test_bandwidth_constant_in_cluster_size(self):
+        """Test per-node probe traffic does not grow with cluster size."""
+        # Push-pull is O(N) per exchange but runs once every 30 periods; measure probing alone
+        config = replace(FAST, push_pull_periods=0)
+        rates = {}
+        for size in (10, 50):
+            sim = SimulatedSwimCluster(size, config=config, seed=5)
+            sim.run(5.0)  # Skip the join exchange
+            sim.reset_counters()
+            sim.run(20.0)
+            periods = 20.0 / FAST.protocol_period
+            rates[size] = (sum(sim.messages_sent.values()) / size / periods,
+                           sum(sim.bytes_sent.values()) / size / periods)
+
+        # ~1 ping + ~1 ack per node per period, independent of N (all-to-all would be N-1)
+        self.assertLess(rates[50][0], 2.5)
+        self.assertLess(rates[50][0] / rates[10][0], 1.2)
+        self.assertLess(rates[50][1] / rates[10][1], 1.2)
+
+    def test_no_false_positives_under_loss(self):
+        """Test indirect probes and refutation keep live nodes alive with 5% loss."""
+        sim = SimulatedSwimCluster(30, config=FAST, seed=11, loss=0.05)
+        sim.run(30.0)
+        for node in sim.live_nodes():
+            self.assertEqual([m.node_id for m in node.members.values() if m.state == MemberState.DEAD], [])
+
+    def test_join_through_seed(self):
+        """Test members learn the full membership from a single seed."""
+        sim = SimulatedSwimCluster(20, config=FAST, seed=2, seed_join=True)
+        sim.run(20.0)
+        for node in sim.live_nodes():
+            self.assertEqual(len(node.alive_members()), 19)
+
+    def test_dead_node_rejoins_after_restart(self):
+        """Test a node declared dead rejoins when it restarts at incarnation 0."""
+        sim = SimulatedSwimCluster(10, config=FAST, seed=4)
+        sim.run(3.0)
+        sim.kill("node-05")
+        sim.run(10.0)
+        for node in sim.live_nodes():
+            self.assertEqual(node.members["node-05"].state, MemberState.DEAD)
+
+        sim.restart("node-05", seed="node-00")
+        sim.run(10.0)
+        restarted = sim.nodes["node-05"]
+        self.assertGreater(restarted.incarnation, 0)
+        self.assertEqual(len(restarted.alive_members()), 9)
+        for node in sim.live_nodes():
+            self.assertEqual(len(node.alive_members()), 9)
+
+
+class TestCoordinatorFailover(unittest.TestCase):
+    """Test gossip-driven failover on the cluster coordinator."""
+
+    def setUp(self):
+        self.config_dir = Path(tempfile.mkdtemp())
+        (self.config_dir / "node_identity.json").write_text(json.dumps({
+            "node_id": "node-00", "hostname": "qwamos-coordinator", "ip_address": "127.0.0.1",
+            "public_key": b"mock_key".hex(), "role": "coordinator", "cluster_id": "qwamos-sim",
+        }))
+
+    def tearDown(self):
+        shutil.rmtree(self.config_dir)
+
+    def test_handle_node_failure_triggered(self):
+        """Test a crashed worker's VMs move within seconds of the crash."""
+        sim = SimulatedSwimCluster(50, config=FAST, seed=9)
+        node = ClusterNode("qwamos-sim", NodeRole.COORDINATOR, config_dir=str(self.config_dir))
+        for node_id in sim.node_ids[1:]:
+            node.add_peer(
+                NodeIdentity(node_id=node_id, hostname=f"host-{node_id}", ip_address="10.0.0.1",
+                             public_key=b"mock_key", role=NodeRole.WORKER, cluster_id="qwamos-sim"),
+                NodeResources(cpu_cores=8, memory_mb=8192, storage_gb=128, gpu_available=False,
+                              network_bandwidth_mbps=1000))
+
+        coordinator = ClusterCoordinator(node)
+        coordinator.attach_membership(sim.nodes["node-00"])
+        placement = coordinator.place_vm("db-vm", 4, 4096, 20)
+        victim = placement.node_id
+
+        sim.run(2.0)
+        crashed_at = sim.now
+        sim.kill(victim)
+        while coordinator.vm_placements["db-vm"].node_id == victim and sim.now - crashed_at < 10:
+            sim.run(0.1)
+
+        self.assertNotEqual(coordinator.vm_placements["db-vm"].node_id, victim)
+        self.assertLess(sim.now - crashed_at, 6.0)
+        self.assertEqual(node.peers[victim].status, NodeStatus.OFFLINE)
+
+        # Heartbeat timeouts no longer apply once gossip is attached
+        node.peers["node-01"].last_seen = 0
+        node.check_peer_health()
+        self.assertEqual(node.peers["node-01"].status, NodeStatus.ONLINE)
+
+
+if __name__ == "__main__":
+    unittest.main()
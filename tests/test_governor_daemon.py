@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+QWAMOS Phase XV: AI Governor Daemon - Unit Tests
+Tests incremental recomputation, cgroup hysteresis and write rate limiting
+
+Author: QWAMOS Project
+License: MIT
+"""
+
+import asyncio
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+# Add hypervisor to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "hypervisor"))
+
+from resource_monitor import (
+    ResourceMonitor, SystemMetrics, CPUMetrics, MemoryMetrics,
+    ThermalMetrics, BatteryMetrics, VMMetrics
+)
+from ai_governor import AIGovernor, ThreatLevel, VMAllocation, WorkloadClass
+from governor_daemon import (
+    CgroupApplier, GovernorDaemon, HysteresisPolicy, _log_collector_exit, allocation_to_cgroup, run_collector
+)
+from metrics_bus import MetricsBusError
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_vm(name: str, cpu: float, memory_percent: float = 5.0) -> VMMetrics:
+    return VMMetrics(
+        vm_name=name, pid=1234, cpu_percent=cpu, memory_mb=256,
+        memory_percent=memory_percent, io_read_mb=0.0, io_write_mb=0.0,
+        net_sent_mb=0.0, net_recv_mb=0.0, threads=8, status="running"
+    )
+
+
+def make_metrics(vms, system_cpu: float = 5.0, cpu_temp: float = 50.0) -> SystemMetrics:
+    return SystemMetrics(
+        timestamp=time.time(),
+        cpu=CPUMetrics(system_percent=system_cpu, per_core=[system_cpu] * 8, temperature_c=cpu_temp,
+                       frequency_mhz=[2000.0] * 8, context_switches=0, interrupts=0),
+        memory=MemoryMetrics(total_mb=8192, used_mb=1024, free_mb=7168, available_mb=7168,
+                             percent=12.5, swap_total_mb=0, swap_used_mb=0, swap_percent=0.0),
+        thermal=ThermalMetrics(cpu_temp_c=cpu_temp, gpu_temp_c=None, battery_temp_c=30.0,
+                               thermal_zone_temps={}),
+        battery=BatteryMetrics(percent=80.0, is_charging=False, time_remaining_min=None, power_draw_w=None),
+        vms=list(vms)
+    )
+
+
+def make_allocation(cpu_pct: float = 40, memory_mb: int = 512, priority: int = 30) -> VMAllocation:
+    return VMAllocation(
+        vm_name="vm-a", cpu_cores=2, cpu_percent_limit=cpu_pct, memory_mb_limit=memory_mb,
+        io_priority=5, network_bandwidth_mbps=None, workload_class=WorkloadClass.LIGHT,
+        priority=priority
+    )
+
+
+class CgroupTestCase(unittest.TestCase):
+    """Fake cgroup v2 tree."""
+
+    VMS = ("vm-a", "vm-b", "vm-c")
+
+    def setUp(self):
+        self.cgroup_root = Path(tempfile.mkdtemp())
+        for vm_name in self.VMS:
+            (self.cgroup_root / f"qwamos-vm-{vm_name}").mkdir()
+        self.clock = FakeClock()
+
+    def tearDown(self):
+        shutil.rmtree(self.cgroup_root)
+
+    def read(self, vm_name: str, key: str) -> str:
+        return (self.cgroup_root / f"qwamos-vm-{vm_name}" / key).read_text()
+
+
+class TestCgroupApplier(CgroupTestCase):
+    """Test hysteresis and rate limits."""
+
+    def setUp(self):
+        super().setUp()
+        self.applier = CgroupApplier(self.cgroup_root, HysteresisPolicy(), clock=self.clock)
+
+    def test_allocation_mapping(self):
+        """Test allocation to cgroup value conversion."""
+        targets = allocation_to_cgroup(make_allocation(cpu_pct=40, memory_mb=512, priority=50))
+        self.assertEqual(targets["cpu.max"], 80000)  # 2 cores x 40%
+        self.assertEqual(targets["cpu.weight"], 100)
+        self.assertEqual(targets["memory.high"], 512 * 1024 * 1024)
+
+    def test_first_apply_writes_all(self):
+        """Test initial allocation writes every file."""
+        written = self.applier.apply("vm-a", make_allocation())
+        self.assertEqual(set(written), {"cpu.max", "cpu.weight", "memory.high"})
+        self.assertEqual(self.read("vm-a", "cpu.max"), "80000 100000")
+
+    def test_small_changes_suppressed(self):
+        """Test changes inside the dead band are not written."""
+        self.applier.apply("vm-a", make_allocation(cpu_pct=40, memory_mb=512))
+        self.clock.now += 60
+
+        written = self.applier.apply("vm-a", make_allocation(cpu_pct=42, memory_mb=530))
+        self.assertEqual(written, [])
+        self.assertEqual(self.read("vm-a", "cpu.max"), "80000 100000")
+        self.assertEqual(self.applier.stats["writes"], 3)
+
+    def test_large_change_written(self):
+        """Test threshold crossings are written, unchanged files are not."""
+        self.applier.apply("vm-a", make_allocation(cpu_pct=40))
+        self.clock.now += 60
+
+        written = self.applier.apply("vm-a", make_allocation(cpu_pct=80))
+        self.assertEqual(written, ["cpu.max"])
+        self.assertEqual(self.read("vm-a", "cpu.max"), "160000 100000")
+
+    def test_per_vm_rate_limit(self):
+        """Test writes closer than min_write_interval_s are deferred then flushed."""
+        self.applier.apply("vm-a", make_allocation(cpu_pct=40))
+        self.clock.now += 1
+
+        self.assertEqual(self.applier.apply("vm-a", make_allocation(cpu_pct=80)), [])
+        self.assertEqual(self.read("vm-a", "cpu.max"), "80000 100000")
+        self.assertGreater(self.applier.next_flush_delay(), 0)
+
+        self.clock.now += 5
+        self.assertEqual(self.applier.flush(), ["cpu.max"])
+        self.assertEqual(self.read("vm-a", "cpu.max"), "160000 100000")
+
+    def test_deferred_change_cancelled_by_reversion(self):
+        """Test a deferred change is dropped if the target returns to the dead band."""
+        self.applier.apply("vm-a", make_allocation(cpu_pct=40))
+        self.clock.now += 1
+        self.applier.apply("vm-a", make_allocation(cpu_pct=80))
+        self.applier.apply("vm-a", make_allocation(cpu_pct=41))
+
+        self.clock.now += 10
+        self.assertEqual(self.applier.flush(), [])
+        self.assertEqual(self.read("vm-a", "cpu.max"), "80000 100000")
+
+    def test_global_write_budget(self):
+        """Test the token bucket bounds writes across VMs."""
+        applier = CgroupApplier(self.cgroup_root, HysteresisPolicy(max_writes_per_second=1.0, write_burst=3),
+                                clock=self.clock)
+        self.assertEqual(len(applier.apply("vm-a", make_allocation())), 3)
+        self.assertEqual(applier.apply("vm-b", make_allocation()), [])
+
+        self.clock.now += 3
+        self.assertEqual(len(applier.flush()), 3)
+
+
+class TestGovernorDaemon(CgroupTestCase):
+    """Test event-driven incremental recomputation."""
+
+    def setUp(self):
+        super().setUp()
+        self.governor = AIGovernor(ResourceMonitor(history_size=10))
+        self.applier = CgroupApplier(self.cgroup_root, HysteresisPolicy(min_write_interval_s=0.0),
+                                     clock=self.clock)
+        self.daemon = GovernorDaemon(self.governor, self.applier)
+
+    def test_first_update_recomputes_all(self):
+        """Test every VM is computed on the first snapshot."""
+        affected = self.daemon.process(make_metrics([make_vm("vm-a", 2), make_vm("vm-b", 2)]))
+        self.assertEqual(sorted(affected), ["vm-a", "vm-b"])
+        self.assertIn("vm-a", self.daemon.decision.vm_allocations)
+
+    def test_only_changed_vm_recomputed(self):
+        """Test a workload change in one VM recomputes only that VM."""
+        self.daemon.process(make_metrics([make_vm("vm-a", 2), make_vm("vm-b", 2)]))
+
+        affected = self.daemon.process(make_metrics([make_vm("vm-a", 2), make_vm("vm-b", 40, 40)]))
+        self.assertEqual(affected, ["vm-b"])
+        self.assertEqual(self.daemon.decision.vm_allocations["vm-b"].workload_class, WorkloadClass.MEDIUM)
+        self.assertEqual(self.daemon.decision.vm_allocations["vm-a"].workload_class, WorkloadClass.IDLE)
+
+    def test_steady_state_does_nothing(self):
+        """Test unchanged inputs skip recomputation and writes."""
+        self.daemon.process(make_metrics([make_vm("vm-a", 2)]))
+        writes = self.applier.stats["writes"]
+
+        for _ in range(10):
+            self.assertEqual(self.daemon.process(make_metrics([make_vm("vm-a", 3)])), [])
+
+        self.assertEqual(self.applier.stats["writes"], writes)
+        self.assertEqual(self.daemon.stats["vm_skipped"], 10)
+
+    def test_system_context_change_recomputes_all(self):
+        """Test thermal throttling affects every VM."""
+        self.daemon.process(make_metrics([make_vm("vm-a", 2), make_vm("vm-b", 2)]))
+        affected = self.daemon.process(make_metrics([make_vm("vm-a", 2), make_vm("vm-b", 2)], cpu_temp=80.0))
+        self.assertEqual(sorted(affected), ["vm-a", "vm-b"])
+
+    def test_threat_level_recomputes(self):
+        """Test threat level changes count as a context change."""
+        self.daemon.process(make_metrics([make_vm("vm-a", 2)]))
+        self.governor.set_threat_level(ThreatLevel.HIGH)
+        self.assertEqual(self.daemon.process(make_metrics([make_vm("vm-a", 2)])), ["vm-a"])
+
+    def test_stopped_vm_forgotten(self):
+        """Test VMs missing from a snapshot are dropped."""
+        self.daemon.process(make_metrics([make_vm("vm-a", 2), make_vm("vm-b", 2)]))
+        self.daemon.process(make_metrics([make_vm("vm-a", 2)]))
+        self.assertNotIn("vm-b", self.daemon.decision.vm_allocations)
+        self.assertNotIn("vm-b", self.applier.applied)
+
+    def test_event_loop_coalesces_updates(self):
+        """Test the async loop processes only the newest of a burst of snapshots."""
+        async def scenario():
+            task = asyncio.ensure_future(self.daemon.run())
+            await asyncio.sleep(0)
+            for cpu in (2, 3, 4, 40):
+                self.daemon.publish(make_metrics([make_vm("vm-a", cpu, 40)]))
+            await asyncio.sleep(0.05)
+            self.daemon.stop()
+            await asyncio.wait_for(task, 1)
+
+        asyncio.run(scenario())
+        self.assertEqual(self.daemon.stats["updates"], 1)
+        self.assertEqual(self.daemon.stats["coalesced"], 3)
+        self.assertEqual(self.daemon.decision.vm_allocations["vm-a"].workload_class, WorkloadClass.MEDIUM)
+
+    def test_attach_to_monitor(self):
+        """Test the daemon subscribes to ResourceMonitor updates."""
+        monitor = ResourceMonitor(history_size=10)
+        self.daemon.attach(monitor)
+        self.assertIn(self.daemon.publish, monitor.subscribers)
+
+
+
+class TestRunCollector(unittest.IsolatedAsyncioTestCase):
+    """Test the periodic collector survives an empty metrics bus."""
+
+    async def test_retries_until_first_snapshot(self):
+        calls = []
+
+        class EmptyBusMonitor:
+            def collect_all_metrics(self, vm_names):
+                calls.append(vm_names)
+                if len(calls) < 3:
+                    raise MetricsBusError("No snapshot on metrics bus qwamos_metrics")
+
+        collector = asyncio.ensure_future(run_collector(EmptyBusMonitor(), ["work-vm"], interval=0.01))
+        try:
+            with self.assertLogs("GovernorDaemon", "WARNING") as logs:
+                deadline = time.monotonic() + 5
+                while len(calls) < 4 and time.monotonic() < deadline:
+                    await asyncio.sleep(0.01)
+            self.assertFalse(collector.done())
+        finally:
+            collector.cancel()
+        self.assertGreaterEqual(len(calls), 4)
+        self.assertEqual(len(logs.output), 2)
+        self.assertIn("retrying", logs.output[0])
+
+    async def test_unexpected_exit_logged(self):
+        async def crash():
+            raise RuntimeError("psutil gone")
+
+        task = asyncio.ensure_future(crash())
+        await asyncio.gather(task, return_exceptions=True)
+        with self.assertLogs("GovernorDaemon", "ERROR") as logs:
+            _log_collector_exit(task)
+        self.assertIn("psutil gone", logs.output[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+QWAMOS Image Signing - Unit Tests
+Tests streaming hashes, signature trailers and parallel batch verification
+
+Author: QWAMOS Project
+License: MIT
+"""
+
+import contextlib
+import hashlib
+import io
+import os
+import struct
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add tools/crypto to path
+REPO_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(REPO_ROOT / "tools" / "crypto"))
+
+with contextlib.redirect_stdout(io.StringIO()):
+    import sign_image
+    import verify_signed_image
+
+
+def quiet(func, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+def ml_dsa_signed(path, body):
+    """Write body plus a verify_signed_image.py (ML-DSA-87 sized) trailer"""
+    trailer = struct.pack('<III', verify_signed_image.QWAMOS_SIGNATURE_MAGIC,
+                          verify_signed_image.QWAMOS_SIGNATURE_VERSION, len(body))
+    trailer += hashlib.sha256(body).digest()
+    trailer += os.urandom(verify_signed_image.SIGNATURE_SIZE) + b'\x00' * 64
+    path.write_bytes(body + trailer)
+
+
+class TestStreamingSignImage(unittest.TestCase):
+    """Test sign_image.py without loading whole images."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.image = self.dir / "kernel.bin"
+        self.key = self.dir / "device.priv"
+        self.signed = self.dir / "kernel.signed"
+        self.body = os.urandom(300_001)
+        self.image.write_bytes(self.body)
+        self.key.write_bytes(os.urandom(3168))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_hash_file_matches_hashlib(self):
+        """Test chunked and mmap hashing of whole files and prefixes."""
+        for use_mmap in (False, True):
+            for length in (None, 0, 1, 4096, 300_000):
+                expected = hashlib.sha256(self.body if length is None else self.body[:length]).digest()
+                self.assertEqual(sign_image.hash_file(self.image, length, use_mmap, chunk_size=4096),
+                                 expected, (use_mmap, length))
+
+    def test_hash_file_short_read(self):
+        with self.assertRaises(ValueError):
+            sign_image.hash_file(self.image, len(self.body) + 1)
+
+    def test_sign_and_verify_round_trip(self):
+        """Test the signed file is image + trailer and verifies via chunks and mmap."""
+        metadata = quiet(sign_image.sign_image, self.image, self.key, self.signed, verify=False)
+        data = self.signed.read_bytes()
+
+        self.assertEqual(data[:len(self.body)], self.body)
+        self.assertEqual(len(data), len(self.body) + sign_image.QWAMOS_SIGNATURE_SIZE)
+        self.assertEqual(metadata["image_hash"], hashlib.sha256(self.body).hexdigest())
+        self.assertEqual(metadata["total_size"], len(data))
+
+        body_size, magic, _, image_size, image_hash, _ = sign_image.read_signature_trailer(self.signed)
+        self.assertEqual((body_size, image_size), (len(self.body), len(self.body)))
+        self.assertEqual(magic, sign_image.QWAMOS_SIGNATURE_MAGIC)
+        self.assertEqual(image_hash, hashlib.sha256(self.body).digest())
+
+        self.assertTrue(quiet(sign_image.verify_signature, self.signed))
+        self.assertTrue(quiet(sign_image.verify_signature, self.signed, use_mmap=True))
+
+    def test_tampered_image_rejected(self):
+        quiet(sign_image.sign_image, self.image, self.key, self.signed, verify=False)
+        with open(self.signed, 'r+b') as f:
+            f.seek(1234)
+            f.write(b'\xff' if self.body[1234] != 0xff else b'\x00')
+        self.assertFalse(quiet(sign_image.verify_signature, self.signed))
+
+        self.signed.write_bytes(b'short')
+        self.assertFalse(quiet(sign_image.verify_signature, self.signed))
+
+
+class TestBatchVerification(unittest.TestCase):
+    """Test verify_signed_image.py over several images."""
+
+    def test_verify_images_in_order(self):
+        """Test pooled verification reports each image, in input order."""
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            pubkey = tmp / "device.pub"
+            pubkey.write_bytes(os.urandom(2592))
+            good, tampered, truncated = tmp / "good.signed", tmp / "tampered.signed", tmp / "short.signed"
+
+            ml_dsa_signed(good, os.urandom(100_000))
+            ml_dsa_signed(tampered, b'\x00' * 100_000)
+            with open(tampered, 'r+b') as f:
+                f.write(b'\x01')
+            truncated.write_bytes(b'\x00' * 100)
+
+            paths = [str(good), str(tampered), str(truncated)]
+            results = verify_signed_image.verify_images(paths, str(pubkey), jobs=2)
+
+        self.assertEqual([r["image"] for r in results], paths)
+        self.assertEqual(results[0]["computed_hash"], results[0]["stored_hash"])
+        self.assertEqual(results[0]["image_size"], 100_000)
+        self.assertEqual(results[1]["error"], "Hash mismatch")
+        self.assertIn("File too small", results[2]["error"])
+        self.assertFalse(results[1]["valid"] or results[2]["valid"])
+        if not verify_signed_image.LIBOQS_AVAILABLE:
+            self.assertFalse(results[0]["valid"])
+
+    def test_unreadable_public_key(self):
+        """Test a hashing/key failure isn't reported as a bad trailer or hash mismatch."""
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            image = tmp / "good.signed"
+            ml_dsa_signed(image, os.urandom(10_000))
+            result = verify_signed_image.verify_image(str(image), str(tmp / "missing.pub"))
+
+        self.assertIsNotNone(result["stored_hash"])
+        self.assertIsNone(result["computed_hash"])
+        self.assertTrue(result["error"].startswith("Failed to hash image or read public key"))
+        self.assertFalse(result["valid"])
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            verify_signed_image.print_result(result)
+        self.assertIn("✓ Signature structure valid", output.getvalue())
+        self.assertIn("✗ Failed to hash image or read public key", output.getvalue())
+        self.assertNotIn("Hash mismatch", output.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
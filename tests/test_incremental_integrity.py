@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+QWAMOS Phase 10: Incremental Integrity Engine - Unit Tests
+Tests stat-signature caching, inotify triggers, read budget and monitor wiring
+
+Author: QWAMOS Project
+License: MIT
+"""
+
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+# Add crypto/ and security/ to path
+REPO_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(REPO_ROOT / "crypto"))
+sys.path.insert(0, str(REPO_ROOT / "security"))
+
+import blake3_hasher
+from incremental_integrity import IncrementalIntegrityEngine, InotifyWatcher
+import firmware_integrity_monitor
+from firmware_integrity_monitor import FirmwareIntegrityMonitor
+
+MB = 1024 * 1024
+
+try:
+    InotifyWatcher().close()
+    INOTIFY = True
+except OSError:
+    INOTIFY = False
+
+
+class TestIncrementalIntegrityEngine(unittest.TestCase):
+    """Test when the engine re-reads artifacts."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.paths = {}
+        for name in ("aboot", "tz", "xbl"):
+            self.paths[name] = self.dir / f"{name}.img"
+            self.paths[name].write_bytes(os.urandom(MB))
+        self.checked = []
+        self.state_path = str(self.dir / "state.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def check(self, name):
+        self.checked.append(name)
+        return hashlib.sha256(self.paths[name].read_bytes()).hexdigest()
+
+    def engine(self, **kwargs):
+        kwargs.setdefault('state_path', self.state_path)
+        kwargs.setdefault('low_priority', False)
+        return IncrementalIntegrityEngine({n: str(p) for n, p in self.paths.items()}, self.check, **kwargs)
+
+    def modify(self, name):
+        with open(self.paths[name], 'r+b') as f:
+            f.write(b"implant")
+
+    def test_only_changed_artifacts_rechecked(self):
+        engine = self.engine()
+        self.assertEqual(engine.run_once(), {"aboot": "changed", "tz": "changed", "xbl": "changed"})
+        self.checked.clear()
+
+        self.assertEqual(engine.run_once(), {})
+        self.modify("tz")
+        self.assertEqual(engine.run_once(), {"tz": "changed"})
+        self.assertEqual(self.checked, ["tz"])
+        self.assertEqual(engine.get_stats()["hash_changes"], 1)
+
+    def test_state_survives_restart(self):
+        self.engine().run_once()
+        self.checked.clear()
+
+        engine = self.engine()
+        self.assertEqual(engine.run_once(), {})
+        self.modify("aboot")
+        self.assertEqual(engine.run_once(), {"aboot": "changed"})
+
+    def test_scheduled_reverification_within_budget(self):
+        """Test unchanged artifacts are re-read only as fast as the MB/min budget allows."""
+        engine = self.engine(full_interval=0, budget_mb_per_min=1)
+        start = time.monotonic()
+        engine.run_once(now=start)
+        self.checked.clear()
+
+        self.assertEqual(engine.run_once(now=start + 30), {})  # 0.5 MB available
+        self.assertEqual(engine.run_once(now=start + 60), {"aboot": "scheduled"})
+        self.assertEqual(engine.run_once(now=start + 120), {"tz": "scheduled"})
+        self.assertEqual(engine.run_once(now=start + 180), {"xbl": "scheduled"})
+        self.assertEqual(self.checked, ["aboot", "tz", "xbl"])
+        self.assertAlmostEqual(engine.get_stats()["mb_reverified"], 3.0)
+
+    def test_unreadable_artifact_retried_with_backoff(self):
+        """Test a failed read is retried at the next poll, then with doubling delays."""
+        self.paths["missing"] = self.dir / "missing.img"
+        engine = self.engine(poll_interval=60)
+        engine.run_once()
+        entry = engine.state["missing"]
+        self.assertIsNone(entry["hash"])
+        self.assertIsNone(entry["verified_at"])
+        self.assertAlmostEqual(entry["retry_at"] - time.time(), 60, delta=5)
+        self.checked.clear()
+        self.assertEqual(engine.run_once(), {})
+
+        entry["retry_at"] -= 60
+        self.assertEqual(engine.run_once(), {"missing": "retry"})
+        self.assertEqual(engine.state["missing"]["failures"], 2)
+        self.assertAlmostEqual(engine.state["missing"]["retry_at"] - time.time(), 120, delta=5)
+
+        self.paths["missing"].write_bytes(b"restored")
+        self.checked.clear()
+        self.assertEqual(engine.run_once(), {"missing": "changed"})
+        self.assertIsNotNone(engine.state["missing"]["hash"])
+        self.assertNotIn("retry_at", engine.state["missing"])
+        self.assertEqual(engine.get_stats()["retry_checks"], 1)
+
+    def test_only_sweep_thread_deprioritized(self):
+        """Test change-triggered checks keep normal priority and stop() releases the wake pipe."""
+        lowered = []
+        engine = self.engine(poll_interval=0.05, low_priority=True, use_inotify=False)
+        with patch('incremental_integrity.lower_thread_priority',
+                   side_effect=lambda: lowered.append(threading.current_thread().name) or True):
+            engine.start()
+            try:
+                deadline = time.monotonic() + 5
+                while len(self.checked) < 3 and time.monotonic() < deadline:
+                    time.sleep(0.02)
+            finally:
+                engine.stop()
+        self.assertEqual(lowered, ["integrity-sweep"])
+        self.assertEqual(sorted(self.checked), ["aboot", "tz", "xbl"])
+        self.assertIsNone(engine._wake_r)
+        self.assertIsNone(engine._wake_w)
+
+    @unittest.skipUnless(INOTIFY, "inotify not available")
+    def test_inotify_triggers_check(self):
+        """Test a write is checked right away, long before the next stat poll."""
+        engine = self.engine(poll_interval=60)
+        engine.start()
+        try:
+            deadline = time.monotonic() + 5
+            while len(self.checked) < 3 and time.monotonic() < deadline:
+                time.sleep(0.02)
+            self.checked.clear()
+
+            self.modify("xbl")
+            deadline = time.monotonic() + 5
+            while not self.checked and time.monotonic() < deadline:
+                time.sleep(0.02)
+            self.assertEqual(self.checked, ["xbl"])
+            self.assertTrue(engine.get_stats()["inotify"])
+            self.assertGreaterEqual(engine.get_stats()["events"], 1)
+        finally:
+            engine.stop()
+        self.assertIsNone(engine._thread)
+
+
+class TestFirmwareMonitorEngine(unittest.TestCase):
+    """Test continuous monitoring uses the engine instead of full rescans."""
+
+    def test_continuous_monitoring(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            data = {name: os.urandom(64 * 1024) for name in ("aboot", "tz")}
+            for name, content in data.items():
+                (tmp / name).write_bytes(content)
+            expected = {name: hashlib.sha256(content).hexdigest() for name, content in data.items()}
+
+            with patch.object(firmware_integrity_monitor, 'PARTITION_DIR', str(tmp)), \
+                 patch.object(firmware_integrity_monitor, 'EXPECTED_BOOTLOADER_HASHES', expected), \
+                 patch.object(firmware_integrity_monitor, 'INTEGRITY_STATE_PATH', str(tmp / "state.json")), \
+                 patch.object(blake3_hasher, 'BASELINE_KEY_PATH', str(tmp / "baseline.key")):
+                monitor = FirmwareIntegrityMonitor(baseline_path=str(tmp / "baseline.json"))
+                monitor.log_path = str(tmp / "integrity.log")
+                periodic = threading.Event()
+                with patch.object(monitor, 'check_firmware_version', side_effect=periodic.set), \
+                     patch.object(monitor, 'check_power_rail'), \
+                     patch.object(monitor, 'run_full_integrity_check') as full_check:
+                    monitor.start_continuous_monitoring()
+                    try:
+                        self.assertTrue(periodic.wait(5))
+                        deadline = time.monotonic() + 5
+                        while len(monitor.check_history) < 2 and time.monotonic() < deadline:
+                            time.sleep(0.02)
+                    finally:
+                        monitor.stop_monitoring()
+
+                full_check.assert_not_called()
+                self.assertEqual(sorted(r.component for r in monitor.check_history), ["bootloader", "trustzone"])
+                self.assertTrue(all(r.status.value == "pass" for r in monitor.check_history))
+                self.assertIsNone(monitor.integrity_engine)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+QWAMOS Kali GPT: Inference Server - Unit Tests
+Tests the shared model server: single load, priority queueing, token streaming
+
+Author: QWAMOS Project
+License: MIT
+"""
+
+import asyncio
+import json
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+# Add ai/ and kali_gpt/ to path
+REPO_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(REPO_ROOT / "ai"))
+sys.path.insert(0, str(REPO_ROOT / "ai" / "kali_gpt"))
+
+from inference_server import (
+    FakeBackend, GenerationParams, InferenceClient, InferenceError, InferenceServer, Priority,
+    PrefixCachingBackend, PrefixStateCache
+)
+from kali_gpt_controller import KaliGPTController
+
+
+class TestPrefixCache(unittest.TestCase):
+    """Test prefix state caching keeps prompt evaluation to the new suffix."""
+
+    SYSTEM = "you are kali gpt " * 50 + "\n\n"
+    TOOLS = {tool: f"Tool Context: {tool} " + "flag " * 30 + "\n\n" for tool in ("nmap", "sqlmap", "hydra")}
+
+    def run_query(self, backend, tool, question, use_prefixes=True):
+        prompt = self.SYSTEM + self.TOOLS[tool] + f"User: {question}\nAssistant: "
+        prefixes = [len(self.SYSTEM), len(self.SYSTEM) + len(self.TOOLS[tool])] if use_prefixes else []
+        list(backend.generate(prompt, GenerationParams(max_tokens=1), prefixes))
+        return backend.last_evaluated
+
+    def test_suffix_only_after_warmup(self):
+        """Test interleaved tools re-evaluate only the question."""
+        backend = FakeBackend()
+        for tool in self.TOOLS:
+            self.run_query(backend, tool, "warm up")
+
+        suffix = len(FakeBackend.tokenize("User: which ports?\nAssistant: "))
+        for tool in ("sqlmap", "nmap", "hydra", "nmap"):
+            self.assertLessEqual(self.run_query(backend, tool, "which ports?"), suffix)
+        self.assertEqual(len(backend.prefix_cache), 4)  # system prompt + 3 tool contexts
+
+        # Without prefix states, switching tools re-evaluates the tool block
+        cold = FakeBackend()
+        self.run_query(cold, "nmap", "warm up", use_prefixes=False)
+        self.assertGreater(self.run_query(cold, "hydra", "which ports?", use_prefixes=False), 30)
+
+    def test_lru_bounds(self):
+        """Test the cache evicts least recently used states by count and bytes."""
+        cache = PrefixStateCache(max_entries=2, max_bytes=100, size_of=len)
+        cache.put("a", "x" * 10)
+        cache.put("b", "x" * 10)
+        self.assertIsNotNone(cache.get("a"))
+        cache.put("c", "x" * 10)
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+
+        cache.put("d", "x" * 95)
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.bytes, 95)
+        self.assertEqual(cache.stats["evictions"], 3)
+
+    def test_backend_must_implement_state_hooks(self):
+        """Test a backend missing a state hook fails at construction, not mid-generation."""
+        class NoEval(PrefixCachingBackend):
+            def _save_state(self):
+                return None
+
+            def _load_state(self, state):
+                pass
+
+        with self.assertRaises(TypeError):
+            NoEval()
+
+
+class TestInferenceServer(unittest.IsolatedAsyncioTestCase):
+    """Test the unix-socket inference server with a fake model."""
+
+    async def asyncSetUp(self):
+        self.work_dir = Path(tempfile.mkdtemp())
+        self.socket_path = str(self.work_dir / "kali.sock")
+        self.backend = FakeBackend()
+        self.server = InferenceServer(self.backend, self.socket_path)
+        await self.server.start()
+        self.client = InferenceClient(self.socket_path, timeout=10)
+
+    async def asyncTearDown(self):
+        await self.server.close()
+        shutil.rmtree(self.work_dir)
+
+    async def test_stream_and_single_load(self):
+        """Test many clients share one loaded model and receive streamed tokens."""
+        pieces = await asyncio.to_thread(lambda: list(self.client.stream("scan\nport 22 open")))
+        self.assertEqual(pieces, ["ack", " port", " 22", " open"])
+        self.assertEqual(self.client.last_result["tokens"], 4)
+
+        replies = await asyncio.gather(*[
+            asyncio.to_thread(InferenceClient(self.socket_path).generate, f"q{i}") for i in range(8)
+        ])
+        self.assertEqual(sorted(replies), sorted(f"ack q{i}" for i in range(8)))
+        self.assertEqual(self.backend.loads, 1)
+        self.assertEqual(self.server.stats["completed"], 9)
+
+    async def test_priority_order(self):
+        """Test threat response jumps queued app-builder and background work."""
+        self.backend.respond = lambda prompt: "ack" + " ." * (30 if prompt == "busy" else 1)
+        self.backend.token_delay = 0.05
+        gate = threading.Event()
+        order = []
+
+        def run(prompt, priority):
+            if prompt != "busy":
+                gate.wait(5)
+            InferenceClient(self.socket_path).generate(prompt, priority)
+            order.append(prompt)
+
+        busy = asyncio.ensure_future(asyncio.to_thread(run, "busy", Priority.BACKGROUND))
+        while self.server.active is None:
+            await asyncio.sleep(0.01)
+
+        queued = []
+        for prompt, priority in (("bg", "background"), ("build", Priority.APP_BUILDER),
+                                 ("threat", Priority.THREAT_RESPONSE)):
+            queued.append(asyncio.ensure_future(asyncio.to_thread(run, prompt, priority)))
+        gate.set()
+        while self.server.status()["queued"] < 3:
+            await asyncio.sleep(0.01)
+
+        await asyncio.gather(busy, *queued)
+        self.assertEqual(order, ["busy", "threat", "build", "bg"])
+        self.assertEqual(self.server.stats["by_priority"]["threat_response"], 1)
+
+    async def test_errors(self):
+        """Test bad requests and backend failures are reported, not fatal."""
+        def raw(payload: bytes) -> dict:
+            with socket.socket(socket.AF_UNIX) as sock:
+                sock.connect(self.socket_path)
+                sock.sendall(payload)
+                return json.loads(sock.makefile("rb").readline())
+
+        self.assertIn("error", await asyncio.to_thread(raw, b"not json\n"))
+        self.assertIn("error", await asyncio.to_thread(raw, b'{"priority": 0}\n'))
+        self.assertIn("error", await asyncio.to_thread(raw, b'{"prompt": "x", "priority": "urgent"}\n'))
+
+        def fail(prompt):
+            raise RuntimeError("model crashed")
+        self.backend.respond = fail
+        with self.assertRaises(InferenceError):
+            await asyncio.to_thread(self.client.generate, "x")
+
+        status = await asyncio.to_thread(self.client.status)
+        self.assertTrue(status["model_loaded"])
+        self.assertEqual(status["rejected"], 2)
+
+    async def test_disconnect_cancels(self):
+        """Test a client that goes away stops generation for its request."""
+        self.backend.respond = lambda prompt: " ".join(["tok"] * 200)
+        self.backend.token_delay = 0.01
+
+        def read_two():
+            stream = InferenceClient(self.socket_path).stream("long")
+            next(stream)
+            next(stream)
+            stream.close()
+
+        await asyncio.to_thread(read_two)
+        for _ in range(300):
+            if self.server.stats["cancelled"]:
+                break
+            await asyncio.sleep(0.01)
+        self.assertEqual(self.server.stats["cancelled"], 1)
+
+
+class TestControllerViaServer(unittest.IsolatedAsyncioTestCase):
+    """Test KaliGPTController uses the shared server instead of loading a model."""
+
+    async def test_query_routes_to_server(self):
+        work_dir = Path(tempfile.mkdtemp())
+        backend = FakeBackend(respond=lambda prompt: "use nmap -sV")
+        server = InferenceServer(backend, str(work_dir / "kali.sock"))
+        await server.start()
+        try:
+            controller = KaliGPTController(model_dir=str(work_dir), enable_sandbox=False,
+                                           encrypt_history=False, server_socket=server.socket_path,
+                                           priority="app_builder")
+            answer = await asyncio.to_thread(controller.query, "scan?", {"tool": "nmap"})
+            self.assertEqual(answer, "use nmap -sV")
+            self.assertIsNone(controller.model)
+            self.assertIn('"description": "Network scanning', backend.prompts[0])
+            self.assertEqual(server.stats["by_priority"]["app_builder"], 1)
+
+            # System prompt and nmap context are cached prefixes; the next
+            # nmap query evaluates only history and question
+            prompt, prefixes = controller._build_prompt_with_prefixes("next?", {"tool": "nmap"})
+            self.assertEqual(prompt[:prefixes[0]], controller.system_prompt + "\n\n")
+            self.assertTrue(prompt[:prefixes[1]].endswith(controller.tool_context["nmap"]))
+            await asyncio.to_thread(controller.query, "next?", {"tool": "nmap"})
+            self.assertEqual(backend.prefix_cache.stats["hits"], 1)
+            self.assertLess(backend.last_evaluated, len(FakeBackend.tokenize(prompt[prefixes[1]:])) + 1)
+
+            await asyncio.to_thread(controller.query, "contain?", {"priority": "threat_response"})
+            self.assertEqual(server.stats["by_priority"]["threat_response"], 1)
+            self.assertTrue(controller.get_status()["server_available"])
+        finally:
+            await server.close()
+            shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+QWAMOS Phase XII: QEMU Argument Generation - Snapshot Tests
+Compares generated command lines per performance profile against
+tests/snapshots/qemu_args.json
+
+Regenerate after intentional changes with:
+    QWAMOS_UPDATE_SNAPSHOTS=1 python -m pytest tests/test_kvm_qemu_args.py
+
+Author: QWAMOS Project
+License: MIT
+"""
+
+import json
+import os
+import sys
+import unittest
+from pathlib import Path
+
+# Add hypervisor to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "hypervisor"))
+
+from kvm_manager import KVMManager, KVMCapabilities, PERFORMANCE_PROFILES
+
+SNAPSHOT_FILE = Path(__file__).parent / "snapshots" / "qemu_args.json"
+
+VM_CONFIG = {
+    "name": "snapshot-vm",
+    "cpu": 4,
+    "memory": "2048M",
+    "disk": {"path": "/vms/snapshot-vm/disk.qcow2", "format": "qcow2", "cache": "writeback"},
+    "network": {"ifname": "tap-snapshot-vm", "device": "virtio-net-pci", "mac": "52:54:00:12:34:99"},
+}
+
+
+def make_manager(kvm: bool = True, hugepages_mb: int = 4096, vhost: bool = True) -> KVMManager:
+    """KVMManager with deterministic host capabilities."""
+    manager = KVMManager(force_tcg=True)
+    manager.capabilities = KVMCapabilities(
+        kvm_available=kvm,
+        cpu_supports_virt=True,
+        arm_virtualization=False,
+        vgic_version=3,
+        memfd_available=True,
+        hugepages_free_mb={2048: hugepages_mb},
+        vhost_net_available=vhost,
+    )
+    manager.enabled = kvm
+    return manager
+
+
+def generate_snapshots():
+    """Generate command lines for every profile and degraded host."""
+    snapshots = {}
+    for profile in PERFORMANCE_PROFILES:
+        config = dict(VM_CONFIG, performance={"profile": profile})
+        snapshots[f"kvm/{profile}"] = make_manager().generate_qemu_args(config)
+
+    throughput = dict(VM_CONFIG, performance={"profile": "throughput"})
+    snapshots["kvm/throughput-no-hugepages"] = make_manager(hugepages_mb=0).generate_qemu_args(throughput)
+    snapshots["kvm/throughput-no-vhost"] = make_manager(vhost=False).generate_qemu_args(throughput)
+    snapshots["tcg/throughput"] = make_manager(kvm=False).generate_qemu_args(throughput)
+    snapshots["kvm/no-performance-section"] = make_manager().generate_qemu_args(
+        {"name": "snapshot-vm", "cpu": 2, "memory": "1G"}
+    )
+    return snapshots
+
+
+class TestQEMUArgSnapshots(unittest.TestCase):
+    """Snapshot-compare generated QEMU command lines."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.generated = generate_snapshots()
+        if os.environ.get("QWAMOS_UPDATE_SNAPSHOTS"):
+            SNAPSHOT_FILE.parent.mkdir(parents=True, exist_ok=True)
+            SNAPSHOT_FILE.write_text(json.dumps(
+                {k: " ".join(v) for k, v in cls.generated.items()}, indent=2) + "\n")
+        cls.expected = json.loads(SNAPSHOT_FILE.read_text())
+
+    def test_snapshot_keys(self):
+        """Test every profile has a snapshot."""
+        self.assertEqual(set(self.generated), set(self.expected))
+
+    def test_snapshots_match(self):
+        """Test command lines match snapshots."""
+        for key, args in self.generated.items():
+            with self.subTest(case=key):
+                self.assertEqual(" ".join(args), self.expected[key])
+
+    def test_multiqueue_sized_to_vcpus(self):
+        """Test virtio-net queue count follows vCPU count."""
+        manager = make_manager()
+        config = dict(VM_CONFIG, cpu=2, performance="throughput")
+        args = " ".join(manager.generate_qemu_args(config))
+        self.assertIn("queues=2", args)
+        self.assertIn("mq=on,vectors=6", args)
+
+    def test_overrides(self):
+        """Test config keys override profile fields."""
+        manager = make_manager()
+        config = dict(VM_CONFIG, performance={"profile": "throughput", "hugepages": False, "iothreads": 1})
+        args = " ".join(manager.generate_qemu_args(config))
+        self.assertNotIn("memory-backend", args)
+        self.assertIn("iothread,id=iothread0", args)
+        self.assertNotIn("iothread1", args)
+
+    def test_unknown_profile_falls_back(self):
+        """Test unknown profile names use the default profile."""
+        profile = make_manager().resolve_performance_profile({"profile": "turbo"})
+        self.assertEqual(profile.name, "default")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+QWAMOS Phase XVI: Live Migration - Unit Tests
+Tests pre-copy convergence, the encrypted stream and end-to-end migration
+
+Author: QWAMOS Project
+License: MIT
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add cluster to path
+REPO_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "cluster"))
+sys.path.insert(0, str(REPO_ROOT / "hypervisor"))
+
+from live_migration import (
+    MSG_MIGRATE_FINISH, ConvergenceTracker, LiveMigrator, MigrationConfig, MigrationError,
+    MigrationTarget, incoming_qemu_args, receive_stream, send_stream
+)
+from cluster_transport import SessionCipher
+from cluster_node import ClusterNode, NodeIdentity, NodeResources, NodeRole
+from cluster_coordinator import ClusterCoordinator, PlacementStrategy
+from qmp_client import QMPClientPool, qmp_command_args
+from tests.helpers.cluster_harness import LocalCluster
+from tests.helpers.mock_migration import IncomingTargetQemu, MigratingSourceQemu
+
+QEMU = shutil.which("qemu-system-x86_64")
+
+
+def ram(sync_count: int, remaining: int) -> dict:
+    return {"dirty-sync-count": sync_count, "remaining": remaining, "transferred": 0}
+
+
+class TestConvergenceTracker(unittest.TestCase):
+    """Test pre-copy progress tracking."""
+
+    def test_converging_needs_no_action(self):
+        """Test shrinking dirty sets leave the downtime limit alone."""
+        tracker = ConvergenceTracker(MigrationConfig())
+        for sync, remaining in enumerate([4000, 1200, 400, 120], start=1):
+            self.assertIsNone(tracker.observe(ram(sync, remaining), sync * 0.1))
+        self.assertEqual(len(tracker.iterations), 4)
+        self.assertTrue(tracker.converging)
+
+    def test_samples_within_an_iteration_ignored(self):
+        """Test only dirty-sync-count changes start an iteration."""
+        tracker = ConvergenceTracker(MigrationConfig())
+        tracker.observe(ram(1, 4000), 0.1)
+        tracker.observe(ram(1, 3000), 0.2)
+        self.assertEqual(len(tracker.iterations), 1)
+
+    def test_stall_raises_downtime_then_aborts(self):
+        """Test a flat dirty set escalates the budget up to the ceiling."""
+        tracker = ConvergenceTracker(MigrationConfig(downtime_limit_ms=300, max_downtime_ms=1000,
+                                                     stall_iterations=2))
+        actions = [tracker.observe(ram(sync, 5000), sync) for sync in range(1, 10)]
+        self.assertEqual(actions[:3], [None, None, ConvergenceTracker.RAISE_DOWNTIME])
+        self.assertEqual(actions.count(ConvergenceTracker.RAISE_DOWNTIME), 2)  # 600, 1000
+        self.assertEqual(tracker.downtime_limit_ms, 1000)
+        self.assertEqual(actions[6], ConvergenceTracker.ABORT)
+
+    def test_iteration_cap(self):
+        """Test max_iterations aborts even while slowly converging."""
+        tracker = ConvergenceTracker(MigrationConfig(max_iterations=3))
+        actions = [tracker.observe(ram(sync, 10000 // sync), sync) for sync in range(1, 4)]
+        self.assertEqual(actions[-1], ConvergenceTracker.ABORT)
+
+
+class TestMigrationStream(unittest.IsolatedAsyncioTestCase):
+    """Test the compressed, encrypted stream over a socket pair."""
+
+    async def test_roundtrip(self):
+        """Test bytes survive compression and encryption and zero pages shrink."""
+        payload = bytes(1024 * 1024) + os.urandom(64 * 1024)
+        send_cipher = SessionCipher(b"a" * 32, b"b" * 32)
+        recv_cipher = SessionCipher(b"b" * 32, b"a" * 32)
+
+        source = asyncio.StreamReader()
+        source.feed_data(payload)
+        source.feed_eof()
+
+        work_dir = tempfile.mkdtemp()
+        received = bytearray()
+        done = asyncio.get_running_loop().create_future()
+
+        async def accept(reader, writer):
+            sink = _Sink(received)
+            stats = await receive_stream(reader, sink, recv_cipher)
+            done.set_result(stats)
+            writer.close()
+
+        server = await asyncio.start_unix_server(accept, path=f"{work_dir}/s.sock")
+        try:
+            _, writer = await asyncio.open_unix_connection(f"{work_dir}/s.sock")
+            sent = await send_stream(source, writer, send_cipher, level=1)
+            received_stats = await done
+            writer.close()
+            await writer.wait_closed()
+        finally:
+            server.close()
+            await server.wait_closed()
+            shutil.rmtree(work_dir)
+
+        self.assertEqual(bytes(received), payload)
+        self.assertEqual(sent["raw_bytes"], len(payload))
+        self.assertEqual(received_stats["wire_bytes"], sent["wire_bytes"])
+        self.assertLess(sent["wire_bytes"], len(payload) / 5)
+
+
+class _Sink:
+    """StreamWriter stand-in collecting bytes."""
+
+    def __init__(self, buffer: bytearray):
+        self.buffer = buffer
+
+    def write(self, data: bytes):
+        self.buffer.extend(data)
+
+    async def drain(self):
+        pass
+
+
+class TestLiveMigration(unittest.IsolatedAsyncioTestCase):
+    """Test migrating between two nodes with emulated QEMU processes."""
+
+    async def asyncSetUp(self):
+        self.work_dir = Path(tempfile.mkdtemp())
+        self.qmp_dir = self.work_dir / "qmp"
+        self.qmp_dir.mkdir()
+
+        self.cluster = LocalCluster(2)
+        await self.cluster.start()
+        self.targets = []
+
+        async def launcher(vm_name, spec):
+            qemu = IncomingTargetQemu(str(self.work_dir / f"{vm_name}-target.qmp"))
+            await qemu.start()
+            self.targets.append(qemu)
+            return qemu.socket_path
+
+        self.target = MigrationTarget(self.cluster["node-01"], launcher,
+                                      f"unix:{self.work_dir / 'stream.sock'}", str(self.work_dir / "in"))
+        await self.target.start()
+        self.pool = QMPClientPool(socket_dir=self.qmp_dir)
+
+    async def asyncTearDown(self):
+        await self.pool.close_all()
+        await self.target.close()
+        for qemu in self.targets + [getattr(self, "source", None)]:
+            if qemu is not None:
+                await qemu.stop()
+        await self.cluster.stop()
+        shutil.rmtree(self.work_dir)
+
+    async def _source(self, **kwargs) -> MigratingSourceQemu:
+        self.source = MigratingSourceQemu(str(self.qmp_dir / "web-vm.qmp"), **kwargs)
+        await self.source.start()
+        return self.source
+
+    def _migrator(self, **config) -> LiveMigrator:
+        return LiveMigrator(self.cluster["node-00"], self.pool, str(self.work_dir / "out"),
+                            MigrationConfig(poll_interval=0.01, **config))
+
+    async def test_precopy_converges(self):
+        """Test memory arrives intact and metrics are reported."""
+        source = await self._source(dirty_ratio=0.3)
+        result = await self._migrator().migrate("web-vm", "node-01")
+
+        target = self.targets[0]
+        self.assertEqual(bytes(target.memory), source.final_memory)
+        self.assertEqual(target.status, "running")
+        self.assertEqual(target.capabilities.get("events"), True)
+        self.assertIn("quit", source.commands)
+
+        self.assertEqual(result.status, "completed")
+        self.assertGreaterEqual(len(result.iterations), 2)
+        remaining = [it.remaining_bytes for it in result.iterations]
+        self.assertEqual(remaining, sorted(remaining, reverse=True))
+        self.assertGreater(result.stream_raw_bytes, source.pages * 4096)
+        self.assertGreater(result.compression_ratio, 2.0)  # Mostly zero pages
+        self.assertGreater(result.throughput_mbps, 0)
+        self.assertEqual(result.downtime_limit_ms, 300)
+
+    async def test_downtime_raised_when_stalled(self):
+        """Test a guest dirtying at link speed converges after the budget grows."""
+        source = await self._source(dirty_ratio=0.0, min_dirty=200)  # ~800 KB dirty every pass
+        result = await self._migrator(stall_iterations=2, max_downtime_ms=1200).migrate("web-vm", "node-01")
+
+        self.assertEqual(result.downtime_limit_ms, 1200)
+        self.assertEqual(source.parameters["downtime-limit"], 1200)
+        self.assertEqual(bytes(self.targets[0].memory), source.final_memory)
+
+    async def test_non_converging_is_cancelled(self):
+        """Test migration is cancelled, the source keeps running and the target is torn down."""
+        source = await self._source(dirty_ratio=0.0, min_dirty=200)
+        with self.assertRaises(MigrationError):
+            await self._migrator(stall_iterations=2, max_downtime_ms=500).migrate("web-vm", "node-01")
+
+        self.assertIn("migrate_cancel", source.commands)
+        self.assertEqual(source.status, "running")
+        self.assertNotIn("quit", source.commands)
+        self.assertIn("quit", self.targets[0].commands)
+        self.assertEqual(self.target.sessions, {})
+
+    async def _hang_finish(self):
+        release = asyncio.Event()
+
+        async def finish(peer_id, body):
+            await release.wait()
+            return {"status": "running"}
+
+        self.cluster["node-01"].on(MSG_MIGRATE_FINISH, finish)
+        self.addAsyncCleanup(release.set)
+
+    async def test_finish_timeout_resumes_source(self):
+        """Test a lost switchover confirmation resumes the paused source before aborting the target."""
+        source = await self._source(dirty_ratio=0.3)
+        await self._hang_finish()
+        with self.assertRaises(MigrationError):
+            await self._migrator(finish_timeout=0.3).migrate("web-vm", "node-01")
+
+        self.assertIn("cont", source.commands)
+        self.assertNotIn("migrate_cancel", source.commands)
+        self.assertEqual(source.status, "running")
+        self.assertNotIn("quit", source.commands)
+        self.assertIn("quit", self.targets[0].commands)
+        self.assertEqual(self.target.sessions, {})
+
+    async def test_finish_timeout_keeps_target_if_source_stuck(self):
+        """Test the target is not aborted when the source can't be resumed."""
+        source = await self._source(dirty_ratio=0.3)
+        del source.handlers["cont"]
+        await self._hang_finish()
+        with self.assertRaisesRegex(MigrationError, "target was kept"):
+            await self._migrator(finish_timeout=0.3).migrate("web-vm", "node-01")
+
+        self.assertEqual(source.status, "postmigrate")
+        self.assertNotIn("quit", self.targets[0].commands)
+        self.assertEqual(len(self.target.sessions), 1)
+
+    async def test_coordinator_moves_placement(self):
+        """Test live_migrate_vm updates placement only on success."""
+        config_dir = self.work_dir / "node"
+        config_dir.mkdir()
+        (config_dir / "node_identity.json").write_text(json.dumps({
+            "node_id": "node-00", "hostname": "qwamos-coordinator", "ip_address": "127.0.0.1",
+            "public_key": b"mock_key".hex(), "role": "coordinator", "cluster_id": "qwamos-test",
+        }))
+        node = ClusterNode("qwamos-test", NodeRole.COORDINATOR, config_dir=str(config_dir))
+        node.add_peer(
+            NodeIdentity(node_id="node-01", hostname="worker", ip_address="127.0.0.1",
+                         public_key=b"mock_key", role=NodeRole.WORKER, cluster_id="qwamos-test"),
+            NodeResources(cpu_cores=8, memory_mb=8192, storage_gb=128, gpu_available=False,
+                          network_bandwidth_mbps=1000))
+        # Fixed capacity instead of this host's, so placement is the same everywhere
+        node.resources = NodeResources(cpu_cores=16, memory_mb=16384, storage_gb=256, gpu_available=False,
+                                       network_bandwidth_mbps=1000)
+        coordinator = ClusterCoordinator(node)
+        placement = coordinator.place_vm("web-vm", 2, 1024, 10, strategy=PlacementStrategy.WORST_FIT)
+        self.assertEqual(placement.node_id, "node-00")
+
+        await self._source(dirty_ratio=0.0, min_dirty=200)
+        with self.assertRaises(MigrationError):
+            await coordinator.live_migrate_vm("web-vm", "node-01",
+                                              self._migrator(stall_iterations=1, max_downtime_ms=300))
+        self.assertEqual(coordinator.vm_placements["web-vm"].node_id, "node-00")
+        self.assertEqual(coordinator.engine.assignments["web-vm"], "node-00")
+
+        self.source.dirty_ratio, self.source.min_dirty = 0.2, 4
+        result = await coordinator.live_migrate_vm("web-vm", "node-01", self._migrator())
+        self.assertEqual(coordinator.vm_placements["web-vm"].node_id, "node-01")
+        self.assertEqual(coordinator.engine.assignments["web-vm"], "node-01")
+        self.assertIn(f"{result.downtime_ms} ms", coordinator.vm_placements["web-vm"].reason)
+
+
+@unittest.skipUnless(QEMU, "qemu-system-x86_64 not installed")
+class TestQemuTcgMigration(unittest.IsolatedAsyncioTestCase):
+    """Migrate between two real QEMU TCG processes on this host."""
+
+    async def asyncSetUp(self):
+        self.work_dir = Path(tempfile.mkdtemp())
+        self.processes = []
+        self.cluster = LocalCluster(2)
+        await self.cluster.start()
+
+    async def asyncTearDown(self):
+        await self.cluster.stop()
+        for process in self.processes:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+        shutil.rmtree(self.work_dir)
+
+    async def _qemu(self, qmp_socket: Path, *extra: str):
+        process = await asyncio.create_subprocess_exec(
+            QEMU, "-machine", "pc", "-accel", "tcg", "-m", "64", "-nodefaults", "-display", "none",
+            *extra, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL)
+        self.processes.append(process)
+        for _ in range(200):
+            if qmp_socket.exists():
+                return
+            await asyncio.sleep(0.05)
+        self.fail("QEMU did not create its QMP socket")
+
+    async def test_migrate_between_processes(self):
+        """Test a TCG guest migrates and resumes on the target."""
+        qmp_dir = self.work_dir / "qmp"
+        qmp_dir.mkdir()
+        await self._qemu(qmp_dir / "tcg-vm.qmp", *qmp_command_args("tcg-vm", qmp_dir))
+
+        async def launcher(vm_name, spec):
+            path = self.work_dir / f"{vm_name}-target.qmp"
+            await self._qemu(path, *incoming_qemu_args(str(path)))
+            return str(path)
+
+        target = MigrationTarget(self.cluster["node-01"], launcher,
+                                 f"unix:{self.work_dir / 'stream.sock'}", str(self.work_dir / "in"))
+        await target.start()
+        pool = QMPClientPool(socket_dir=qmp_dir)
+        try:
+            result = await LiveMigrator(self.cluster["node-00"], pool, str(self.work_dir / "out")).migrate(
+                "tcg-vm", "node-01")
+        finally:
+            await pool.close_all()
+            await target.close()
+
+        self.assertEqual(result.status, "completed")
+        self.assertGreater(result.ram_transferred_bytes, 0)
+        self.assertGreater(result.compression_ratio, 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+QWAMOS Phase XV: Metrics Bus - Unit Tests
+Tests the shared-memory seqlock snapshot published by the single collector
+
+Author: QWAMOS Project
+License: MIT
+"""
+
+import multiprocessing
+import os
+import sys
+import unittest
+from pathlib import Path
+
+# Add hypervisor to path
+REPO_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "hypervisor"))
+
+from metrics_bus import BusResourceMonitor, MetricsBusError, MetricsPublisher, MetricsReader
+from tests.helpers.metrics_writer import hammer, make_metrics
+
+
+class TestMetricsBus(unittest.TestCase):
+    """Test publishing and reading snapshots in one process."""
+
+    def setUp(self):
+        self.name = f"qwamos-test-{os.getpid()}-{self._testMethodName}"[:30]
+        self.publisher = MetricsPublisher(self.name, max_cores=16, max_zones=4, max_vms=4)
+        self.reader = MetricsReader(self.name)
+
+    def tearDown(self):
+        self.reader.close()
+        self.publisher.close()
+
+    def test_roundtrip(self):
+        """Test a snapshot reads back field for field, including None values."""
+        self.assertIsNone(self.reader.snapshot())
+
+        metrics = make_metrics(7)
+        self.publisher.publish(metrics)
+        self.assertEqual(self.reader.snapshot(vm_names=None), metrics)
+        self.assertEqual(self.reader.sequence, 2)
+        self.assertEqual(self.reader.writer_pid, os.getpid())
+
+    def test_vm_lookup(self):
+        """Test single-VM reads and VM filtering."""
+        self.publisher.publish(make_metrics(3, vm_names=["vm-a", "vm-b", "vm-c"]))
+
+        self.assertEqual(self.reader.vm("vm-b").cpu_percent, 3.0)
+        self.assertIsNone(self.reader.vm("vm-z"))
+        self.assertIsNone(self.reader.vm("x" * 100))
+        names = [vm.vm_name for vm in self.reader.snapshot(vm_names=["vm-c", "vm-a"]).vms]
+        self.assertEqual(names, ["vm-a", "vm-c"])
+
+    def test_capacity_limits(self):
+        """Test VMs and cores beyond the segment's slots are dropped."""
+        with self.assertLogs("MetricsBus", "WARNING"):
+            self.publisher.publish(make_metrics(1, vm_names=[f"vm-{i}" for i in range(6)], cores=32))
+        snapshot = self.reader.snapshot()
+        self.assertEqual(len(snapshot.vms), 4)
+        self.assertEqual(len(snapshot.cpu.per_core), 16)
+
+    def test_reattach(self):
+        """Test a restarted collector reuses the segment readers already mapped."""
+        self.publisher.publish(make_metrics(1))
+        self.publisher.close(unlink=False)
+
+        self.publisher = MetricsPublisher(self.name, max_cores=16, max_zones=4, max_vms=4)
+        self.publisher.publish(make_metrics(2))
+        self.assertEqual(self.reader.snapshot().memory.used_mb, 2)
+        self.assertEqual(self.reader.wait(after=2, timeout=0), 4)
+        self.assertIsNone(self.reader.wait(after=4, timeout=0.05))
+
+        with self.assertRaises(MetricsBusError):
+            MetricsPublisher(self.name, max_cores=8, max_zones=4, max_vms=4)
+
+    def test_bus_resource_monitor(self):
+        """Test the bus-backed monitor serves snapshots to subscribers."""
+        monitor = BusResourceMonitor(self.reader)
+        with self.assertRaises(MetricsBusError):
+            monitor.collect_all_metrics(["vm-a"])
+
+        seen = []
+        monitor.subscribe(seen.append)
+        self.publisher.publish(make_metrics(5))
+        metrics = monitor.collect_all_metrics(["vm-a"])
+        self.assertEqual([vm.vm_name for vm in metrics.vms], ["vm-a"])
+        self.assertEqual(seen, [metrics])
+        self.assertEqual(monitor.get_metrics_history(), [metrics])
+
+
+class TestConcurrentWriter(unittest.TestCase):
+    """Test lock-free reads against a collector in another process."""
+
+    def test_no_torn_reads(self):
+        """Test every snapshot read while the writer runs is internally consistent."""
+        name = f"qwamos-test-{os.getpid()}-torn"
+        ctx = multiprocessing.get_context("spawn")
+        ready = ctx.Event()
+        writer = ctx.Process(target=hammer, args=(name, 1.5, ready))
+        writer.start()
+        try:
+            self.assertTrue(ready.wait(30))
+            reader = MetricsReader(name)
+            seen = set()
+            while writer.is_alive() or not seen:
+                snapshot = reader.snapshot()
+                if snapshot is None:
+                    continue
+                value = snapshot.memory.used_mb
+                seen.add(value)
+                self.assertEqual(snapshot.cpu.system_percent, value)
+                self.assertEqual(snapshot.cpu.per_core, [float(value)] * 8)
+                self.assertEqual(snapshot.memory.total_mb, value)
+                self.assertEqual(snapshot.thermal.thermal_zone_temps, {"thermal_zone0": float(value)})
+                self.assertEqual({vm.threads for vm in snapshot.vms}, {value})
+                self.assertEqual(snapshot.timestamp, 1000.0 + value)
+            self.assertGreater(len(seen), 10)
+            reader.close()
+        finally:
+            writer.join(10)
+            MetricsPublisher(name).close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+QWAMOS Phase 9: Multi-AI Coordination Pipeline - Unit Tests
+Tests concurrent AI calls, diff-based crosschecks and checkpoint resume
+
+Author: QWAMOS Project
+License: MIT
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add pipeline/coordinator to path
+REPO_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(REPO_ROOT / "ai_app_builder" / "pipeline" / "coordinator"))
+
+try:
+    import requests
+except ImportError:
+    requests = None
+
+if requests:
+    from multi_ai_pipeline import ApprovalStatus, MultiAIPipeline, SecurityError
+
+REQUEST = "Build me an offline todo app with encrypted storage"
+DELAY = 0.2
+
+
+class FakeAI:
+    """Records calls; every method takes DELAY seconds"""
+
+    def __init__(self, name, approve_after=1, audit_score=95.0):
+        self.name = name
+        self.calls = []
+        self.approve_after = approve_after
+        self.audit_score = audit_score
+
+    async def _call(self, method, *args, **kwargs):
+        self.calls.append((method, args, kwargs))
+        await asyncio.sleep(DELAY)
+
+    def count(self, method):
+        return sum(1 for call in self.calls if call[0] == method)
+
+    async def analyze_requirements(self, request, focus):
+        await self._call('analyze_requirements', request, focus=focus)
+        return {'functionality': ['todos'], 'dependencies': [f'{self.name}-dep']}
+
+    async def generate_code(self, requirements, previous_code=None):
+        await self._call('generate_code', previous_code=previous_code)
+        version = self.count('generate_code')
+        return {
+            'MainActivity.kt': f"class MainActivity {{\n    val version = {version}\n}}\n",
+            'Storage.kt': "object Storage\n",
+        }
+
+    async def apply_improvements(self, code, improvements):
+        await self._call('apply_improvements', code, improvements)
+        return code
+
+    async def review_code(self, code, focus, as_diff=False):
+        await self._call('review_code', code, focus=focus, as_diff=as_diff)
+        approved = self.count('review_code') >= self.approve_after
+        return SimpleNamespace(
+            status=ApprovalStatus.APPROVED if approved else ApprovalStatus.NEEDS_REVISION,
+            suggestions=[] if approved else [f"{self.name}: harden storage"]
+        )
+
+    async def security_audit(self, code, audit_type):
+        await self._call('security_audit', code, audit_type=audit_type)
+        return SimpleNamespace(score=self.audit_score, findings=[], recommendations=[])
+
+    async def suggest_enhancements(self, code, focus):
+        await self._call('suggest_enhancements', code, focus=focus)
+        return [f"{self.name} idea", "dark mode"]
+
+
+@unittest.skipUnless(requests, "requests not installed")
+class TestMultiAIPipeline(unittest.TestCase):
+    """Test the pipeline against fake AI controllers."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.kali = FakeAI('kali', approve_after=2)
+        self.claude = FakeAI('claude')
+        self.chatgpt = FakeAI('chatgpt', approve_after=2)
+        self.pipeline = MultiAIPipeline(self.kali, self.claude, self.chatgpt,
+                                        checkpoint_dir=self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, **kwargs):
+        return asyncio.run(self.pipeline.build_app(REQUEST, "user1", **kwargs))
+
+    def test_independent_calls_concurrent(self):
+        """Test the 3 analyses, reviews, audits and enhancements each take one round-trip."""
+        started = time.monotonic()
+        app = self.build()
+        elapsed = time.monotonic() - started
+
+        # analyses + 2x(generate, reviews) + improvements + audits + enhancements
+        self.assertLess(elapsed, 8 * DELAY + 0.5)
+        self.assertEqual(app.security_score, 95.0)
+        self.assertEqual(sorted(app.dependencies), ['chatgpt-dep', 'claude-dep', 'kali-dep'])
+        self.assertEqual(app.enhancements, ["kali idea", "dark mode", "claude idea", "chatgpt idea"])
+
+    def test_reviewers_get_diffs(self):
+        """Test reviewers see full code once, then only changed files as diffs."""
+        self.build()
+        first, second = [call for call in self.kali.calls if call[0] == 'review_code']
+
+        self.assertFalse(first[2]['as_diff'])
+        self.assertEqual(set(first[1][0]), {'MainActivity.kt', 'Storage.kt'})
+
+        self.assertTrue(second[2]['as_diff'])
+        diffs = second[1][0]
+        self.assertEqual(list(diffs), ['MainActivity.kt'])
+        self.assertIn("-    val version = 1\n+    val version = 2\n", diffs['MainActivity.kt'])
+        self.assertTrue(diffs['MainActivity.kt'].startswith("--- a/MainActivity.kt\n+++ b/MainActivity.kt\n"))
+
+    def test_diff_added_and_removed_files(self):
+        diffs = self.pipeline._diff_code({'Old.kt': "a\n", 'Same.kt': "s\n"},
+                                         {'New.kt': "b", 'Same.kt': "s\n"})
+        self.assertEqual(diffs, {
+            'New.kt': "--- /dev/null\n+++ b/New.kt\n@@ -0,0 +1 @@\n+b\n\\ No newline at end of file\n",
+            'Old.kt': "--- a/Old.kt\n+++ /dev/null\n@@ -1 +0,0 @@\n-a\n",
+        })
+
+    def test_resume_after_failed_stage(self):
+        """Test a failed security audit resumes without redoing requirements or code."""
+        self.chatgpt.audit_score = 40.0
+        with self.assertRaises(SecurityError):
+            self.build()
+        build_dirs = list(Path(self.tmp.name).iterdir())
+        self.assertEqual(len(build_dirs), 1)
+        self.assertEqual(sorted(p.name for p in build_dirs[0].iterdir()),
+                         ['code_generation.json', 'requirements_analysis.json'])
+
+        self.chatgpt.audit_score = 95.0
+        app = self.build()
+        self.assertEqual(self.claude.count('analyze_requirements'), 1)
+        self.assertEqual(self.claude.count('generate_code'), 2)
+        self.assertEqual(self.claude.count('security_audit'), 2)
+        self.assertEqual(app.name, "Custom Todo App")
+        self.assertIn("val version = 2", app.code['MainActivity.kt'])
+        # Successful builds drop their checkpoints
+        self.assertFalse(build_dirs[0].exists())
+
+    def test_no_resume(self):
+        """Test resume=False and a different request both start from requirements."""
+        self.chatgpt.audit_score = 40.0
+        with self.assertRaises(SecurityError):
+            self.build()
+        self.chatgpt.audit_score = 95.0
+        self.build(resume=False)
+        self.assertEqual(self.claude.count('analyze_requirements'), 2)
+
+        asyncio.run(self.pipeline.build_app(REQUEST + " and reminders", "user1"))
+        self.assertEqual(self.claude.count('analyze_requirements'), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+QWAMOS Partition Tree Hash - Unit Tests
+Tests pread chunk hashing, per-chunk baselines and concurrent partition checks
+
+Author: QWAMOS Project
+License: MIT
+"""
+
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+# Add crypto/ and security/ to path
+REPO_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(REPO_ROOT / "crypto"))
+sys.path.insert(0, str(REPO_ROOT / "security"))
+
+import blake3_hasher
+from blake3_hasher import TreeHashBaseline, changed_regions, hash_region, read_region, tree_hash
+import firmware_integrity_monitor
+from firmware_integrity_monitor import FirmwareIntegrityMonitor, IntegrityStatus
+
+CHUNK = 64 * 1024
+
+
+class TestTreeHash(unittest.TestCase):
+    """Test the pread reader and the chunked tree hash."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.image = Path(self.tmp.name) / "partition.img"
+        self.data = os.urandom(10 * CHUNK + 123)
+        self.image.write_bytes(self.data)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_at(self, offset, payload):
+        with open(self.image, 'r+b') as f:
+            f.seek(offset)
+            f.write(payload)
+
+    def test_read_region(self):
+        self.assertEqual(b"".join(read_region(self.image, chunk_size=CHUNK)), self.data)
+        self.assertEqual(b"".join(read_region(self.image, 3 * CHUNK + 5, CHUNK)), self.data[:3 * CHUNK + 5])
+        self.assertEqual(hash_region(self.image, 5000), hashlib.sha256(self.data[:5000]).digest())
+
+    def test_parallel_matches_sequential(self):
+        """Test chunk digests and root don't depend on the number of threads."""
+        one = tree_hash(self.image, chunk_size=CHUNK, max_workers=1, flat_algorithm="sha256")
+        many = tree_hash(self.image, chunk_size=CHUNK, max_workers=4, flat_algorithm="sha256")
+        self.assertEqual(one, many)
+        self.assertEqual(len(one["chunks"]), 11)
+        self.assertEqual(one["length"], len(self.data))
+        self.assertEqual(one["flat"], hashlib.sha256(self.data).hexdigest())
+
+    def test_concurrent_hashes_share_inflight_cap(self):
+        """Test concurrent tree hashes together never hold more than the shared cap."""
+        class CountingSemaphore(threading.BoundedSemaphore):
+            def __init__(self, value):
+                super().__init__(value)
+                self.held = self.peak = 0
+                self.count_lock = threading.Lock()
+
+            def acquire(self, *args, **kwargs):
+                acquired = super().acquire(*args, **kwargs)
+                if acquired:
+                    with self.count_lock:
+                        self.held += 1
+                        self.peak = max(self.peak, self.held)
+                return acquired
+
+            def release(self, *args, **kwargs):
+                with self.count_lock:
+                    self.held -= 1
+                super().release(*args, **kwargs)
+
+        inflight = CountingSemaphore(3)
+        expected = tree_hash(self.image, chunk_size=CHUNK)
+        with patch.object(blake3_hasher, '_inflight_chunks', inflight):
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                results = list(pool.map(lambda _: tree_hash(self.image, chunk_size=CHUNK, max_workers=4),
+                                        range(4)))
+        self.assertEqual(results, [expected] * 4)
+        self.assertLessEqual(inflight.peak, 3)
+        self.assertEqual(inflight.held, 0)
+
+    def test_changed_regions(self):
+        """Test changed chunks are reported as merged byte ranges."""
+        baseline = tree_hash(self.image, chunk_size=CHUNK)
+        self.write_at(2 * CHUNK + 10, b"\xff\xfe")
+        self.write_at(3 * CHUNK, b"\x00\x01")
+        self.write_at(9 * CHUNK + 1, b"\x42\x43")
+        current = tree_hash(self.image, chunk_size=CHUNK)
+
+        self.assertNotEqual(baseline["root"], current["root"])
+        self.assertEqual(changed_regions(baseline, current),
+                         [(2 * CHUNK, 2 * CHUNK), (9 * CHUNK, CHUNK)])
+
+        with open(self.image, 'ab') as f:
+            f.write(b"appended")
+        grown = tree_hash(self.image, chunk_size=CHUNK)
+        self.assertEqual(changed_regions(current, grown)[-1], (10 * CHUNK, 123 + 8))
+
+
+class TestTreeHashBaseline(unittest.TestCase):
+    """Test bootstrapping and using the per-chunk reference baseline."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.image = self.dir / "boot_a.img"
+        self.data = os.urandom(8 * CHUNK)
+        self.image.write_bytes(self.data)
+        self.expected = hashlib.sha256(self.data[:6 * CHUNK]).hexdigest()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def baseline(self, **kwargs):
+        kwargs.setdefault('key_path', self.dir / "baseline.key")
+        return TreeHashBaseline(self.dir / "baseline.json", chunk_size=CHUNK, **kwargs)
+
+    def test_bootstrap_only_from_expected_hash(self):
+        baseline = self.baseline()
+        self.assertEqual(baseline.verify("boot_a", self.image, "0" * 64, 6 * CHUNK), self.expected)
+        self.assertEqual(baseline.manifests, {})
+
+        self.assertEqual(baseline.verify("boot_a", self.image, self.expected, 6 * CHUNK), self.expected)
+        self.assertEqual(len(self.baseline().manifests["boot_a"]["chunks"]), 6)
+
+    def test_mismatch_pinpoints_region(self):
+        """Test a later modification is located from one tree-hash pass."""
+        self.baseline().verify("boot_a", self.image, self.expected, 6 * CHUNK)
+        baseline = self.baseline()
+        self.assertEqual(baseline.verify("boot_a", self.image, self.expected, 6 * CHUNK), self.expected)
+
+        with open(self.image, 'r+b') as f:
+            f.seek(4 * CHUNK + 7)
+            f.write(b"implant")
+            f.seek(7 * CHUNK)  # outside the hashed region
+            f.write(b"ignored")
+
+        with patch('blake3_hasher.tree_hash', wraps=tree_hash) as spy:
+            actual = baseline.verify("boot_a", self.image, self.expected, 6 * CHUNK)
+        spy.assert_called_once()
+        self.assertNotIn('flat_algorithm', spy.call_args.kwargs)  # single tree-hash pass
+        self.assertNotEqual(actual, self.expected)
+        self.assertTrue(actual.startswith(f"{baseline.algorithm}-tree:"))
+        self.assertEqual(baseline.changes["boot_a"], [(4 * CHUNK, CHUNK)])
+
+    def test_expected_hash_update_rebootstraps(self):
+        self.baseline().verify("boot_a", self.image, self.expected, 6 * CHUNK)
+        new_data = os.urandom(8 * CHUNK)
+        self.image.write_bytes(new_data)
+        new_expected = hashlib.sha256(new_data[:6 * CHUNK]).hexdigest()
+
+        baseline = self.baseline()
+        self.assertEqual(baseline.verify("boot_a", self.image, new_expected, 6 * CHUNK), new_expected)
+        self.assertEqual(self.baseline().manifests["boot_a"]["expected_sha256"], new_expected)
+
+    def test_forged_manifest_discarded(self):
+        """Test a rewritten baseline can't make a modified partition pass."""
+        self.baseline().verify("boot_a", self.image, self.expected, 6 * CHUNK)
+        self.assertEqual((self.dir / "baseline.key").stat().st_mode & 0o777, 0o600)
+
+        with open(self.image, 'r+b') as f:
+            f.seek(CHUNK)
+            f.write(b"implant")
+        forged = tree_hash(self.image, 6 * CHUNK, chunk_size=CHUNK)
+        stored = json.loads((self.dir / "baseline.json").read_text())
+        stored["manifests"]["boot_a"].update(root=forged["root"], chunks=forged["chunks"])
+        (self.dir / "baseline.json").write_text(json.dumps(stored))
+
+        baseline = self.baseline()
+        self.assertEqual(baseline.manifests, {})
+        actual = baseline.verify("boot_a", self.image, self.expected, 6 * CHUNK)
+        self.assertEqual(actual, hashlib.sha256(self.image.read_bytes()[:6 * CHUNK]).hexdigest())
+        self.assertNotEqual(actual, self.expected)
+
+        # Signed with another device's key
+        self.assertEqual(self.baseline(key=os.urandom(32)).manifests, {})
+
+    def test_no_key_no_baseline(self):
+        """Test without a key every check compares the flat SHA-256."""
+        baseline = self.baseline(key_path=self.dir)  # a directory, not a key file
+        self.assertIsNone(baseline.key)
+        self.assertEqual(baseline.verify("boot_a", self.image, self.expected, 6 * CHUNK), self.expected)
+        self.assertEqual(baseline.manifests, {})
+        self.assertFalse((self.dir / "baseline.json").exists())
+
+
+class TestFirmwarePartitionHashing(unittest.TestCase):
+    """Test the firmware monitor reads partitions directly and concurrently."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.partitions = {name: os.urandom(3 * CHUNK) for name in ("aboot", "tz")}
+        for name, data in self.partitions.items():
+            (self.dir / name).write_bytes(data)
+        self.expected = {name: hashlib.sha256(data).hexdigest() for name, data in self.partitions.items()}
+
+        self.patches = [
+            patch.object(firmware_integrity_monitor, 'PARTITION_DIR', str(self.dir)),
+            patch.object(firmware_integrity_monitor, 'EXPECTED_BOOTLOADER_HASHES', self.expected),
+            patch.object(blake3_hasher, 'BASELINE_KEY_PATH', str(self.dir / "baseline.key")),
+        ]
+        for p in self.patches:
+            p.start()
+        self.monitor = FirmwareIntegrityMonitor(baseline_path=str(self.dir / "baseline.json"))
+        self.monitor.baseline.chunk_size = CHUNK
+        self.monitor.log_path = str(self.dir / "integrity.log")
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        self.tmp.cleanup()
+
+    def test_hash_partitions(self):
+        self.assertEqual(self.monitor.hash_partitions(["aboot", "tz", "missing"]),
+                         {**self.expected, "missing": None})
+        self.assertEqual(self.monitor.check_bootloader_integrity().status, IntegrityStatus.PASS)
+
+    def test_modified_bootloader_reports_region(self):
+        self.monitor.hash_partitions(["aboot", "tz"])  # records the baseline
+        with open(self.dir / "aboot", 'r+b') as f:
+            f.seek(CHUNK + 1)
+            f.write(b"dark matter")
+
+        with patch.object(self.monitor.ml_override, 'handle_threat') as mock_threat:
+            result = self.monitor.check_bootloader_integrity()
+        self.assertEqual(result.status, IntegrityStatus.FAIL)
+        self.assertIn(f"changed regions: 0x{CHUNK:x}+{CHUNK}", result.details)
+        mock_threat.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
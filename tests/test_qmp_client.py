@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+QWAMOS Phase XV: QMP Client - Unit Tests
+Tests pooled QMP connections against a mock QMP server
+
+Author: QWAMOS Project
+License: MIT
+"""
+
+import asyncio
+import concurrent.futures
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add hypervisor to path
+REPO_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "hypervisor"))
+
+from qmp_client import QMPClientPool, QMPError, qmp_command_args, qmp_socket_path
+from tests.helpers.mock_qmp import MockQMPServer
+
+
+class TestQMPClientPool(unittest.IsolatedAsyncioTestCase):
+    """Test QMP client pool against mock QEMU instances."""
+
+    async def asyncSetUp(self):
+        """Start two mock VMs."""
+        self.socket_dir = Path(tempfile.mkdtemp())
+        self.net_dir = Path(tempfile.mkdtemp())
+        self.servers = {}
+        for vm_name in ("vm-a", "vm-b"):
+            server = MockQMPServer(qmp_socket_path(vm_name, self.socket_dir))
+            await server.start()
+            self.servers[vm_name] = server
+
+        self.pool = QMPClientPool(socket_dir=self.socket_dir, timeout=2.0, sysfs_net_dir=self.net_dir)
+
+    async def asyncTearDown(self):
+        """Stop mock VMs."""
+        await self.pool.close_all()
+        for server in self.servers.values():
+            await server.stop()
+        shutil.rmtree(self.socket_dir)
+        shutil.rmtree(self.net_dir)
+
+    def test_qmp_command_args(self):
+        """Test QEMU -qmp argument generation."""
+        args = qmp_command_args("vm-a", self.socket_dir)
+        self.assertEqual(args[0], "-qmp")
+        self.assertIn(f"unix:{self.socket_dir / 'vm-a.qmp'}", args[1])
+        self.assertIn("server=on", args[1])
+
+    async def test_query_status(self):
+        """Test run state query."""
+        self.assertEqual(await self.pool.query_status("vm-a"), "running")
+        self.servers["vm-a"].status = "paused"
+        self.assertEqual(await self.pool.query_status("vm-a"), "paused")
+
+    async def test_connection_is_persistent(self):
+        """Test repeated commands reuse one connection per VM."""
+        for _ in range(5):
+            await self.pool.query_status("vm-a")
+            await self.pool.query_block_stats("vm-a")
+
+        self.assertEqual(self.servers["vm-a"].connections, 1)
+        self.assertEqual(self.servers["vm-a"].commands.count("qmp_capabilities"), 1)
+
+    async def test_concurrent_commands_share_connection(self):
+        """Test concurrent commands on one connection get their own responses."""
+        results = await asyncio.gather(*(self.pool.query_status("vm-a") for _ in range(20)))
+
+        self.assertEqual(results, ["running"] * 20)
+        self.assertEqual(self.servers["vm-a"].connections, 1)
+
+    async def test_reconnect_after_drop(self):
+        """Test the pool reconnects when QEMU drops the connection."""
+        await self.pool.query_status("vm-a")
+        for writer in list(self.servers["vm-a"]._writers):
+            writer.close()
+        await asyncio.sleep(0.05)
+
+        self.assertEqual(await self.pool.query_status("vm-a"), "running")
+        self.assertEqual(self.servers["vm-a"].connections, 2)
+
+    async def test_system_powerdown(self):
+        """Test graceful powerdown waits for SHUTDOWN."""
+        self.assertTrue(await self.pool.system_powerdown("vm-a", timeout=2.0))
+        self.assertIn("system_powerdown", self.servers["vm-a"].commands)
+
+    async def test_system_powerdown_timeout(self):
+        """Test powerdown reports failure when the guest ignores ACPI."""
+        self.servers["vm-a"].powerdown_responds = False
+        self.assertFalse(await self.pool.system_powerdown("vm-a", timeout=0.2))
+
+    async def test_block_stats(self):
+        """Test block counter parsing."""
+        stats = await self.pool.query_block_stats("vm-a")
+        self.assertEqual(stats["drive0"]["rd_bytes"], 4 * 1024 * 1024)
+        self.assertEqual(stats["drive0"]["wr_operations"], 25)
+
+    async def test_balloon_control(self):
+        """Test balloon query and resize."""
+        self.assertEqual(await self.pool.query_balloon("vm-a"), 2048)
+        await self.pool.set_balloon("vm-a", 1024)
+        self.assertEqual(await self.pool.query_balloon("vm-a"), 1024)
+
+    async def test_balloon_absent(self):
+        """Test VMs without a balloon device."""
+        self.servers["vm-a"].balloon_bytes = None
+        self.assertIsNone(await self.pool.query_balloon("vm-a"))
+
+    async def test_vcpu_threads(self):
+        """Test vCPU thread lookup via query-cpus-fast."""
+        self.servers["vm-a"].handlers["query-cpus-fast"] = lambda args: [
+            {"cpu-index": 0, "thread-id": 4001, "qom-path": "/machine/unattached/device[0]"},
+            {"cpu-index": 1, "thread-id": 4002, "qom-path": "/machine/unattached/device[1]"},
+        ]
+        self.assertEqual(await self.pool.query_vcpu_threads("vm-a"), {0: 4001, 1: 4002})
+
+    async def test_command_error(self):
+        """Test QMP errors are raised with their class."""
+        with self.assertRaises(QMPError) as ctx:
+            await self.pool.execute("vm-a", "no-such-command")
+        self.assertEqual(ctx.exception.error_class, "CommandNotFound")
+
+    async def test_collect_vm_stats_batch(self):
+        """Test batched stats collection with tap counters and a missing VM."""
+        stats_dir = self.net_dir / "tap-vm-b" / "statistics"
+        stats_dir.mkdir(parents=True)
+        (stats_dir / "rx_bytes").write_text("3000\n")
+        (stats_dir / "tx_bytes").write_text("7000\n")
+
+        stats = await self.pool.collect_vm_stats(["vm-a", "vm-b", "vm-missing"])
+
+        self.assertEqual(set(stats), {"vm-a", "vm-b"})
+        self.assertEqual(stats["vm-a"].block_read_bytes, 4 * 1024 * 1024)
+        self.assertEqual(stats["vm-a"].net_tx_bytes, 0)
+        # Host tap rx is guest tx
+        self.assertEqual(stats["vm-b"].net_tx_bytes, 3000)
+        self.assertEqual(stats["vm-b"].net_rx_bytes, 7000)
+        self.assertEqual(stats["vm-b"].balloon_mb, 2048)
+
+    async def test_missing_socket(self):
+        """Test unreachable VMs raise QMPError."""
+        with self.assertRaises(QMPError):
+            await self.pool.query_status("vm-missing")
+
+
+class TestQMPClientPoolSync(unittest.TestCase):
+    """Test the synchronous bridge used by VMManager and ResourceMonitor."""
+
+    def test_call_keeps_connection_across_calls(self):
+        """Test sync calls share the pool's background loop and connection."""
+        socket_dir = Path(tempfile.mkdtemp())
+        server_loop = asyncio.new_event_loop()
+        server = MockQMPServer(qmp_socket_path("vm-sync", socket_dir))
+
+        import threading
+        thread = threading.Thread(target=server_loop.run_forever, daemon=True)
+        thread.start()
+        asyncio.run_coroutine_threadsafe(server.start(), server_loop).result(2)
+
+        pool = QMPClientPool(socket_dir=socket_dir, timeout=2.0)
+        try:
+            for _ in range(3):
+                self.assertEqual(pool.call(pool.query_status("vm-sync"), timeout=2), "running")
+            self.assertEqual(server.connections, 1)
+        finally:
+            pool.shutdown()
+            asyncio.run_coroutine_threadsafe(server.stop(), server_loop).result(2)
+            server_loop.call_soon_threadsafe(server_loop.stop)
+            thread.join(2)
+            server_loop.close()
+            shutil.rmtree(socket_dir)
+
+    def test_call_timeout_cancels(self):
+        """Test a timed-out call raises TimeoutError and cancels the coroutine."""
+        pool = QMPClientPool(socket_dir=Path(tempfile.gettempdir()), timeout=2.0)
+        cancelled = []
+
+        async def hang():
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        try:
+            with self.assertRaises(concurrent.futures.TimeoutError):
+                pool.call(hang(), timeout=0.05)
+            self.assertEqual(pool.call(asyncio.sleep(0, "ok"), timeout=2), "ok")
+            self.assertEqual(cancelled, [True])
+        finally:
+            pool.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+QWAMOS Phase 9: Automated Quality Assurance - Unit Tests
+Tests sharded parallel execution, timeouts, fail-fast and duration history
+
+Author: QWAMOS Project
+License: MIT
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+# Add qa/ and ai/ to path
+REPO_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(REPO_ROOT / "ai_app_builder" / "qa"))
+sys.path.insert(0, str(REPO_ROOT / "ai"))
+
+import quality_assurance
+from ai_sandbox import AISandbox, SandboxMode
+from quality_assurance import AutomatedQualityAssurance, ShardedTestExecutor
+
+# Aliased so pytest does not try to collect the Test* dataclasses/enums
+QACase = quality_assurance.TestCase
+QAStatus = quality_assurance.TestStatus
+QAType = quality_assurance.TestType
+
+CODE = {
+    'notes/store.py': "def add(items, item):\n    return items + [item.strip()]\n",
+}
+
+
+def py_test(name, body, test_type=QAType.UNIT):
+    return QACase(test_type=test_type, name=name, description=name,
+                    code=body, target_file='notes/store.py', language='python')
+
+
+def sleeper(name, seconds, test_type=QAType.UNIT):
+    return py_test(name, f"import time\n\ndef test_sleep():\n    time.sleep({seconds})\n", test_type)
+
+
+def local_sandbox(**kwargs):
+    """Sandbox without isolation tools, so the tests run anywhere"""
+    kwargs.setdefault('pool_size', 4)
+    return AISandbox("qa", SandboxMode.NONE, scrub_env=True, **kwargs)
+
+
+def collect(executor, test_cases, code=CODE):
+    async def run():
+        try:
+            return [result async for result in executor.run(test_cases, code)]
+        finally:
+            await executor.sandbox.close_pools()
+    return asyncio.run(run())
+
+
+class TestShardedExecutor(unittest.TestCase):
+    """Test the subprocess backend."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.history = Path(self.tmp.name) / "history.json"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def executor(self, **kwargs):
+        kwargs.setdefault('history_path', str(self.history))
+        kwargs.setdefault('max_shards', 4)
+        kwargs.setdefault('sandbox', local_sandbox())
+        return ShardedTestExecutor(**kwargs)
+
+    def test_outcomes(self):
+        """Test pass/fail/error/timeout/no-runner classification against generated code."""
+        tests = [
+            py_test("test_add", "from notes.store import add\n\n"
+                    "def test_add():\n    assert add([], ' a ') == ['a']\n"),
+            py_test("test_wrong", "from notes.store import add\n\n"
+                    "def test_wrong():\n    assert add([], 'a') == [], 'store kept item'\n"),
+            py_test("test_broken", "def test_broken():\n    raise KeyError('boom')\n"),
+            py_test("test_empty", "VALUE = 1\n"),
+            sleeper("test_hang", 30),
+            QACase(QAType.UNIT, "test_junit", "JUnit", "@Test public void t() {}", "Main.kt"),
+        ]
+        started = time.monotonic()
+        results = {r.test_case.name: r for r in collect(self.executor(timeout_s=0.5), tests)}
+        self.assertLess(time.monotonic() - started, 5)
+
+        self.assertEqual(results["test_add"].status, QAStatus.PASSED)
+        self.assertEqual(results["test_wrong"].status, QAStatus.FAILED)
+        self.assertIn("AssertionError: store kept item", results["test_wrong"].error_message)
+        self.assertIn("Traceback", results["test_wrong"].stack_trace)
+        self.assertEqual(results["test_broken"].status, QAStatus.ERROR)
+        self.assertIn("KeyError", results["test_broken"].error_message)
+        self.assertEqual(results["test_empty"].status, QAStatus.ERROR)
+        self.assertEqual(results["test_hang"].status, QAStatus.ERROR)
+        self.assertIn("timed out after 0.5s", results["test_hang"].error_message)
+        self.assertEqual(results["test_junit"].status, QAStatus.ERROR)
+        self.assertIn("No test runner configured for java tests", results["test_junit"].error_message)
+
+    def test_shards_run_in_parallel(self):
+        """Test shards run concurrently and results stream back in completion order."""
+        tests = [sleeper(f"test_slow_{i}", 0.6) for i in range(3)] + [sleeper("test_fast", 0)]
+        started = time.monotonic()
+        results = collect(self.executor(), tests)
+        self.assertLess(time.monotonic() - started, 1.5)  # 1.8s if sequential
+        self.assertTrue(all(r.status == QAStatus.PASSED for r in results))
+        self.assertEqual(results[0].test_case.name, "test_fast")
+
+    def test_fail_fast_on_security_failure(self):
+        """Test a failing security test stops the run and skips what's left."""
+        tests = [sleeper(f"test_slow_{i}", 5) for i in range(3)]
+        tests.append(py_test("test_sql_injection", "def test_sql():\n    assert False\n", QAType.SECURITY))
+        started = time.monotonic()
+        results = collect(self.executor(max_shards=2), tests)
+        self.assertLess(time.monotonic() - started, 3)
+
+        self.assertEqual(results[0].test_case.name, "test_sql_injection")
+        self.assertEqual(results[0].status, QAStatus.FAILED)
+        self.assertEqual(len(results), 4)
+        for result in results[1:]:
+            self.assertEqual(result.status, QAStatus.SKIPPED)
+            self.assertIn("fail-fast after critical failure in test_sql_injection", result.error_message)
+
+    def test_duration_history_drives_sharding(self):
+        """Test measured durations are saved and used to balance the next run."""
+        tests = [sleeper("test_long", 0.5)] + [sleeper(f"test_short_{i}", 0) for i in range(3)]
+        collect(self.executor(max_shards=2), tests)
+        history = json.loads(self.history.read_text())['durations_ms']
+        self.assertGreater(history["notes/store.py::test_long"], 500)
+
+        # Default estimates are equal, history separates the long test
+        shards = self.executor(max_shards=2).plan_shards(tests)
+        self.assertEqual([[t.name for t in shard] for shard in shards if tests[0] in shard], [["test_long"]])
+
+    def test_critical_tests_first_in_shard(self):
+        tests = [sleeper("test_perf", 0, QAType.PERFORMANCE),
+                 sleeper("test_crypto", 0, QAType.SECURITY)]
+        shard, = self.executor(max_shards=1, history_path=None).plan_shards(tests)
+        self.assertEqual([t.name for t in shard], ["test_crypto", "test_perf"])
+
+    def test_sandbox_backend(self):
+        """Test tests run on pooled sandbox workers without the host environment."""
+        async def run():
+            sandbox = local_sandbox(pool_size=2)
+            executor = self.executor(sandbox=sandbox, timeout_s=0.5)
+            try:
+                return [r async for r in executor.run(
+                    [py_test("test_ok", "def test_ok():\n    assert True\n"), sleeper("test_hang", 30),
+                     py_test("test_env", "import os\n\ndef test_env():\n"
+                             "    assert 'QWAMOS_TEST_SECRET' not in os.environ\n")], CODE)]
+            finally:
+                await sandbox.close_pools()
+
+        os.environ['QWAMOS_TEST_SECRET'] = 'sk-test'
+        try:
+            results = {r.test_case.name: r.status for r in asyncio.run(run())}
+        finally:
+            del os.environ['QWAMOS_TEST_SECRET']
+        self.assertEqual(results, {"test_ok": QAStatus.PASSED, "test_hang": QAStatus.ERROR,
+                                   "test_env": QAStatus.PASSED})
+
+    def test_default_sandbox(self):
+        """Test tests never run as plain host subprocesses by default."""
+        executor = ShardedTestExecutor(history_path=None)
+        self.assertTrue(executor.owns_sandbox)
+        self.assertEqual(executor.sandbox.mode, SandboxMode.NETWORK_ISOLATED)
+        self.assertTrue(executor.sandbox.scrub_env)
+
+
+class TestQualityAssuranceExecution(unittest.TestCase):
+    """Test AutomatedQualityAssurance uses the executor."""
+
+    def test_results_in_input_order(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            config = {'quality_assurance': {'duration_history': f"{tmp}/history.json"}}
+            qa = AutomatedQualityAssurance(config, None, None, None, sandbox=local_sandbox())
+            tests = [sleeper("test_a", 0.3), py_test("test_b", "def test_b():\n    assert 1\n")]
+
+            async def run():
+                try:
+                    return await qa._execute_tests(tests, CODE)
+                finally:
+                    await qa.executor.sandbox.close_pools()
+            results = asyncio.run(run())
+        self.assertEqual([r.test_case.name for r in results], ["test_a", "test_b"])
+        self.assertTrue(all(r.status == QAStatus.PASSED for r in results))
+
+    def test_zero_errors_requires_executed_tests(self):
+        """Test skipped or runner-less tests can't satisfy the zero-errors gate."""
+        async def run(tests):
+            qa = AutomatedQualityAssurance(
+                {'quality_assurance': {'duration_history': None, 'min_code_coverage': 0.0}},
+                None, None, None, sandbox=local_sandbox())
+
+            async def generate(*args):
+                return tests
+            qa._generate_test_suite = generate
+            try:
+                return await qa.perform_quality_assurance(CODE, {}, "notes app")
+            finally:
+                await qa.executor.sandbox.close_pools()
+
+        junit = QACase(QAType.UNIT, "test_junit", "JUnit", "@Test public void t() {}", "Main.java")
+        ok = py_test("test_ok", "def test_ok():\n    assert True\n")
+        self.assertFalse(asyncio.run(run([])).zero_errors_achieved)
+        self.assertFalse(asyncio.run(run([junit])).zero_errors_achieved)
+        self.assertFalse(asyncio.run(run([ok, junit])).zero_errors_achieved)
+        self.assertTrue(asyncio.run(run([ok])).zero_errors_achieved)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+QWAMOS AI Security: Request Sanitizer - Unit Tests
+Tests single-pass redaction, streaming and the cloud controllers' use of it
+
+Author: QWAMOS Project
+License: MIT
+"""
+
+import random
+import sys
+import unittest
+from pathlib import Path
+
+# Add ai/ and ai/security/ to path
+REPO_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(REPO_ROOT / "ai"))
+sys.path.insert(0, str(REPO_ROOT / "ai" / "security"))
+
+try:
+    import requests
+except ImportError:
+    requests = None
+
+from request_sanitizer import RequestSanitizer
+from sanitizer_benchmark import legacy_sanitize, make_scan_output
+
+
+class TestSanitize(unittest.TestCase):
+    """Test one-shot sanitization."""
+
+    def setUp(self):
+        self.sanitizer = RequestSanitizer()
+
+    def test_documented_redactions(self):
+        """Test each documented PII class is replaced by its token."""
+        cases = [
+            ("My IP is 192.168.1.100 and email is user@example.com",
+             "My IP is [IP_ADDRESS] and email is [EMAIL]"),
+            ("Call me at 555-123-4567 or +1-555-123-4567", "Call me at [PHONE] or [PHONE]"),
+            ("Credit card: 4532-1234-5678-9010", "Credit card: [CREDIT_CARD]"),
+            ("SSN: 123-45-6789", "SSN: [SSN]"),
+            ("gw fe80:0:0:0:202:b3ff:fe1e:8329 mac 00:1A:2B:3C:4D:5E",
+             "gw [IPV6_ADDRESS] mac [MAC_ADDRESS]"),
+            ("Visit https://example.com?token=secret123&user=admin", "Visit [URL_WITH_PARAMS]"),
+            ("File: /home/user/.ssh/id_rsa", "File: [FILE_PATH]"),
+            ("Username: admin, Password: secret123", "username: [USERNAME], password: [REDACTED]"),
+            ("key sk-abcdefghijklmnopqrstuvwx and ghp_" + "a" * 36, "key [API_KEY] and [API_KEY]"),
+            ("pass=hunter2 but pass the test", "password: [REDACTED] but pass the test"),
+        ]
+        for text, expected in cases:
+            with self.subTest(text=text):
+                self.assertEqual(self.sanitizer.sanitize(text)[0], expected)
+
+    def test_values_after_credential_keywords(self):
+        """Test IPs, emails, cards and keys after user/login/password are not cut to one token."""
+        cases = [
+            ("user: 192.168.1.100 connected", "user: [IP_ADDRESS] connected"),
+            ("login=alice@example.com", "login=[EMAIL]"),
+            ("user 4532-1234-5678-9010", "user [CREDIT_CARD]"),
+            ("login: 123-45-6789 ok", "login: [SSN] ok"),
+            ("user=sk-" + "a1" * 20, "user=[API_KEY]"),
+            ("login=admin42 password=hunter1", "username: [USERNAME] password: [REDACTED]"),
+            ("password: 4532 1234 5678 9010 end", "password: [REDACTED] end"),
+        ]
+        for text, expected in cases:
+            with self.subTest(text=text):
+                self.assertEqual(self.sanitizer.sanitize(text)[0], expected)
+                self.assertEqual(legacy_sanitize(text), expected)
+
+    def test_values_do_not_swallow_labels(self):
+        """Test a credential or phone value doesn't take the next label and leak its value."""
+        cases = [
+            ("password: user: X", "password: [REDACTED] [USERNAME]"),
+            ("pass= user:\nX", "password: [REDACTED] [USERNAME]"),
+            ("pass=Xuser: Y end", "password: [REDACTED] [USERNAME] end"),
+            ("+1 555 123 4567user@example.com", "[PHONE] [EMAIL]"),
+            ("see /home/user@example.com", "see /home/[EMAIL]"),
+            ("pwd=user:+1 555 123 4567pass=x", "password: [REDACTED]"),
+            ("login=adminsk-" + "a" * 24, "username: [USERNAME][API_KEY]"),
+        ]
+        for text, expected in cases:
+            with self.subTest(text=text):
+                self.assertEqual(self.sanitizer.sanitize(text)[0], expected)
+                self.assertEqual(legacy_sanitize(text), expected)
+
+    def test_report_and_detection(self):
+        """Test the replacement report and check_for_sensitive_data."""
+        text = "10.0.0.1 10.0.0.2 admin@corp.example"
+        _, replacements = self.sanitizer.sanitize(text)
+        self.assertEqual(replacements, ["ipv4: 2 replacement(s)", "email: 1 replacement(s)"])
+        self.assertEqual(self.sanitizer.get_report(), "Sanitized: ipv4: 2 replacement(s), email: 1 replacement(s)")
+        self.assertEqual(self.sanitizer.check_for_sensitive_data(text), ['ipv4', 'email'])
+        self.assertEqual(self.sanitizer.check_for_sensitive_data("nothing here"), [])
+
+    def test_aggressive(self):
+        """Test hashes are only redacted in aggressive mode."""
+        text = "hostkey " + "ab" * 32
+        self.assertEqual(self.sanitizer.sanitize(text)[0], text)
+        self.assertEqual(self.sanitizer.sanitize(text, aggressive=True)[0], "hostkey [HASH]")
+
+    def test_matches_per_pattern_passes(self):
+        """Test the combined pass agrees with one re.sub() per pattern on scan output."""
+        text = make_scan_output(0.2, seed=7)
+        for aggressive in (False, True):
+            with self.subTest(aggressive=aggressive):
+                self.assertEqual(self.sanitizer.sanitize(text, aggressive)[0],
+                                 legacy_sanitize(text, aggressive))
+
+
+class TestSanitizeStream(unittest.TestCase):
+    """Test chunked sanitization."""
+
+    def test_stream_equals_one_shot(self):
+        """Test random chunk boundaries give the same output and report."""
+        sanitizer = RequestSanitizer()
+        text = make_scan_output(0.3, seed=3)
+        expected, report = sanitizer.sanitize(text, aggressive=True)
+
+        rng = random.Random(1)
+        for _ in range(5):
+            cuts = sorted(rng.sample(range(1, len(text)), 200))
+            chunks = [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+            streamed = "".join(sanitizer.sanitize_stream(chunks, aggressive=True, overlap=256))
+            self.assertEqual(streamed, expected)
+            self.assertEqual(sanitizer.replacements_made, report)
+
+    def test_match_across_chunk_boundary(self):
+        """Test a match split over two chunks is still redacted once."""
+        sanitizer = RequestSanitizer()
+        chunks = ["x" * 60 + " admin@corp.ex", "ample 192.168.", "1.100 end"]
+        streamed = "".join(sanitizer.sanitize_stream(chunks, overlap=16))
+        self.assertEqual(streamed, "x" * 60 + " [EMAIL] [IP_ADDRESS] end")
+
+
+@unittest.skipUnless(requests, "requests not installed")
+class TestControllerSanitization(unittest.TestCase):
+    """Test the cloud controllers redact with the shared sanitizer."""
+
+    def test_controllers(self):
+        sys.path.insert(0, str(REPO_ROOT / "ai" / "claude"))
+        sys.path.insert(0, str(REPO_ROOT / "ai" / "chatgpt"))
+        from claude_controller import ClaudeController
+        from chatgpt_controller import ChatGPTController
+
+        prompt = "scan 10.0.0.5 for admin@corp.example, password: hunter2"
+        for logger, controller in (('Claude', ClaudeController("test-key")),
+                                   ('ChatGPT', ChatGPTController("test-key"))):
+            with self.subTest(controller=logger):
+                with self.assertLogs(logger, 'WARNING'):
+                    sanitized = controller.sanitize_request(prompt)
+                self.assertEqual(sanitized, "scan [IP_ADDRESS] for [EMAIL], password: [REDACTED]")
+                controller.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+QWAMOS Phase 9: Runtime Monitor Scheduler - Unit Tests
+Tests per-VM batching, staggering, adaptive intervals and threat fan-out
+
+Author: QWAMOS Project
+License: MIT
+"""
+
+import asyncio
+import sys
+import unittest
+from pathlib import Path
+
+# Add deployment/ to path
+REPO_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(REPO_ROOT / "ai_app_builder" / "deployment"))
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+if psutil:
+    from deployment_manager import (
+        DeploymentManager, RuntimeMetrics, RuntimeMonitorScheduler, ThreatDetection,
+        ThreatLevel, VMConfiguration
+    )
+
+SCALE = 0.02  # 5 s base interval -> 100 ms
+
+
+def vm(name):
+    return VMConfiguration(vm_id=f"id_{name}", vm_name=name, cpu_cores=2, ram_mb=1024,
+                           storage_gb=2, network_mode='isolated', android_version="13")
+
+
+def make_manager(**monitor):
+    monitor_config = {
+        'base_interval_seconds': 5.0 * SCALE,
+        'min_interval_seconds': 1.0 * SCALE,
+        'max_interval_seconds': 15.0 * SCALE,
+    }
+    monitor_config.update(monitor)
+
+    class FakeManager(DeploymentManager):
+        def __init__(self):
+            super().__init__({'deployment': {'runtime_monitor': monitor_config}})
+            self.collections = []
+            self.stopped = []
+            self.hot = set()
+            self.critical = set()
+            self.broken = set()
+            self.in_flight = 0
+            self.peak = 0
+
+        async def _collect_vm_metrics(self, vm_config, package_names):
+            self.collections.append((vm_config.vm_name, sorted(package_names)))
+            if vm_config.vm_name in self.broken:
+                raise RuntimeError("adb offline")
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            await asyncio.sleep(0.01)
+            self.in_flight -= 1
+            return {p: RuntimeMetrics(5.0, 128.0, 0, 512 if p in self.hot else 0, 50.0, 1.0)
+                    for p in package_names}
+
+        async def _detect_threats(self, vm_config, package_name, metrics):
+            if package_name in self.critical:
+                return ThreatDetection(ThreatLevel.CRITICAL, ["exfiltration"], [], "")
+            return await super()._detect_threats(vm_config, package_name, metrics)
+
+        async def stop_app(self, app_id):
+            self.stopped.append(app_id)
+            return True
+
+    return FakeManager()
+
+
+def polls(manager, name):
+    return sum(1 for vm_name, _ in manager.collections if vm_name == name)
+
+
+@unittest.skipUnless(psutil, "psutil not installed")
+class TestRuntimeMonitorScheduler(unittest.IsolatedAsyncioTestCase):
+    """Test the single scheduler that replaced per-app monitor tasks."""
+
+    async def asyncSetUp(self):
+        self.manager = make_manager()
+        self.monitor = self.manager.runtime_monitor
+
+    async def asyncTearDown(self):
+        await self.monitor.stop()
+
+    async def test_batches_apps_per_vm(self):
+        """Test apps sharing a VM are collected in one call."""
+        shared = vm("shared")
+        await self.manager._start_runtime_monitor(shared, "com.a", "u_com.a")
+        await self.manager._start_runtime_monitor(shared, "com.b", "u_com.b")
+        await asyncio.sleep(0.35)
+
+        self.assertGreaterEqual(len(self.manager.collections), 2)
+        self.assertTrue(all(c == ("shared", ["com.a", "com.b"]) for c in self.manager.collections))
+        self.assertEqual(self.monitor.get_stats()['vms'], 1)
+        self.assertEqual(self.monitor.get_stats()['apps'], 2)
+
+    async def test_adaptive_interval(self):
+        """Test a VM under threat is polled faster than a quiet one."""
+        self.manager.hot.add("com.hot")
+        self.monitor.register(vm("hot"), "com.hot", "u_com.hot")
+        self.monitor.register(vm("quiet"), "com.quiet", "u_com.quiet")
+        await asyncio.sleep(0.8)
+
+        self.assertGreater(polls(self.manager, "hot"), 3 * polls(self.manager, "quiet"))
+
+        # Default intervals: 1 s under HIGH/CRITICAL up to 15 s while quiet
+        defaults = RuntimeMonitorScheduler(self.manager)
+        self.assertEqual(defaults._next_interval(5.0, ThreatLevel.HIGH), 1.0)
+        self.assertEqual(defaults._next_interval(5.0, ThreatLevel.MEDIUM), 2.5)
+        self.assertEqual(defaults._next_interval(5.0, ThreatLevel.NONE), 7.5)
+        self.assertEqual(defaults._next_interval(14.0, ThreatLevel.NONE), 15.0)
+        self.assertEqual(defaults._next_interval(14.0, ThreatLevel.LOW), 5.0)
+
+    async def test_staggered_and_bounded(self):
+        """Test first polls spread over the base interval with bounded concurrency."""
+        manager = make_manager(max_concurrent_collections=3)
+        loop = asyncio.get_running_loop()
+        for i in range(30):
+            manager.runtime_monitor.register(vm(f"vm{i}"), f"com.app{i}", f"u_com.app{i}")
+        dues = sorted(due - loop.time() for due, *_ in manager.runtime_monitor.heap)
+        await asyncio.sleep(0.15)
+        await manager.runtime_monitor.stop()
+
+        self.assertEqual(len(dues), 30)
+        self.assertGreater(dues[-1] - dues[0], 0.05)
+        self.assertLessEqual(manager.peak, 3)
+        self.assertGreaterEqual(len({name for name, _ in manager.collections}), 25)
+
+    async def test_critical_threat_stops_app(self):
+        """Test CRITICAL findings are fanned out and stop the app by app_id."""
+        self.manager.critical.add("com.evil")
+        self.monitor.register(vm("evil"), "com.evil", "user1_com.evil")
+        await asyncio.sleep(0.2)
+        self.assertEqual(self.manager.stopped, ["user1_com.evil"])
+
+        # The stopped app is no longer polled
+        self.assertNotIn("id_evil", self.monitor.vms)
+        polled = polls(self.manager, "evil")
+        await asyncio.sleep(0.2)
+        self.assertEqual(polls(self.manager, "evil"), polled)
+
+    async def test_unregister_and_errors(self):
+        """Test uninstalled apps stop being polled and collection errors back off."""
+        self.manager.broken.add("broken")
+        self.monitor.error_interval = 0.3
+        self.monitor.register(vm("gone"), "com.gone", "u_com.gone")
+        self.monitor.register(vm("broken"), "com.broken", "u_com.broken")
+        await asyncio.sleep(0.15)
+        self.monitor.unregister("id_gone", "com.gone")
+        polled = polls(self.manager, "gone")
+        await asyncio.sleep(0.3)
+
+        self.assertEqual(polls(self.manager, "gone"), polled)
+        self.assertLessEqual(polls(self.manager, "broken"), 2)
+        self.assertGreaterEqual(self.monitor.get_stats()['errors'], 1)
+        self.assertFalse(self.monitor.task.done())
+
+
+@unittest.skipUnless(psutil, "psutil not installed")
+class TestMonitorBenchmark(unittest.TestCase):
+    def test_small_fleet(self):
+        sys.path.insert(0, str(REPO_ROOT / "ai_app_builder" / "deployment"))
+        from monitor_benchmark import run_benchmark
+
+        results = run_benchmark(apps=40, hot=4, scale=0.01, monitored_seconds=40)
+        self.assertEqual(results['legacy']['peak_concurrent'], 40)
+        self.assertLessEqual(results['scheduler']['peak_concurrent'], 8)
+        self.assertLess(results['scheduler']['hot_interval_s'], results['legacy']['hot_interval_s'])
+
+
+if __name__ == "__main__":
+    unittest.main()
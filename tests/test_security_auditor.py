@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+QWAMOS Phase 9: Triple-AI Security Auditor - Unit Tests
+Tests the shared static-analysis engine, finding locations and re-audit memoization
+
+Author: QWAMOS Project
+License: MIT
+"""
+
+import asyncio
+import sys
+import unittest
+from pathlib import Path
+
+# Add auditor/security to path
+REPO_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(REPO_ROOT / "ai_app_builder" / "auditor" / "security"))
+
+from security_auditor import (
+    StaticAnalysisEngine, TripleAISecurityAuditor, VulnerabilitySeverity
+)
+
+CONFIG = {
+    'security_audit': {
+        'min_score_per_ai': 90.0,
+        'fail_conditions': ['insecure_crypto', 'hardcoded_secrets', 'known_vulnerabilities',
+                            'network_calls_without_permission']
+    }
+}
+
+CRYPTO_UTIL = """package org.qwamos.notes
+
+import java.util.Random
+
+object CryptoUtil {
+    private val password = "hunter2-MD5"
+    fun cipher() = Cipher.getInstance("AES/ECB/PKCS5Padding")
+}
+"""
+
+MAIN_ACTIVITY = """class MainActivity : Activity() {
+    override fun onCreate(state: Bundle?) {
+        val input = findViewById<EditText>(R.id.note)
+        // TODO: encrypt notes before saving
+        db.execSQL("INSERT INTO notes VALUES('" + input.text + "')")
+    }
+}
+"""
+
+
+def audit(auditor, code, manifest="", dependencies=None, request="offline notes app"):
+    return asyncio.run(auditor.perform_triple_audit(code, manifest, dependencies or [], request))
+
+
+def by_description(result):
+    return {v.description: v for audit in (result.kali_gpt_audit, result.claude_audit, result.chatgpt_audit)
+            for v in audit.vulnerabilities}
+
+
+class TestStaticAnalysis(unittest.TestCase):
+    """Test findings produced from the shared analysis."""
+
+    def setUp(self):
+        self.auditor = TripleAISecurityAuditor(CONFIG, None, None, None)
+
+    def test_findings_have_locations(self):
+        """Test each finding reports the line and column of its first match."""
+        result = audit(self.auditor, {'CryptoUtil.kt': CRYPTO_UTIL, 'MainActivity.kt': MAIN_ACTIVITY})
+        findings = by_description(result)
+
+        sql = findings["Potential SQL injection - string concatenation in SQL query"]
+        self.assertEqual((sql.file, sql.line, sql.column), ('MainActivity.kt', 5, 11))
+        self.assertEqual(sql.detected_by_ai, 'kali_gpt')
+
+        secret = findings["Hardcoded secret detected in source code"]
+        self.assertEqual((secret.file, secret.line, secret.column), ('CryptoUtil.kt', 6, 17))
+        self.assertEqual(secret.severity, VulnerabilitySeverity.CRITICAL)
+
+        # Overlapping matches are all found: MD5 sits inside the secret literal
+        md5 = findings["Weak cryptographic algorithm detected: MD5"]
+        self.assertEqual((md5.line, md5.column), (6, 37))
+        self.assertEqual(findings["ECB cipher mode detected (insecure)"].line, 7)
+        self.assertEqual(findings["Insecure random number generator used for cryptographic operations"].line, 3)
+
+        todo = findings["Unfinished security-related code (TODO/FIXME)"]
+        self.assertEqual((todo.file, todo.line, todo.detected_by_ai), ('MainActivity.kt', 4, 'chatgpt'))
+        unvalidated = findings["User input handling without visible validation"]
+        self.assertEqual((unvalidated.line, unvalidated.detected_by_ai), (3, 'claude'))
+        self.assertEqual(findings["Activity may lack authentication checks"].line, 1)
+
+        self.assertEqual(result.fail_conditions_triggered, [
+            "Insecure cryptography: MD5",
+            "Hardcoded secrets detected",
+            "2 critical vulnerabilities detected",
+        ])
+        self.assertFalse(result.all_pass)
+
+    def test_clean_code_passes(self):
+        """Test code without findings scores 100 from every AI."""
+        result = audit(self.auditor, {'Notes.kt': "class Notes { fun count() = 0 }\n"})
+        for ai_audit in (result.kali_gpt_audit, result.claude_audit, result.chatgpt_audit):
+            self.assertEqual(ai_audit.score, 100.0)
+        self.assertTrue(result.all_pass)
+
+
+class TestReaudit(unittest.TestCase):
+    """Test scans are shared between audits and memoized across re-audits."""
+
+    def test_only_changed_files_rescanned(self):
+        auditor = TripleAISecurityAuditor(CONFIG, None, None, None)
+        code = {f'File{i}.kt': f"class File{i} {{ val n = {i} }}\n" for i in range(10)}
+        code['MainActivity.kt'] = MAIN_ACTIVITY
+
+        first = audit(auditor, code)
+        # One scan per file serves all three AI audits and the fail conditions
+        self.assertEqual(auditor.analysis_engine.get_stats()['files_scanned'], 11)
+
+        fixed = dict(code, **{'MainActivity.kt': MAIN_ACTIVITY.replace('" + input.text + "', "?")})
+        second = audit(auditor, fixed)
+        stats = auditor.analysis_engine.get_stats()
+        self.assertEqual(stats['files_scanned'], 12)
+        self.assertEqual(stats['cache_hits'], 10)
+
+        self.assertIn("Potential SQL injection - string concatenation in SQL query", by_description(first))
+        self.assertNotIn("Potential SQL injection - string concatenation in SQL query", by_description(second))
+        self.assertGreater(second.kali_gpt_audit.score, first.kali_gpt_audit.score)
+
+    def test_cache_bound(self):
+        """Test the memo table evicts least recently used contents."""
+        engine = StaticAnalysisEngine(max_cached_files=2)
+        for text in ("a", "b", "a", "c"):
+            engine.scan(text)
+        self.assertEqual(engine.get_stats(), {'files_scanned': 3, 'cache_hits': 1, 'cached_files': 2})
+        engine.scan("a")
+        self.assertEqual(engine.get_stats()['cache_hits'], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
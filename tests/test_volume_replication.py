@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+QWAMOS Phase XVI: Volume Replication - Unit Tests
+Tests Merkle-tree delta replication of PQC volumes over a local cluster
+
+Author: QWAMOS Project
+License: MIT
+"""
+
+import asyncio
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add cluster to path
+REPO_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "cluster"))
+
+from volume_replication import (
+    MerkleTree, ReplicationError, ReplicationSource, VolumeReplicator, hash_data, load_leaves
+)
+from replication_benchmark import run_benchmark
+from crypto.pqc_keystore import PQCKeystore
+from storage.pqc_volume import PQCVolume
+from tests.helpers.cluster_harness import LocalCluster
+
+
+class TestMerkleTree(unittest.TestCase):
+    """Test the fixed-fanout hash tree."""
+
+    def test_incremental_update_matches_rebuild(self):
+        """Test updating leaves gives the same root as rebuilding."""
+        leaves = [hash_data(str(i)) for i in range(300)]
+        tree = MerkleTree(leaves, fanout=4)
+        self.assertEqual(tree.depth, 6)  # 300 -> 75 -> 19 -> 5 -> 2 -> 1
+
+        changes = {0: hash_data("a"), 150: hash_data("b"), 299: hash_data("c")}
+        tree.update(changes)
+        leaves = [changes.get(i, leaf) for i, leaf in enumerate(leaves)]
+        self.assertEqual(tree.root, MerkleTree(leaves, fanout=4).root)
+
+    def test_children(self):
+        """Test child slices at the ragged edge."""
+        tree = MerkleTree([hash_data(str(i)) for i in range(10)], fanout=4)
+        self.assertEqual(len(tree.children(1, 0)), 4)
+        self.assertEqual(len(tree.children(1, 2)), 2)
+        self.assertEqual(tree.children(tree.depth - 1, 0), tree.levels[-2])
+
+    def test_empty(self):
+        """Test a volume with no blocks still has a root."""
+        self.assertEqual(MerkleTree([]).depth, 1)
+
+
+class TestVolumeReplication(unittest.IsolatedAsyncioTestCase):
+    """Test replicating a PQC volume between two nodes."""
+
+    async def asyncSetUp(self):
+        self.work_dir = Path(tempfile.mkdtemp())
+        self.keystore = PQCKeystore(keystore_path=str(self.work_dir / "keys"))
+        self.source_path = self.work_dir / "source" / "data.qvol"
+        self.replica_path = self.work_dir / "replica" / "data.qvol"
+
+        self.volume = PQCVolume(str(self.source_path), self.keystore)
+        self.volume.create("data", "test-vm", size_mb=4)  # 1024 blocks
+        self.volume.open()
+        for block in range(0, 1024, 7):
+            self.volume.write_block(block, f"block {block}".encode())
+        self.volume.file_handle.flush()
+
+        self.cluster = LocalCluster(2)
+        await self.cluster.start()
+        self.source = ReplicationSource(self.cluster["node-00"], {"data": str(self.source_path)}, fanout=8)
+        self.replicator = VolumeReplicator(self.cluster["node-01"], batch_blocks=16, window=4)
+
+    async def asyncTearDown(self):
+        self.volume.close()
+        await self.cluster.stop()
+        shutil.rmtree(self.work_dir)
+
+    def _write(self, block: int, data: bytes):
+        self.volume.write_block(block, data)
+        self.volume.file_handle.flush()
+
+    def _read_replica(self, block: int) -> bytes:
+        replica = PQCVolume(str(self.replica_path), self.keystore)
+        replica.open(readonly=True)
+        try:
+            return replica.read_block(block).rstrip(b"\x00")
+        finally:
+            replica.close()
+
+    async def test_initial_copy_decrypts_on_replica(self):
+        """Test the replica is byte-identical and readable with the shared key."""
+        stats = await self.replicator.replicate("node-00", "data", str(self.replica_path))
+        self.assertEqual(stats["blocks_changed"], len(range(0, 1024, 7)))
+        self.assertEqual(self.replica_path.read_bytes(), self.source_path.read_bytes())
+        self.assertEqual(self._read_replica(700), b"block 700")
+
+    async def test_delta_is_logarithmic(self):
+        """Test one changed block costs one round trip per tree level."""
+        await self.replicator.replicate("node-00", "data", str(self.replica_path))
+        self._write(500, b"changed")
+
+        stats = await self.replicator.replicate("node-00", "data", str(self.replica_path))
+        depth = self.source.tree("data").depth  # 1024 leaves, fanout 8 -> 5 levels
+        self.assertEqual(depth, 5)
+        self.assertEqual(stats["blocks_changed"], 1)
+        self.assertEqual(stats["round_trips"], depth)
+        self.assertEqual(stats["block_requests"], 1)
+        self.assertEqual(self._read_replica(500), b"changed")
+
+        stats = await self.replicator.replicate("node-00", "data", str(self.replica_path))
+        self.assertEqual((stats["round_trips"], stats["blocks_changed"]), (1, 0))
+
+    async def test_resume_from_checkpoint(self):
+        """Test an interrupted transfer resumes with only the missing blocks."""
+        served = [0]
+        on_blocks = self.source._on_blocks
+
+        async def flaky(peer_id, body):
+            served[0] += 1
+            if served[0] > 3:
+                raise RuntimeError("link dropped")
+            return await on_blocks(peer_id, body)
+
+        self.cluster["node-00"].on("repl_blocks", flaky)
+        replicator = VolumeReplicator(self.cluster["node-01"], batch_blocks=16, window=1, checkpoint_blocks=16)
+        with self.assertRaises(Exception):
+            await replicator.replicate("node-00", "data", str(self.replica_path))
+        checkpoint = self.replica_path.with_name("data.qvol.replckpt")
+        self.assertTrue(checkpoint.exists())
+
+        self.cluster["node-00"].on("repl_blocks", on_blocks)
+        stats = await replicator.replicate("node-00", "data", str(self.replica_path))
+        self.assertTrue(stats["resumed"])
+        self.assertEqual(stats["round_trips"], 1)
+        self.assertEqual(stats["blocks_changed"], len(range(0, 1024, 7)) - 3 * 16)
+        self.assertFalse(checkpoint.exists())
+        self.assertEqual(self.replica_path.read_bytes(), self.source_path.read_bytes())
+
+    async def test_source_change_mid_transfer_detected(self):
+        """Test blocks rewritten after the diff fail verification."""
+        on_blocks = self.source._on_blocks
+
+        async def rewrite_then_serve(peer_id, body):
+            self._write(body["blocks"][0], b"rewritten")
+            return await on_blocks(peer_id, body)
+
+        self.cluster["node-00"].on("repl_blocks", rewrite_then_serve)
+        with self.assertRaises(ReplicationError):
+            await self.replicator.replicate("node-00", "data", str(self.replica_path))
+
+    async def test_leaf_cache_reused(self):
+        """Test unchanged volumes are not re-hashed."""
+        leaves = load_leaves(self.source_path)
+        cache = self.source_path.with_name("data.qvol.merkle")
+        self.assertTrue(cache.exists())
+        stamp = cache.stat().st_mtime_ns
+        self.assertEqual(load_leaves(self.source_path), leaves)
+        self.assertEqual(cache.stat().st_mtime_ns, stamp)
+
+    async def test_push(self):
+        """Test a source asks a peer to pull into its volume directory."""
+        VolumeReplicator(self.cluster["node-01"], volume_dir=str(self.work_dir / "pushed"))
+        stats = await self.source.push("node-01", "data", timeout=10)
+        self.assertEqual(stats["blocks_total"], 1024)
+        self.assertEqual((self.work_dir / "pushed" / "data.qvol").read_bytes(), self.source_path.read_bytes())
+
+
+class TestReplicationBenchmark(unittest.TestCase):
+    """Smoke-test the loopback benchmark."""
+
+    def test_benchmark_runs(self):
+        """Test delta sync moves far less than the initial copy."""
+        results = asyncio.run(run_benchmark(size_mb=4, change=0.01))
+        self.assertLess(results["delta"]["blocks_changed"], results["initial"]["blocks_changed"] / 10)
+        self.assertEqual(results["unchanged"]["round_trips"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,6 +7,10 @@ Signs kernel and initramfs images with Kyber-1024 post-quantum signatures.
 Usage:
     python sign_image.py --image kernel.bin --key keys/device_key.priv --output kernel.signed
 
+Images are streamed: the image is hashed in fixed-size chunks (or via mmap
+with --mmap) and copied to the output, so peak memory stays constant
+regardless of image size.
+
 Output:
     Signed image with appended QWAMOS signature structure (3,413 bytes)
 
@@ -27,6 +31,8 @@ For production, this will use liboqs for real Kyber-1024 signatures.
 import os
 import sys
 import argparse
+import mmap
+import shutil
 import struct
 import hashlib
 import json
@@ -60,6 +66,9 @@ QWAMOS_SIGNATURE_SIZE = (
     QWAMOS_SIGNATURE_RESERVED
 )  # = 3,413 bytes
 
+# Streaming hash chunk size (1 MiB)
+HASH_CHUNK_SIZE = 1 << 20
+
 def compute_sha256(data):
     """
     Compute SHA-256 hash of data.
@@ -72,6 +81,78 @@ def compute_sha256(data):
     """
     return hashlib.sha256(data).digest()
 
+def hash_file(path, length=None, use_mmap=False, chunk_size=HASH_CHUNK_SIZE):
+    """
+    Compute SHA-256 of the first `length` bytes of a file without loading it.
+
+    Chunked reads go through one reused buffer. With use_mmap, the file is
+    hashed from a read-only mapping through memoryview slices (no copies);
+    processed pages are released so RSS does not grow with the image.
+
+    Args:
+        path (Path): File to hash
+        length (int): Bytes to hash from the start (default: whole file)
+        use_mmap (bool): Hash from a memory mapping instead of read() calls
+        chunk_size (int): Bytes hashed per step
+
+    Returns:
+        bytes: SHA-256 hash (32 bytes)
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        if length is None:
+            length = os.fstat(f.fileno()).st_size
+
+        if use_mmap and length > 0:
+            with mmap.mmap(f.fileno(), length, access=mmap.ACCESS_READ) as mapped:
+                if hasattr(mapped, 'madvise'):
+                    mapped.madvise(mmap.MADV_SEQUENTIAL)
+                with memoryview(mapped) as view:
+                    for offset in range(0, length, chunk_size):
+                        end = min(offset + chunk_size, length)
+                        digest.update(view[offset:end])
+                        if hasattr(mmap, 'MADV_DONTNEED'):
+                            mapped.madvise(mmap.MADV_DONTNEED, offset, end - offset)
+            return digest.digest()
+
+        buffer = bytearray(chunk_size)
+        view = memoryview(buffer)
+        remaining = length
+        while remaining > 0:
+            n = f.readinto(view[:min(chunk_size, remaining)])
+            if not n:
+                raise ValueError(f"Unexpected end of file: {path}")
+            digest.update(view[:n])
+            remaining -= n
+    return digest.digest()
+
+def read_signature_trailer(signed_image_path, signature_bytes=KYBER1024_SIGNATURE_BYTES):
+    """
+    Read only the QWAMOS signature structure appended to a signed image.
+
+    Args:
+        signed_image_path (Path): Path to signed image
+        signature_bytes (int): Length of the PQ signature field
+
+    Returns:
+        tuple: (body_size, magic, version, image_size, image_hash, signature)
+
+    Raises:
+        ValueError: If the file is too small to contain a signature
+    """
+    struct_size = 4 + 4 + 4 + 32 + signature_bytes + QWAMOS_SIGNATURE_RESERVED
+    with open(signed_image_path, 'rb') as f:
+        total_size = os.fstat(f.fileno()).st_size
+        if total_size < struct_size:
+            raise ValueError(f"File too small: {total_size} bytes (expected at least {struct_size})")
+        f.seek(total_size - struct_size)
+        signature_data = f.read(struct_size)
+
+    magic, version, image_size = struct.unpack('<III', signature_data[:12])
+    image_hash = signature_data[12:44]
+    signature = signature_data[44:44 + signature_bytes]
+    return total_size - struct_size, magic, version, image_size, image_hash, signature
+
 def load_private_key(key_path):
     """
     Load private key from file.
@@ -132,10 +213,20 @@ def create_qwamos_signature(image_data, private_key):
     Returns:
         bytes: Complete QWAMOS signature structure (3,413 bytes)
     """
-    # Compute SHA-256 hash of image
-    image_hash = compute_sha256(image_data)
-    image_size = len(image_data)
+    return build_signature_struct(compute_sha256(image_data), len(image_data), private_key)
 
+def build_signature_struct(image_hash, image_size, private_key):
+    """
+    Create QWAMOS signature structure from an already computed image hash.
+
+    Args:
+        image_hash (bytes): SHA-256 hash of the image (32 bytes)
+        image_size (int): Image size in bytes
+        private_key (bytes): Private key for signing
+
+    Returns:
+        bytes: Complete QWAMOS signature structure (3,413 bytes)
+    """
     print(f"Image size:  {image_size:,} bytes")
     print(f"Image hash:  {image_hash.hex()}")
 
@@ -160,26 +251,29 @@ def create_qwamos_signature(image_data, private_key):
 
     return signature_struct
 
-def sign_image(image_path, key_path, output_path, verify=True):
+def sign_image(image_path, key_path, output_path, verify=True, use_mmap=False):
     """
     Sign image file and create signed output.
 
+    The image is never held in memory: it is hashed in chunks, copied to
+    the output file and the signature structure is appended.
+
     Args:
         image_path (Path): Path to image file
         key_path (Path): Path to private key
         output_path (Path): Path for signed image output
         verify (bool): Verify signature after signing
+        use_mmap (bool): Hash via mmap instead of chunked reads
 
     Returns:
         dict: Signature metadata
     """
-    # Load image
-    print(f"Loading image: {image_path}")
-    with open(image_path, 'rb') as f:
-        image_data = f.read()
-
-    if len(image_data) == 0:
+    # Hash image
+    print(f"Hashing image: {image_path}")
+    image_size = image_path.stat().st_size
+    if image_size == 0:
         raise ValueError("Image file is empty")
+    image_hash = hash_file(image_path, image_size, use_mmap=use_mmap)
 
     # Load private key
     print(f"Loading private key: {key_path}")
@@ -187,16 +281,16 @@ def sign_image(image_path, key_path, output_path, verify=True):
 
     # Create signature
     print("Creating signature...")
-    signature = create_qwamos_signature(image_data, private_key)
-
-    # Append signature to image
-    signed_image = image_data + signature
+    signature = build_signature_struct(image_hash, image_size, private_key)
 
-    # Save signed image
+    # Copy image and append signature
     print(f"Saving signed image: {output_path}")
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(output_path, 'wb') as f:
-        f.write(signed_image)
+    with open(image_path, 'rb') as src, open(output_path, 'wb') as dst:
+        shutil.copyfileobj(src, dst, HASH_CHUNK_SIZE)
+        if dst.tell() != image_size:
+            raise ValueError(f"Image changed while signing: {image_path}")
+        dst.write(signature)
 
     # Create metadata
     metadata = {
@@ -204,10 +298,10 @@ def sign_image(image_path, key_path, output_path, verify=True):
         "magic": hex(QWAMOS_SIGNATURE_MAGIC),
         "version": QWAMOS_SIGNATURE_VERSION,
         "original_image": str(image_path),
-        "original_size": len(image_data),
+        "original_size": image_size,
         "signature_size": QWAMOS_SIGNATURE_SIZE,
-        "total_size": len(signed_image),
-        "image_hash": compute_sha256(image_data).hex(),
+        "total_size": image_size + len(signature),
+        "image_hash": image_hash.hex(),
         "signed_date": datetime.now().isoformat(),
         "signer": "QWAMOS sign_image.py (stub)",
         "production_ready": False,
@@ -223,7 +317,7 @@ def sign_image(image_path, key_path, output_path, verify=True):
     # Verify if requested
     if verify:
         print("\nVerifying signature...")
-        verify_result = verify_signature(output_path)
+        verify_result = verify_signature(output_path, use_mmap=use_mmap)
         if verify_result:
             print("✓ Signature verification PASSED")
         else:
@@ -232,33 +326,27 @@ def sign_image(image_path, key_path, output_path, verify=True):
 
     return metadata
 
-def verify_signature(signed_image_path):
+def verify_signature(signed_image_path, use_mmap=False):
     """
     Verify QWAMOS signature on signed image.
 
+    Only the trailing signature structure is read into memory; the image
+    body is hashed in place.
+
     Args:
         signed_image_path (Path): Path to signed image
+        use_mmap (bool): Hash via mmap instead of chunked reads
 
     Returns:
         bool: True if signature is valid
     """
-    with open(signed_image_path, 'rb') as f:
-        signed_data = f.read()
-
-    if len(signed_data) < QWAMOS_SIGNATURE_SIZE:
+    try:
+        body_size, magic, version, image_size, image_hash, kyber_signature = \
+            read_signature_trailer(signed_image_path)
+    except ValueError:
         print(f"Error: File too small to contain signature")
         return False
 
-    # Split image and signature
-    image_size_from_file = len(signed_data) - QWAMOS_SIGNATURE_SIZE
-    image_data = signed_data[:image_size_from_file]
-    signature_data = signed_data[image_size_from_file:]
-
-    # Parse signature structure
-    magic, version, image_size = struct.unpack('<III', signature_data[:12])
-    image_hash = signature_data[12:44]
-    kyber_signature = signature_data[44:44+KYBER1024_SIGNATURE_BYTES]
-
     # Verify magic
     if magic != QWAMOS_SIGNATURE_MAGIC:
         print(f"✗ Invalid magic: {hex(magic)} (expected {hex(QWAMOS_SIGNATURE_MAGIC)})")
@@ -272,13 +360,13 @@ def verify_signature(signed_image_path):
     print(f"✓ Version valid: {version}")
 
     # Verify image size
-    if image_size != len(image_data):
-        print(f"✗ Image size mismatch: {image_size} != {len(image_data)}")
+    if image_size != body_size:
+        print(f"✗ Image size mismatch: {image_size} != {body_size}")
         return False
     print(f"✓ Image size valid: {image_size:,} bytes")
 
     # Verify hash
-    computed_hash = compute_sha256(image_data)
+    computed_hash = hash_file(signed_image_path, body_size, use_mmap=use_mmap)
     if computed_hash != image_hash:
         print(f"✗ Hash mismatch!")
         print(f"  Expected: {image_hash.hex()}")
@@ -356,6 +444,12 @@ Signature Structure (3,413 bytes):
         help='Overwrite existing signed image'
     )
 
+    parser.add_argument(
+        '--mmap',
+        action='store_true',
+        help='Hash the image through mmap instead of chunked reads'
+    )
+
     args = parser.parse_args()
 
     # Check if output exists
@@ -384,7 +478,8 @@ Signature Structure (3,413 bytes):
 
     # Sign image
     try:
-        metadata = sign_image(args.image, args.key, args.output, verify=not args.no_verify)
+        metadata = sign_image(args.image, args.key, args.output, verify=not args.no_verify,
+                              use_mmap=args.mmap)
         if metadata is None:
             return 1
     except Exception as e:
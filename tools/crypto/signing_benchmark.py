@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+QWAMOS Image Signing Benchmark
+
+Measures peak RSS and wall time of signing and verifying a large image with
+the previous whole-file path (read everything, slice a second copy, hash)
+against the streaming paths (chunked reads and mmap). Each measurement runs
+in a fresh child process so peak RSS is per operation.
+
+Also times hashing a batch of images sequentially vs. in a process pool
+(the hashing step of verify_signed_image.py --jobs).
+
+Usage:
+    python tools/crypto/signing_benchmark.py [--size-mb 2048] [--batch 4] [--dir /tmp]
+
+Author: QWAMOS Project
+License: MIT
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Add tools/crypto to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+with contextlib.redirect_stdout(io.StringIO()):
+    import sign_image
+
+FILL_CHUNK = 64 << 20
+
+
+def legacy_verify(signed_path):
+    """The previous verify path: whole file in memory plus a sliced copy"""
+    with open(signed_path, 'rb') as f:
+        data = f.read()
+    signature_data = data[-sign_image.QWAMOS_SIGNATURE_SIZE:]
+    original_image = data[:-sign_image.QWAMOS_SIGNATURE_SIZE]
+    return hashlib.sha256(original_image).digest() == signature_data[12:44]
+
+
+def legacy_sign(image_path, key_path, output_path):
+    """The previous sign path: whole image in memory plus image + signature copy"""
+    with open(image_path, 'rb') as f:
+        image_data = f.read()
+    signature = sign_image.create_qwamos_signature(image_data, sign_image.load_private_key(key_path))
+    signed_image = image_data + signature
+    with open(output_path, 'wb') as f:
+        f.write(signed_image)
+
+
+def run_child(mode, image, signed, key, output):
+    """Run one operation (inside the measured child process)"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        if mode == 'legacy-sign':
+            legacy_sign(image, key, output)
+        elif mode == 'stream-sign':
+            sign_image.sign_image(image, key, output, verify=False)
+        elif mode == 'mmap-sign':
+            sign_image.sign_image(image, key, output, verify=False, use_mmap=True)
+        elif mode == 'legacy-verify':
+            ok = legacy_verify(signed)
+        elif mode == 'stream-verify':
+            ok = sign_image.verify_signature(signed)
+        elif mode == 'mmap-verify':
+            ok = sign_image.verify_signature(signed, use_mmap=True)
+    if mode.endswith('verify') and not ok:
+        sys.exit(2)
+
+
+def measure(mode, image, signed, key, output):
+    """Run mode in a fresh process; return wall seconds and peak RSS"""
+    started = time.monotonic()
+    proc = subprocess.Popen([sys.executable, __file__, '--child', mode,
+                             str(image), str(signed), str(key), str(output)])
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{mode} failed with exit code {proc.returncode}")
+    return {'seconds': time.monotonic() - started, 'peak_rss_mb': usage.ru_maxrss / 1024}
+
+
+def write_image(path, size):
+    """Write a pseudo-random image of size bytes"""
+    block = os.urandom(min(FILL_CHUNK, size))
+    with open(path, 'wb') as f:
+        remaining = size
+        while remaining > 0:
+            n = min(len(block), remaining)
+            f.write(block[:n])
+            remaining -= n
+
+
+def run_benchmark(size_mb=2048, batch=4, directory=None, jobs=None):
+    """Sign and verify a size_mb image with each strategy"""
+    size = size_mb << 20
+    results = {'size_mb': size_mb, 'operations': {}, 'batch': {}}
+
+    with tempfile.TemporaryDirectory(dir=directory, prefix="qwamos-sign-bench-") as tmp:
+        tmp = Path(tmp)
+        image, key = tmp / "image.bin", tmp / "device.priv"
+        signed, output = tmp / "image.signed", tmp / "out.signed"
+        write_image(image, size)
+        key.write_bytes(os.urandom(3168))
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            sign_image.sign_image(image, key, signed, verify=False)
+
+        for mode in ('legacy-sign', 'stream-sign', 'mmap-sign',
+                     'legacy-verify', 'stream-verify', 'mmap-verify'):
+            results['operations'][mode] = measure(mode, image, signed, key, output)
+            output.unlink(missing_ok=True)
+
+        # Hash a batch of image bodies: one process vs. a pool
+        if batch > 1:
+            copies = [signed] + [tmp / f"copy{i}.signed" for i in range(1, batch)]
+            for copy in copies[1:]:
+                os.link(signed, copy)
+            length = size
+
+            started = time.monotonic()
+            for copy in copies:
+                sign_image.hash_file(copy, length)
+            sequential = time.monotonic() - started
+
+            workers = jobs or os.cpu_count() or 1
+            started = time.monotonic()
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(sign_image.hash_file, copies, [length] * batch))
+            pooled = time.monotonic() - started
+
+            results['batch'] = {'images': batch, 'workers': workers,
+                                'sequential_s': sequential, 'pool_s': pooled}
+
+    return results
+
+
+def main():
+    """Run benchmark and print results."""
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        mode, *paths = sys.argv[2:]
+        run_child(mode, *map(Path, paths))
+        return
+
+    parser = argparse.ArgumentParser(description="QWAMOS image signing benchmark")
+    parser.add_argument("--size-mb", type=int, default=2048, help="Image size in MiB")
+    parser.add_argument("--batch", type=int, default=4, help="Images in the batch verify test")
+    parser.add_argument("--jobs", type=int, default=None, help="Pool workers for the batch test")
+    parser.add_argument("--dir", default=None, help="Directory for temporary images")
+    parser.add_argument("--json", action="store_true", help="Print raw JSON results")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.size_mb, args.batch, args.dir, args.jobs)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print("=" * 70)
+    print(f"QWAMOS Image Signing Benchmark ({args.size_mb} MiB image)")
+    print("=" * 70)
+    print(f"{'operation':<16} {'seconds':>10} {'peak RSS MiB':>14}")
+    for mode, result in results['operations'].items():
+        print(f"{mode:<16} {result['seconds']:>10.2f} {result['peak_rss_mb']:>14.1f}")
+    if results['batch']:
+        batch = results['batch']
+        print("-" * 70)
+        print(f"Hash {batch['images']} images: sequential {batch['sequential_s']:.2f}s, "
+              f"pool of {batch['workers']} {batch['pool_s']:.2f}s")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
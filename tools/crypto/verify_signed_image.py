@@ -7,22 +7,30 @@ This demonstrates that the bootloader will accept properly signed images.
 
 Usage:
     python verify_signed_image.py --image kernel/Image.signed --pubkey test/keys/qwamos_device.pub
+    python verify_signed_image.py --image images/*.signed --pubkey test/keys/qwamos_device.pub --jobs 4
+
+Only the trailing signature structure is read into memory; image bodies are
+hashed in chunks (or via mmap with --mmap). Several images are verified in
+parallel worker processes.
 """
 
 import os
 import sys
-import struct
-import hashlib
+import time
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 # Try to import liboqs
 try:
     import oqs
     LIBOQS_AVAILABLE = True
 except ImportError:
+    oqs = None
     LIBOQS_AVAILABLE = False
-    print("ERROR: liboqs not available - cannot verify signatures")
-    sys.exit(1)
+
+from sign_image import hash_file, read_signature_trailer
 
 # QWAMOS Signature Constants
 QWAMOS_SIGNATURE_MAGIC = 0x4D415751  # 'QWAM'
@@ -31,24 +39,15 @@ SIGNATURE_SIZE = 4627  # ML-DSA-87
 
 
 def extract_signature_components(signed_image_path):
-    """Extract image and signature from signed image file."""
-    with open(signed_image_path, 'rb') as f:
-        data = f.read()
+    """
+    Read and check the signature structure appended to a signed image.
 
-    # Signature is appended at the end
+    Returns:
+        tuple: (image_size, image_hash, signature); the image body is not read
+    """
     # Format: magic(4) + version(4) + image_size(4) + hash(32) + signature(4627) + reserved(64)
-    header_size = 4 + 4 + 4 + 32
-    signature_struct_size = header_size + SIGNATURE_SIZE + 64
-
-    if len(data) < signature_struct_size:
-        raise ValueError(f"File too small: {len(data)} bytes (expected at least {signature_struct_size})")
-
-    # Extract signature structure from end
-    signature_data = data[-signature_struct_size:]
-    original_image = data[:-signature_struct_size]
-
-    # Parse signature structure
-    magic, version, image_size = struct.unpack('<III', signature_data[:12])
+    body_size, magic, version, image_size, image_hash, signature = \
+        read_signature_trailer(signed_image_path, SIGNATURE_SIZE)
 
     if magic != QWAMOS_SIGNATURE_MAGIC:
         raise ValueError(f"Invalid magic: 0x{magic:08x} (expected 0x{QWAMOS_SIGNATURE_MAGIC:08x})")
@@ -56,101 +55,175 @@ def extract_signature_components(signed_image_path):
     if version != QWAMOS_SIGNATURE_VERSION:
         raise ValueError(f"Invalid version: {version} (expected {QWAMOS_SIGNATURE_VERSION})")
 
-    if image_size != len(original_image):
-        raise ValueError(f"Image size mismatch: {image_size} != {len(original_image)}")
+    if image_size != body_size:
+        raise ValueError(f"Image size mismatch: {image_size} != {body_size}")
 
-    # Extract hash and signature
-    image_hash = signature_data[12:44]
-    signature = signature_data[44:44+SIGNATURE_SIZE]
+    return image_size, image_hash, signature
 
-    return original_image, image_hash, signature
 
-
-def verify_signature(image_data, signature, public_key_path):
-    """Verify ML-DSA-87 signature using public key."""
+def verify_signature(signed_image_path, image_size, signature, public_key_path, use_mmap=False):
+    """Verify ML-DSA-87 signature over the streamed image hash using public key."""
     # Load public key
     with open(public_key_path, 'rb') as f:
         public_key = f.read()
 
-    # Compute SHA-256 hash of image
-    computed_hash = hashlib.sha256(image_data).digest()
-
-    print(f"  Image size:     {len(image_data):,} bytes")
-    print(f"  Computed hash:  {computed_hash.hex()}")
-    print(f"  Public key size: {len(public_key)} bytes")
-    print(f"  Signature size:  {len(signature)} bytes")
+    # Compute SHA-256 hash of image body
+    computed_hash = hash_file(signed_image_path, image_size, use_mmap=use_mmap)
 
     # Verify signature using ML-DSA-87
     try:
         sig = oqs.Signature("ML-DSA-87")
         is_valid = sig.verify(computed_hash, signature, public_key)
 
-        return is_valid, computed_hash
+        return is_valid, computed_hash, len(public_key), None
     except Exception as e:
-        print(f"  Verification error: {e}")
-        return False, computed_hash
+        return False, computed_hash, len(public_key), f"Verification error: {e}"
 
 
-def main():
-    parser = argparse.ArgumentParser(description='Verify QWAMOS signed images')
-    parser.add_argument('--image', required=True, help='Signed image file')
-    parser.add_argument('--pubkey', required=True, help='Public key file')
+def verify_image(signed_image_path, public_key_path, use_mmap=False):
+    """
+    Verify one signed image (runs in a worker process).
 
-    args = parser.parse_args()
+    Returns:
+        dict: image, valid, error, image_size, stored_hash, computed_hash, seconds
+    """
+    started = time.monotonic()
+    result = {"image": str(signed_image_path), "valid": False, "error": None,
+              "image_size": None, "stored_hash": None, "computed_hash": None}
+    try:
+        image_size, stored_hash, signature = extract_signature_components(signed_image_path)
+    except Exception as e:
+        result.update(error=f"Failed to extract signature: {e}", seconds=time.monotonic() - started)
+        return result
+    result.update(image_size=image_size, stored_hash=stored_hash.hex(),
+                  signature_size=len(signature))
 
-    print("=" * 70)
-    print("QWAMOS Signed Image Verification")
-    print("=" * 70)
-    print()
+    try:
+        is_valid, computed_hash, pubkey_size, error = verify_signature(
+            signed_image_path, image_size, signature, public_key_path, use_mmap)
+    except Exception as e:
+        result.update(error=f"Failed to hash image or read public key: {e}",
+                      seconds=time.monotonic() - started)
+        return result
+    result.update(computed_hash=computed_hash.hex(), pubkey_size=pubkey_size, error=error)
 
-    print(f"Signed image: {args.image}")
-    print(f"Public key:   {args.pubkey}")
+    if stored_hash != computed_hash:
+        result["error"] = "Hash mismatch"
+    else:
+        result["valid"] = bool(is_valid)
+    result["seconds"] = time.monotonic() - started
+    return result
+
+
+def verify_images(image_paths, public_key_path, jobs=None, use_mmap=False):
+    """
+    Verify several signed images in parallel worker processes.
+
+    Args:
+        image_paths (list): Signed image files
+        public_key_path (str): Public key file
+        jobs (int): Worker processes (default: one per CPU, at most one per image)
+        use_mmap (bool): Hash via mmap instead of chunked reads
+
+    Returns:
+        list: verify_image() results, in input order
+    """
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(image_paths)))
+    if jobs == 1:
+        return [verify_image(path, public_key_path, use_mmap) for path in image_paths]
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(verify_image, image_paths,
+                             [public_key_path] * len(image_paths),
+                             [use_mmap] * len(image_paths)))
+
+
+def print_result(result):
+    """Print the verification steps for one image."""
+    print(f"Signed image: {result['image']}")
     print()
 
-    # Extract components
     print("[1] Extracting signature components...")
-    try:
-        original_image, stored_hash, signature = extract_signature_components(args.image)
-        print(f"  ✓ Signature structure valid")
-        print(f"  ✓ Stored hash: {stored_hash.hex()}")
-    except Exception as e:
-        print(f"  ✗ Failed to extract signature: {e}")
-        return 1
-
+    if result["stored_hash"] is None:
+        print(f"  ✗ {result['error']}")
+        return
+    print(f"  ✓ Signature structure valid")
+    print(f"  ✓ Stored hash: {result['stored_hash']}")
     print()
 
-    # Verify signature
     print("[2] Verifying ML-DSA-87 signature...")
-    is_valid, computed_hash = verify_signature(original_image, signature, args.pubkey)
-
+    if result["computed_hash"] is None:
+        print(f"  ✗ {result['error']}")
+        return
+    print(f"  Image size:     {result['image_size']:,} bytes")
+    print(f"  Computed hash:  {result['computed_hash']}")
+    print(f"  Public key size: {result['pubkey_size']} bytes")
+    print(f"  Signature size:  {result['signature_size']} bytes")
     print()
 
-    if stored_hash != computed_hash:
+    if result["stored_hash"] != result["computed_hash"]:
         print("  ✗ Hash mismatch!")
-        print(f"    Stored:   {stored_hash.hex()}")
-        print(f"    Computed: {computed_hash.hex()}")
-        return 1
+        print(f"    Stored:   {result['stored_hash']}")
+        print(f"    Computed: {result['computed_hash']}")
+        return
+    print("  ✓ Hash matches")
+
+    if result["valid"]:
+        print(f"  ✓ Signature verification PASSED ({result['seconds']:.2f}s)")
     else:
-        print("  ✓ Hash matches")
+        if result["error"]:
+            print(f"  {result['error']}")
+        print("  ✗ Signature verification FAILED")
+
 
-    if is_valid:
-        print("  ✓ Signature verification PASSED")
+def main():
+    parser = argparse.ArgumentParser(description='Verify QWAMOS signed images')
+    parser.add_argument('--image', required=True, nargs='+', help='Signed image file(s)')
+    parser.add_argument('--pubkey', required=True, help='Public key file')
+    parser.add_argument('--jobs', type=int, default=None,
+                        help='Images verified in parallel (default: CPU count)')
+    parser.add_argument('--mmap', action='store_true',
+                        help='Hash images through mmap instead of chunked reads')
+
+    args = parser.parse_args()
+
+    if not LIBOQS_AVAILABLE:
+        print("ERROR: liboqs not available - cannot verify signatures")
+        return 1
+
+    print("=" * 70)
+    print("QWAMOS Signed Image Verification")
+    print("=" * 70)
+    print()
+
+    print(f"Public key:   {args.pubkey}")
+    print()
+
+    results = verify_images(args.image, args.pubkey, args.jobs, args.mmap)
+    for result in results:
+        print_result(result)
         print()
+
+    failed = [result["image"] for result in results if not result["valid"]]
+    if not failed:
         print("=" * 70)
-        print("✅ IMAGE VERIFICATION SUCCESSFUL")
+        print("✅ IMAGE VERIFICATION SUCCESSFUL"
+              + (f" ({len(results)} images)" if len(results) > 1 else ""))
         print("=" * 70)
         print()
-        print("This image would be accepted by the QWAMOS bootloader.")
+        print("This image would be accepted by the QWAMOS bootloader."
+              if len(results) == 1 else "These images would be accepted by the QWAMOS bootloader.")
         print("Secure boot validation: PASSED")
         return 0
     else:
-        print("  ✗ Signature verification FAILED")
-        print()
         print("=" * 70)
-        print("❌ IMAGE VERIFICATION FAILED")
+        print(f"❌ IMAGE VERIFICATION FAILED ({len(failed)} of {len(results)})")
         print("=" * 70)
         print()
-        print("This image would be REJECTED by the QWAMOS bootloader.")
+        for image in failed:
+            print(f"  REJECTED: {image}")
+        print("This image would be REJECTED by the QWAMOS bootloader."
+              if len(results) == 1 else "Rejected images would not be booted by the QWAMOS bootloader.")
         return 1
 
 